@@ -1 +1 @@
-npx html-minifier-terser index-raw.html --collapse-whitespace --remove-comments --minify-css true --minify-js true -o index.html
\ No newline at end of file
+python python-scripts\build_page.py
\ No newline at end of file
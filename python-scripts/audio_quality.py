@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音質比對與位元率快取（供 轉檔v3.py --optimize 使用）
+========================================
+把「標準化後的參考音」與「編碼後再解碼的候選音」放在同一取樣率、單聲道下比較：
+
+  - 對齊：以 FFT 互相關找出 ±MAX_LAG 取樣內的延遲（mp3 編碼器延遲／解碼修剪不一致時仍可比）
+  - lsd：log-spectral distance（dB），只計非靜音的 STFT 幀，各頻帶以 FLOOR_DB 為下限，
+         愈小愈好；低 VBR 等級砍掉的高頻會直接反映在這個值上
+  - snr：訊號雜訊比（dB），愈大愈好；以波形誤差為準，對能量小的高頻損失不敏感
+  - BitrateCache：以來源檔 SHA-256 + 轉檔參數為鍵，記住每個音檔選到的編碼設定，
+    同一來源、同一參數再跑一次時略過搜尋
+
+需要：ffmpeg、numpy。
+"""
+
+import json
+import os
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import numpy as np
+except ImportError:  # 由呼叫端回報
+    np = None
+
+METRICS = ("lsd", "snr")
+DEFAULT_THRESHOLDS = {"lsd": 4.0, "snr": 20.0}
+MAX_LAG = 2048
+FRAME = 1024
+HOP = 512
+FLOOR_DB = -80.0      # 頻帶下限（相對整段最大值）
+SILENCE_DB = -50.0    # 幀能量低於整段最大值此 dB 數視為靜音，不計入 lsd
+
+
+def decode_mono(path: Path, rate: int) -> "np.ndarray":
+    """音檔 → 單聲道 float32 陣列（ffmpeg 重取樣到 rate）。"""
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", str(path),
+           "-f", "f32le", "-ac", "1", "-ar", str(rate), "-"]
+    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if p.returncode != 0:
+        raise RuntimeError(f"解碼失敗：{path.name}：{p.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(p.stdout, dtype="<f4").astype(np.float64)
+
+
+def align(ref: "np.ndarray", test: "np.ndarray", max_lag: int = MAX_LAG):
+    """以互相關找出 test 相對 ref 的延遲，回傳裁成等長的 (ref, test)。"""
+    n = min(len(ref), len(test))
+    if n == 0:
+        return ref[:0], test[:0]
+    size = 1 << (len(ref) + len(test) - 1).bit_length()
+    corr = np.fft.irfft(np.fft.rfft(test, size) * np.conj(np.fft.rfft(ref, size)), size)
+    lags = np.r_[corr[:max_lag + 1], corr[-max_lag:]]
+    lag = int(np.argmax(lags))
+    if lag > max_lag:
+        lag -= len(lags)
+    if lag > 0:
+        test = test[lag:]
+    elif lag < 0:
+        ref = ref[-lag:]
+    n = min(len(ref), len(test))
+    return ref[:n], test[:n]
+
+
+def _frames(x: "np.ndarray") -> "np.ndarray":
+    if len(x) < FRAME:
+        x = np.pad(x, (0, FRAME - len(x)))
+    count = 1 + (len(x) - FRAME) // HOP
+    idx = np.arange(FRAME)[None, :] + HOP * np.arange(count)[:, None]
+    return x[idx] * np.hanning(FRAME)
+
+
+def spectral_distance(ref: "np.ndarray", test: "np.ndarray") -> float:
+    """對齊後的 log-spectral distance（dB，非靜音幀的平均）。"""
+    r = np.abs(np.fft.rfft(_frames(ref), axis=1)) ** 2
+    t = np.abs(np.fft.rfft(_frames(test), axis=1)) ** 2
+    peak = max(float(r.max()), 1e-20)
+    floor = peak * 10 ** (FLOOR_DB / 10)
+    r_db = 10 * np.log10(np.maximum(r, floor))
+    t_db = 10 * np.log10(np.maximum(t, floor))
+    energy = r.sum(axis=1)
+    active = energy >= energy.max() * 10 ** (SILENCE_DB / 10)
+    if not active.any():
+        return 0.0
+    per_frame = np.sqrt(np.mean((r_db[active] - t_db[active]) ** 2, axis=1))
+    return float(per_frame.mean())
+
+
+def snr_db(ref: "np.ndarray", test: "np.ndarray") -> float:
+    """對齊後的訊號雜訊比（dB）；完全相同時回傳 inf。"""
+    noise = float(np.sum((ref - test) ** 2))
+    signal = float(np.sum(ref ** 2))
+    if noise <= 0:
+        return float("inf")
+    if signal <= 0:
+        return float("-inf")
+    return float(10 * np.log10(signal / noise))
+
+
+def measure(ref_path: Path, test_path: Path, rate: int, metric: str) -> float:
+    """解碼兩個檔案、對齊後回傳指定指標的值。"""
+    ref, test = align(decode_mono(ref_path, rate), decode_mono(test_path, rate))
+    return spectral_distance(ref, test) if metric == "lsd" else snr_db(ref, test)
+
+
+def passes(value: float, metric: str, threshold: float) -> bool:
+    """lsd 愈小愈好、snr 愈大愈好。"""
+    return value <= threshold if metric == "lsd" else value >= threshold
+
+
+# --------------------------------------------------------------------------- #
+#  以來源雜湊為鍵的結果快取                                                       #
+# --------------------------------------------------------------------------- #
+
+class BitrateCache:
+    """JSON 檔：{ "<sha256>|<參數>": {quality, value, bytes, baseline_bytes} }；quality 為 null 表示用基準設定。"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self.dirty = False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self.entries = data
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def key(digest: str, params: str) -> str:
+        return f"{digest}|{params}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self.entries.get(key)
+
+    def put(self, key: str, entry: Dict) -> None:
+        if self.entries.get(key) != entry:
+            self.entries[key] = entry
+            self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+            f.write("\n")
+        os.replace(tmp, self.path)
+        self.dirty = False
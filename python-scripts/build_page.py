@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+頁面建置（取代 build.bat 的 npx html-minifier-terser）
+========================================
+index-raw.html 開頁後要依序等 asset-manifest.json → tags.json + sounds.json（約 750 KB）
+→ vote-results.json 三次往返，才渲染第一批卡片。此腳本產生部署用的 index.html：
+
+  - 壓縮 HTML / CSS / JS：去註解、合併空白（<pre>、<textarea> 與字串 / 樣板字串 / 正規式不動；
+    JS 保留可能影響自動分號的換行，不改名、不改寫語法）
+  - 內嵌 <script id="boot-data" type="application/json">：tags.json、票選前 topRankCount 名、
+    預設順序的第一批音效（CONFIG.ui.batchSize 筆，順序與頁面的 applyVoteResultsOrdering 相同）
+  - 頁面有內嵌資料時不再 fetch tags / vote-results，先用第一批渲染主頁網格，
+    完整的 sounds.json 仍照常載入（搜尋、標籤、最愛都以完整清單為準）
+  - 帶 sizes 屬性的 <img>（關於頁插畫、獎狀）依 config/image-variants.json 補上 srcset，
+    瀏覽器依顯示寬度選 WebP 變體；沒有清單時保持原樣
+  - 報告壓縮前後大小（含 gzip）與第一批卡片出現前的請求數、串行往返數、JSON bytes
+  - 內容沒變就不改寫 index.html（之後 publish_assets.py 再換成雜湊檔名）
+
+用法：
+  python build_page.py                      # index-raw.html → ../index.html
+  python build_page.py --no-inline          # 只壓縮（等同原本的 npx 步驟）
+  python build_page.py --out D:/site/index.html --json
+"""
+
+import argparse
+import gzip
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from image_variants import apply_srcset
+from publish_assets import write_if_changed
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+DEFAULT_SRC = REPO_ROOT / "index-raw.html"
+DEFAULT_OUT = REPO_ROOT / "index.html"
+BOOT_ID = "boot-data"
+# 頁面 loadConfig 在第一批卡片前要取得的資料（asset-manifest 之後）
+BOOT_PATHS = ("tags", "sounds", "voteResults")
+
+# --------------------------------------------------------------------------- #
+# JS                                                                          #
+# --------------------------------------------------------------------------- #
+
+_JS_IDENT = re.compile(r"[\w$\u0080-\uffff]")
+# 前一個字元是這些時，/ 開始的是正規式而不是除號
+_REGEX_AFTER = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+                   "throw", "case", "do", "else", "yield", "await"}
+# 換行前後是這些字元時去掉換行不影響自動分號與 restricted production
+_NL_DROP_AFTER = set("{([,;:=&|?")
+_NL_DROP_BEFORE = set(")]},;.?:")
+
+
+def _is_ident(ch: str) -> bool:
+    return bool(ch) and bool(_JS_IDENT.match(ch))
+
+
+class _JsMinifier:
+    def __init__(self, src: str):
+        self.src = src
+        self.out: List[str] = []
+        self.last = ""       # 最後輸出的非空白字元
+        self.last_word = ""  # 最後輸出的識別字（其後輸出其他符號即清空）
+
+    def emit(self, tok: str, pending: str) -> None:
+        nxt = tok[0]
+        if pending == "\n" and self.last and not (self.last in _NL_DROP_AFTER or nxt in _NL_DROP_BEFORE):
+            self.out.append("\n")
+        elif pending and self.last and (
+                (_is_ident(self.last) and _is_ident(nxt))
+                or (self.last in "+-" and nxt == self.last)
+                or (self.last == "/" and nxt in "/*")
+                or (self.last.isdigit() and nxt == ".")):
+            self.out.append(" ")
+        self.out.append(tok)
+        self.last = tok[-1]
+        self.last_word = tok if _is_ident(tok[0]) and _is_ident(tok[-1]) else ""
+
+    def _quoted(self, i: int, quote: str) -> int:
+        """回傳字串（含引號）結束後的位置。"""
+        src, n = self.src, len(self.src)
+        j = i + 1
+        while j < n and src[j] != quote:
+            j += 2 if src[j] == "\\" else 1
+        return min(j + 1, n)
+
+    def _regex(self, i: int) -> int:
+        src, n = self.src, len(self.src)
+        j, in_class = i + 1, False
+        while j < n:
+            ch = src[j]
+            if ch == "\\":
+                j += 2
+                continue
+            if ch == "[":
+                in_class = True
+            elif ch == "]":
+                in_class = False
+            elif ch == "/" and not in_class:
+                break
+            elif ch == "\n":
+                raise ValueError(f"無法解析的正規式（第 {src.count(chr(10), 0, i) + 1} 行）")
+            j += 1
+        j += 1
+        while j < n and src[j].isalpha():
+            j += 1
+        return j
+
+    def template(self, i: int, pending: str) -> int:
+        """樣板字串原樣輸出，${…} 內當作程式碼處理；回傳結束位置。"""
+        src, n = self.src, len(self.src)
+        self.emit("`", pending)
+        j = i + 1
+        start = j
+        while j < n:
+            ch = src[j]
+            if ch == "\\":
+                j += 2
+            elif ch == "`":
+                self.out.append(src[start:j + 1])
+                self.last, self.last_word = "`", ""
+                return j + 1
+            elif ch == "$" and src.startswith("${", j):
+                self.out.append(src[start:j + 2])
+                self.last, self.last_word = "{", ""
+                j = self.code(j + 2, nested=True)
+                start = j
+            else:
+                j += 1
+        raise ValueError("樣板字串沒有結尾")
+
+    def code(self, i: int, nested: bool = False) -> int:
+        """處理程式碼直到結尾（nested 時到對應的 }，含輸出該 }）；回傳結束位置。"""
+        src, n = self.src, len(self.src)
+        depth, pending = 0, ""
+        while i < n:
+            ch = src[i]
+            if ch.isspace():
+                pending = "\n" if ch == "\n" or pending == "\n" else " "
+                i += 1
+            elif src.startswith("//", i):
+                i = src.find("\n", i)
+                i = n if i < 0 else i
+                pending = pending or " "
+            elif src.startswith("/*", i):
+                end = src.find("*/", i + 2)
+                end = n if end < 0 else end + 2
+                pending = "\n" if "\n" in src[i:end] or pending == "\n" else " "
+                i = end
+            elif ch in "'\"":
+                j = self._quoted(i, ch)
+                self.emit(src[i:j], pending)
+                pending, i = "", j
+            elif ch == "`":
+                i, pending = self.template(i, pending), ""
+            elif ch == "/" and (not self.last or self.last in _REGEX_AFTER or self.last_word in _REGEX_KEYWORDS):
+                j = self._regex(i)
+                self.emit(src[i:j], pending)
+                self.last_word = ""
+                pending, i = "", j
+            elif _is_ident(ch):
+                j = i + 1
+                while j < n and _is_ident(src[j]):
+                    j += 1
+                self.emit(src[i:j], pending)
+                pending, i = "", j
+            else:
+                if ch == "{":
+                    depth += 1
+                elif ch == "}":
+                    if nested and depth == 0:
+                        self.emit("}", "")
+                        return i + 1
+                    depth -= 1
+                self.emit(ch, pending)
+                pending, i = "", i + 1
+        if nested:
+            raise ValueError("樣板字串的 ${ 沒有對應的 }")
+        return n
+
+
+def minify_js(src: str) -> str:
+    m = _JsMinifier(src)
+    m.code(0)
+    return "".join(m.out).strip()
+
+
+# --------------------------------------------------------------------------- #
+# CSS / HTML                                                                  #
+# --------------------------------------------------------------------------- #
+
+_CSS_STRING_OR_COMMENT = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/""", re.S)
+_CSS_STRING = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""")
+
+
+def minify_css(css: str) -> str:
+    css = _CSS_STRING_OR_COMMENT.sub(lambda m: m.group(1) or "", css)
+    parts = _CSS_STRING.split(css)
+    for k in range(0, len(parts), 2):  # 偶數索引是字串以外的部分
+        p = re.sub(r"\s+", " ", parts[k])
+        p = re.sub(r"\s*([{};,])\s*", r"\1", p)
+        p = re.sub(r":\s+", ":", p)  # 只去冒號後的空白：「.a :hover」與「.a:hover」不同
+        parts[k] = p.replace(";}", "}")
+    return "".join(parts).strip()
+
+
+# 兩側的空白不影響排版的元素（其餘如 span、a、button、img 為行內，保留一個空白）
+_BLOCK_TAGS = {
+    "html", "head", "body", "meta", "link", "title", "script", "style", "noscript", "template",
+    "div", "header", "footer", "main", "nav", "section", "article", "aside", "dialog",
+    "h1", "h2", "h3", "h4", "h5", "h6", "p", "ul", "ol", "li", "dl", "dt", "dd",
+    "table", "thead", "tbody", "tfoot", "tr", "td", "th", "form", "fieldset", "legend",
+    "figure", "figcaption", "details", "summary", "hr", "br", "!doctype",
+}
+_HTML_TOKEN = re.compile(
+    r"<!--.*?-->"
+    r"|<(script|style|pre|textarea)\b[^>]*>.*?</\1\s*>"
+    r"|<[^>]+>"
+    r"|[^<]+", re.S | re.I)
+_TAG_NAME = re.compile(r"</?\s*([!\w-]+)")
+_TAG_WS = re.compile(r"""("[^"]*"|'[^']*')|\s+""")
+_JS_TYPES = ("", "text/javascript", "module", "application/javascript")
+
+
+def _tag_name(tok: str) -> str:
+    m = _TAG_NAME.match(tok)
+    return m.group(1).lower() if m else ""
+
+
+def _compact_tag(tag: str) -> str:
+    tag = _TAG_WS.sub(lambda m: m.group(1) or " ", tag)
+    return re.sub(r"\s*(/?>)$", r"\1", tag)
+
+
+def _raw_element(tok: str, name: str) -> str:
+    open_end = tok.index(">") + 1
+    close_start = tok.lower().rindex("</")
+    open_tag, body, close_tag = _compact_tag(tok[:open_end]), tok[open_end:close_start], f"</{name}>"
+    if name == "style":
+        body = minify_css(body)
+    elif name == "script" and not re.search(r"\bsrc\s*=", open_tag, re.I):
+        m = re.search(r"""\btype\s*=\s*["']?([^"'\s>]+)""", open_tag, re.I)
+        kind = m.group(1).lower() if m else ""
+        if kind in _JS_TYPES:
+            body = minify_js(body)
+        elif kind.endswith("json"):
+            body = json.dumps(json.loads(body), ensure_ascii=False, separators=(",", ":"))
+    return open_tag + body + close_tag
+
+
+def minify_html(html: str) -> str:
+    toks = [m.group(0) for m in _HTML_TOKEN.finditer(html)]
+    toks = [t for t in toks if not t.startswith("<!--")]
+    out: List[str] = []
+    for k, tok in enumerate(toks):
+        if tok.startswith("<"):
+            name = _tag_name(tok)
+            out.append(_raw_element(tok, name) if name in ("script", "style") and not tok.startswith("</")
+                       else tok if name in ("pre", "textarea") else _compact_tag(tok))
+            continue
+        text = re.sub(r"\s+", " ", tok)
+        if k > 0 and _tag_name(toks[k - 1]) in _BLOCK_TAGS:
+            text = text.lstrip()
+        if k + 1 < len(toks) and _tag_name(toks[k + 1]) in _BLOCK_TAGS:
+            text = text.rstrip()
+        if text:
+            out.append(text)
+    return "".join(out).strip() + "\n"
+
+
+# --------------------------------------------------------------------------- #
+# 內嵌啟動資料                                                                 #
+# --------------------------------------------------------------------------- #
+
+def page_config(html: str) -> dict:
+    """從頁面的 CONFIG 讀出 batchSize、topRankCount 與資料路徑。"""
+    cfg: Dict[str, object] = {}
+    for key in ("batchSize", "topRankCount"):
+        m = re.search(rf"\b{key}:\s*(\d+)", html)
+        if not m:
+            raise ValueError(f"頁面 CONFIG 中找不到 {key}")
+        cfg[key] = int(m.group(1))
+    for key in BOOT_PATHS:
+        m = re.search(rf"\b{key}:\s*'([^']+\.json)'", html)
+        if not m:
+            raise ValueError(f"頁面 CONFIG.paths 中找不到 {key}")
+        cfg[key] = m.group(1)
+    m = re.search(r"\bimageVariants:\s*'([^']+\.json)'", html)
+    cfg["imageVariants"] = m.group(1) if m else None
+    return cfg
+
+
+def variant_images(root: Path, cfg: dict) -> Dict[str, dict]:
+    """image_variants.py 產生的清單中的 images；沒有清單時回傳空 dict。"""
+    if not cfg.get("imageVariants"):
+        return {}
+    try:
+        with open(root / cfg["imageVariants"], "r", encoding="utf-8") as f:
+            images = json.load(f).get("images")
+    except FileNotFoundError:
+        return {}
+    return images if isinstance(images, dict) else {}
+
+
+def _sound_id(s: dict) -> str:
+    return s.get("id") or re.sub(r"^.*[\\/]", "", s["file"])
+
+
+def first_batch(sounds: list, votes: list, batch_size: int, top_rank: int) -> list:
+    """預設順序（與頁面 applyVoteResultsOrdering 相同：票選前 N 名在前，其餘維持原序）的前 batch_size 筆。"""
+    by_id = {_sound_id(s): s for s in sounds}  # 同 id 以最後一筆為準（同頁面的 Map）
+    top_ids = [v.get("id") for v in votes[:top_rank] if isinstance(v, dict) and v.get("id")]
+    if not top_ids:
+        return sounds[:batch_size]
+    seen, matched = set(), []
+    for vid in top_ids:
+        s = by_id.get(vid)
+        if s is not None and _sound_id(s) not in seen:
+            seen.add(_sound_id(s))
+            matched.append(s)
+    rest = [s for s in sounds if _sound_id(s) not in seen]
+    return (matched + rest)[:batch_size]
+
+
+def boot_data(root: Path, cfg: dict) -> dict:
+    def load(key: str):
+        return json.loads((root / str(cfg[key])).read_text(encoding="utf-8"))
+
+    sounds, votes = load("sounds"), load("voteResults")
+    return {"tags": load("tags"),
+            "votes": votes[:cfg["topRankCount"]],
+            "sounds": first_batch(sounds, votes, cfg["batchSize"], cfg["topRankCount"])}
+
+
+def inject_boot(html: str, data: dict) -> str:
+    """在主程式（第一個沒有 src 的 <script>）前插入內嵌資料。"""
+    # JSON 字串中的 < 轉成 \u003c，內容不可能提前結束 <script>
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).replace("<", "\\u003c")
+    tag = f'<script id="{BOOT_ID}" type="application/json">{payload}</script>'
+    html = re.sub(rf'<script id="{BOOT_ID}"[^>]*>.*?</script>', "", html, flags=re.S)
+    m = re.search(r"<script(?![^>]*\bsrc\s*=)[^>]*>", html, re.I)
+    if not m:
+        raise ValueError("頁面中找不到主程式 <script>")
+    return html[:m.start()] + tag + html[m.start():]
+
+
+# --------------------------------------------------------------------------- #
+# 報告                                                                         #
+# --------------------------------------------------------------------------- #
+
+def _gz(data: bytes) -> int:
+    return len(gzip.compress(data, 9, mtime=0))
+
+
+def startup_profile(html: str, root: Path, cfg: dict, inlined: bool) -> dict:
+    """第一批卡片出現前：請求數、串行往返數（不含頁面本身）與要下載的 JSON bytes。"""
+    blocking = [m.group(1) for m in re.finditer(r"<script\b([^>]*)>", html, re.I)
+                if re.search(r"\bsrc\s*=", m.group(1), re.I) and not re.search(r"\b(async|defer)\b", m.group(1), re.I)]
+    blocking += re.findall(r"<link\b[^>]*rel=[\"']?stylesheet[^>]*>", html, re.I)
+    data = [] if inlined else [str(cfg[k]) for k in BOOT_PATHS]
+    json_bytes = json_gz = 0
+    for rel in data:
+        try:
+            b = (root / rel).read_bytes()
+        except OSError:
+            continue
+        json_bytes += len(b)
+        json_gz += _gz(b)
+    # asset-manifest → (tags ∥ sounds) → vote-results；內嵌時只剩 asset-manifest
+    return {"requests": len(blocking) + 1 + len(data), "round_trips": 1 + (2 if data else 0),
+            "json_bytes": json_bytes, "json_gzip": json_gz}
+
+
+def build(src: Path, root: Path, minify: bool, inline: bool) -> Tuple[str, dict]:
+    raw = src.read_text(encoding="utf-8")
+    cfg = page_config(raw)
+    images = variant_images(root, cfg)
+    html, srcset = apply_srcset(raw, images)
+    html = minify_html(html) if minify else html
+    boot_bytes = 0
+    if inline:
+        data = boot_data(root, cfg)
+        html = inject_boot(html, data)
+        boot_bytes = len(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    raw_b, out_b = raw.encode("utf-8"), html.encode("utf-8")
+    stats = {"src_bytes": len(raw_b), "src_gzip": _gz(raw_b),
+             "out_bytes": len(out_b), "out_gzip": _gz(out_b),
+             "boot_bytes": boot_bytes, "batch_size": cfg["batchSize"],
+             "variants_manifest": bool(images), "srcset": srcset,
+             "before": startup_profile(raw, root, cfg, inlined=False),
+             "after": startup_profile(html, root, cfg, inlined=inline)}
+    return html, stats
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="壓縮 index-raw.html 並內嵌第一批資料，產生 index.html")
+    ap.add_argument("--src", default=str(DEFAULT_SRC), help="原始頁面（預設：index-raw.html）")
+    ap.add_argument("--out", default=str(DEFAULT_OUT), help="輸出頁面（預設：index.html）")
+    ap.add_argument("--root", default=str(REPO_ROOT), help="網站根目錄（讀取 config/，預設：repo 根目錄）")
+    ap.add_argument("--no-inline", action="store_true", help="不內嵌 tags / 票選 / 第一批音效")
+    ap.add_argument("--no-minify", action="store_true", help="不壓縮（方便檢查內嵌結果）")
+    ap.add_argument("--json", action="store_true", help="以 JSON 輸出報告")
+    args = ap.parse_args()
+
+    src, out = Path(args.src), Path(args.out)
+    try:
+        html, stats = build(src, Path(args.root), not args.no_minify, not args.no_inline)
+    except (OSError, ValueError) as e:
+        print(f"建置失敗：{e}", file=sys.stderr)
+        return 1
+    stats["written"] = write_if_changed(out, html.encode("utf-8"))
+
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return 0
+    kb = lambda n: f"{n / 1024:.1f} KB"  # noqa: E731
+    print(f"{src.name} {kb(stats['src_bytes'])}（gzip {kb(stats['src_gzip'])}）→ {out.name} "
+          f"{kb(stats['out_bytes'])}（gzip {kb(stats['out_gzip'])}），{'已寫入' if stats['written'] else '內容未變'}")
+    if stats["boot_bytes"]:
+        print(f"  內嵌 tags、票選、第一批 {stats['batch_size']} 筆音效：{kb(stats['boot_bytes'])}")
+    if stats["srcset"]:
+        print(f"  <img> 補上 srcset：{'、'.join(stats['srcset'])}")
+    elif not stats["variants_manifest"]:
+        print("  沒有圖片變體清單，<img> 維持原圖（先執行 image_variants.py）")
+    print(f"  第一批卡片前{'':8}請求  串行往返  JSON（gzip）")
+    for label, p in (("原本", stats["before"]), ("建置後", stats["after"])):
+        pad = " " * (18 - 2 * len(label))  # 中文標籤佔兩格
+        print(f"  {label}{pad}{p['requests']:>4}{p['round_trips']:>10}  {kb(p['json_bytes'])}（{kb(p['json_gzip'])}）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sounds.json 的原子化、增量寫入與版本歷史
+========================================
+取代「copy2 成 sounds-old.json → deepcopy → write_text 整份」：
+
+  - 寫入：暫存檔 + fsync + os.replace，中途當掉不會留下寫一半的 sounds.json
+  - 增量：每筆記錄的序列化結果（indent=4 的文字片段）留在記憶體，
+          一次合併只重新序列化變動的記錄，其餘直接拼接；載入時若檔案是標準格式，
+          片段直接從原文切出，不必整份重新 dumps
+  - 歷史：每次變更以 JSON Patch（RFC 6902：add / replace / remove）加上反向 patch
+          追加一行到 sounds.history.jsonl（append-only），可復原到任一先前版本；
+          復原本身也是一個新版本，因此可以再「復原復原」
+  - WAL：先寫歷史再換檔；換檔前當掉，下次開啟會依歷史把該版本補寫完成
+
+sounds.json 被外部程式改過（sha256 與歷史最後一版不符）時，下一次提交會先記一筆
+reset，復原無法越過該點。
+
+用法：
+  python catalog_store.py log                   # 列出版本
+  python catalog_store.py show 12               # 顯示第 12 版的 patch
+  python catalog_store.py undo --to 10          # 把 sounds.json 復原成第 10 版的內容
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_SOUNDS = SCRIPT_DIR.parent / "config" / "sounds.json"
+SOUNDS_INDENT = 4  # 與現有 config/sounds.json 一致
+_SEP = ",\n" + " " * SOUNDS_INDENT + "{\n"
+
+
+class CatalogError(RuntimeError):
+    pass
+
+
+def history_path_for(sounds_path: Path) -> Path:
+    return Path(sounds_path).with_name(Path(sounds_path).stem + ".history.jsonl")
+
+
+def _dump_record(rec: Any) -> str:
+    """單筆記錄在 json.dumps(list, indent=4) 中的文字（含第一層縮排）。"""
+    pad = " " * SOUNDS_INDENT
+    return pad + json.dumps(rec, ensure_ascii=False, indent=SOUNDS_INDENT).replace("\n", "\n" + pad)
+
+
+def _join(chunks: List[str]) -> str:
+    if not chunks:
+        return "[]\n"
+    return "[\n" + ",\n".join(chunks) + "\n]\n"
+
+
+def _split_canonical(text: str, n: int) -> Optional[List[str]]:
+    """標準格式（indent=4、每筆為 dict）時直接從原文切出每筆片段；否則回傳 None。"""
+    if n == 0 or not text.startswith("[\n" + " " * SOUNDS_INDENT + "{\n") or not text.endswith("}\n]\n"):
+        return None
+    parts = text[2:-3].split(_SEP)
+    if len(parts) != n:
+        return None
+    head = " " * SOUNDS_INDENT + "{\n"
+    return [parts[0]] + [head + p for p in parts[1:]]
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _index(path: str, n: int, allow_end: bool = False) -> int:
+    if not path.startswith("/"):
+        raise CatalogError(f"不支援的 patch 路徑：{path}")
+    token = path[1:]
+    if token == "-" and allow_end:
+        return n
+    if not token.isdigit():
+        raise CatalogError(f"不支援的 patch 路徑：{path}")
+    i = int(token)
+    if i > n or (i == n and not allow_end):
+        raise CatalogError(f"patch 索引超出範圍：{path}（共 {n} 筆）")
+    return i
+
+
+def _drop_torn_tail(f) -> None:
+    """截掉最後一個換行之後的內容（上次寫到一半當掉的行），下一筆才不會接在它後面。"""
+    end = f.seek(0, os.SEEK_END)
+    pos = end
+    while pos > 0:
+        step = min(4096, pos)
+        f.seek(pos - step)
+        i = f.read(step).rfind(b"\n")
+        if i != -1:
+            pos = pos - step + i + 1
+            break
+        pos -= step
+    if pos != end:
+        f.truncate(pos)
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """暫存檔 + fsync + os.replace；成功後 fsync 所在資料夾（POSIX）。"""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        dfd = os.open(str(path.parent), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dfd)
+        finally:
+            os.close(dfd)
+
+
+class CatalogStore:
+    """
+    sounds.json 的讀寫入口。records 為目前內容（請勿直接修改，變更一律經 commit）。
+    記憶體中的狀態以 (size, mtime_ns) 對應磁碟；檔案被外部改動時自動重新載入。
+    """
+
+    def __init__(self, sounds_path: Path, history_path: Optional[Path] = None):
+        self.path = Path(sounds_path)
+        self.history_path = Path(history_path) if history_path else history_path_for(self.path)
+        self._records: Optional[List[Any]] = None
+        self._chunks: Optional[List[Optional[str]]] = None
+        self._stat: Optional[Tuple[int, int]] = None
+        self._sha: Optional[str] = None
+        self._history: Optional[List[dict]] = None
+
+    # ---------- 載入 ----------
+    def _disk_stat(self) -> Tuple[int, int]:
+        st = self.path.stat()
+        return st.st_size, st.st_mtime_ns
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            raise CatalogError(f"找不到 sounds.json：{self.path}")
+        raw = self.path.read_bytes()
+        text = raw.decode("utf-8")
+        data = json.loads(text)
+        if not isinstance(data, list):
+            raise CatalogError("sounds.json 最外層必須是陣列。")
+        self._records = data
+        self._chunks = _split_canonical(text, len(data)) or [None] * len(data)
+        self._stat = self._disk_stat()
+        self._sha = _sha(raw)
+        self._recover()
+
+    def _ensure_loaded(self) -> None:
+        if self._records is None or self._stat != self._disk_stat():
+            self._load()
+
+    @property
+    def records(self) -> List[Any]:
+        self._ensure_loaded()
+        return self._records
+
+    # ---------- 歷史 ----------
+    def history(self) -> List[dict]:
+        if self._history is None:
+            self._history = []
+            if self.history_path.exists():
+                with open(self.history_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            self._history.append(json.loads(line))
+                        except ValueError:
+                            break  # 最後一行寫到一半（當掉）：之後的都不算
+        return self._history
+
+    @property
+    def version(self) -> int:
+        h = self.history()
+        return h[-1]["version"] if h else 0
+
+    def _append_history(self, entry: dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with open(self.history_path, "a+b") as f:
+            _drop_torn_tail(f)
+            f.write(line.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        self.history().append(entry)
+
+    def _recover(self) -> None:
+        """歷史最後一版已寫入、但 sounds.json 尚未換檔時（WAL 中斷），補寫該版本。"""
+        h = self.history()
+        if not h or h[-1].get("sha256") == self._sha:
+            return
+        last = h[-1]
+        if last.get("parent") == self._sha and "patch" in last:
+            self._apply_ops(last["patch"])
+            self._write()
+
+    # ---------- 變更 ----------
+    def _apply_ops(self, ops: List[dict]) -> List[dict]:
+        """套用 patch 到記憶體狀態，回傳反向 patch。成本與 ops 數量成正比。"""
+        recs, chunks = self._records, self._chunks
+        undo: List[dict] = []
+        for op in ops:
+            kind = op.get("op")
+            if kind == "add":
+                i = _index(op["path"], len(recs), allow_end=True)
+                recs.insert(i, op["value"])
+                chunks.insert(i, None)
+                undo.append({"op": "remove", "path": f"/{i}"})
+            elif kind == "replace":
+                i = _index(op["path"], len(recs))
+                undo.append({"op": "replace", "path": f"/{i}", "value": recs[i]})
+                recs[i] = op["value"]
+                chunks[i] = None
+            elif kind == "remove":
+                i = _index(op["path"], len(recs))
+                undo.append({"op": "add", "path": f"/{i}", "value": recs[i]})
+                del recs[i]
+                del chunks[i]
+            else:
+                raise CatalogError(f"不支援的 patch 操作：{kind}")
+        undo.reverse()
+        return undo
+
+    def _render(self) -> bytes:
+        chunks = self._chunks
+        for i, c in enumerate(chunks):
+            if c is None:
+                chunks[i] = _dump_record(self._records[i])
+        return _join(chunks).encode("utf-8")
+
+    def _write(self) -> None:
+        data = self._render()
+        atomic_write(self.path, data)
+        self._stat = self._disk_stat()
+        self._sha = _sha(data)
+
+    def commit(self, ops: List[dict], message: str = "") -> int:
+        """
+        套用一組 JSON Patch（路徑為 "/<索引>" 或 "/-"）並原子寫入；回傳新版本號。
+        只會重新序列化 ops 動到的記錄。
+        """
+        if not ops:
+            return self.version
+        self._ensure_loaded()
+        parent = self._sha
+        h = self.history()
+        if h and h[-1].get("sha256") != parent:
+            # 外部改過 sounds.json：記一個無法越過的還原點
+            self._append_history({"version": self.version + 1, "time": time.time(),
+                                  "message": "外部修改（無法復原到此之前）", "reset": True,
+                                  "sha256": parent})
+        snapshot = list(ops)
+        try:
+            undo = self._apply_ops(snapshot)
+        except Exception:
+            self._records = None  # 狀態可能套用一半：丟掉重新載入
+            raise
+        data = self._render()
+        entry = {"version": self.version + 1, "time": time.time(), "message": message,
+                 "parent": parent, "sha256": _sha(data), "patch": snapshot, "undo": undo}
+        self._append_history(entry)   # WAL：先記歷史
+        atomic_write(self.path, data)
+        self._stat = self._disk_stat()
+        self._sha = entry["sha256"]
+        return entry["version"]
+
+    def undo_to(self, version: int) -> int:
+        """把內容復原成第 version 版（0 = 開始記錄歷史前）；以新版本寫入並回傳其版本號。"""
+        self._ensure_loaded()
+        h = self.history()
+        cur = self.version
+        if not 0 <= version < cur:
+            raise CatalogError(f"版本必須介於 0 與 {cur - 1} 之間。")
+        if h[-1].get("sha256") != self._sha:
+            raise CatalogError("sounds.json 在最後一版之後被外部修改，請先提交或還原該修改。")
+        by_version = {e["version"]: e for e in h}
+        ops: List[dict] = []
+        for v in range(cur, version, -1):
+            e = by_version.get(v)
+            if e is None or e.get("reset"):
+                raise CatalogError(f"第 {v} 版是外部修改的還原點，無法復原到第 {version} 版。")
+            ops.extend(e["undo"])
+        return self.commit(ops, f"復原到第 {version} 版")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="sounds.json 版本歷史與復原")
+    ap.add_argument("--sounds", default=str(DEFAULT_SOUNDS), help="sounds.json 路徑")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("log", help="列出版本")
+    p_show = sub.add_parser("show", help="顯示某一版的 patch")
+    p_show.add_argument("version", type=int)
+    p_undo = sub.add_parser("undo", help="復原到指定版本（以新版本寫入）")
+    p_undo.add_argument("--to", type=int, required=True, help="目標版本（0 = 開始記錄歷史前）")
+    args = ap.parse_args()
+
+    store = CatalogStore(Path(args.sounds))
+    if args.cmd == "log":
+        h = store.history()
+        if not h:
+            print("尚無歷史紀錄。")
+        for e in h:
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(e["time"]))
+            size = "reset" if e.get("reset") else f"{len(e['patch'])} ops"
+            print(f"v{e['version']:<4} {when}  {size:>9}  {e.get('message', '')}")
+        return 0
+    if args.cmd == "show":
+        e = next((e for e in store.history() if e["version"] == args.version), None)
+        if e is None:
+            print(f"找不到第 {args.version} 版。", file=sys.stderr)
+            return 1
+        print(json.dumps(e.get("patch", []), ensure_ascii=False, indent=2))
+        return 0
+    try:
+        v = store.undo_to(args.to)
+    except CatalogError as e:
+        print(f"[錯誤] {e}", file=sys.stderr)
+        return 1
+    print(f"已復原到第 {args.to} 版的內容（新版本 v{v}，共 {len(store.records)} 筆）。")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音檔內容完整性清單（SHA-256 + size + mtime）
+========================================
+記錄 sounds/ 下每個檔案「應該是什麼內容」，存在 config/sounds.json 旁
+（config/sounds.manifest.json），用來抓出靜默損毀或複製不完整的檔案。
+
+  build   ── 平行雜湊整個資料夾（大區塊讀檔），產生清單並回報 MB/s
+  verify  ── 預設只重算 (size, mtime_ns) 變動的檔案；
+             --sample N / --budget-mb M 另外隨機抽查未變動的檔案（抓位元腐壞）；
+             --full 全部重算
+  有 missing / modified / corrupt 時以結束碼 1 結束。
+
+用法：
+  python content_manifest.py build
+  python content_manifest.py verify
+  python content_manifest.py verify --budget-mb 200 --update
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ufid_registry import sha256_file
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_SOUNDS_DIR = SCRIPT_DIR.parent / "sounds"
+DEFAULT_MANIFEST = SCRIPT_DIR.parent / "config" / "sounds.manifest.json"
+MANIFEST_VERSION = 1
+
+
+def scan_tree(root: Path) -> Dict[str, os.stat_result]:
+    """回傳 {相對路徑(posix): stat}。"""
+    out: Dict[str, os.stat_result] = {}
+    for dirpath, _, files in os.walk(root):
+        for fn in files:
+            full = os.path.join(dirpath, fn)
+            rel = os.path.relpath(full, root).replace("\\", "/")
+            out[rel] = os.stat(full)
+    return out
+
+
+def hash_many(root: Path, rels: Iterable[str], workers: int) -> Tuple[Dict[str, str], int, float]:
+    """
+    平行計算 SHA-256。hashlib 對大區塊 update 會釋放 GIL，執行緒即可吃滿磁碟。
+    回傳 ({rel: sha256}, 讀取 bytes, 秒數)。
+    """
+    rels = list(rels)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        digests = dict(zip(rels, ex.map(lambda r: sha256_file(root / r), rels)))
+    elapsed = time.perf_counter() - t0
+    nbytes = sum((root / r).stat().st_size for r in rels)
+    return digests, nbytes, elapsed
+
+
+def _throughput(nbytes: int, elapsed: float) -> str:
+    mb = nbytes / (1 << 20)
+    return f"{mb:.1f} MB / {elapsed:.2f}s = {mb / elapsed if elapsed > 0 else 0:.1f} MB/s"
+
+
+def load_manifest(path: Path) -> Dict[str, dict]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if data.get("version") != MANIFEST_VERSION:
+        raise SystemExit(f"不支援的清單版本：{data.get('version')}")
+    return data["files"]
+
+
+def save_manifest(path: Path, files: Dict[str, dict]) -> None:
+    data = {
+        "version": MANIFEST_VERSION,
+        "algorithm": "sha256",
+        "generated": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "files": {k: files[k] for k in sorted(files)},
+    }
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _entry(sha: str, st: os.stat_result) -> dict:
+    return {"sha256": sha, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def build(root: Path, workers: int) -> Tuple[Dict[str, dict], int, float]:
+    stats = scan_tree(root)
+    digests, nbytes, elapsed = hash_many(root, stats, workers)
+    return {r: _entry(digests[r], stats[r]) for r in stats}, nbytes, elapsed
+
+
+def pick_sample(manifest: Dict[str, dict], candidates: List[str], count: Optional[int],
+                budget_mb: Optional[float], seed: Optional[int]) -> List[str]:
+    """從未變動的檔案隨機抽查：最多 count 個，且總大小不超過 budget_mb。"""
+    rng = random.Random(seed)
+    pool = candidates[:]
+    rng.shuffle(pool)
+    budget = budget_mb * (1 << 20) if budget_mb is not None else None
+    picked, used = [], 0
+    for r in pool:
+        if count is not None and len(picked) >= count:
+            break
+        size = manifest[r]["size"]
+        if budget is not None and used + size > budget:
+            continue
+        picked.append(r)
+        used += size
+    return picked
+
+
+def verify(root: Path, manifest: Dict[str, dict], workers: int, full: bool = False,
+           sample: Optional[int] = None, budget_mb: Optional[float] = None,
+           seed: Optional[int] = None) -> Tuple[dict, Dict[str, dict]]:
+    """
+    回傳 (報告, 更新後的清單)。
+      missing  ── 清單有、磁碟沒有
+      added    ── 磁碟有、清單沒有
+      touched  ── stat 變了但內容相同（只需更新 mtime）
+      modified ── stat 變了且內容不同
+      corrupt  ── stat 沒變但內容不同（抽查 / --full 才抓得到）
+    """
+    stats = scan_tree(root)
+    missing = sorted(set(manifest) - set(stats))
+    added = sorted(set(stats) - set(manifest))
+    changed, unchanged = [], []
+    for r in stats.keys() & manifest.keys():
+        m, st = manifest[r], stats[r]
+        if m["size"] == st.st_size and m["mtime_ns"] == st.st_mtime_ns:
+            unchanged.append(r)
+        else:
+            changed.append(r)
+    unchanged.sort()
+    sampled = unchanged if full else (
+        pick_sample(manifest, unchanged, sample, budget_mb, seed)
+        if (sample is not None or budget_mb is not None) else [])
+
+    digests, nbytes, elapsed = hash_many(root, changed + sampled + added, workers)
+
+    touched = sorted(r for r in changed if digests[r] == manifest[r]["sha256"])
+    modified = sorted(r for r in changed if digests[r] != manifest[r]["sha256"])
+    corrupt = sorted(r for r in sampled if digests[r] != manifest[r]["sha256"])
+
+    updated = {r: manifest[r] for r in manifest if r in stats}
+    for r in touched + modified + added:
+        updated[r] = _entry(digests[r], stats[r])
+
+    report = {
+        "files": len(stats),
+        "hashed": len(digests),
+        "sampled": len(sampled),
+        "bytes_hashed": nbytes,
+        "elapsed_s": round(elapsed, 3),
+        "missing": missing,
+        "added": added,
+        "touched": touched,
+        "modified": modified,
+        "corrupt": corrupt,
+    }
+    return report, updated
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="sounds/ 內容完整性清單（SHA-256）")
+    ap.add_argument("--sounds-dir", default=str(DEFAULT_SOUNDS_DIR), help="音檔資料夾")
+    ap.add_argument("--manifest", default=str(DEFAULT_MANIFEST), help="清單路徑")
+    ap.add_argument("--workers", type=int, default=0, help="雜湊並行數（0=自動）")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sub.add_parser("build", help="雜湊整個資料夾並寫出清單")
+
+    p_ver = sub.add_parser("verify", help="比對清單")
+    p_ver.add_argument("--full", action="store_true", help="所有檔案都重新雜湊")
+    p_ver.add_argument("--sample", type=int, default=None, help="另外隨機抽查 N 個未變動的檔案")
+    p_ver.add_argument("--budget-mb", type=float, default=None, help="抽查總讀取量上限（MB）")
+    p_ver.add_argument("--seed", type=int, default=None, help="抽樣亂數種子（重現用）")
+    p_ver.add_argument("--update", action="store_true",
+                       help="把 added / touched / modified 寫回清單（missing 會移除）")
+    p_ver.add_argument("--json", action="store_true", help="以 JSON 輸出報告")
+    args = ap.parse_args()
+
+    root = Path(args.sounds_dir)
+    manifest_path = Path(args.manifest)
+    workers = args.workers if args.workers > 0 else min(32, (os.cpu_count() or 1) * 4)
+
+    if args.cmd == "build":
+        files, nbytes, elapsed = build(root, workers)
+        save_manifest(manifest_path, files)
+        print(f"已寫出 {manifest_path}（{len(files)} 個檔案）")
+        print(f"雜湊：{_throughput(nbytes, elapsed)}（workers={workers}）")
+        return 0
+
+    if not manifest_path.exists():
+        print(f"找不到清單：{manifest_path}（請先執行 build）", file=sys.stderr)
+        return 2
+    report, updated = verify(root, load_manifest(manifest_path), workers, full=args.full,
+                             sample=args.sample, budget_mb=args.budget_mb, seed=args.seed)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"檔案 {report['files']}，重新雜湊 {report['hashed']}（其中抽查 {report['sampled']}）")
+        print(f"雜湊：{_throughput(report['bytes_hashed'], report['elapsed_s'])}")
+        for key, label in (("missing", "遺失"), ("modified", "內容變更"), ("corrupt", "損毀（stat 未變）"),
+                           ("added", "新增"), ("touched", "僅時間戳變更")):
+            if report[key]:
+                print(f"\n[{label}] {len(report[key])} 個")
+                for r in report[key][:50]:
+                    print(f"  {r}")
+                if len(report[key]) > 50:
+                    print(f"  …（共 {len(report[key])} 個）")
+    if args.update:
+        save_manifest(manifest_path, updated)
+        print(f"\n已更新清單：{manifest_path}", file=sys.stderr)
+    bad = report["missing"] or report["modified"] or report["corrupt"]
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+demaPanel 離線混音輸出
+========================================
+頁面的 demaPanel 多軌編輯器只能在瀏覽器裡用 Web Audio 即時播放。此腳本讀取同一份
+片段模型（localStorage 的 demaPanel_v1，或片段陣列），以 NumPy 混音並輸出 WAV / MP3：
+
+  片段 { soundId, trackIndex, startTime, trimStart, trimEnd, duration, volume }
+  → 從 startTime 起播放音檔的 [trimStart, duration - trimEnd)，增益 = --gain × volume
+    （同頁面 source.start(when, offset, duration) 與 gainNode）
+
+  - 每個音檔只解碼一次（ffmpeg → 32-bit float PCM），不同音檔以多執行緒並行解碼；
+    解碼結果放在有容量上限的 LRU 快取，一次處理多個專案時共用
+  - 混音為整段 NumPy 陣列加總；超出 ±1 的取樣預設與瀏覽器一樣截斷（並報告數量），
+    --normalize 則整體縮放到 -1 dBFS
+  - --undo N 輸出 undoStack 中倒數第 N 個狀態（按 N 次「復原」後的樣子）
+  - --stems 另外輸出每一軌
+  - --bench 以型錄中的音效隨機組成 3 軌、100 個片段的專案，重複輸出並報告速度（× 即時）
+
+取得專案：在頁面的開發者工具主控台執行 copy(localStorage.demaPanel_v1)，貼到 .json 檔。
+
+用法：
+  python dema_render.py mix.json -o mix.mp3
+  python dema_render.py mix.json --undo 1 --normalize -o before.wav
+  python dema_render.py a.json b.json --format mp3      # 輸出到 a.mp3、b.mp3
+  python dema_render.py --bench --bench-runs 3
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import wave
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 在 main() 中回報
+    np = None
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+DEFAULT_SOUNDS = REPO_ROOT / "config" / "sounds.json"
+DEFAULT_SOUNDS_DIR = REPO_ROOT / "sounds"
+SAMPLE_RATE = 44100
+CHANNELS = 2
+TRACK_COUNT = 3        # 同頁面 demaPanel 的 TRACK_COUNT
+DEFAULT_CACHE_MB = 512
+DEFAULT_BITRATE = "192k"
+NORMALIZE_PEAK_DB = -1.0
+OUTPUT_FORMATS = ("wav", "mp3")
+
+
+def have_ffmpeg() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+# --------------------------------------------------------------------------- #
+#  解碼與 PCM 快取                                                              #
+# --------------------------------------------------------------------------- #
+
+def decode(path: Path, rate: int = SAMPLE_RATE) -> "np.ndarray":
+    """音檔 → (取樣數, CHANNELS) 的 float32 陣列。"""
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", str(path),
+           "-f", "f32le", "-ac", str(CHANNELS), "-ar", str(rate), "-"]
+    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if p.returncode != 0:
+        raise RuntimeError(f"解碼失敗：{path.name}：{p.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(p.stdout, dtype="<f4").reshape(-1, CHANNELS)
+
+
+class PcmCache:
+    """解碼後 PCM 的 LRU 快取（以 bytes 計上限）；鍵含檔案大小與修改時間，音檔換了就重新解碼。"""
+
+    def __init__(self, max_bytes: int, rate: int = SAMPLE_RATE, workers: int = 0):
+        self.max_bytes = max_bytes
+        self.rate = rate
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self._items: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self.decode_seconds = 0.0
+
+    def _key(self, path: Path) -> tuple:
+        st = path.stat()
+        return (str(path), st.st_size, st.st_mtime_ns, self.rate)
+
+    def _put(self, key: tuple, pcm: "np.ndarray") -> None:
+        with self._lock:
+            self._items[key] = pcm
+            self.bytes += pcm.nbytes
+            # 只剩這一筆時即使超過上限也保留（呼叫端正要用）
+            while self.bytes > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self.bytes -= old.nbytes
+                self.evictions += 1
+
+    def get_many(self, paths: Iterable[Path]) -> Dict[Path, "np.ndarray"]:
+        """取得多個音檔的 PCM；未快取的並行解碼。回傳的 dict 持有參照，渲染期間不受淘汰影響。"""
+        out: Dict[Path, np.ndarray] = {}
+        todo: List[Tuple[Path, tuple]] = []
+        for path in dict.fromkeys(paths):
+            key = self._key(path)
+            with self._lock:
+                pcm = self._items.get(key)
+                if pcm is not None:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    out[path] = pcm
+                    continue
+            self.misses += 1
+            todo.append((path, key))
+        if todo:
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for (path, key), pcm in zip(todo, pool.map(lambda pk: decode(pk[0], self.rate), todo)):
+                    self._put(key, pcm)
+                    out[path] = pcm
+            self.decode_seconds += time.perf_counter() - t0
+        return out
+
+
+# --------------------------------------------------------------------------- #
+#  專案                                                                        #
+# --------------------------------------------------------------------------- #
+
+def load_project(path: Path, undo: int = 0) -> List[dict]:
+    """讀取 demaPanel_v1（或片段陣列）；undo > 0 時取 undoStack 倒數第 undo 個狀態。"""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, str):  # 主控台 copy() 有時多包一層字串
+        data = json.loads(data)
+    if undo:
+        stack = data.get("undoStack", []) if isinstance(data, dict) else []
+        if undo > len(stack):
+            raise ValueError(f"{path.name} 的 undoStack 只有 {len(stack)} 個狀態")
+        clips = json.loads(stack[-undo])
+    else:
+        clips = data.get("clips") if isinstance(data, dict) else data
+    if not isinstance(clips, list):
+        raise ValueError(f"{path.name} 不是 demaPanel 專案（需要 clips 陣列）")
+    return [normalize_clip(c, i) for i, c in enumerate(clips)]
+
+
+def normalize_clip(c: dict, index: int) -> dict:
+    try:
+        clip = {
+            "soundId": str(c["soundId"]),
+            "trackIndex": min(max(int(c.get("trackIndex", 0)), 0), TRACK_COUNT - 1),
+            "startTime": max(0.0, float(c["startTime"])),
+            "trimStart": max(0.0, float(c.get("trimStart", 0))),
+            "trimEnd": max(0.0, float(c.get("trimEnd", 0))),
+            "duration": float(c["duration"]),
+            "volume": float(c.get("volume", 1.0)),
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"第 {index + 1} 個片段格式錯誤：{e}") from None
+    return clip
+
+
+def sound_paths(sounds_json: Path, sounds_dir: Path) -> Dict[str, Path]:
+    """sounds.json 的 id → 音檔路徑（沒有 id 時同頁面以檔名為 id）。"""
+    out = {}
+    for s in json.loads(sounds_json.read_text(encoding="utf-8")):
+        if isinstance(s, dict) and s.get("file"):
+            sid = s.get("id") or re.sub(r"^.*[\\/]", "", s["file"])
+            out[sid] = sounds_dir / s["file"]
+    return out
+
+
+# --------------------------------------------------------------------------- #
+#  混音                                                                        #
+# --------------------------------------------------------------------------- #
+
+def render(clips: List[dict], paths: Dict[str, Path], cache: PcmCache, gain: float = 1.0,
+           stems: bool = False) -> Tuple["np.ndarray", Optional[List["np.ndarray"]], dict]:
+    """回傳 (混音, 各軌或 None, 統計)。"""
+    rate = cache.rate
+    missing = {c["soundId"] for c in clips if c["soundId"] not in paths or not paths[c["soundId"]].is_file()}
+    usable = [c for c in clips if c["soundId"] not in missing and c["duration"] - c["trimStart"] - c["trimEnd"] > 0]
+    pcms = cache.get_many(paths[c["soundId"]] for c in usable)
+
+    t0 = time.perf_counter()
+    segments = []
+    for c in usable:
+        pcm = pcms[paths[c["soundId"]]]
+        start = int(round(c["startTime"] * rate))
+        offset = int(round(c["trimStart"] * rate))
+        n = min(int(round((c["duration"] - c["trimStart"] - c["trimEnd"]) * rate)), len(pcm) - offset)
+        if n > 0:
+            segments.append((c, pcm, start, offset, n))
+    frames = max((s + n for _, _, s, _, n in segments), default=0)
+    mix = np.zeros((frames, CHANNELS), dtype=np.float32)
+    tracks = [np.zeros_like(mix) for _ in range(TRACK_COUNT)] if stems else None
+    for c, pcm, start, offset, n in segments:
+        part = pcm[offset:offset + n] * np.float32(gain * c["volume"])
+        mix[start:start + n] += part
+        if tracks is not None:
+            tracks[c["trackIndex"]][start:start + n] += part
+    stats = {"clips": len(clips), "rendered": len(segments), "missing": sorted(missing),
+             "sources": len(pcms), "seconds": frames / rate,
+             "mix_seconds": time.perf_counter() - t0}
+    return mix, tracks, stats
+
+
+def finish(buf: "np.ndarray", normalize: bool) -> Tuple["np.ndarray", int, float]:
+    """截斷或正規化到可輸出的範圍；回傳 (結果, 截斷的取樣數, 峰值 dBFS)。"""
+    peak = float(np.max(np.abs(buf))) if buf.size else 0.0
+    peak_db = 20 * math.log10(peak) if peak > 0 else -math.inf
+    if normalize and peak > 0:
+        return buf * np.float32(10 ** (NORMALIZE_PEAK_DB / 20) / peak), 0, peak_db
+    clipped = int(np.count_nonzero(np.abs(buf) > 1.0))
+    return (np.clip(buf, -1.0, 1.0) if clipped else buf), clipped, peak_db
+
+
+def to_pcm16(buf: "np.ndarray") -> bytes:
+    return (np.clip(buf, -1.0, 1.0) * 32767.0).round().astype("<i2").tobytes()
+
+
+def write_audio(path: Path, buf: "np.ndarray", rate: int, bitrate: str = DEFAULT_BITRATE) -> None:
+    fmt = path.suffix.lower().lstrip(".")
+    tmp = path.with_name(path.name + ".tmp")
+    if fmt == "wav":
+        with wave.open(str(tmp), "wb") as w:
+            w.setnchannels(CHANNELS)
+            w.setsampwidth(2)
+            w.setframerate(rate)
+            w.writeframes(to_pcm16(buf))
+    elif fmt == "mp3":
+        cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+               "-f", "s16le", "-ar", str(rate), "-ac", str(CHANNELS), "-i", "-",
+               "-c:a", "libmp3lame", "-b:a", bitrate, "-f", "mp3", str(tmp)]
+        p = subprocess.run(cmd, input=to_pcm16(buf), stderr=subprocess.PIPE, check=False)
+        if p.returncode != 0:
+            tmp.unlink(missing_ok=True)
+            raise RuntimeError(f"MP3 編碼失敗：{p.stderr.decode(errors='replace').strip()}")
+    else:
+        raise ValueError(f"不支援的輸出格式：{path.suffix}（{' / '.join(OUTPUT_FORMATS)}）")
+    os.replace(tmp, path)
+
+
+def render_to_file(clips: List[dict], paths: Dict[str, Path], cache: PcmCache, out: Path,
+                   args: argparse.Namespace) -> dict:
+    mix, tracks, stats = render(clips, paths, cache, args.gain, args.stems)
+    t0 = time.perf_counter()
+    mix, clipped, peak_db = finish(mix, args.normalize)
+    write_audio(out, mix, cache.rate, args.bitrate)
+    outputs = [str(out)]
+    for i, tr in enumerate(tracks or []):
+        if not np.any(tr):
+            continue
+        stem = out.with_name(f"{out.stem}.track{i + 1}{out.suffix}")
+        write_audio(stem, finish(tr, args.normalize)[0], cache.rate, args.bitrate)
+        outputs.append(str(stem))
+    stats.update(encode_seconds=time.perf_counter() - t0, clipped=clipped, peak_db=peak_db, outputs=outputs)
+    return stats
+
+
+# --------------------------------------------------------------------------- #
+#  基準測試                                                                    #
+# --------------------------------------------------------------------------- #
+
+def bench_project(paths: Dict[str, Path], n_clips: int, seed: int, rate: int,
+                  pool_size: int = 40) -> List[dict]:
+    """隨機的 3 軌專案：從型錄抽 pool_size 個音效（會重複使用，同實際混音），各軌依序排放並隨機裁剪。
+    片段的 duration 同頁面取自解碼後的實際長度（另用一個快取解碼，不計入測量）。"""
+    rng = random.Random(seed)
+    ids = sorted(sid for sid, p in paths.items() if p.is_file())
+    if not ids:
+        raise ValueError("找不到任何音檔，無法產生基準測試專案")
+    pool = rng.sample(ids, min(pool_size, len(ids)))
+    pcms = PcmCache(1 << 62, rate).get_many(paths[sid] for sid in pool)
+    durations = {sid: len(pcms[paths[sid]]) / rate for sid in pool}
+    cursor = [0.0] * TRACK_COUNT
+    clips = []
+    for i in range(n_clips):
+        sid = rng.choice(pool)
+        track = i % TRACK_COUNT
+        dur = durations[sid]
+        trim_start = rng.uniform(0, dur * 0.3)
+        trim_end = rng.uniform(0, dur * 0.3)
+        start = cursor[track] + rng.uniform(-0.5, 1.5)
+        clips.append({"soundId": sid, "trackIndex": track, "startTime": max(0.0, start),
+                      "trimStart": trim_start, "trimEnd": trim_end, "duration": dur,
+                      "volume": round(rng.uniform(0.5, 1.2), 2)})
+        cursor[track] = max(0.0, start) + dur - trim_start - trim_end
+    return [normalize_clip(c, i) for i, c in enumerate(clips)]
+
+
+def run_bench(args: argparse.Namespace, paths: Dict[str, Path], cache: PcmCache) -> List[dict]:
+    clips = bench_project(paths, args.bench_clips, args.seed, cache.rate)
+    runs = []
+    for i in range(args.bench_runs):
+        decode_before = cache.decode_seconds
+        t0 = time.perf_counter()
+        if args.out:
+            stats = render_to_file(clips, paths, cache, Path(args.out), args)
+        else:
+            mix, _, stats = render(clips, paths, cache, args.gain)
+            finish(mix, args.normalize)
+        wall = time.perf_counter() - t0
+        stats.update(run=i + 1, wall=wall, decode_seconds=cache.decode_seconds - decode_before,
+                     realtime=stats["seconds"] / wall if wall else math.inf,
+                     cache_hits=cache.hits, cache_misses=cache.misses)
+        runs.append(stats)
+    return runs
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+
+def _out_path(project: Path, args: argparse.Namespace, multiple: bool) -> Path:
+    if args.out and not multiple:
+        return Path(args.out)
+    return project.with_suffix("." + (args.format or "wav"))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="離線輸出 demaPanel 混音（WAV / MP3）")
+    ap.add_argument("projects", nargs="*", help="demaPanel 專案 JSON（localStorage 的 demaPanel_v1 或片段陣列）")
+    ap.add_argument("-o", "--out", help="輸出檔（.wav / .mp3；只有一個專案或 --bench 時）")
+    ap.add_argument("--format", choices=OUTPUT_FORMATS, help="多個專案時的輸出格式（輸出到專案旁，預設 wav）")
+    ap.add_argument("--undo", type=int, default=0, metavar="N", help="輸出 undoStack 倒數第 N 個狀態")
+    ap.add_argument("--sounds", default=str(DEFAULT_SOUNDS), help="音效清單（預設：config/sounds.json）")
+    ap.add_argument("--sounds-dir", default=str(DEFAULT_SOUNDS_DIR), help="音檔資料夾（預設：sounds/）")
+    ap.add_argument("--gain", type=float, default=1.0, help="整體音量（同頁面的全域音量，預設 1）")
+    ap.add_argument("--normalize", action="store_true", help=f"整體縮放到 {NORMALIZE_PEAK_DB:g} dBFS（預設超出即截斷）")
+    ap.add_argument("--stems", action="store_true", help="另外輸出每一軌（<輸出>.trackN.<格式>）")
+    ap.add_argument("--rate", type=int, default=SAMPLE_RATE, help="取樣率")
+    ap.add_argument("--bitrate", default=DEFAULT_BITRATE, help="MP3 位元率")
+    ap.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_MB, help="解碼快取上限（MB）")
+    ap.add_argument("--workers", type=int, default=0, help="並行解碼數（0=自動）")
+    ap.add_argument("--bench", action="store_true", help="以隨機 3 軌專案測試速度")
+    ap.add_argument("--bench-clips", type=int, default=100, help="基準測試專案的片段數")
+    ap.add_argument("--bench-runs", type=int, default=3, help="基準測試重複次數（第一次含解碼）")
+    ap.add_argument("--seed", type=int, default=1, help="基準測試的亂數種子")
+    ap.add_argument("--json", action="store_true", help="以 JSON 輸出報告")
+    args = ap.parse_args()
+
+    if np is None:
+        print("需要 NumPy：pip install numpy", file=sys.stderr)
+        return 2
+    if not have_ffmpeg():
+        print("錯誤：找不到 ffmpeg，請先安裝並確認在 PATH 中。", file=sys.stderr)
+        return 2
+    if not args.projects and not args.bench:
+        ap.error("請指定專案，或使用 --bench")
+    if args.out and Path(args.out).suffix.lower().lstrip(".") not in OUTPUT_FORMATS:
+        ap.error(f"--out 的副檔名須為 {' / '.join('.' + f for f in OUTPUT_FORMATS)}")
+
+    cache = PcmCache(args.cache_mb << 20, args.rate, args.workers)
+    try:
+        paths = sound_paths(Path(args.sounds), Path(args.sounds_dir))
+        if args.bench:
+            runs = run_bench(args, paths, cache)
+            results = [{"project": f"bench（{args.bench_clips} 片段、{TRACK_COUNT} 軌）", **r} for r in runs]
+        else:
+            results = []
+            for p in map(Path, args.projects):
+                clips = load_project(p, args.undo)
+                t0 = time.perf_counter()
+                stats = render_to_file(clips, paths, cache, _out_path(p, args, len(args.projects) > 1), args)
+                stats["wall"] = time.perf_counter() - t0
+                stats["realtime"] = stats["seconds"] / stats["wall"] if stats["wall"] else math.inf
+                results.append({"project": str(p), **stats})
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"輸出失敗：{e}", file=sys.stderr)
+        return 1
+
+    cache_info = {"hits": cache.hits, "misses": cache.misses, "evictions": cache.evictions,
+                  "mb": round(cache.bytes / (1 << 20), 1), "decode_seconds": round(cache.decode_seconds, 3)}
+    if args.json:
+        print(json.dumps({"results": results, "cache": cache_info, "peak_rss_mb": _peak_rss_mb()},
+                         ensure_ascii=False, indent=2, default=str))
+        return 0
+    for r in results:
+        label = f"第 {r['run']} 次" if "run" in r else r["project"]
+        print(f"{label}：{r['rendered']}/{r['clips']} 片段、{r['sources']} 個音檔 → {r['seconds']:.1f} 秒音訊；"
+              f"耗時 {r['wall']:.2f}s（× {r['realtime']:.0f} 即時）")
+        detail = [f"混音 {r['mix_seconds']:.3f}s"]
+        if "decode_seconds" in r:
+            detail.insert(0, f"解碼 {r['decode_seconds']:.2f}s")
+        if "encode_seconds" in r:
+            detail.append(f"輸出 {r['encode_seconds']:.2f}s")
+        if "peak_db" in r:
+            detail.append(f"峰值 {r['peak_db']:.1f} dBFS" + (f"，截斷 {r['clipped']} 個取樣" if r["clipped"] else ""))
+        print("  " + "、".join(detail))
+        if r["missing"]:
+            print(f"  [警告] sounds.json 中找不到：{', '.join(r['missing'])}", file=sys.stderr)
+        for o in r.get("outputs", []):
+            print(f"  → {o}")
+    rss = _peak_rss_mb()
+    print(f"解碼快取：命中 {cache_info['hits']}、解碼 {cache_info['misses']}（{cache_info['decode_seconds']:.2f}s）、"
+          f"淘汰 {cache_info['evictions']}、目前 {cache_info['mb']} MB" + (f"；峰值記憶體 {rss:.0f} MB" if rss else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+響應式圖片變體（WebP / AVIF 多寬度 + 模糊預覽）
+========================================
+assets/background-by-jia_v*_full.png 每張都好幾 MB，avatars/*.png 以原尺寸 PNG 顯示在 75px 的框內。
+此腳本（離線執行，需要 Pillow）為 assets/、avatars/ 的圖片產生：
+
+  assets/variants/art-by-sigh.640w.webp、….640w.avif …   依寬度分級的變體（不放大）
+  config/image-variants.json                            srcset 用的清單：
+      {"images": {"assets/art-by-sigh.png": {"width", "height", "bytes", "sha256", "placeholder",
+                   "variants": {"avif": [{"url", "width", "height", "bytes"}, …], "webp": […]}}}}
+
+  - placeholder 為 16px 寬的模糊 WebP（data URI），可在原圖載入前先顯示
+  - AVIF 需要 Pillow 11.3+ 或 pillow-avif-plugin（有安裝就自動匯入）；沒有就只產生 WebP 並提示
+  - 以行程池平行處理；來源 sha256 與參數都沒變、變體檔都在的圖片直接沿用
+  - 與原圖同寬的變體沒有比原檔小就不留；清單不再引用的變體檔會刪除
+  - index-raw.html 中帶 sizes 屬性的 <img>，由 build_page.py 建置時依清單補上 srcset
+    （WebP 變體 + 原圖）；瀏覽器解析到標籤時就選好一張，不會重複下載
+  - 報告列出每張圖的原始大小與原寬變體大小，以及首次開頁（index-raw.html 直接引用的圖片，
+    依顯示寬度 × --dpr 選用變體）的 bytes：有 srcset 的 <img> 為頁面實際省下的量，
+    其餘（CSS 背景、favicon 等頁面沒有用到變體的引用）另列為潛在節省
+
+用法：
+  python image_variants.py
+  python image_variants.py --dpr 1 --json
+  python image_variants.py --force --workers 4
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ufid_registry import sha256_file
+
+try:
+    from PIL import Image, ImageFilter, ImageOps, features
+except ImportError:  # 允許 --help；實際執行時再提示
+    Image = None
+try:
+    import pillow_avif  # 舊版 Pillow 的 AVIF 外掛：匯入即註冊編碼器（行程池的子行程也會匯入本模組）
+except ImportError:
+    pillow_avif = None
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+DEFAULT_DIRS = ("assets", "avatars")
+DEFAULT_MANIFEST = REPO_ROOT / "config" / "image-variants.json"
+VARIANT_DIR = "variants"
+SRC_EXTS = {".png", ".jpg", ".jpeg", ".webp", ".avif"}
+WIDTHS = (160, 320, 640, 960, 1280, 1920)
+QUALITY = {"avif": 50, "webp": 80}
+PLACEHOLDER_WIDTH = 16
+MANIFEST_VERSION = 1
+# 首次開頁直接載入的圖片與其顯示寬度（CSS px），對應 index-raw.html 的樣式
+DISPLAY_WIDTH = {
+    "assets/background-by-jia.avif": 760,   # body::before：background-size auto 90%（1080p 視窗約 970px 高）
+    "assets/art-by-sigh.png": 504,          # max-height: 250px
+    "assets/award1-1.jpg": 240,             # .awards-grid：minmax(120px, 240px)
+    "assets/award1-2.jpg": 240,
+    "assets/award1-3.jpg": 240,
+    "assets/award1-4.jpg": 240,
+    "assets/3rd.r1r.avif": 80,              # .archive-icon
+    "assets/favicon.png": 32,
+}
+
+
+# --------------------------------------------------------------------------- #
+#  編碼（在子行程執行）
+# --------------------------------------------------------------------------- #
+def available_formats() -> List[str]:
+    """偏好順序：AVIF（較小）→ WebP。Pillow 11.3+ 內建 AVIF；較舊版本靠 pillow-avif-plugin 註冊的編碼器。"""
+    fmts = []
+    if features.check("avif") or (pillow_avif is not None and "AVIF" in Image.SAVE):
+        fmts.append("avif")
+    if features.check("webp"):
+        fmts.append("webp")
+    return fmts
+
+
+def _encode(im: "Image.Image", fmt: str) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "webp":
+        im.save(buf, "WEBP", quality=QUALITY["webp"], method=6)
+    else:
+        im.save(buf, "AVIF", quality=QUALITY["avif"], speed=4)
+    return buf.getvalue()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def widths_for(src_width: int) -> List[int]:
+    """不放大：小於原寬的級距，再加上原寬（原寬超過最大級距則不含）。"""
+    out = [w for w in WIDTHS if w < src_width]
+    if src_width <= WIDTHS[-1]:
+        out.append(src_width)
+    return out
+
+
+def variant_rel(rel: str, width: int, fmt: str) -> str:
+    """assets/art-by-sigh.png → assets/variants/art-by-sigh.640w.webp"""
+    head, _, name = rel.rpartition("/")
+    stem = name.rsplit(".", 1)[0]
+    return f"{head}/{VARIANT_DIR}/{stem}.{width}w.{fmt}" if head else f"{VARIANT_DIR}/{stem}.{width}w.{fmt}"
+
+
+def process_image(root: str, rel: str, sha256: str, formats: List[str]) -> dict:
+    """產生 rel 的所有變體與預覽；回傳清單項目。"""
+    src = Path(root) / rel
+    src_bytes = src.stat().st_size
+    with Image.open(src) as opened:
+        im = ImageOps.exif_transpose(opened)
+        im.load()
+    has_alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+    im = im.convert("RGBA" if has_alpha else "RGB")
+    w0, h0 = im.size
+
+    variants: Dict[str, List[dict]] = {f: [] for f in formats}
+    t0 = time.perf_counter()
+    for w in widths_for(w0):
+        h = max(1, round(h0 * w / w0))
+        scaled = im if w == w0 else im.resize((w, h), Image.LANCZOS)
+        for fmt in formats:
+            data = _encode(scaled, fmt)
+            if w == w0 and len(data) >= src_bytes:
+                continue  # 原尺寸的變體沒有比原檔小：直接用原檔
+            url = variant_rel(rel, w, fmt)
+            _write_atomic(Path(root) / url, data)
+            variants[fmt].append({"url": url, "width": w, "height": h, "bytes": len(data)})
+
+    ph_h = max(1, round(h0 * PLACEHOLDER_WIDTH / w0))
+    tiny = im.resize((PLACEHOLDER_WIDTH, ph_h), Image.LANCZOS).filter(ImageFilter.GaussianBlur(1))
+    buf = io.BytesIO()
+    tiny.save(buf, "WEBP", quality=30)
+    placeholder = "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+    return {"sha256": sha256, "width": w0, "height": h0, "bytes": src_bytes,
+            "placeholder": placeholder, "variants": variants,
+            "ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+
+# --------------------------------------------------------------------------- #
+#  掃描、快取判斷、清理
+# --------------------------------------------------------------------------- #
+def scan_images(root: Path, dirs: List[str]) -> List[str]:
+    """各資料夾第一層的圖片（不含 variants/ 與隱藏檔）。"""
+    out = []
+    for d in dirs:
+        base = root / d
+        if not base.is_dir():
+            continue
+        for e in os.scandir(base):
+            if e.is_file() and not e.name.startswith(".") and Path(e.name).suffix.lower() in SRC_EXTS:
+                out.append(f"{d}/{e.name}")
+    return sorted(out)
+
+
+def params_fingerprint(formats: List[str]) -> dict:
+    return {"widths": list(WIDTHS), "quality": {f: QUALITY[f] for f in formats}, "formats": formats,
+            "placeholder": PLACEHOLDER_WIDTH}
+
+
+def is_fresh(root: Path, entry: Optional[dict], sha256: str) -> bool:
+    if not entry or entry.get("sha256") != sha256:
+        return False
+    return all((root / v["url"]).exists() for vs in entry["variants"].values() for v in vs)
+
+
+def remove_orphans(root: Path, dirs: List[str], images: Dict[str, dict]) -> List[str]:
+    keep = {v["url"] for e in images.values() for vs in e["variants"].values() for v in vs}
+    removed = []
+    for d in dirs:
+        vdir = root / d / VARIANT_DIR
+        if not vdir.is_dir():
+            continue
+        for e in os.scandir(vdir):
+            rel = f"{d}/{VARIANT_DIR}/{e.name}"
+            if e.is_file() and rel not in keep:
+                os.remove(e.path)
+                removed.append(rel)
+    return removed
+
+
+def build(root: Path, dirs: List[str], manifest_path: Path, workers: int, force: bool = False) -> dict:
+    t_start = time.perf_counter()
+    formats = available_formats()
+    params = params_fingerprint(formats)
+    try:
+        prev = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        prev = {}
+    prev_images = prev.get("images", {}) if prev.get("params") == params and not force else {}
+
+    sources = scan_images(root, dirs)
+    images: Dict[str, dict] = {}
+    todo: List[Tuple[str, str]] = []
+    for rel in sources:
+        sha = sha256_file(root / rel)
+        if is_fresh(root, prev_images.get(rel), sha):
+            images[rel] = prev_images[rel]
+        else:
+            todo.append((rel, sha))
+
+    timings: Dict[str, float] = {}
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futs = {rel: ex.submit(process_image, str(root), rel, sha, formats) for rel, sha in todo}
+        for rel, fut in futs.items():
+            entry = fut.result()
+            timings[rel] = entry.pop("ms")
+            images[rel] = entry
+
+    images = {k: images[k] for k in sorted(images)}
+    manifest = {"version": MANIFEST_VERSION, "formats": formats, "params": params, "images": images}
+    data = (json.dumps(manifest, ensure_ascii=False, indent=1) + "\n").encode("utf-8")
+    try:
+        changed = manifest_path.read_bytes() != data
+    except OSError:
+        changed = True
+    if changed:
+        _write_atomic(manifest_path, data)
+    removed = remove_orphans(root, dirs, images)
+    return {"formats": formats, "images": images, "processed": [r for r, _ in todo], "timings": timings,
+            "removed": removed, "manifest_changed": changed,
+            "elapsed_s": round(time.perf_counter() - t_start, 3)}
+
+
+# --------------------------------------------------------------------------- #
+#  首次開頁節省估算
+# --------------------------------------------------------------------------- #
+def page_images(page: Path) -> List[str]:
+    """index-raw.html 直接引用（<img src>、<link href>、CSS url()）的 assets/ 圖片。"""
+    try:
+        html = page.read_text(encoding="utf-8")
+    except OSError:
+        return []
+    refs = re.findall(r"""(?:src=|href=|url\()["']?(assets/[^"')?#\s]+)""", html)
+    return [r for r in dict.fromkeys(refs) if Path(r).suffix.lower() in SRC_EXTS]
+
+
+_IMG_TAG = re.compile(r"<img\b[^>]*>", re.I)
+_IMG_SRC = re.compile(r"""\bsrc=(["'])(assets/[^"']+)\1""")
+SRCSET_FORMAT = "webp"  # 與頁面 imgVariantAttrs 相同：srcset 無法依格式退回，只用支援度最廣的 WebP
+
+
+def srcset_targets(html: str) -> List[str]:
+    """帶 sizes、還沒有 srcset 的 <img> 所引用的 assets/ 圖片（build_page.py 會補上 srcset）。"""
+    out = []
+    for tag in _IMG_TAG.findall(html):
+        m = _IMG_SRC.search(tag)
+        if m and re.search(r"\ssizes=", tag) and not re.search(r"\ssrcset=", tag):
+            out.append(m.group(2))
+    return list(dict.fromkeys(out))
+
+
+def srcset_for(rel: str, entry: dict) -> Optional[str]:
+    """寬度描述的 srcset：WebP 變體，最寬的變體比原圖窄時再加上原圖；沒有變體回 None。"""
+    vs = sorted(entry.get("variants", {}).get(SRCSET_FORMAT, []), key=lambda v: v["width"])
+    if not vs:
+        return None
+    cands = [f"{v['url']} {v['width']}w" for v in vs]
+    if vs[-1]["width"] < entry["width"]:
+        cands.append(f"{rel} {entry['width']}w")
+    return ", ".join(cands)
+
+
+def apply_srcset(html: str, images: Dict[str, dict]) -> Tuple[str, List[str]]:
+    """為 srcset_targets 的 <img> 補上 srcset；回傳 (新頁面, 有補上的圖片)。"""
+    applied: List[str] = []
+
+    def sub(m: "re.Match") -> str:
+        tag = m.group(0)
+        src = _IMG_SRC.search(tag)
+        if not src or not re.search(r"\ssizes=", tag) or re.search(r"\ssrcset=", tag):
+            return tag
+        entry = images.get(src.group(2))
+        srcset = srcset_for(src.group(2), entry) if entry else None
+        if not srcset:
+            return tag
+        applied.append(src.group(2))
+        return tag[:src.end()] + f' srcset="{srcset}"' + tag[src.end():]
+
+    return _IMG_TAG.sub(sub, html), list(dict.fromkeys(applied))
+
+
+def pick_variant(entry: dict, need_width: int, formats: List[str]) -> Optional[dict]:
+    """最偏好格式中、寬度 ≥ need_width 的最小變體（都不夠寬就取最寬的）；沒有變體回 None。"""
+    for fmt in formats:
+        vs = sorted(entry["variants"].get(fmt, []), key=lambda v: v["width"])
+        if not vs:
+            continue
+        for v in vs:
+            if v["width"] >= need_width:
+                return dict(v, format=fmt)
+        return dict(vs[-1], format=fmt)
+    return None
+
+
+def first_load_savings(images: Dict[str, dict], refs: List[str], targets: List[str],
+                       formats: List[str], dpr: float) -> dict:
+    """
+    targets（建置時補上 srcset 的 <img>）依瀏覽器的選法取 WebP 變體，計入頁面實際節省；
+    其他直接引用頁面不會換成變體，以最偏好格式估算，只計入 potential_*。
+    """
+    rows = []
+    for rel in refs:
+        e = images.get(rel)
+        if e is None:
+            continue
+        applied = rel in targets and srcset_for(rel, e) is not None
+        need = min(e["width"], round(DISPLAY_WIDTH.get(rel, e["width"]) * dpr))
+        v = pick_variant(e, need, [SRCSET_FORMAT] if applied else formats)
+        best = v if v and v["bytes"] < e["bytes"] else None
+        rows.append({"image": rel, "bytes": e["bytes"], "need_width": need, "applied": applied,
+                     "variant": best["url"] if best else None,
+                     "variant_bytes": best["bytes"] if best else e["bytes"]})
+    out = {"dpr": dpr, "rows": rows}
+    for prefix, sel in (("", True), ("potential_", False)):
+        before = sum(r["bytes"] for r in rows if r["applied"] is sel)
+        after = sum(r["variant_bytes"] for r in rows if r["applied"] is sel)
+        out.update({f"{prefix}bytes_before": before, f"{prefix}bytes_after": after,
+                    f"{prefix}saved": before - after})
+    return out
+
+
+def _kb(n: int) -> str:
+    return f"{n / 1024:.1f}K"
+
+
+def print_report(r: dict, fl: dict) -> None:
+    print(f"格式：{', '.join(r['formats']) or '（無）'}；處理 {len(r['processed'])} 張，"
+          f"沿用 {len(r['images']) - len(r['processed'])} 張；刪除舊變體 {len(r['removed'])}；"
+          f"清單{'已更新' if r['manifest_changed'] else '未變'}；耗時 {r['elapsed_s']:.2f}s")
+    print(f"{'原始':>10}{'原寬變體':>12}{'變體數':>8}  圖片")
+    for rel, e in r["images"].items():
+        vs = [v for fmt in r["formats"] for v in e["variants"].get(fmt, [])]
+        smallest = min((v["bytes"] for v in vs if v["width"] == max(x["width"] for x in vs)), default=None)
+        mark = " *" if rel in r["processed"] else ""
+        print(f"{_kb(e['bytes']):>10}{_kb(smallest) if smallest else '-':>12}{len(vs):>8}  "
+              f"{rel} ({e['width']}×{e['height']}){mark}")
+    print(f"\n首次開頁（index-raw.html 直接引用的圖片，DPR {fl['dpr']:g}）：")
+    for row in fl["rows"]:
+        target = f"→ {row['variant']} {_kb(row['variant_bytes'])}" if row["variant"] else "（沿用原檔）"
+        how = "srcset" if row["applied"] else "未使用"
+        print(f"  {row['image']:<36}{_kb(row['bytes']):>10}  {how:<6} 需要 {row['need_width']}px {target}")
+    pct = fl["saved"] * 100 / fl["bytes_before"] if fl["bytes_before"] else 0
+    print(f"  頁面實際（建置時補上 srcset 的 <img>）：{_kb(fl['bytes_before'])} → {_kb(fl['bytes_after'])}，"
+          f"省下 {_kb(fl['saved'])}（{pct:.0f}%）")
+    if fl["potential_saved"]:
+        print(f"  潛在（其餘引用，頁面尚未使用變體）：{_kb(fl['potential_bytes_before'])} → "
+              f"{_kb(fl['potential_bytes_after'])}，可再省 {_kb(fl['potential_saved'])}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="產生響應式圖片變體（WebP / AVIF）與 srcset 清單")
+    ap.add_argument("--root", default=str(REPO_ROOT), help="網站根目錄（預設：repo 根目錄）")
+    ap.add_argument("--dirs", nargs="+", default=list(DEFAULT_DIRS), help="要處理的資料夾")
+    ap.add_argument("--manifest", default=str(DEFAULT_MANIFEST), help="輸出清單（預設：config/image-variants.json）")
+    ap.add_argument("--page", default="index-raw.html", help="估算首次開頁用的頁面（相對 --root）")
+    ap.add_argument("--dpr", type=float, default=2.0, help="估算時的裝置像素比")
+    ap.add_argument("--workers", type=int, default=0, help="並行行程數（0=CPU 數）")
+    ap.add_argument("--force", action="store_true", help="忽略快取全部重新產生")
+    ap.add_argument("--json", action="store_true", help="以 JSON 輸出報告")
+    args = ap.parse_args()
+
+    if Image is None:
+        print("需要 Pillow：pip install pillow", file=sys.stderr)
+        return 2
+    if "avif" not in available_formats():
+        print("[提示] 目前的 Pillow 不支援 AVIF，只產生 WebP（升級到 Pillow 11.3+ 或 pip install pillow-avif-plugin）",
+              file=sys.stderr)
+    root = Path(args.root).resolve()
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    r = build(root, args.dirs, Path(args.manifest), workers, force=args.force)
+    try:
+        page_html = (root / args.page).read_text(encoding="utf-8")
+    except OSError:
+        page_html = ""
+    fl = first_load_savings(r["images"], page_images(root / args.page), srcset_targets(page_html),
+                            r["formats"], args.dpr)
+    if args.json:
+        out = {k: v for k, v in r.items() if k != "images"}
+        out["images"] = {k: {kk: vv for kk, vv in e.items() if kk != "placeholder"} for k, e in r["images"].items()}
+        out["first_load"] = fl
+        print(json.dumps(out, ensure_ascii=False, indent=2))
+    else:
+        print_report(r, fl)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
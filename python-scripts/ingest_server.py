@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+匯入流程的本機 HTTP 工作伺服器
+========================================
+把 update_gui.py 的 1~5 步驟（檔名清理 ▸ 轉檔 ▸ 生成 JSON ▸ 產生 UUID ▸ 更新 sounds.json；實作在 pipeline.py）
+開成無介面的 HTTP API，讓腳本或建置機一次送出多批音效：
+
+  POST /jobs               送出工作 → 202 {"id", "events"}；佇列已滿 429、資料夾正被別的工作使用 409
+  GET  /jobs               所有工作的摘要
+  GET  /jobs/<id>          單一工作的狀態與結果
+  GET  /jobs/<id>/events   以 JSON Lines 串流事件（?from=N 從第 N 個接續），工作結束時關閉
+  POST /jobs/<id>/cancel   要求停止（轉檔中會經 stdin 通知 轉檔v3.py）
+  GET  /health
+
+工作內容（POST /jobs 的 JSON）：
+  {"input": "...", "output": "...", "sounds": "config/sounds.json",
+   "steps": ["clean", "convert", "json", "uuid", "merge"],
+   "duplicates": "skip" | "overwrite",
+   "options": {同 update_gui 的 _collect_opts：recursive, keep_channels, force, sample_rate,
+               workers, I, TP, LRA, nbytes, namespace}}
+
+  - 工作在有上限的執行緒池執行（--jobs），排隊超過 --queue 個即回 429
+  - 合併 sounds.json 一律交給單一寫入執行緒依序處理：新增 / 重複在寫入當下才判定，
+    id 碰撞也以最新型錄檢查，多批同時送出不會互相覆蓋
+  - 預設只綁定 127.0.0.1，沒有認證，勿對外開放
+
+用法：
+  python ingest_server.py serve [--port 8765] [--jobs 2] [--queue 32]
+  python ingest_server.py bench [--batches 40] [--files 25] [--concurrency 16] [--dup-rate 0.1]
+"""
+
+import argparse
+import json
+import os
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import pipeline
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_SOUNDS = SCRIPT_DIR.parent / "config" / "sounds.json"
+DEFAULT_PORT = 8765
+STEPS = ("clean", "convert", "json", "uuid", "merge")
+DEFAULT_OPTS = {
+    "recursive": False, "keep_channels": False, "force": False,
+    "sample_rate": 32000, "workers": 0, "I": -14.0, "TP": -1.5, "LRA": 11.0,
+    "nbytes": 4, "namespace": "",
+}
+KEEP_FINISHED = 500  # 保留多少個已結束工作的狀態與事件
+
+
+class JobError(Exception):
+    """工作內容不合法（400）。"""
+
+
+class QueueFull(Exception):
+    """排隊中的工作已達上限（429）。"""
+
+
+class DirBusy(Exception):
+    """輸入 / 輸出資料夾正被其他工作使用（409）。"""
+
+
+class Cancelled(Exception):
+    pass
+
+
+def _dir_key(p: Path) -> str:
+    return os.path.normcase(str(Path(p).resolve()))
+
+
+def parse_spec(body: dict, default_sounds: Path) -> dict:
+    """檢查並補齊工作內容；回傳正規化後的 spec。"""
+    if not isinstance(body, dict):
+        raise JobError("工作內容必須是 JSON 物件")
+    steps = body.get("steps") or list(STEPS)
+    bad = [s for s in steps if s not in STEPS]
+    if bad:
+        raise JobError(f"未知的步驟：{bad}（可用：{list(STEPS)}）")
+    steps = [s for s in STEPS if s in steps]  # 一律依流程順序
+
+    opts = dict(DEFAULT_OPTS)
+    for k, v in (body.get("options") or {}).items():
+        if k not in DEFAULT_OPTS:
+            raise JobError(f"未知的選項：{k}")
+        try:
+            opts[k] = type(DEFAULT_OPTS[k])(v)
+        except (TypeError, ValueError):
+            raise JobError(f"選項 {k} 的值不合法：{v!r}")
+
+    spec = {"steps": steps, "options": opts,
+            "duplicates": body.get("duplicates", "skip")}
+    if spec["duplicates"] not in ("skip", "overwrite"):
+        raise JobError("duplicates 只能是 skip 或 overwrite")
+    if {"clean", "convert"} & set(steps):
+        if not body.get("input"):
+            raise JobError("clean / convert 需要 input")
+        spec["input"] = Path(body["input"])
+        if not spec["input"].is_dir():
+            raise JobError(f"input 不是資料夾：{spec['input']}")
+    if {"convert", "json", "uuid", "merge"} & set(steps):
+        if not body.get("output"):
+            raise JobError("convert / json / uuid / merge 需要 output")
+        spec["output"] = Path(body["output"])
+    if "merge" in steps:
+        spec["sounds"] = Path(body.get("sounds") or default_sounds)
+        if not spec["sounds"].is_file():
+            raise JobError(f"找不到 sounds.json：{spec['sounds']}")
+    return spec
+
+
+# --------------------------------------------------------------------------- #
+#  工作與事件
+# --------------------------------------------------------------------------- #
+class Job:
+    def __init__(self, spec: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.spec = spec
+        self.state = "queued"  # queued / running / done / failed / cancelled
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.events: List[dict] = []
+        self.cond = threading.Condition()
+        self.cancel = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("done", "failed", "cancelled")
+
+    def emit(self, ev: dict) -> None:
+        with self.cond:
+            ev["seq"] = len(self.events)
+            ev["t"] = round(time.time() - self.created, 3)
+            self.events.append(ev)
+            self.cond.notify_all()
+
+    def log(self, msg: str) -> None:
+        self.emit({"event": "log", "msg": msg})
+
+    def finish(self, state: str, result: Optional[dict] = None, error: Optional[str] = None) -> None:
+        with self.cond:
+            self.state, self.result, self.error = state, result, error
+            self.finished = time.time()
+            self.emit({"event": "end", "state": state, "result": result, "error": error})
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id, "state": self.state, "steps": self.spec["steps"],
+            "input": str(self.spec.get("input", "")), "output": str(self.spec.get("output", "")),
+            "created": self.created, "started": self.started, "finished": self.finished,
+            "events": len(self.events), "result": self.result, "error": self.error,
+        }
+
+
+class CatalogWriter:
+    """
+    sounds.json 的唯一寫入者。合併請求進佇列、由同一條執行緒依序套用，
+    每個路徑共用一個 CatalogStore（解析結果快取、版本歷史連續）。
+    """
+
+    def __init__(self):
+        self._q: "queue.Queue" = queue.Queue()
+        self._stores: Dict[str, object] = {}
+        self._thread = threading.Thread(target=self._run, name="catalog-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, job: Job, entries: list) -> Future:
+        fut: Future = Future()
+        self._q.put((fut, job, entries))
+        return fut
+
+    def close(self) -> None:
+        self._q.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._q.get()
+            if item is None:
+                return
+            fut, job, entries = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                fut.set_result(self._merge(job, entries))
+            except BaseException as e:  # noqa: BLE001
+                fut.set_exception(e)
+
+    def _merge(self, job: Job, entries: list) -> dict:
+        if job.cancel.is_set():
+            raise Cancelled()
+        spec = job.spec
+        key = _dir_key(spec["sounds"])
+        store = self._stores.get(key)
+        if store is None:
+            store = self._stores[key] = pipeline.mod_store.CatalogStore(spec["sounds"])
+        # 新增 / 重複以「輪到自己時」的型錄判定
+        new_entries, dup_entries = pipeline.split_merge(store.records, entries)
+        resolutions = {e.get("file"): {"action": spec["duplicates"], "new_file": ""}
+                       for e in dup_entries}
+        return pipeline.merge_into_catalog(store, new_entries, dup_entries, resolutions,
+                                      spec["output"], spec["options"], job.log)
+
+
+def run_pipeline(job: Job, writer: CatalogWriter) -> dict:
+    """依 spec 的步驟執行；回傳各步驟摘要。"""
+    spec, opts = job.spec, job.spec["options"]
+    summary: dict = {}
+    entries = None
+    for step in spec["steps"]:
+        if job.cancel.is_set():
+            raise Cancelled()
+        t0 = time.perf_counter()
+        job.emit({"event": "step", "step": step})
+        if step == "clean":
+            summary["renamed"] = len(pipeline.clean_filenames(spec["input"], job.log))
+        elif step == "convert":
+            spec["output"].mkdir(parents=True, exist_ok=True)
+            rc = pipeline.run_convert(spec["input"], spec["output"], opts, job.log, job.cancel,
+                                 on_event=lambda ev: job.emit({"event": "convert", "data": ev}))
+            if job.cancel.is_set():
+                raise Cancelled()
+            if rc != 0:
+                raise RuntimeError(f"轉檔結束碼非 0：{rc}")
+        elif step == "json":
+            entries = pipeline.generate_index(spec["output"], job.log)
+            summary["parsed"] = len(entries)
+        elif step == "uuid":
+            if entries is None:
+                entries = pipeline.generate_index(spec["output"], job.log)
+            entries = pipeline.assign_uuids(entries, opts, job.log)
+        elif step == "merge":
+            if entries is None:
+                entries = pipeline.assign_uuids(pipeline.generate_index(spec["output"], job.log), opts, job.log)
+            t_wait = time.perf_counter()
+            job.emit({"event": "merge_queued"})
+            result = writer.submit(job, entries).result()
+            summary["merge"] = result
+            summary["merge_wait_s"] = round(time.perf_counter() - t_wait, 3)
+        job.emit({"event": "step_done", "step": step, "elapsed": round(time.perf_counter() - t0, 3)})
+    return summary
+
+
+class IngestService:
+    """工作登記、有上限的執行緒池與資料夾佔用檢查；HTTP 層只負責轉送。"""
+
+    def __init__(self, jobs: int = 2, max_queue: int = 32, default_sounds: Path = DEFAULT_SOUNDS):
+        self.max_active = jobs + max_queue
+        self.default_sounds = Path(default_sounds)
+        self.pool = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="ingest")
+        self.writer = CatalogWriter()
+        self.jobs: Dict[str, Job] = {}
+        self.busy: Dict[str, str] = {}  # 資料夾鍵 → 工作 id
+        self.lock = threading.Lock()
+
+    def _dirs(self, spec: dict) -> List[str]:
+        return sorted({_dir_key(spec[k]) for k in ("input", "output") if k in spec})
+
+    def submit(self, body: dict) -> Job:
+        spec = parse_spec(body, self.default_sounds)
+        job = Job(spec)
+        dirs = self._dirs(spec)
+        with self.lock:
+            if sum(1 for j in self.jobs.values() if not j.done) >= self.max_active:
+                raise QueueFull("排隊中的工作已滿，請稍後再送")
+            for d in dirs:
+                if d in self.busy:
+                    raise DirBusy(f"資料夾正被工作 {self.busy[d]} 使用：{d}")
+            for d in dirs:
+                self.busy[d] = job.id
+            self.jobs[job.id] = job
+            self._prune()
+        job.emit({"event": "queued"})
+        self.pool.submit(self._run, job)
+        return job
+
+    def _run(self, job: Job) -> None:
+        job.state, job.started = "running", time.time()
+        try:
+            job.finish("done", run_pipeline(job, self.writer))
+        except Cancelled:
+            job.finish("cancelled")
+        except Exception as e:  # noqa: BLE001
+            job.finish("failed", error=f"{type(e).__name__}: {e}")
+        finally:
+            with self.lock:
+                for d in self._dirs(job.spec):
+                    if self.busy.get(d) == job.id:
+                        del self.busy[d]
+
+    def _prune(self) -> None:
+        ended = sorted((j for j in self.jobs.values() if j.done), key=lambda j: j.finished)
+        for j in ended[:max(0, len(ended) - KEEP_FINISHED)]:
+            del self.jobs[j.id]
+
+    def cancel(self, job: Job) -> None:
+        job.cancel.set()
+        job.log("[中斷] 已要求停止…")
+
+    def close(self) -> None:
+        for j in list(self.jobs.values()):
+            j.cancel.set()
+        self.pool.shutdown(wait=True)
+        self.writer.close()
+
+
+# --------------------------------------------------------------------------- #
+#  HTTP
+# --------------------------------------------------------------------------- #
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service: IngestService = None  # make_server 設定
+    quiet = True
+
+    def log_message(self, fmt, *args):
+        if not self.quiet:
+            super().log_message(fmt, *args)
+
+    def _send_json(self, code: int, obj) -> None:
+        data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _job(self, job_id: str) -> Optional[Job]:
+        job = self.service.jobs.get(job_id)
+        if job is None:
+            self._send_json(404, {"error": f"沒有這個工作：{job_id}"})
+        return job
+
+    def _read_body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(n) if n else b""
+        return json.loads(raw.decode("utf-8") or "{}")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        if parts == ["health"]:
+            self._send_json(200, {"ok": True, "jobs": len(self.service.jobs)})
+        elif parts == ["jobs"]:
+            self._send_json(200, [j.summary() for j in list(self.service.jobs.values())])
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self._job(parts[1])
+            if job:
+                self._send_json(200, job.summary())
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+            job = self._job(parts[1])
+            if job:
+                start = int(parse_qs(url.query).get("from", ["0"])[0])
+                self._stream(job, start)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        parts = [p for p in urlparse(self.path).path.split("/") if p]
+        if parts == ["jobs"]:
+            try:
+                job = self.service.submit(self._read_body())
+            except (JobError, ValueError) as e:
+                self._send_json(400, {"error": str(e)})
+            except QueueFull as e:
+                self._send_json(429, {"error": str(e)})
+            except DirBusy as e:
+                self._send_json(409, {"error": str(e)})
+            else:
+                self._send_json(202, {"id": job.id, "events": f"/jobs/{job.id}/events"})
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+            job = self._job(parts[1])
+            if job:
+                self.service.cancel(job)
+                self._send_json(202, job.summary())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _stream(self, job: Job, start: int) -> None:
+        """chunked 串流事件：有新事件就送，工作結束且送完即關閉。"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        i = max(0, start)
+        try:
+            while True:
+                with job.cond:
+                    while i >= len(job.events) and not job.done:
+                        job.cond.wait(timeout=15)
+                    batch = job.events[i:]
+                    ended = job.done
+                if batch:
+                    data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in batch).encode("utf-8")
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                    i += len(batch)
+                if ended and i >= len(job.events):
+                    break
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+def make_server(service: IngestService, host: str, port: int, quiet: bool = True) -> ThreadingHTTPServer:
+    handler = type("BoundHandler", (Handler,), {"service": service, "quiet": quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+# --------------------------------------------------------------------------- #
+#  壓力測試：合成語料 + 大量並行工作
+# --------------------------------------------------------------------------- #
+_SPEAKERS = "狗貓萬豹瓦鼠雞"
+_TAGS = ("笑", "唱", "罵", "叫")
+
+
+def _write_silence(path: Path, seconds: float = 0.2, rate: int = 16000) -> None:
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\0\0" * int(seconds * rate))
+
+
+def make_corpus(root: Path, batches: int, files: int, dup_rate: float, convert: bool,
+                seed: int = 0) -> Dict[str, int]:
+    """
+    產生 batches 個輸入資料夾，每個 files 個檔案；檔名帶 _ 與多餘空白（讓清理步驟有事做）。
+    dup_rate 比例的檔名與第 0 批相同，合併時應被判為重複。回傳 {"files", "unique"}。
+    """
+    rng = random.Random(seed)
+    names0: List[str] = []
+    unique = set()
+    total = 0
+    for b in range(batches):
+        d = root / f"batch{b:03d}"
+        d.mkdir(parents=True)
+        for k in range(files):
+            if b and names0 and rng.random() < dup_rate:
+                stem = rng.choice(names0)
+            else:
+                stem = f"{rng.choice(_SPEAKERS)}_壓測{b:03d}-{k:03d}  [{rng.choice(_TAGS)}]"
+                if b == 0:
+                    names0.append(stem)
+            if convert:
+                _write_silence(d / f"{stem}.wav")
+            else:
+                (d / f"{stem}.mp3").write_bytes(f"{b}-{k}".encode())
+            unique.add(stem)
+            total += 1
+    return {"files": total, "unique": len(unique)}
+
+
+def _http(method: str, url: str, body: Optional[dict] = None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method,
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=600) as r:
+        return r.status, json.loads(r.read().decode("utf-8"))
+
+
+def _pct(xs: List[float], p: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def bench(batches: int, files: int, concurrency: int, server_jobs: int, dup_rate: float,
+          convert: bool, sounds: Path, url: Optional[str] = None, keep: bool = False) -> int:
+    tmp = Path(tempfile.mkdtemp(prefix="ingest-bench-"))
+    server = service = None
+    try:
+        corpus = make_corpus(tmp / "in", batches, files, dup_rate, convert)
+        catalog = tmp / "sounds.json"
+        shutil.copyfile(sounds, catalog)
+        base = len(json.loads(catalog.read_text(encoding="utf-8")))
+        print(f"語料：{batches} 批 × {files} 檔 = {corpus['files']}（不重複 {corpus['unique']}），"
+              f"型錄起始 {base} 筆；{'含轉檔' if convert else '不含轉檔'}")
+
+        if url is None:
+            service = IngestService(jobs=server_jobs, max_queue=batches)
+            server = make_server(service, "127.0.0.1", 0)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+        steps = list(STEPS) if convert else ["clean", "json", "uuid", "merge"]
+
+        def one(b: int) -> dict:
+            d = tmp / "in" / f"batch{b:03d}"
+            body = {"input": str(d), "output": str(tmp / "out" / d.name) if convert else str(d),
+                    "sounds": str(catalog), "steps": steps, "options": {"workers": 1}}
+            t0 = time.perf_counter()
+            retries = 0
+            while True:
+                try:
+                    _, r = _http("POST", f"{url}/jobs", body)
+                    break
+                except urllib.error.HTTPError as e:
+                    if e.code != 429:
+                        raise
+                    retries += 1
+                    time.sleep(min(0.05 * 2 ** retries, 1.0))
+            t_sub = time.perf_counter() - t0
+            first_step = end = None
+            with urllib.request.urlopen(f"{url}{r['events']}", timeout=600) as s:
+                for line in s:
+                    ev = json.loads(line)
+                    if ev["event"] == "step" and first_step is None:
+                        first_step = time.perf_counter() - t0
+                    if ev["event"] == "end":
+                        end = ev
+            return {"submit": t_sub, "wait": first_step or 0.0, "total": time.perf_counter() - t0,
+                    "retries": retries, "state": end["state"], "error": end["error"],
+                    "merge_wait": ((end["result"] or {}).get("merge_wait_s") or 0.0)}
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            res = list(ex.map(one, range(batches)))
+        wall = time.perf_counter() - t0
+
+        data = json.loads(catalog.read_text(encoding="utf-8"))
+        ids = [str(e.get("id")) for e in data if isinstance(e, dict)]
+        states = {s: sum(1 for r in res if r["state"] == s) for s in {r["state"] for r in res}}
+        expected = base + corpus["unique"]
+        ok = (states.get("done") == batches and len(data) == expected and len(set(ids)) == len(ids))
+
+        def row(label: str, key: str) -> str:
+            xs = [r[key] * 1000 for r in res]
+            return (f"  {label}  p50 {_pct(xs, 50):8.1f}  p95 {_pct(xs, 95):8.1f}  "
+                    f"max {max(xs):8.1f} ms")
+
+        print(f"\n完成 {batches} 個工作，耗時 {wall:.2f}s → {batches / wall:.1f} 工作/s、"
+              f"{corpus['files'] / wall:.0f} 檔/s（並行客戶端 {concurrency}、伺服器工作數 {server_jobs}）")
+        print(row("送出", "submit"))
+        print(row("排隊", "wait"))
+        print(row("合併", "merge_wait"))  # 等單一寫入者 + 寫入
+        print(row("全程", "total"))
+        print(f"  429 重送 {sum(r['retries'] for r in res)} 次；狀態 {states}")
+        for r in res:
+            if r["error"]:
+                print(f"  [失敗] {r['error']}")
+        print(f"型錄：{len(data)} 筆（預期 {expected}），id 重複 {len(ids) - len(set(ids))} 個 → "
+              f"{'通過' if ok else '不通過'}")
+        return 0 if ok else 1
+    finally:
+        if server is not None:
+            server.shutdown()
+            service.close()
+        if keep:
+            print(f"（保留測試資料：{tmp}）")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="匯入流程的本機 HTTP 工作伺服器")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_serve = sub.add_parser("serve", help="啟動伺服器")
+    p_serve.add_argument("--host", default="127.0.0.1", help="綁定位址（預設只限本機）")
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"連接埠（預設 {DEFAULT_PORT}）")
+    p_serve.add_argument("--jobs", type=int, default=2, help="同時執行的工作數")
+    p_serve.add_argument("--queue", type=int, default=32, help="最多排隊的工作數，超過回 429")
+    p_serve.add_argument("--sounds", default=str(DEFAULT_SOUNDS), help="預設的 sounds.json")
+    p_serve.add_argument("--verbose", action="store_true", help="印出每個 HTTP 請求")
+
+    p_bench = sub.add_parser("bench", help="以合成語料並行送出大量工作（壓力測試）")
+    p_bench.add_argument("--batches", type=int, default=40, help="工作數")
+    p_bench.add_argument("--files", type=int, default=25, help="每個工作的檔案數")
+    p_bench.add_argument("--concurrency", type=int, default=16, help="並行客戶端數")
+    p_bench.add_argument("--jobs", type=int, default=4, help="伺服器同時執行的工作數（內建伺服器）")
+    p_bench.add_argument("--dup-rate", type=float, default=0.1, help="與第 0 批同名的比例（合併時應略過）")
+    p_bench.add_argument("--convert", action="store_true", help="包含轉檔步驟（需要 ffmpeg）")
+    p_bench.add_argument("--sounds", default=str(DEFAULT_SOUNDS), help="起始型錄（會複製一份使用）")
+    p_bench.add_argument("--url", default=None, help="改打既有伺服器（例：http://127.0.0.1:8765）")
+    p_bench.add_argument("--keep", action="store_true", help="保留合成語料與結果")
+    args = ap.parse_args()
+
+    if args.cmd == "bench":
+        return bench(args.batches, args.files, args.concurrency, args.jobs, args.dup_rate,
+                     args.convert, Path(args.sounds), args.url, args.keep)
+
+    service = IngestService(jobs=args.jobs, max_queue=args.queue, default_sounds=Path(args.sounds))
+    server = make_server(service, args.host, args.port, quiet=not args.verbose)
+    print(f"匯入伺服器：http://{args.host}:{server.server_address[1]}（工作數 {args.jobs}，佇列 {args.queue}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n停止中…（取消執行中的工作）", file=sys.stderr)
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
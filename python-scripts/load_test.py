@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+網站壓力測試（重播真實的音效板流量）
+========================================
+以 asyncio 模擬大量訪客同時開頁、篩選標籤、點播音效（例如直播後湧入的點擊潮），
+請求組合取自實際資料：
+
+  - 點播熱度：config/vote-results.json 的票數（未上榜的音效權重 1）
+  - 標籤篩選：config/tags.json 的標籤，依該標籤音效的總熱度挑選
+  - 音效網址：config/sounds.json；源站有 asset-manifest.json 時與頁面一樣改用雜湊檔名
+
+每個工作階段（session）＝ 一條 keep-alive 連線上的一次造訪：
+  index.html → asset-manifest.json → 頁面引用的 scripts/、assets/ → tags / sounds / vote-results
+  （頁面由 build_page.py 內嵌了 tags / 票選時只請求 sounds）
+  → 點播 N 個音效（Range: bytes=0-，同 <audio>），每次點播連同該音效主播的頭像（播放時彈出）
+
+模擬瀏覽器快取：immutable / max-age 的回應在同一工作階段內直接命中，no-cache 的帶
+If-None-Match 重新驗證（預期 304）。情境（可用參數覆寫）：
+
+  cold       空快取的新訪客
+  warm       回訪：頁面、JSON、頭像與 30 個熱門音效已在快取
+  favorites  回訪且以最愛為主：80% 的點播落在自己的 12 個最愛（重複點播）
+
+報告：吞吐（req/s、MB/s）、各類請求的延遲百分位（首位元組與完整回應）、狀態碼、
+本地快取命中與 304 次數；源站提供 /__stats（static_server.py）時一併列出伺服器端計數。
+
+用法：
+  python load_test.py                                  # 自動啟動 static_server.py（服務 ../dist）
+  python load_test.py --scenario cold warm --sessions 2000 --concurrency 500
+  python load_test.py --url http://127.0.0.1:8080 --scenario favorites --json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+import unicodedata
+import urllib.error
+import urllib.request
+from bisect import bisect
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from publish_assets import hashed_name
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+DEFAULT_CONFIG = REPO_ROOT / "config"
+TOP_RANK = 30            # 與頁面 CONFIG.awards.topRankCount 相同：票選前 N 名排在最前
+ACCEPT_ENCODING = "gzip, deflate, br, zstd"
+KINDS = ("page", "json", "static", "avatar", "clip")
+
+SCENARIOS = {
+    "cold": {"warm": False, "clips": 8, "tag_ratio": 0.3, "favorites": 0, "fav_ratio": 0.0,
+             "warm_clips": 0},
+    "warm": {"warm": True, "clips": 8, "tag_ratio": 0.3, "favorites": 0, "fav_ratio": 0.0,
+             "warm_clips": 30},
+    "favorites": {"warm": True, "clips": 30, "tag_ratio": 0.1, "favorites": 12, "fav_ratio": 0.8,
+                  "warm_clips": 0},
+}
+
+
+# --------------------------------------------------------------------------- #
+#  資料：熱度、標籤、頭像
+# --------------------------------------------------------------------------- #
+def _slug(s: str) -> str:
+    """同頁面 utils.slug：NFKC + trim。"""
+    return unicodedata.normalize("NFKC", s).strip()
+
+
+class Catalog:
+    """sounds / tags / vote-results → 依熱度抽樣、依標籤篩選、音效對應的主播頭像。"""
+
+    def __init__(self, config_dir: Path):
+        def load(name: str) -> list:
+            return json.loads((config_dir / name).read_text(encoding="utf-8"))
+
+        self.sounds = [s for s in load("sounds.json") if isinstance(s, dict) and s.get("file")]
+        self.tags = load("tags.json")
+        votes = load("vote-results.json")
+        by_id = {str(s.get("id") or s["file"]): i for i, s in enumerate(self.sounds)}
+        self.weight = [1.0] * len(self.sounds)
+        for v in votes:
+            i = by_id.get(str(v.get("id")))
+            if i is not None:
+                self.weight[i] += float(v.get("votes") or 0)
+        # 頁面順序：票選前 TOP_RANK 名在前，其餘維持型錄順序
+        top = [by_id[str(v.get("id"))] for v in votes[:TOP_RANK] if str(v.get("id")) in by_id]
+        seen = set(top)
+        self.order = top + [i for i in range(len(self.sounds)) if i not in seen]
+        self.avatar = {_slug(t["key"]): t["avatar"] for t in self.tags
+                       if t.get("role") == "streamer" and t.get("avatar")}
+
+        self.by_tag: Dict[str, List[int]] = {}
+        for i in self.order:
+            for t in self.sounds[i]["tags"]:
+                self.by_tag.setdefault(_slug(t), []).append(i)
+        # 可篩選的標籤＝ tags.json 中有音效使用的；挑選權重為其音效熱度總和
+        self.tag_keys = [k for k in (_slug(t["key"]) for t in self.tags) if k in self.by_tag]
+        self._tag_cum = list(accumulate(sum(self.weight[i] for i in self.by_tag[k]) for k in self.tag_keys))
+        self._cum = {None: list(accumulate(self.weight[i] for i in self.order))}
+
+    def pool(self, tag: Optional[str]) -> List[int]:
+        return self.order if tag is None else self.by_tag[tag]
+
+    def pick_tag(self, rng: random.Random) -> str:
+        return self.tag_keys[bisect(self._tag_cum, rng.random() * self._tag_cum[-1])]
+
+    def pick_clip(self, rng: random.Random, tag: Optional[str] = None) -> int:
+        cum = self._cum.get(tag)
+        if cum is None:
+            cum = self._cum[tag] = list(accumulate(self.weight[i] for i in self.pool(tag)))
+        pool = self.pool(tag)
+        return pool[min(len(pool) - 1, bisect(cum, rng.random() * cum[-1]))]
+
+    def clip_avatars(self, i: int) -> List[str]:
+        """播放音效 i 時頁面彈出的主播頭像（同 index-raw.html 的 streamerTags）。"""
+        out: List[str] = []
+        for t in self.sounds[i]["tags"]:
+            a = self.avatar.get(_slug(t))
+            if a and a not in out:
+                out.append(a)
+        return out
+
+
+# --------------------------------------------------------------------------- #
+#  最小的 HTTP/1.1 keep-alive 用戶端
+# --------------------------------------------------------------------------- #
+class Response:
+    __slots__ = ("status", "headers", "nbytes", "ttfb", "total")
+
+    def __init__(self, status: int, headers: Dict[str, str], nbytes: int, ttfb: float, total: float):
+        self.status, self.headers, self.nbytes, self.ttfb, self.total = status, headers, nbytes, ttfb, total
+
+
+class Conn:
+    def __init__(self, host: str, port: int, timeout: float):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.opened = 0
+
+    async def _open(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, limit=1 << 16)
+        self.opened += 1
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, headers: Optional[Dict[str, str]] = None) -> Response:
+        """送出請求並讀完主體（不保留內容，只計 bytes）；伺服器已關閉閒置連線時重連一次。"""
+        for attempt in (0, 1):
+            if self.writer is None:
+                await self._open()
+            try:
+                return await asyncio.wait_for(self._roundtrip(method, path, headers or {}), self.timeout)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                self.close()
+                if attempt:
+                    raise
+        raise ConnectionError("unreachable")
+
+    async def _roundtrip(self, method: str, path: str, headers: Dict[str, str]) -> Response:
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 f"Accept-Encoding: {ACCEPT_ENCODING}"] + [f"{k}: {v}" for k, v in headers.items()]
+        t0 = time.perf_counter()
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await self.writer.drain()
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        ttfb = time.perf_counter() - t0
+        status_line, *hlines = head.decode("latin-1").split("\r\n")
+        status = int(status_line.split(" ", 2)[1])
+        hdrs: Dict[str, str] = {}
+        for line in hlines:
+            k, sep, v = line.partition(":")
+            if sep:
+                hdrs[k.strip().lower()] = v.strip()
+
+        nbytes = len(head)
+        if method == "HEAD" or status in (204, 304):
+            pass
+        elif "content-length" in hdrs:
+            left = int(hdrs["content-length"])
+            nbytes += left
+            while left > 0:
+                chunk = await self.reader.read(min(left, 1 << 18))
+                if not chunk:
+                    raise asyncio.IncompleteReadError(b"", left)
+                left -= len(chunk)
+        elif hdrs.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size_line = await self.reader.readuntil(b"\r\n")
+                n = int(size_line.split(b";")[0], 16)
+                await self.reader.readexactly(n + 2)
+                nbytes += len(size_line) + n + 2
+                if n == 0:
+                    break
+        else:  # 無長度：讀到連線關閉
+            while True:
+                chunk = await self.reader.read(1 << 18)
+                if not chunk:
+                    break
+                nbytes += len(chunk)
+            hdrs["connection"] = "close"
+        if hdrs.get("connection", "").lower() == "close":
+            self.close()
+        return Response(status, hdrs, nbytes, ttfb, time.perf_counter() - t0)
+
+
+# --------------------------------------------------------------------------- #
+#  源站網址（雜湊檔名與頁面引用）
+# --------------------------------------------------------------------------- #
+class Site:
+    def __init__(self, base_url: str, catalog: Catalog):
+        u = urlsplit(base_url)
+        self.host, self.port = u.hostname or "127.0.0.1", u.port or 80
+        self.prefix = u.path.rstrip("/")
+        self.catalog = catalog
+        self.manifest: Dict[str, str] = {}
+        self.page_refs: List[str] = []
+        self.boot_inlined = False   # index.html 內嵌了 tags / 票選（build_page.py）
+        self.meta: Dict[str, Tuple[Optional[str], bool]] = {}   # 暖機取得的 (驗證子, 可直接命中)
+
+    def url(self, rel: str) -> str:
+        """與頁面 assetUrl 相同：清單中有就插入雜湊，否則原路徑。"""
+        h = self.manifest.get(rel)
+        if h:
+            rel = hashed_name(rel, h)
+        return self.prefix + "/" + quote(rel)
+
+    def clip_url(self, i: int) -> str:
+        return self.url(f"sounds/{self.catalog.sounds[i]['file']}")
+
+    def _get(self, path: str) -> Tuple[int, bytes]:
+        try:
+            with urllib.request.urlopen(f"http://{self.host}:{self.port}{path}", timeout=10) as r:
+                return r.status, r.read()
+        except urllib.error.HTTPError as e:
+            return e.code, b""
+
+    def discover(self) -> None:
+        """讀取源站的 asset-manifest.json 與 index.html 的 scripts/、assets/ 引用（不計入測量）。"""
+        status, body = self._get(self.prefix + "/asset-manifest.json")
+        if status == 200:
+            self.manifest = json.loads(body).get("files", {})
+        status, body = self._get(self.prefix + "/")
+        refs = re.findall(r"""(?:src|href)=["']((?:scripts|assets)/[^"'?#]+)""", body.decode("utf-8", "replace"))
+        self.page_refs = list(dict.fromkeys(refs))
+        self.boot_inlined = b'id="boot-data"' in body
+
+    def page_resources(self) -> List[Tuple[str, str]]:
+        """一次開頁的請求：[(種類, 路徑)]。"""
+        out = [("page", self.prefix + "/")]
+        if self.manifest:
+            out.append(("json", self.prefix + "/asset-manifest.json"))
+        out += [("static", self.prefix + "/" + quote(r)) for r in self.page_refs]
+        names = ("sounds.json",) if self.boot_inlined else ("tags.json", "sounds.json", "vote-results.json")
+        out += [("json", self.url(f"config/{n}")) for n in names]
+        return out
+
+    def avatar_urls(self) -> List[str]:
+        return [self.url(a) for a in dict.fromkeys(self.catalog.avatar.values())]
+
+
+def _cache_entry(r: Response) -> Tuple[Optional[str], bool]:
+    cc = r.headers.get("cache-control", "").lower()
+    fresh = "immutable" in cc or ("max-age" in cc and "no-cache" not in cc and "max-age=0" not in cc)
+    return r.headers.get("etag") or r.headers.get("last-modified"), fresh
+
+
+def _conditional(validator: str) -> Dict[str, str]:
+    return {"If-None-Match": validator} if validator.startswith(('"', 'W/')) else {"If-Modified-Since": validator}
+
+
+# --------------------------------------------------------------------------- #
+#  工作階段與情境
+# --------------------------------------------------------------------------- #
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[Tuple[float, float]]] = {k: [] for k in KINDS}
+        self.bytes: Dict[str, int] = {k: 0 for k in KINDS}
+        self.status: Dict[int, int] = {}
+        self.local_hits = 0
+        self.errors: Dict[str, int] = {}
+
+    def add(self, kind: str, r: Response) -> None:
+        self.samples[kind].append((r.ttfb, r.total))
+        self.bytes[kind] += r.nbytes
+        self.status[r.status] = self.status.get(r.status, 0) + 1
+
+    def error(self, e: BaseException) -> None:
+        name = type(e).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+
+async def run_session(site: Site, sc: dict, rng: random.Random, rec: Recorder,
+                      think: float, timeout: float) -> int:
+    conn = Conn(site.host, site.port, timeout)
+    cache: Dict[str, Tuple[Optional[str], bool]] = {}
+    cat = site.catalog
+    tag = cat.pick_tag(rng) if rng.random() < sc["tag_ratio"] else None
+    favorites = [cat.pick_clip(rng) for _ in range(sc["favorites"])]
+    if sc["warm"]:
+        # 回訪：上次開頁的資源、頭像與聽過的熱門音效已在快取（驗證子來自暖機）
+        for path in [p for _, p in site.page_resources()] + site.avatar_urls():
+            if path in site.meta:
+                cache[path] = site.meta[path]
+        for _ in range(sc["warm_clips"]):
+            path = site.clip_url(cat.pick_clip(rng))
+            if path in site.meta:
+                cache[path] = site.meta[path]
+
+    async def fetch(kind: str, path: str, extra: Optional[Dict[str, str]] = None) -> None:
+        entry = cache.get(path)
+        if entry is not None and entry[1]:
+            rec.local_hits += 1
+            return
+        headers = dict(extra or {})
+        if entry is not None and entry[0]:
+            headers.update(_conditional(entry[0]))
+        r = await conn.request("GET", path, headers)
+        rec.add(kind, r)
+        if r.status in (200, 206):
+            cache[path] = _cache_entry(r)
+
+    try:
+        for kind, path in site.page_resources():
+            await fetch(kind, path)
+        for _ in range(sc["clips"]):
+            if think:
+                await asyncio.sleep(rng.expovariate(1 / think))
+            if favorites and rng.random() < sc["fav_ratio"]:
+                i = rng.choice(favorites)
+            else:
+                i = cat.pick_clip(rng, tag)
+            await fetch("clip", site.clip_url(i), {"Range": "bytes=0-"})
+            for a in cat.clip_avatars(i):
+                await fetch("avatar", site.url(a))
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+        rec.error(e)
+    finally:
+        conn.close()
+    return conn.opened
+
+
+async def prime(site: Site, timeout: float) -> None:
+    """暖機：取得頁面資源與最熱門音效的驗證子 / 快取標頭，供 warm 情境預填快取。"""
+    conn = Conn(site.host, site.port, timeout)
+    try:
+        for path in [p for _, p in site.page_resources()] + site.avatar_urls():
+            r = await conn.request("GET", path)
+            site.meta[path] = _cache_entry(r)
+        top = sorted(range(len(site.catalog.sounds)), key=lambda i: -site.catalog.weight[i])[:200]
+        for i in top:
+            path = site.clip_url(i)
+            r = await conn.request("HEAD", path)
+            if r.status == 200:
+                site.meta[path] = _cache_entry(r)
+    finally:
+        conn.close()
+
+
+async def run_scenario(site: Site, sc: dict, sessions: int, concurrency: int, ramp: float,
+                       think: float, timeout: float, seed: int) -> dict:
+    rec = Recorder()
+    sem = asyncio.Semaphore(concurrency)
+    conns = 0
+    active = peak = 0
+
+    async def one(n: int) -> None:
+        nonlocal conns, active, peak
+        if ramp:
+            await asyncio.sleep(ramp * n / sessions)
+        async with sem:
+            active += 1
+            peak = max(peak, active)
+            try:
+                opened = await run_session(site, sc, random.Random(seed * 1_000_003 + n), rec, think, timeout)
+                conns += opened
+            finally:
+                active -= 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(sessions)))
+    wall = time.perf_counter() - t0
+    return summarize(rec, wall, sessions, conns, peak)
+
+
+def _pct(xs: List[float], p: float) -> float:
+    if not xs:
+        return 0.0
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def summarize(rec: Recorder, wall: float, sessions: int, conns: int, peak: int) -> dict:
+    kinds = {}
+    for k in KINDS:
+        xs = rec.samples[k]
+        if not xs:
+            continue
+        ttfb = sorted(t for t, _ in xs)
+        total = sorted(t for _, t in xs)
+        kinds[k] = {"requests": len(xs), "bytes": rec.bytes[k],
+                    **{f"ttfb_p{p}": round(_pct(ttfb, p) * 1000, 2) for p in (50, 99)},
+                    **{f"p{p}": round(_pct(total, p) * 1000, 2) for p in (50, 90, 99)},
+                    "max": round(total[-1] * 1000, 2)}
+    requests = sum(len(v) for v in rec.samples.values())
+    nbytes = sum(rec.bytes.values())
+    all_total = sorted(t for v in rec.samples.values() for _, t in v)
+    return {
+        "sessions": sessions, "connections": conns, "peak_sessions": peak,
+        "elapsed_s": round(wall, 3), "requests": requests,
+        "req_per_s": round(requests / wall, 1) if wall else 0.0,
+        "bytes": nbytes, "mb_per_s": round(nbytes / wall / (1 << 20), 2) if wall else 0.0,
+        "p50": round(_pct(all_total, 50) * 1000, 2), "p99": round(_pct(all_total, 99) * 1000, 2),
+        "status": {str(k): v for k, v in sorted(rec.status.items())},
+        "local_hits": rec.local_hits, "errors": rec.errors, "kinds": kinds,
+    }
+
+
+# --------------------------------------------------------------------------- #
+#  內建源站（static_server.py 子行程）
+# --------------------------------------------------------------------------- #
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_origin(root: Optional[str], sendfile: bool) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    cmd = [sys.executable, str(SCRIPT_DIR / "static_server.py"), "--port", str(port)]
+    if root:
+        cmd += ["--root", root]
+    if not sendfile:
+        cmd.append("--no-sendfile")
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"static_server.py 啟動失敗（exit {proc.returncode}）")
+        try:
+            urllib.request.urlopen(url + "/__stats", timeout=1).read()
+            return proc, url
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("static_server.py 未在 10 秒內就緒")
+
+
+def server_stats(url: str) -> Optional[dict]:
+    try:
+        with urllib.request.urlopen(url.rstrip("/") + "/__stats", timeout=5) as r:
+            return json.loads(r.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _stats_delta(before: Optional[dict], after: Optional[dict]) -> Optional[dict]:
+    if not before or not after:
+        return None
+    out = {k: after[k] - before[k] for k in ("connections", "requests", "bytes_body", "bytes_sendfile")}
+    out["peak"] = after["peak"]
+    out["encoded"] = {k: v - before["encoded"].get(k, 0) for k, v in after["encoded"].items()}
+    return out
+
+
+# --------------------------------------------------------------------------- #
+#  報告
+# --------------------------------------------------------------------------- #
+_KIND_LABEL = {"page": "頁面", "json": "JSON", "static": "靜態", "avatar": "頭像", "clip": "音效"}
+
+
+def print_report(name: str, sc: dict, r: dict) -> None:
+    print(f"\n== {name} ==  {json.dumps(sc, ensure_ascii=False)}")
+    print(f"  工作階段 {r['sessions']}（同時最多 {r['peak_sessions']}），連線 {r['connections']}，"
+          f"耗時 {r['elapsed_s']:.2f}s")
+    print(f"  請求 {r['requests']} → {r['req_per_s']:.0f} req/s；傳輸 {r['bytes'] / (1 << 20):.1f} MB → "
+          f"{r['mb_per_s']:.1f} MB/s；延遲 p50 {r['p50']:.1f} / p99 {r['p99']:.1f} ms")
+    print(f"  狀態 {r['status']}；本地快取命中 {r['local_hits']}"
+          + (f"；錯誤 {r['errors']}" if r["errors"] else ""))
+    print(f"  {'':4}{'請求':>8}{'MB':>9}{'首位元組 p50':>13}{'p99':>8}{'完整 p50':>10}{'p90':>8}{'p99':>8}{'max':>9}")
+    for k, v in r["kinds"].items():
+        print(f"  {_KIND_LABEL[k]:4}{v['requests']:>10}{v['bytes'] / (1 << 20):>9.1f}"
+              f"{v['ttfb_p50']:>15.1f}{v['ttfb_p99']:>8.1f}{v['p50']:>12.1f}{v['p90']:>8.1f}"
+              f"{v['p99']:>8.1f}{v['max']:>9.1f}")
+    s = r.get("server")
+    if s:
+        enc = "、".join(f"{k} {v}" for k, v in s["encoded"].items() if v) or "無"
+        print(f"  伺服器：請求 {s['requests']}、連線 {s['connections']}（尖峰 {s['peak']}）、"
+              f"送出 {s['bytes_body'] / (1 << 20):.1f} MB（sendfile {s['bytes_sendfile'] / (1 << 20):.1f} MB）、"
+              f"預壓縮 {enc}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="以真實資料組成的請求重播音效板流量（asyncio 壓力測試）")
+    ap.add_argument("--url", default=None, help="源站網址（預設：自動啟動 static_server.py）")
+    ap.add_argument("--root", default=None, help="自動啟動源站時的網站根目錄（預設同 static_server.py）")
+    ap.add_argument("--no-sendfile", action="store_true", help="自動啟動的源站不使用 sendfile")
+    ap.add_argument("--config", default=str(DEFAULT_CONFIG), help="讀取 sounds / tags / vote-results 的資料夾")
+    ap.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS),
+                    help="要執行的情境（依序）")
+    ap.add_argument("--sessions", type=int, default=500, help="每個情境的工作階段數")
+    ap.add_argument("--concurrency", type=int, default=200, help="同時進行的工作階段數（＝連線數）")
+    ap.add_argument("--ramp", type=float, default=0.0, help="在幾秒內陸續開始工作階段（0 = 同時湧入）")
+    ap.add_argument("--think-ms", type=float, default=0.0, help="兩次點播之間的平均間隔（指數分布）")
+    ap.add_argument("--clips", type=int, default=None, help="覆寫每個工作階段點播的音效數")
+    ap.add_argument("--favorites", type=int, default=None, help="覆寫最愛數量")
+    ap.add_argument("--fav-ratio", type=float, default=None, help="覆寫點播落在最愛的比例")
+    ap.add_argument("--tag-ratio", type=float, default=None, help="覆寫以標籤篩選開頁的比例")
+    ap.add_argument("--timeout", type=float, default=30.0, help="單一請求逾時秒數")
+    ap.add_argument("--seed", type=int, default=1, help="亂數種子（同種子 → 同樣的請求序列）")
+    ap.add_argument("--json", action="store_true", help="以 JSON 輸出報告")
+    args = ap.parse_args()
+
+    catalog = Catalog(Path(args.config))
+    proc = None
+    try:
+        if args.url:
+            url = args.url
+        else:
+            proc, url = start_origin(args.root, not args.no_sendfile)
+        site = Site(url, catalog)
+        site.discover()
+        if not args.json:
+            print(f"源站 {url}：清單 {len(site.manifest)} 筆、頁面引用 {len(site.page_refs)} 個；"
+                  f"型錄 {len(catalog.sounds)} 個音效、可篩選標籤 {len(catalog.tag_keys)} 個")
+        if any(SCENARIOS[n]["warm"] for n in args.scenario):
+            asyncio.run(prime(site, args.timeout))
+
+        overrides = {"clips": args.clips, "favorites": args.favorites, "fav_ratio": args.fav_ratio,
+                     "tag_ratio": args.tag_ratio}
+        report = {"url": url, "sessions": args.sessions, "concurrency": args.concurrency, "scenarios": {}}
+        for name in args.scenario:
+            sc = dict(SCENARIOS[name], **{k: v for k, v in overrides.items() if v is not None})
+            before = server_stats(url)
+            r = asyncio.run(run_scenario(site, sc, args.sessions, args.concurrency, args.ramp,
+                                         args.think_ms / 1000, args.timeout, args.seed))
+            r["server"] = _stats_delta(before, server_stats(url))
+            r["params"] = sc
+            report["scenarios"][name] = r
+            if not args.json:
+                print_report(name, sc, r)
+        if args.json:
+            print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 1 if any(r["errors"] for r in report["scenarios"].values()) else 0
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
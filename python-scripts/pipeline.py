@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+匯入流程核心（不含介面）
+========================================
+update_gui.py 與 ingest_server.py 共用的 1~5 步驟：
+
+  1. clean_filenames    檔名清理（rename_plan 交易式更名）
+  2. run_convert        以子行程呼叫 轉檔v3.py --progress-json，事件整理成逐檔 log
+  3. generate_index     解析輸出資料夾的 MP3 檔名
+  4. assign_uuids       以 ufid64 計算 id
+  5. split_merge / merge_into_catalog   併入 sounds.json（catalog_store，一次合併一版）
+
+既有腳本（檔名含中文）以 LazyModule 在第一次使用時才載入。只用標準函式庫，
+不匯入 tkinter，建置機等沒有 Tk 的環境也能使用。
+"""
+
+import contextlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# --------------------------------------------------------------------------- #
+#  動態載入既有腳本（檔名含中文，用 importlib 依路徑載入）
+# --------------------------------------------------------------------------- #
+def _load_module(filename: str, alias: str):
+    path = SCRIPT_DIR / filename
+    if not path.exists():
+        raise FileNotFoundError(path)
+    spec = importlib.util.spec_from_file_location(alias, path)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[alias] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _try_load(filename: str, alias: str):
+    try:
+        return _load_module(filename, alias)
+    except Exception as e:  # noqa: BLE001
+        print(f"[警告] 無法載入 {filename}：{e}")
+        return None
+
+
+class LazyModule:
+    """
+    第一次取用屬性時才載入的模組（啟動時不必執行各腳本的 import）。
+    載入失敗時為 False，呼叫端以 `if not mod_x` 判斷；載入耗時記在 load_ms。
+    """
+    _lock = threading.RLock()
+    loaded: list = []  # [(檔名, 毫秒)]，供啟動報告 / log 使用
+    on_load = None     # callable(檔名, 毫秒)；App 用來寫進 log
+
+    def __init__(self, filename: str, alias: str):
+        self._filename = filename
+        self._alias = alias
+        self._mod = None
+        self._tried = False
+
+    def _get(self):
+        if not self._tried:
+            with LazyModule._lock:
+                if not self._tried:
+                    t0 = time.perf_counter()
+                    self._mod = _try_load(self._filename, self._alias)
+                    ms = (time.perf_counter() - t0) * 1000
+                    LazyModule.loaded.append((self._filename, ms))
+                    self._tried = True
+                    if LazyModule.on_load:
+                        LazyModule.on_load(self._filename, ms)
+        return self._mod
+
+    def __bool__(self) -> bool:
+        return self._get() is not None
+
+    def __getattr__(self, name):
+        mod = self._get()
+        if mod is None:
+            raise RuntimeError(f"{self._filename} 未載入")
+        return getattr(mod, name)
+
+
+mod_clean = LazyModule("檔名清理.py", "mod_clean")       # transform_filename_compiled()
+mod_rename = LazyModule("rename_plan.py", "mod_rename")  # plan_renames() / execute()（交易式更名）
+mod_json = LazyModule("JSON生成v3.py", "mod_json")       # build_index()
+mod_uuid = LazyModule("ufid64.py", "mod_uuid")           # ufid(), assign_ids_strict()
+mod_registry = LazyModule("ufid_registry.py", "mod_registry")  # IdRegistry（改名後沿用 id）
+mod_store = LazyModule("catalog_store.py", "mod_store")  # CatalogStore（原子寫入 + 版本歷史）
+
+
+# --------------------------------------------------------------------------- #
+#  核心邏輯（與 GUI 解耦，皆接受 log 回呼）
+# --------------------------------------------------------------------------- #
+def pending_journal(input_dir: Path):
+    """input_dir 有上次中斷的更名紀錄時回傳 (總步數, 已完成步數)，否則 None。"""
+    if not mod_rename:
+        return None
+    journal = input_dir / mod_rename.JOURNAL_NAME
+    if not journal.exists():
+        return None
+    steps, n_done = mod_rename.load_journal(journal)  # 計畫行讀不出來時會刪掉 journal、回傳空的 steps
+    return (len(steps), n_done) if steps else None
+
+
+def clean_filenames(input_dir: Path, log, journal=None) -> list:
+    """
+    就地清理 input_dir 第一層的檔名（整批規劃、journal 保護）。回傳 [(old, new), ...]。
+    有上次中斷的更名紀錄時，依 journal（"resume" 續跑 / "rollback" 還原）先處理；
+    沒指定就不動檔案、直接報錯，由呼叫端（使用者）決定。
+    """
+    if not mod_clean or not mod_rename:
+        raise RuntimeError("檔名清理.py / rename_plan.py 未載入，無法執行清理。")
+    pending = pending_journal(input_dir)
+    if pending:
+        log(f"[中斷紀錄] 發現上次中斷的更名紀錄：共 {pending[0]} 步，已完成 {pending[1]} 步。")
+        if journal not in ("resume", "rollback"):
+            raise RuntimeError(f"{input_dir} 有上次中斷的更名紀錄（{mod_rename.JOURNAL_NAME}），"
+                               "請先決定續跑或還原：python 檔名清理.py --resume 或 --rollback")
+        log("[續跑] 完成上次的更名。" if journal == "resume" else "[還原] 還原上次的更名。")
+        mod_rename.recover(input_dir, journal, log=log)
+    plan = mod_rename.plan_renames(input_dir, mod_clean.transform_filename_compiled)
+    for src, dst, why in plan.skipped:
+        log(f"[跳過] {src} → {dst}：{why}")
+    if not plan.renames:
+        log("沒有需要更名的檔案。")
+        return []
+    try:
+        changes = mod_rename.execute(plan, log=log)
+    except mod_rename.RenameError as e:
+        log(f"[失敗] {e}")
+        return []
+    return changes
+
+
+def build_convert_cmd(input_dir: Path, output_dir: Path, opts: dict) -> list:
+    cmd = [sys.executable, str(SCRIPT_DIR / "轉檔v3.py"),
+           "-i", str(input_dir), "-o", str(output_dir)]
+    if opts.get("recursive"):
+        cmd.append("--recursive")
+    if opts.get("keep_channels"):
+        cmd.append("--stereo")
+    if opts.get("force"):
+        cmd.append("--force")
+    cmd += ["--sample-rate", str(opts.get("sample_rate", 32000))]
+    if opts.get("workers", 0):
+        cmd += ["--workers", str(opts["workers"])]
+    cmd += ["--I", str(opts.get("I", -14.0)),
+            "--TP", str(opts.get("TP", -1.5)),
+            "--LRA", str(opts.get("LRA", 11.0))]
+    cmd.append("--progress-json")
+    return cmd
+
+
+CANCEL_GRACE = 5.0  # 送出 cancel 後等轉檔器自行收尾的秒數，逾時才強制終止
+_STAGE_NAMES = {"probe": "偵測", "measure": "量測", "apply": "套用", "fallback": "後備"}
+
+
+def _fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def _fmt_eta(sec: float) -> str:
+    sec = int(sec + 0.5)
+    return f"{sec // 3600}:{sec // 60 % 60:02d}:{sec % 60:02d}" if sec >= 3600 else f"{sec // 60}:{sec % 60:02d}"
+
+
+class ConvertProgress:
+    """
+    彙整 轉檔v3.py --progress-json 的事件。
+    ETA 以「已完成的輸入 bytes / 經過時間」估算，比用檔數準（檔案大小差很多）。
+    """
+
+    def __init__(self):
+        self.todo = 0
+        self.bytes_total = 0
+        self.done = 0
+        self.failed = 0
+        self.bytes_done = 0
+        self.running = {}   # index → 目前階段
+        self.t0 = time.monotonic()
+
+    def feed(self, ev: dict) -> str:
+        """吃一個事件；需要寫進 log 的回傳文字，否則回傳 None。"""
+        kind = ev.get("event")
+        if kind == "start":
+            self.todo, self.bytes_total = ev["todo"], ev["bytes_total"]
+            self.t0 = time.monotonic()
+            skipped = f"，略過已存在 {ev['skipped']}" if ev["skipped"] else ""
+            return f"共 {ev['total']} 個檔案，待轉 {self.todo}{skipped}（{_fmt_bytes(self.bytes_total)}，{ev['workers']} 個工作）"
+        if kind in ("file_start", "stage"):
+            self.running[ev["index"]] = ev.get("stage", "")
+            return None
+        if kind == "file_done":
+            self.running.pop(ev["index"], None)
+            if ev.get("cancelled"):
+                return None
+            self.done += 1
+            self.bytes_done += ev.get("bytes_in", 0)
+            name = Path(ev["src"]).name
+            head = f"[{self.done}/{self.todo}]"
+            if not ev["ok"]:
+                self.failed += 1
+                return f"{head} ✗ {name}\n{ev.get('error') or ''}".rstrip()
+            stages = " / ".join(f"{_STAGE_NAMES.get(k, k)} {v:.1f}s" for k, v in ev.get("stages", {}).items())
+            fb = "（後備單段式）" if ev.get("fallback") else ""
+            return (f"{head} ✓ {name}{fb}  {ev['elapsed']:.1f}s（{stages}）  "
+                    f"{_fmt_bytes(ev['bytes_in'])} → {_fmt_bytes(ev['bytes_out'])}")
+        if kind == "done":
+            return (f"成功 {ev['succeeded']}、失敗 {ev['failed']}、取消 {ev['cancelled']}、略過 {ev['skipped']}；"
+                    f"{_fmt_bytes(ev['bytes_in'])} → {_fmt_bytes(ev['bytes_out'])}，耗時 {_fmt_eta(ev['elapsed'])}")
+        return None
+
+    def status(self) -> str:
+        elapsed = max(time.monotonic() - self.t0, 1e-6)
+        pct = self.done * 100 // self.todo if self.todo else 100
+        parts = [f"轉檔 {self.done}/{self.todo}（{pct}%）"]
+        if self.done:
+            rate = self.bytes_done / elapsed
+            parts.append(f"{self.done / elapsed:.1f} 檔/s · {_fmt_bytes(rate)}/s")
+            if rate > 0 and self.done < self.todo:
+                parts.append(f"剩餘約 {_fmt_eta((self.bytes_total - self.bytes_done) / rate)}")
+        if self.running:
+            parts.append(f"進行中 {len(self.running)}")
+        if self.failed:
+            parts.append(f"失敗 {self.failed}")
+        return " · ".join(parts)
+
+
+def _watch_cancel(proc: subprocess.Popen, cancel_event: threading.Event, log) -> None:
+    """使用者按中斷時經 stdin 送出 cancel；轉檔器 CANCEL_GRACE 秒內沒結束才 terminate。"""
+    while proc.poll() is None:
+        if not cancel_event.wait(0.2):
+            continue
+        log("[中斷] 已要求停止轉檔…")
+        try:
+            proc.stdin.write("cancel\n")
+            proc.stdin.flush()
+        except (OSError, ValueError):
+            pass
+        try:
+            proc.wait(timeout=CANCEL_GRACE)
+        except subprocess.TimeoutExpired:
+            log("[中斷] 轉檔器未回應，強制終止。")
+            proc.terminate()
+        return
+
+
+def run_convert(input_dir: Path, output_dir: Path, opts: dict, log,
+                cancel_event: threading.Event, progress=None, on_event=None) -> int:
+    """
+    以子行程呼叫 轉檔v3.py --progress-json，把事件整理成逐檔 log；
+    progress(str) 會收到進度 / 吞吐量 / ETA 摘要（狀態列用），on_event(dict) 收到原始事件。
+    回傳結束碼。
+    """
+    script = SCRIPT_DIR / "轉檔v3.py"
+    if not script.exists():
+        raise RuntimeError(f"找不到 轉檔v3.py：{script}")
+    cmd = build_convert_cmd(input_dir, output_dir, opts)
+    log("執行：" + " ".join(f'"{c}"' if " " in c else c for c in cmd))
+
+    env = os.environ.copy()
+    env["PYTHONUTF8"] = "1"
+    env["PYTHONIOENCODING"] = "UTF-8"
+
+    proc = subprocess.Popen(
+        cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        env=env, text=True, encoding="utf-8", errors="replace", bufsize=1,
+    )
+    threading.Thread(target=_watch_cancel, args=(proc, cancel_event, log), daemon=True).start()
+    prog = ConvertProgress()
+    try:
+        for line in proc.stdout:
+            line = line.rstrip("\n")
+            try:
+                ev = json.loads(line)
+            except ValueError:
+                ev = None
+            if not isinstance(ev, dict):
+                log(line)  # 轉檔器啟動前的錯誤訊息等非事件輸出
+                continue
+            if on_event:
+                on_event(ev)
+            msg = prog.feed(ev)
+            if msg:
+                log(msg)
+            if progress and ev.get("event") in ("start", "file_done"):
+                progress(prog.status())
+    finally:
+        proc.stdout.close()
+        proc.wait()
+        if proc.stdin:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+    return proc.returncode
+
+
+def generate_index(output_dir: Path, log) -> list:
+    """解析輸出資料夾的 MP3 檔名 → [{file, title, tags}]。"""
+    if not mod_json:
+        raise RuntimeError("JSON生成v3.py 未載入，無法生成索引。")
+    data = mod_json.build_index(str(output_dir))
+    log(f"解析完成：共 {len(data)} 筆 MP3。")
+    return data
+
+
+def assign_uuids(entries: list, opts: dict, log) -> list:
+    """為 entries 計算 id（k=0，與 ufid64 預設一致）。回傳新 list。"""
+    if not mod_uuid:
+        raise RuntimeError("ufid64.py 未載入，無法產生 UUID。")
+    nbytes = int(opts.get("nbytes", 4))
+    namespace = opts.get("namespace") or None
+    out = [dict(e) for e in entries]
+    todo = [e for e in out if isinstance(e.get("file"), str) and e.get("file")]
+    engine = mod_uuid.UfidEngine(namespace, "nfkc", True, True, nbytes)
+    for e, idv in zip(todo, engine.file_ids([e["file"] for e in todo])):
+        e["id"] = idv
+    log(f"已產生 {len(out)} 筆 id（bytes={nbytes}, namespace={namespace or '(無)'}）。")
+    return out
+
+
+def split_merge(existing: list, entries: list) -> tuple[list, list]:
+    """依 file 把 entries 分成 (新增, 與 existing 重複)。"""
+    existing_files = {e.get("file") for e in existing if isinstance(e, dict)}
+    new_entries, dup_entries = [], []
+    for e in entries:
+        (dup_entries if e.get("file") in existing_files else new_entries).append(e)
+    return new_entries, dup_entries
+
+
+def merge_into_catalog(store, new_entries: list, dup_entries: list, resolutions: dict,
+                       output_dir: Path, opts: dict, log) -> dict:
+    """
+    把新增與重複（依 resolutions 處理）併入 store，寫成 sounds.json 的一版。
+    resolutions：{file: {"action": "skip" | "overwrite" | "rename", "new_file": 新檔名}}；
+    rename 會就地改 dup_entries 內物件的 file / id（GUI 的解析結果跟著更新）。
+    回傳 {version, total, added, skipped, overwritten, renamed}；沒有變更時 version 為 None。
+    """
+    sounds_path = store.path
+    nbytes = int(opts.get("nbytes", 4))
+    namespace = opts.get("namespace") or None
+
+    # 只產生變動部分的 patch；既有記錄不複製、不重新序列化
+    current = store.records
+    by_file = {e.get("file"): i for i, e in enumerate(current)
+               if isinstance(e, dict)}
+    # 預覽之後型錄可能已被別的流程更新：已存在的「新增」改當重複略過
+    late = [e for e in new_entries if e.get("file") in by_file]
+    if late:
+        log(f"[略過] {len(late)} 筆在預覽後已被加入 sounds.json。")
+        new_entries = [e for e in new_entries if e.get("file") not in by_file]
+    ops = []
+    dup_by_file = {e.get("file"): e for e in dup_entries}
+
+    n_skip = n_over = n_ren = 0
+    extra_new = []  # 重新命名後當作新增
+    overwritten = []
+    for f, res in resolutions.items():
+        src = dup_by_file.get(f)
+        if src is None:
+            continue
+        action = res["action"]
+        if action == "skip":
+            n_skip += 1
+        elif action == "overwrite":
+            idx = by_file.get(f)
+            if idx is not None:
+                overwritten.append(dict(src))
+                ops.append({"op": "replace", "path": f"/{idx}", "value": overwritten[-1]})
+            n_over += 1
+        elif action == "rename":
+            new_file = res["new_file"]
+            old_fp = output_dir / f
+            new_fp = output_dir / new_file
+            if old_fp.exists():
+                if new_fp.exists():
+                    raise RuntimeError(f"重新命名目標已存在：{new_fp}")
+                old_fp.rename(new_fp)
+                log(f"[更名] {f} → {new_file}")
+            else:
+                log(f"[警告] 找不到輸出檔，僅更新資料：{old_fp}")
+            # 更新原解析資料（與呼叫端的 entries 共用同一物件）
+            src["file"] = new_file
+            if mod_uuid:
+                src["id"] = mod_uuid.ufid(new_file, namespace, 0,
+                                          "nfkc", True, True, nbytes)
+            extra_new.append(dict(src))
+            n_ren += 1
+
+    new_all = [dict(e) for e in new_entries] + extra_new
+
+    # 沒被覆寫的既有 id（新資料不可與之碰撞）
+    replaced = {int(op["path"][1:]) for op in ops}
+    taken = {str(e.get("id")) for i, e in enumerate(current)
+             if i not in replaced and isinstance(e, dict) and e.get("id") is not None}
+
+    with contextlib.ExitStack() as stack:
+        # 有 ufid 登記簿時：內容或檔名已登記過的音效沿用原本的 id
+        registry = None
+        reg_path = mod_registry.default_db_for(sounds_path) if mod_registry else None
+        if reg_path is not None and reg_path.exists():
+            # 之後任何一步拋出例外（id 碰撞、寫入失敗）都要關閉連線；ingest_server 長時間執行
+            registry = stack.enter_context(mod_registry.IdRegistry(reg_path))
+            taken_reg = set(taken)
+            for e in new_all:
+                f, proposed = e.get("file"), e.get("id")
+                if not f or proposed is None:
+                    continue
+                sid = registry.stable_id(output_dir / f, f, str(proposed), taken_reg)
+                if sid != proposed:
+                    log(f"[沿用 id] {f}：{proposed} → {sid}")
+                    e["id"] = sid
+                taken_reg.add(sid)
+        ops += [{"op": "add", "path": "/-", "value": e} for e in new_all]
+        log(f"[新增] 加入 {len(new_all)} 筆"
+            + (f"（含 {n_ren} 筆重新命名）" if n_ren else "") + "。")
+        if dup_entries:
+            log(f"[重複] 略過 {n_skip}、覆寫 {n_over}、重新命名 {n_ren}。")
+        result = {"version": None, "total": len(current), "added": len(new_all),
+                  "skipped": n_skip + len(late), "overwritten": n_over, "renamed": n_ren}
+        if not ops:
+            log("[完成] 沒有需要寫入的變更。")
+            return result
+
+        # 以 ufid 補/驗證變動記錄的 id（保留既有、補缺、偵測碰撞）；
+        # 整份型錄的一致性改由 validate_catalog.py 檢查
+        delta = [op["value"] for op in ops]
+        if mod_uuid:
+            try:
+                changed = mod_uuid.assign_ids_strict(
+                    delta, namespace, False, "nfkc", True, True, "warn", nbytes)
+                log(f"[UUID] 補/更新 {changed} 筆 id。")
+            except SystemExit as se:
+                raise RuntimeError(f"id 碰撞或驗證失敗：{se}")
+        clash = [e.get("file") for e in delta if str(e.get("id")) in taken]
+        if clash:
+            raise RuntimeError("id 與既有音效碰撞：" + "、".join(map(str, clash[:10])))
+
+        version = store.commit(ops, f"合併：新增 {len(new_all)}、覆寫 {len(overwritten)}")
+        total = len(store.records)
+        log(f"[完成] 已寫入 {sounds_path}（共 {total} 筆，版本 v{version}）。")
+        result.update(version=version, total=total)
+
+        if registry is not None:  # 離開 with 時 commit
+            for e in new_all + overwritten:
+                f = e.get("file")
+                if not f or e.get("id") is None:
+                    continue
+                fp = output_dir / f
+                registry.record(registry.content_hash(fp) if fp.is_file() else None,
+                                str(e["id"]), f)
+            log(f"[登記簿] 已登記 {len(new_all) + len(overwritten)} 筆 → {reg_path.name}")
+        return result
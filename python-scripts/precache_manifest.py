@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Service Worker 預快取清單（依票數分層）
+========================================
+每個按鈕的 MP3 都是點下去才下載，行動網路上第一次點播很慢。此腳本讀取發佈目錄
+（publish_assets.py 的輸出）的 asset-manifest.json，產生 precache-manifest.json，
+讓 sw.js 在背景依序預快取：
+
+  catalog   型錄：tags / sounds / vote-results / image-variants、scripts/、主播頭像
+            （有圖片變體時用 WebP 變體）、頁面引用的 assets/
+  top       票數最高的音效
+  popular   其餘有票的音效（依票數）
+
+  - 每層有 bytes 上限（--budget）；音效依票數排名依序放入，目前層放不下就放下一層，
+    全部層都滿即停止，排名較前的音效一定在較前面的層
+  - 票數讀自發佈目錄中的 vote-results.json（同票依原檔順序），輸出只取決於清單內容，
+    不含時間戳；內容沒變就不改寫檔案，revision 也不變
+  - 網址都是雜湊檔名：sw.js 只下載還沒快取的網址，沒變的項目不會重新下載
+  - 順便把 repo 根目錄的 sw.js 複製到發佈目錄（Service Worker 的網址須固定，不加雜湊）
+
+用法：
+  python precache_manifest.py                       # 處理 ../dist
+  python precache_manifest.py --budget top=2 popular=10
+  python precache_manifest.py --out D:/site --json
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from publish_assets import MANIFEST_NAME, PAGE_NAME, hashed_name, write_if_changed
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+DEFAULT_OUT = REPO_ROOT / "dist"
+OUTPUT_NAME = "precache-manifest.json"
+SW_NAME = "sw.js"
+PRECACHE_VERSION = 1
+# (層名, 預設上限 MB)；順序即預快取順序
+TIERS: Tuple[Tuple[str, float], ...] = (("catalog", 2.0), ("top", 1.0), ("popular", 6.0))
+CATALOG_JSON = ("config/tags.json", "config/sounds.json", "config/vote-results.json",
+                "config/image-variants.json")
+
+
+def _load_published_json(out: Path, files: Dict[str, str], src: str):
+    """讀取發佈目錄中 src 的雜湊版本；不存在回 None。"""
+    if src not in files:
+        return None
+    try:
+        return json.loads((out / hashed_name(src, files[src])).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _avatar_src(avatar: str, variants: Optional[dict], files: Dict[str, str]) -> str:
+    """頁面有圖片變體時顯示的是最寬的 WebP 變體（image_variants.py），預快取也用它。"""
+    vs = (((variants or {}).get("images") or {}).get(avatar) or {}).get("variants", {}).get("webp") or []
+    best = max(vs, key=lambda v: v["width"], default=None)
+    return best["url"] if best and best["url"] in files else avatar
+
+
+def catalog_candidates(out: Path, files: Dict[str, str], tags: list,
+                       variants: Optional[dict] = None) -> List[str]:
+    """第一層的候選（依優先順序）：型錄 JSON → scripts/ → 主播頭像 → 頁面引用的 assets/。"""
+    out_list: List[str] = [s for s in CATALOG_JSON if s in files]
+    out_list += sorted(s for s in files if s.startswith("scripts/"))
+    for t in tags or []:
+        a = t.get("avatar") if isinstance(t, dict) and t.get("role") == "streamer" else None
+        a = _avatar_src(a, variants, files) if a else None
+        if a and a in files and a not in out_list:
+            out_list.append(a)
+    # 頁面（已由 publish_assets.py 改寫成雜湊檔名）直接引用的 assets/
+    try:
+        html = (out / PAGE_NAME).read_text(encoding="utf-8")
+    except OSError:
+        html = ""
+    by_hashed = {hashed_name(s, h): s for s, h in files.items() if s.startswith("assets/")}
+    for ref in re.findall(r"""(?:src|href)=["'](assets/[^"'?#]+)""", html):
+        src = by_hashed.get(ref)
+        if src and src not in out_list:
+            out_list.append(src)
+    return out_list
+
+
+def ranked_clips(files: Dict[str, str], sounds: list, votes: list) -> List[Tuple[str, int]]:
+    """[(sounds/xxx.mp3, 票數)]，依票數由高到低（同票維持 vote-results 原順序），只含有票的音效。"""
+    by_id = {}
+    for s in sounds or []:
+        if isinstance(s, dict) and s.get("file"):
+            by_id.setdefault(str(s.get("id") or s["file"]), s["file"])
+    seen, ranked = set(), []
+    for pos, v in enumerate(votes or []):
+        n = int(v.get("votes") or 0) if isinstance(v, dict) else 0
+        f = by_id.get(str(v.get("id"))) if isinstance(v, dict) else None
+        src = f"sounds/{f}" if f else None
+        if n <= 0 or src is None or src in seen or src not in files:
+            continue
+        seen.add(src)
+        ranked.append((n, pos, src))
+    ranked.sort(key=lambda x: (-x[0], x[1]))
+    return [(src, n) for n, _, src in ranked]
+
+
+def build(out: Path, budgets: Dict[str, int]) -> Tuple[dict, dict]:
+    """回傳 (precache 清單, 統計)。"""
+    manifest = json.loads((out / MANIFEST_NAME).read_text(encoding="utf-8"))
+    files: Dict[str, str] = manifest.get("files", {})
+    tags = _load_published_json(out, files, "config/tags.json")
+    sounds = _load_published_json(out, files, "config/sounds.json")
+    votes = _load_published_json(out, files, "config/vote-results.json")
+    variants = _load_published_json(out, files, "config/image-variants.json")
+
+    missing = 0
+
+    def entry(src: str) -> Optional[dict]:
+        nonlocal missing
+        url = hashed_name(src, files[src])
+        try:
+            size = (out / url).stat().st_size
+        except OSError:
+            missing += 1
+            return None
+        return {"url": url, "hash": files[src], "size": size}
+
+    tiers = [{"name": name, "budget": budgets[name], "bytes": 0, "entries": []} for name, _ in TIERS]
+    catalog = tiers[0]
+    skipped_catalog = []
+    for src in catalog_candidates(out, files, tags, variants):
+        e = entry(src)
+        if e is None:
+            continue
+        if catalog["bytes"] + e["size"] > catalog["budget"]:
+            skipped_catalog.append(src)
+            continue
+        catalog["entries"].append(e)
+        catalog["bytes"] += e["size"]
+
+    clips = ranked_clips(files, sounds, votes)
+    placed = 0
+    level = 1
+    for src, _ in clips:
+        e = entry(src)
+        if e is None:
+            continue
+        while level < len(tiers) and tiers[level]["bytes"] + e["size"] > tiers[level]["budget"]:
+            level += 1
+        if level >= len(tiers):
+            break
+        tiers[level]["entries"].append(e)
+        tiers[level]["bytes"] += e["size"]
+        placed += 1
+
+    canonical = json.dumps([[t["name"], [e["url"] for e in t["entries"]]] for t in tiers],
+                           ensure_ascii=False, separators=(",", ":"))
+    result = {"version": PRECACHE_VERSION,
+              "revision": hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16],
+              "tiers": tiers}
+    stats = {"ranked_clips": len(clips), "placed_clips": placed, "missing": missing,
+             "skipped_catalog": skipped_catalog}
+    return result, stats
+
+
+def diff(prev: Optional[dict], cur: dict) -> dict:
+    """與上一版相比：既有用戶需要下載 / 可刪除的項目。"""
+    def urls(m: Optional[dict]) -> Dict[str, int]:
+        return {e["url"]: e["size"] for t in (m or {}).get("tiers", []) for e in t["entries"]}
+
+    old, new = urls(prev), urls(cur)
+    added = [u for u in new if u not in old]
+    removed = [u for u in old if u not in new]
+    return {"added": len(added), "bytes_added": sum(new[u] for u in added),
+            "removed": len(removed), "kept": len(new) - len(added)}
+
+
+def parse_budgets(items: List[str]) -> Dict[str, int]:
+    budgets = {name: int(mb * (1 << 20)) for name, mb in TIERS}
+    for item in items or []:
+        name, sep, mb = item.partition("=")
+        if not sep or name not in budgets:
+            raise ValueError(f"--budget 格式為 層名=MB（層名：{', '.join(budgets)}）：{item}")
+        budgets[name] = int(float(mb) * (1 << 20))
+    return budgets
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="產生依票數分層的 Service Worker 預快取清單")
+    ap.add_argument("--out", default=str(DEFAULT_OUT), help="發佈目錄（預設：dist/）")
+    ap.add_argument("--budget", nargs="+", default=[], metavar="層名=MB",
+                    help=f"各層 bytes 上限（預設 {' '.join(f'{n}={mb:g}' for n, mb in TIERS)}）")
+    ap.add_argument("--sw", default=str(REPO_ROOT / SW_NAME), help="要複製到發佈目錄的 Service Worker")
+    ap.add_argument("--json", action="store_true", help="以 JSON 輸出報告")
+    args = ap.parse_args()
+
+    out = Path(args.out).resolve()
+    if not (out / MANIFEST_NAME).is_file():
+        print(f"找不到 {out / MANIFEST_NAME}（請先執行 publish_assets.py）", file=sys.stderr)
+        return 2
+    try:
+        budgets = parse_budgets(args.budget)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    try:
+        prev = json.loads((out / OUTPUT_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        prev = None
+    result, stats = build(out, budgets)
+    changed = write_if_changed(out / OUTPUT_NAME,
+                                (json.dumps(result, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8"))
+    sw = Path(args.sw)
+    sw_written = write_if_changed(out / SW_NAME, sw.read_bytes()) if sw.is_file() else None
+    d = diff(prev, result)
+
+    if args.json:
+        print(json.dumps({"revision": result["revision"], "changed": changed, "sw_written": sw_written,
+                          "tiers": [{k: t[k] for k in ("name", "budget", "bytes")} | {"entries": len(t["entries"])}
+                                    for t in result["tiers"]],
+                          **stats, "diff": d}, ensure_ascii=False, indent=2))
+        return 0
+    print(f"預快取清單：{out / OUTPUT_NAME}（revision {result['revision']}，{'已更新' if changed else '未變'}）")
+    for t in result["tiers"]:
+        print(f"  {t['name']:<8} {len(t['entries']):>5} 項  {t['bytes'] / (1 << 20):6.2f} / "
+              f"{t['budget'] / (1 << 20):.2f} MB")
+    print(f"  有票音效 {stats['ranked_clips']}，放入 {stats['placed_clips']}"
+          + (f"；發佈目錄缺檔 {stats['missing']}" if stats["missing"] else ""))
+    if stats["skipped_catalog"]:
+        print(f"  型錄層放不下：{', '.join(stats['skipped_catalog'])}")
+    print(f"  與上一版相比：新增 {d['added']}（{d['bytes_added'] / 1024:.0f} KB 需下載）、"
+          f"移除 {d['removed']}、沿用 {d['kept']}")
+    if sw_written is None:
+        print(f"  [警告] 找不到 {sw}，未複製 Service Worker", file=sys.stderr)
+    elif sw_written:
+        print(f"  已複製 {SW_NAME}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
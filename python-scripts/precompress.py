@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+靜態預壓縮（.gz / .br / .zst）
+========================================
+為發佈目錄中每個文字資產（index.html、config/*.json、scripts/*.js、asset-manifest.json…）
+寫出最高壓縮率的同名壓縮檔，讓伺服器依 Accept-Encoding 直接送出
+（如 nginx 的 gzip_static / brotli_static），不必每次請求即時壓縮：
+
+  index.html → index.html.gz、index.html.br、index.html.zst
+
+  - .gz 一定產生：有 zopfli 套件時用 zopfli，否則 zlib level 9（mtime=0，輸出固定）
+  - .br 需要 brotli 套件（quality 11、lgwin 24），.zst 需要 zstandard 套件
+    或 Python 3.14 的 compression.zstd（level 22）；沒有就略過該格式
+  - 以行程池平行壓縮；.precompress-cache.json 記錄來源 sha256 與各格式大小，
+    內容沒變且壓縮檔都在就跳過
+  - 壓縮後沒有比原檔小 5% 以上就不留該格式（避免伺服器送出更大的檔案）
+  - 報告列出每個資產的原始 / 各格式 bytes 與上次建置的差異，方便抓出負載倒退
+
+用法：
+  python precompress.py                   # 處理 ../dist（publish_assets.py 的輸出）
+  python precompress.py --root ../dist --json
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ufid_registry import sha256_file
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_ROOT = SCRIPT_DIR.parent / "dist"
+CACHE_NAME = ".precompress-cache.json"
+CACHE_VERSION = 1
+TEXT_EXTS = {".html", ".htm", ".js", ".mjs", ".css", ".json", ".svg", ".txt", ".xml",
+             ".map", ".webmanifest"}
+MIN_SIZE = 256          # 小於此 bytes 不壓縮（標頭成本比省下的多）
+MIN_SAVING = 0.05       # 壓縮後至少小 5% 才保留
+
+
+# --------------------------------------------------------------------------- #
+#  壓縮器（可選套件）
+# --------------------------------------------------------------------------- #
+def _gzip_codec() -> Tuple[str, Callable[[bytes], bytes]]:
+    try:
+        import zopfli.gzip  # type: ignore
+        return "zopfli", lambda data: zopfli.gzip.compress(data, numiterations=15)
+    except ImportError:
+        return "zlib-9", lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli_codec() -> Optional[Tuple[str, Callable[[bytes], bytes]]]:
+    try:
+        import brotli  # type: ignore
+    except ImportError:
+        return None
+    return "brotli-11", lambda data: brotli.compress(data, quality=11, lgwin=24)
+
+
+def _zstd_codec() -> Optional[Tuple[str, Callable[[bytes], bytes]]]:
+    try:
+        from compression import zstd  # type: ignore  # Python 3.14+
+        return "zstd-22", lambda data: zstd.compress(data, level=22)
+    except ImportError:
+        pass
+    try:
+        import zstandard  # type: ignore
+    except ImportError:
+        return None
+    return "zstd-22", lambda data: zstandard.ZstdCompressor(level=22).compress(data)
+
+
+def available_codecs() -> Dict[str, Tuple[str, Callable[[bytes], bytes]]]:
+    """{副檔名: (實作名稱, 壓縮函式)}；.gz 一定有。"""
+    codecs = {"gz": _gzip_codec()}
+    for ext, factory in (("br", _brotli_codec), ("zst", _zstd_codec)):
+        c = factory()
+        if c is not None:
+            codecs[ext] = c
+    return codecs
+
+
+# --------------------------------------------------------------------------- #
+#  壓縮單一檔案（在子行程執行）
+# --------------------------------------------------------------------------- #
+def _write_atomic(path: Path, data: bytes, mtime_ns: int) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.utime(tmp, ns=(mtime_ns, mtime_ns))  # 與來源同 mtime，方便伺服器比對
+    os.replace(tmp, path)
+
+
+def compress_one(path: str, exts: List[str]) -> dict:
+    """壓縮一個檔案成 exts 指定的格式；回傳 {sha256, raw, variants{ext: size|None}, ms}。"""
+    p = Path(path)
+    data = p.read_bytes()
+    st = p.stat()
+    codecs = available_codecs()
+    out = {"sha256": hashlib.sha256(data).hexdigest(), "raw": len(data), "variants": {}, "ms": {}}
+    for ext in exts:
+        t0 = time.perf_counter()
+        comp = codecs[ext][1](data)
+        out["ms"][ext] = round((time.perf_counter() - t0) * 1000, 1)
+        target = p.with_name(f"{p.name}.{ext}")
+        if len(comp) <= len(data) * (1 - MIN_SAVING):
+            _write_atomic(target, comp, st.st_mtime_ns)
+            out["variants"][ext] = len(comp)
+        else:
+            target.unlink(missing_ok=True)
+            out["variants"][ext] = None
+    return out
+
+
+# --------------------------------------------------------------------------- #
+#  掃描與快取
+# --------------------------------------------------------------------------- #
+def find_assets(root: Path) -> List[str]:
+    """root 下所有文字資產的相對路徑（不含壓縮檔本身與隱藏檔）。"""
+    out = []
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for fn in files:
+            if fn.startswith("."):
+                continue
+            if Path(fn).suffix.lower() not in TEXT_EXTS:
+                continue
+            full = os.path.join(dirpath, fn)
+            if os.path.getsize(full) < MIN_SIZE:
+                continue
+            out.append(os.path.relpath(full, root).replace("\\", "/"))
+    return sorted(out)
+
+
+def load_cache(root: Path) -> dict:
+    try:
+        data = json.loads((root / CACHE_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data.get("files", {}) if data.get("version") == CACHE_VERSION else {}
+
+
+def save_cache(root: Path, files: dict) -> None:
+    tmp = root / (CACHE_NAME + ".tmp")
+    tmp.write_text(json.dumps({"version": CACHE_VERSION, "files": files}, ensure_ascii=False,
+                              indent=1) + "\n", encoding="utf-8")
+    os.replace(tmp, root / CACHE_NAME)
+
+
+def remove_orphans(root: Path, assets: List[str], exts: List[str]) -> List[str]:
+    """刪除來源已不存在的壓縮檔（只處理文字資產的壓縮檔）。"""
+    alive = set(assets)
+    removed = []
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for fn in files:
+            base, dot, ext = fn.rpartition(".")
+            if not dot or ext not in ("gz", "br", "zst") or Path(base).suffix.lower() not in TEXT_EXTS:
+                continue
+            rel = os.path.relpath(os.path.join(dirpath, base), root).replace("\\", "/")
+            if rel not in alive or ext not in exts:
+                os.remove(os.path.join(dirpath, fn))
+                removed.append(f"{rel}.{ext}")
+    return removed
+
+
+def precompress(root: Path, workers: int, force: bool = False) -> dict:
+    t_start = time.perf_counter()
+    codecs = available_codecs()
+    exts = list(codecs)
+    impl = {ext: codecs[ext][0] for ext in exts}
+    cache = load_cache(root)
+    assets = find_assets(root)
+
+    todo, results = [], {}
+    for rel in assets:
+        c = cache.get(rel)
+        fresh = (not force and c is not None and c.get("impl") == impl
+                 and c["sha256"] == sha256_file(root / rel)
+                 and all(c["variants"].get(e) is None or (root / f"{rel}.{e}").exists() for e in exts))
+        if fresh:
+            results[rel] = dict(c, skipped=True)
+        else:
+            todo.append(rel)
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        for rel, r in zip(todo, ex.map(compress_one, [str(root / r) for r in todo], [exts] * len(todo))):
+            r["impl"] = impl
+            r["skipped"] = False
+            results[rel] = r
+
+    removed = remove_orphans(root, assets, exts)
+    save_cache(root, {rel: {k: v for k, v in r.items() if k not in ("skipped", "ms")}
+                      for rel, r in results.items()})
+
+    rows = []
+    for rel in assets:
+        r, prev = results[rel], cache.get(rel) or {}
+        rows.append({
+            "asset": rel, "raw": r["raw"], "variants": r["variants"],
+            "prev_raw": prev.get("raw"), "prev_variants": prev.get("variants", {}),
+            "skipped": r["skipped"], "ms": r.get("ms", {}),
+        })
+    return {
+        "codecs": impl, "assets": len(assets), "compressed": len(todo),
+        "skipped": len(assets) - len(todo), "removed": removed, "rows": rows,
+        "elapsed_s": round(time.perf_counter() - t_start, 3),
+    }
+
+
+# --------------------------------------------------------------------------- #
+#  報告
+# --------------------------------------------------------------------------- #
+def _kb(n: Optional[int]) -> str:
+    return "-" if n is None else f"{n / 1024:.1f}K"
+
+
+def _delta(cur: Optional[int], prev: Optional[int]) -> str:
+    if cur is None or prev is None or cur == prev:
+        return ""
+    return f" ({'+' if cur > prev else ''}{(cur - prev) / 1024:.1f}K)"
+
+
+def print_report(r: dict) -> None:
+    exts = list(r["codecs"])
+    print(f"壓縮器：{'、'.join(f'.{e}={n}' for e, n in r['codecs'].items())}")
+    header = f"{'原始':>18}" + "".join(f"{'.' + e:>18}" for e in exts) + "  資產"
+    print(header)
+    totals = {"raw": 0, **{e: 0 for e in exts}}
+    for row in sorted(r["rows"], key=lambda x: -x["raw"]):
+        cells = [f"{_kb(row['raw'])}{_delta(row['raw'], row['prev_raw'])}"]
+        totals["raw"] += row["raw"]
+        for e in exts:
+            v = row["variants"].get(e)
+            totals[e] += v if v is not None else row["raw"]
+            pct = f" {v * 100 / row['raw']:.0f}%" if v else ""
+            cells.append(f"{_kb(v)}{pct}{_delta(v, row['prev_variants'].get(e))}")
+        mark = "" if row["skipped"] else " *"
+        print("".join(f"{c:>18}" for c in cells) + f"  {row['asset']}{mark}")
+    raw = max(totals["raw"], 1)
+    line = f"{_kb(totals['raw']):>18}" + "".join(
+        f"{_kb(totals[e]) + f' {totals[e] * 100 / raw:.0f}%':>18}" for e in exts)
+    print(line + "  合計（沒有壓縮檔的以原始大小計）")
+    print(f"\n資產 {r['assets']}：壓縮 {r['compressed']}（* 標記），沿用 {r['skipped']}；"
+          f"刪除孤兒壓縮檔 {len(r['removed'])}；耗時 {r['elapsed_s']:.2f}s")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="為文字資產產生 .gz / .br / .zst 預壓縮檔")
+    ap.add_argument("--root", default=str(DEFAULT_ROOT), help="發佈目錄（預設：dist/）")
+    ap.add_argument("--workers", type=int, default=0, help="並行行程數（0=CPU 數）")
+    ap.add_argument("--force", action="store_true", help="忽略快取全部重新壓縮")
+    ap.add_argument("--json", action="store_true", help="以 JSON 輸出報告")
+    args = ap.parse_args()
+
+    root = Path(args.root).resolve()
+    if not root.is_dir():
+        print(f"找不到發佈目錄：{root}（請先執行 publish_assets.py）", file=sys.stderr)
+        return 2
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    r = precompress(root, workers, force=args.force)
+    if args.json:
+        print(json.dumps(r, ensure_ascii=False, indent=2))
+    else:
+        print_report(r)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+內容雜湊資產發佈（取代全域 ?v= 快取破壞）
+========================================
+頁面原本對每個 URL 加上同一個 VERSION，每次發版所有音檔（100+ MB）的快取一起失效，
+sounds.json / tags.json 更是 no-store 從不快取。此腳本把 sounds/、avatars/、assets/、
+scripts/ 與頁面會載入的 config/*.json 複製成「檔名含內容雜湊」的版本到發佈目錄（預設 dist/）：
+
+  dist/sounds/帝王謝-你當年的技術呢？.3f2a9c1b0d.mp3
+  dist/asset-manifest.json   {"files": {"sounds/帝王謝-你當年的技術呢？.mp3": "3f2a9c1b0d", ...}}
+  dist/index.html            靜態引用（assets/、scripts/…）已換成雜湊檔名
+
+  - 頁面先讀 asset-manifest.json（no-cache），再以雜湊檔名載入音檔與 JSON；
+    內容沒變的檔案網址不變，可永久快取（Cache-Control: immutable）
+  - 只有 (size, mtime) 變動的檔案才重新雜湊，雜湊檔名已存在就不複製，
+    清單與 index.html 內容沒變也不改寫
+  - 舊的雜湊檔預設保留（還開著舊頁面的人仍拿得到）；--prune 才刪除未被目前清單引用的檔案
+  - config/ 不整個發佈：裡面還有 ufid-registry.sqlite（stat_cache 含本機絕對路徑）、
+    sounds.history.jsonl、sounds.manifest.json 等工具的快取與紀錄，只發佈 PUBLIC_FILES
+
+用法：
+  python publish_assets.py                  # 發佈到 ../dist
+  python publish_assets.py --out D:/site --prune
+  python publish_assets.py --dry-run        # 只顯示會複製 / 刪除什麼
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from content_manifest import hash_many, scan_tree
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+DEFAULT_OUT = REPO_ROOT / "dist"
+DEFAULT_DIRS = ("sounds", "avatars", "assets", "scripts")
+# 頁面 CONFIG.paths 會載入的設定檔（不存在的略過，例如尚未執行 image_variants.py）
+PUBLIC_FILES = ("config/tags.json", "config/sounds.json", "config/vote-results.json",
+                "config/image-variants.json")
+PAGE_NAME = "index.html"
+MANIFEST_NAME = "asset-manifest.json"
+STATE_NAME = ".publish-state.json"  # 來源的 sha256 / size / mtime，不對外提供
+MANIFEST_VERSION = 1
+HASH_LEN = 10  # 檔名中的雜湊長度（sha256 前 10 個十六進位字元）
+PAGE_REWRITE_DIRS = ("assets", "avatars", "scripts")  # index.html 內的靜態引用（config/ 由頁面經清單解析）
+PRECOMPRESSED_EXTS = ("gz", "br", "zst")  # precompress.py 產生的同名壓縮檔，--prune 時隨原檔保留
+
+
+def hashed_name(rel: str, digest: str) -> str:
+    """sounds/a.mp3 + 3f2a… → sounds/a.3f2a9c1b0d.mp3"""
+    head, _, base = rel.rpartition("/")
+    stem, dot, ext = base.rpartition(".")
+    if not dot or not stem:
+        stem, ext = base, ""
+    name = f"{stem}.{digest[:HASH_LEN]}" + (f".{ext}" if ext else "")
+    return f"{head}/{name}" if head else name
+
+
+def _load_json(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def write_if_changed(path: Path, data: bytes, dry_run: bool = False) -> bool:
+    """內容相同就不寫（保留 mtime / ETag）；否則暫存檔 + os.replace。回傳是否寫入。"""
+    try:
+        if path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    if not dry_run:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    return True
+
+
+def scan_sources(root: Path, dirs: Iterable[str], files: Iterable[str] = ()) -> Dict[str, os.stat_result]:
+    """{"sounds/a.mp3": stat}；dirs 整個資料夾（略過隱藏檔與暫存檔），files 為個別檔案。"""
+    out: Dict[str, os.stat_result] = {}
+    for rel in files:
+        try:
+            st = (root / rel).stat()
+        except OSError:
+            continue
+        out[rel] = st
+    for d in dirs:
+        base = root / d
+        if not base.is_dir():
+            continue
+        for rel, st in scan_tree(base).items():
+            if any(part.startswith(".") for part in rel.split("/")) or rel.endswith((".tmp", "~")):
+                continue
+            out[f"{d}/{rel}"] = st
+    return out
+
+
+def rewrite_page(html: str, files: Dict[str, str]) -> Tuple[str, int]:
+    """把 index.html 內對 assets/ 等的引用換成雜湊檔名（含去引號的 attr 與 CSS url()）。"""
+    keys = [k for k in files if k.split("/", 1)[0] in PAGE_REWRITE_DIRS]
+    if not keys:
+        return html, 0
+    keys.sort(key=len, reverse=True)
+    pat = re.compile(r"(?<=[\"'(=\s])(" + "|".join(map(re.escape, keys)) + r")(?=[\"')\s>])")
+    return pat.subn(lambda m: hashed_name(m.group(1), files[m.group(1)]), html)
+
+
+def publish(root: Path, out: Path, dirs: Iterable[str], workers: int, page: Optional[Path],
+            prune: bool = False, dry_run: bool = False, log=print,
+            public_files: Iterable[str] = PUBLIC_FILES) -> dict:
+    t_start = time.perf_counter()
+    state_path = out / STATE_NAME
+    prev_state = (_load_json(state_path) or {}).get("files", {})
+    prev_manifest = (_load_json(out / MANIFEST_NAME) or {}).get("files", {})
+
+    dirs, public_files = list(dirs), list(public_files)
+    stats = scan_sources(root, dirs, public_files)
+    stale = [r for r, st in stats.items()
+             if not (r in prev_state and prev_state[r]["size"] == st.st_size
+                     and prev_state[r]["mtime_ns"] == st.st_mtime_ns)]
+    digests, nbytes_hashed, t_hash = hash_many(root, stale, workers) if stale else ({}, 0, 0.0)
+
+    state: Dict[str, dict] = {}
+    files: Dict[str, str] = {}
+    for r, st in stats.items():
+        sha = digests[r] if r in digests else prev_state[r]["sha256"]
+        state[r] = {"sha256": sha, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        files[r] = sha[:HASH_LEN]
+
+    # 只複製雜湊檔名還不存在的檔案
+    to_copy: List[Tuple[str, str]] = []
+    for r in sorted(files):
+        dst = hashed_name(r, files[r])
+        if not (out / dst).exists():
+            to_copy.append((r, dst))
+
+    def copy(item: Tuple[str, str]) -> int:
+        src, dst = item
+        target = out / dst
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".tmp")
+        shutil.copyfile(root / src, tmp)
+        os.replace(tmp, target)
+        return stats[src].st_size
+
+    if dry_run:
+        copied_bytes = sum(stats[s].st_size for s, _ in to_copy)
+        for s, d in to_copy[:50]:
+            log(f"[複製] {s} → {d}")
+        if len(to_copy) > 50:
+            log(f"  …（共 {len(to_copy)} 個）")
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            copied_bytes = sum(ex.map(copy, to_copy))
+
+    manifest = {"version": MANIFEST_VERSION, "hash": f"sha256/{HASH_LEN}",
+                "files": {k: files[k] for k in sorted(files)}}
+    manifest_changed = manifest["files"] != prev_manifest
+    if manifest_changed:
+        manifest["generated"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        write_if_changed(out / MANIFEST_NAME,
+                          (json.dumps(manifest, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8"),
+                          dry_run)
+
+    page_refs, page_written = 0, False
+    if page is not None and page.is_file():
+        html, page_refs = rewrite_page(page.read_text(encoding="utf-8"), files)
+        page_written = write_if_changed(out / PAGE_NAME, html.encode("utf-8"), dry_run)
+
+    removed: List[str] = []
+    if prune:
+        keep = {hashed_name(r, h) for r, h in files.items()}
+        # 個別檔案所在的資料夾也要清（舊版整個發佈 config/ 時留下的檔案）
+        for d in dict.fromkeys(dirs + [f.split("/", 1)[0] for f in public_files if "/" in f]):
+            base = out / d
+            if not base.is_dir():
+                continue
+            for rel in scan_tree(base):
+                key = f"{d}/{rel}"
+                stem, _, enc = key.rpartition(".")
+                if key not in keep and not (enc in PRECOMPRESSED_EXTS and stem in keep):
+                    removed.append(key)
+                    if not dry_run:
+                        (out / key).unlink()
+
+    if not dry_run:
+        out.mkdir(parents=True, exist_ok=True)
+        write_if_changed(state_path, (json.dumps({"version": MANIFEST_VERSION, "files": state},
+                                                  ensure_ascii=False) + "\n").encode("utf-8"), False)
+
+    # 與上一版清單相比：網址沒變（可繼續用快取）的檔案與 bytes
+    kept = [r for r in files if prev_manifest.get(r) == files[r]]
+    total_bytes = sum(st.st_size for st in stats.values())
+    return {
+        "files": len(files),
+        "bytes": total_bytes,
+        "hashed": len(digests),
+        "bytes_hashed": nbytes_hashed,
+        "hash_s": round(t_hash, 3),
+        "copied": len(to_copy),
+        "bytes_copied": copied_bytes,
+        "url_unchanged": len(kept),
+        "bytes_url_unchanged": sum(stats[r].st_size for r in kept),
+        "manifest_changed": manifest_changed,
+        "page_refs": page_refs,
+        "page_written": page_written,
+        "removed": removed,
+        "elapsed_s": round(time.perf_counter() - t_start, 3),
+    }
+
+
+def _mb(n: int) -> str:
+    return f"{n / (1 << 20):.1f} MB"
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="把靜態資產發佈成內容雜湊檔名，並產生 asset-manifest.json")
+    ap.add_argument("--root", default=str(REPO_ROOT), help="網站根目錄（預設：repo 根目錄）")
+    ap.add_argument("--out", default=str(DEFAULT_OUT), help="發佈目錄（預設：dist/）")
+    ap.add_argument("--dirs", nargs="+", default=list(DEFAULT_DIRS), help="要發佈的資料夾")
+    ap.add_argument("--files", nargs="*", default=list(PUBLIC_FILES),
+                    help="另外發佈的個別檔案（相對 --root；預設為頁面載入的 config/*.json）")
+    ap.add_argument("--page", default=PAGE_NAME,
+                    help="要改寫靜態引用的頁面（相對 --root；空字串 = 不處理）")
+    ap.add_argument("--workers", type=int, default=0, help="雜湊 / 複製並行數（0=自動）")
+    ap.add_argument("--prune", action="store_true", help="刪除發佈目錄中未被目前清單引用的雜湊檔")
+    ap.add_argument("--dry-run", action="store_true", help="只列出會做的事")
+    ap.add_argument("--json", action="store_true", help="以 JSON 輸出報告")
+    args = ap.parse_args()
+
+    root = Path(args.root).resolve()
+    out = Path(args.out).resolve()
+    sources = set(args.dirs) | {f.split("/", 1)[0] for f in args.files}
+    if out == root or root in out.parents and out.relative_to(root).parts[0] in sources:
+        print(f"發佈目錄不可與來源重疊：{out}", file=sys.stderr)
+        return 2
+    workers = args.workers if args.workers > 0 else min(32, (os.cpu_count() or 1) * 4)
+    page = (root / args.page) if args.page else None
+
+    r = publish(root, out, args.dirs, workers, page, prune=args.prune, dry_run=args.dry_run,
+                public_files=args.files)
+    if args.json:
+        print(json.dumps(r, ensure_ascii=False, indent=2))
+        return 0
+    mode = "（乾跑）" if args.dry_run else ""
+    print(f"發佈{mode}：{out}")
+    print(f"  檔案 {r['files']}（{_mb(r['bytes'])}）")
+    rate = r["bytes_hashed"] / r["hash_s"] / (1 << 20) if r["hash_s"] else 0
+    print(f"  重新雜湊 {r['hashed']}（{_mb(r['bytes_hashed'])}，{rate:.0f} MB/s）；其餘沿用上次的雜湊")
+    print(f"  複製 {r['copied']}（{_mb(r['bytes_copied'])}）")
+    print(f"  網址不變 {r['url_unchanged']}/{r['files']}（{_mb(r['bytes_url_unchanged'])} 可繼續用快取）")
+    print(f"  清單 {'已更新' if r['manifest_changed'] else '未變'}；"
+          f"{PAGE_NAME} 替換 {r['page_refs']} 處引用{'，已寫入' if r['page_written'] else '，內容未變'}")
+    if r["removed"]:
+        print(f"  刪除 {len(r['removed'])} 個未引用的雜湊檔")
+    print(f"  耗時 {r['elapsed_s']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
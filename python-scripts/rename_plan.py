@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+交易式批次更名（檔名清理.py 與 pipeline.clean_filenames 共用）
+========================================
+原本逐檔更名、遇到目標已存在就跳過，會讓鏈狀（a→b、b→c）與循環（a→b、b→a）
+更名只做一半；中途當掉則留下新舊混雜的資料夾。本模組改成：
+
+  1) plan_renames   先算出完整對照表：
+       - 多個檔案對應同一目標 → 只保留排序第一個，其餘跳過
+       - 目標被「不會移走的檔案」佔用 → 跳過（並連帶處理因此卡住的鏈）
+       - 鏈狀依相依順序排列（先騰出位置再移入）
+       - 循環先移到暫存名再歸位
+  2) execute        先把整個步驟寫入暫存檔、fsync 後換名成 write-ahead journal，
+                    每完成一步追加一行；任何一步失敗即依 journal 反向還原
+  3) recover        程式中斷後依 journal 續跑（resume）或還原（rollback）；journal 只每
+                    FSYNC_EVERY 步 fsync，斷電後可能少記多步，因此從最後一筆紀錄往後
+                    逐步比對檔案狀態，找出實際完成到哪一步
+
+預覽（dry-run）直接列出同一份 plan，與實際執行的步驟一致。
+整個資料夾只 scandir 一次，之後全用 dict / set 查詢，10 萬檔的資料夾也是線性時間。
+"""
+
+import json
+import os
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+JOURNAL_NAME = ".rename-journal.jsonl"
+TEMP_PREFIX = ".~rename-"
+FSYNC_EVERY = 1000  # 每完成幾步對 journal fsync 一次（每步都有 flush；少記的步數由 recover 比對補回）
+
+
+def _key(name: str) -> str:
+    """檔名在此檔案系統上的比對鍵（Windows 不分大小寫）。"""
+    return os.path.normcase(name)
+
+
+@dataclass
+class RenamePlan:
+    root: Path
+    renames: List[Tuple[str, str]] = field(default_factory=list)        # 最終對照 (舊, 新)
+    steps: List[Tuple[str, str]] = field(default_factory=list)          # 實際執行順序（含暫存名）
+    skipped: List[Tuple[str, str, str]] = field(default_factory=list)   # (舊, 新, 原因)
+    cycles: int = 0
+
+    def describe(self, log: Callable[[str], None] = print) -> None:
+        for src, dst, why in self.skipped:
+            log(f"[跳過] {src} -> {dst}：{why}")
+        for src, dst in self.renames:
+            log(f"[預覽] {src} -> {dst}")
+        extra = f"，其中 {self.cycles} 組循環需經暫存名" if self.cycles else ""
+        log(f"共 {len(self.renames)} 個更名、{len(self.skipped)} 個跳過{extra}。")
+
+
+def plan_renames(root: Path, transform: Callable[[str], str], include_hidden: bool = False,
+                 entries: Optional[Iterable[os.DirEntry]] = None) -> RenamePlan:
+    """掃描 root 第一層，依 transform 算出可安全執行的更名計畫（不觸碰檔案）。"""
+    root = Path(root)
+    if entries is None:
+        with os.scandir(root) as it:
+            entries = list(it)
+    occupied: Set[str] = set()
+    moves: Dict[str, str] = {}
+    skipped: List[Tuple[str, str, str]] = []
+    for e in entries:
+        occupied.add(_key(e.name))
+        if e.name.startswith(".") and not include_hidden:
+            continue
+        if e.name == JOURNAL_NAME or e.name.startswith(TEMP_PREFIX):
+            continue
+        if not e.is_file():
+            continue
+        new = transform(e.name)
+        if not new or new == e.name:
+            continue
+        if "/" in new or "\\" in new:
+            skipped.append((e.name, new, "目標含路徑分隔字元"))
+            continue
+        moves[e.name] = new
+
+    # 反覆剔除不可行的更名；被剔除的檔案留在原地，可能再擋住別的更名
+    while True:
+        src_keys = {_key(s) for s in moves}
+        drop: Dict[str, str] = {}
+        by_target: Dict[str, List[str]] = {}
+        for s, d in moves.items():
+            by_target.setdefault(_key(d), []).append(s)
+        for kd, srcs in by_target.items():
+            if len(srcs) > 1:
+                srcs.sort()
+                for s in srcs[1:]:
+                    drop[s] = f"與 {srcs[0]} 對應到同一目標"
+        for s, d in moves.items():
+            kd = _key(d)
+            if s in drop or kd == _key(s):
+                continue
+            if kd in occupied and kd not in src_keys:
+                drop[s] = "目標已存在"
+        if not drop:
+            break
+        for s, why in drop.items():
+            skipped.append((s, moves.pop(s), why))
+
+    plan = RenamePlan(root=root, renames=sorted(moves.items()),
+                      skipped=sorted(skipped))
+    plan.steps, plan.cycles = _order_steps(moves, occupied)
+    return plan
+
+
+def _order_steps(moves: Dict[str, str], occupied: Set[str]) -> Tuple[List[Tuple[str, str]], int]:
+    """
+    每個來源只有一個目標、每個目標只有一個來源（已去除衝突），
+    因此相依圖只由「路徑」與「循環」組成：路徑從末端開始做，循環先移一個到暫存名。
+    """
+    by_key = {_key(s): s for s in moves}
+    waiting: Dict[str, str] = {}   # 目標鍵 → 等待該位置騰出的來源
+    ready = deque()
+    for s in sorted(moves):
+        kd = _key(moves[s])
+        if kd in by_key and kd != _key(s):
+            waiting[kd] = s
+        else:
+            ready.append(s)
+
+    steps: List[Tuple[str, str]] = []
+    done: Set[str] = set()
+
+    def drain() -> None:
+        while ready:
+            s = ready.popleft()
+            steps.append((s, moves[s]))
+            done.add(s)
+            w = waiting.pop(_key(s), None)
+            if w is not None:
+                ready.append(w)
+
+    drain()
+    cycles = 0
+    serial = 0
+    for s0 in sorted(moves):
+        if s0 in done:
+            continue
+        # s0 在循環上：先移到暫存名，騰出位置讓循環依序歸位
+        cycles += 1
+        while True:
+            tmp = f"{TEMP_PREFIX}{os.getpid()}-{serial}"
+            serial += 1
+            if _key(tmp) not in occupied:
+                break
+        occupied.add(_key(tmp))
+        steps.append((s0, tmp))
+        done.add(s0)
+        cur = _key(s0)
+        while True:
+            w = waiting.pop(cur)
+            if w == s0:
+                steps.append((tmp, moves[s0]))
+                break
+            steps.append((w, moves[w]))
+            done.add(w)
+            cur = _key(w)
+    return steps, cycles
+
+
+# --------------------------------------------------------------------------- #
+#  執行 / 還原
+# --------------------------------------------------------------------------- #
+class RenameError(RuntimeError):
+    pass
+
+
+def _rename(root: Path, src: str, dst: str) -> None:
+    # POSIX 的 rename 會默默覆蓋目標；規劃後若有其他程式放了同名檔，寧可失敗
+    if _key(src) != _key(dst) and os.path.lexists(root / dst):
+        raise FileExistsError(f"目標已存在：{dst}")
+    os.rename(root / src, root / dst)
+
+
+def execute(plan: RenamePlan, log: Callable[[str], None] = print,
+            journal_path: Optional[Path] = None) -> List[Tuple[str, str]]:
+    """依 plan 執行更名；失敗時自動還原並拋出 RenameError。回傳已完成的 (舊, 新)。"""
+    root = plan.root
+    if not plan.steps:
+        return []
+    journal_path = journal_path or root / JOURNAL_NAME
+    if journal_path.exists():
+        raise RenameError(f"發現未完成的更名紀錄：{journal_path}（請先 resume 或 rollback）")
+    # 計畫寫完、fsync 後才換名成 journal：中途當掉只會留下暫存檔，不會有空白 / 半行的 journal
+    tmp = journal_path.with_name(f"{TEMP_PREFIX}journal-{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "plan", "steps": plan.steps}, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, journal_path)
+    with open(journal_path, "a", encoding="utf-8") as j:
+        _run_steps(root, plan.steps, 0, j, log)
+    journal_path.unlink()
+    return plan.renames
+
+
+def _run_steps(root: Path, steps: List[Tuple[str, str]], start: int, j, log) -> None:
+    origin = {dst: src for src, dst in steps if dst.startswith(TEMP_PREFIX)}
+    i = start
+    renamed = False  # 第 i 步已改名（之後寫 journal 失敗時也要還原這一步）
+    try:
+        for i in range(start, len(steps)):
+            renamed = False
+            src, dst = steps[i]
+            _rename(root, src, dst)
+            renamed = True
+            j.write(f'{{"done":{i}}}\n')
+            j.flush()
+            if (i + 1) % FSYNC_EVERY == 0:
+                os.fsync(j.fileno())
+            if not dst.startswith(TEMP_PREFIX):
+                log(f"[完成] {origin.get(src, src)} -> {dst}")
+    except Exception as e:  # noqa: BLE001
+        n_done = i + 1 if renamed else i
+        log(f"[失敗] {steps[i][0]} -> {steps[i][1]}：{e}；還原已完成的 {n_done} 步…")
+        _undo(root, steps, n_done, log)
+        j.close()
+        Path(j.name).unlink()
+        raise RenameError(f"更名失敗，已還原：{e}") from e
+
+
+def _undo(root: Path, steps: List[Tuple[str, str]], n_done: int, log) -> None:
+    """反向還原前 n_done 步；檔案狀態與 journal 不符時拋出 RenameError（呼叫端保留 journal）。"""
+    for k in range(n_done - 1, -1, -1):
+        src, dst = steps[k]
+        if _key(src) != _key(dst) and (not os.path.lexists(root / dst) or os.path.lexists(root / src)):
+            raise RenameError(f"無法還原第 {k + 1} 步 {src} <- {dst}：檔案狀態與更名紀錄不符，已保留紀錄")
+        os.rename(root / dst, root / src)
+    log(f"已還原 {n_done} 步。")
+
+
+def load_journal(journal_path: Path) -> Tuple[List[Tuple[str, str]], int]:
+    """
+    讀取 journal，回傳 (steps, 已完成步數)。
+    計畫行讀不出來（舊版寫到一半的 journal）時尚未改過任何檔名：刪除 journal、回傳 ([], 0)。
+    """
+    lines = journal_path.read_text(encoding="utf-8").splitlines()
+    try:
+        steps = [(s[0], s[1]) for s in json.loads(lines[0])["steps"]]
+    except (IndexError, KeyError, TypeError, ValueError):
+        journal_path.unlink()
+        return [], 0
+    n_done = 0
+    for line in lines[1:]:
+        try:
+            idx = json.loads(line)["done"]
+        except (ValueError, KeyError):
+            break  # 最後一行寫到一半
+        if idx != n_done:
+            break
+        n_done += 1
+    return steps, n_done
+
+
+def recover(root: Path, mode: str, log: Callable[[str], None] = print,
+            journal_path: Optional[Path] = None) -> int:
+    """依中斷留下的 journal 續跑（"resume"）或還原（"rollback"）。回傳處理的步數。"""
+    root = Path(root)
+    journal_path = journal_path or root / JOURNAL_NAME
+    if not journal_path.exists():
+        log("沒有未完成的更名紀錄。")
+        return 0
+    steps, n_logged = load_journal(journal_path)
+    if not steps:
+        log("更名紀錄沒有完整的計畫（尚未更名任何檔案），已刪除。")
+        return 0
+    n_done = n_logged
+    # 「已改名、尚未寫入 journal」時中斷（最多 FSYNC_EVERY 步沒落盤）：
+    # 往後逐步比對，來源已不在、目標已存在的步驟都算已完成
+    names = None  # 只改大小寫的步驟要看目錄中實際的檔名（不分大小寫的檔案系統上 lexists 分不出來）
+    while n_done < len(steps):
+        src, dst = steps[n_done]
+        if _key(src) == _key(dst):
+            if names is None:
+                names = set(os.listdir(root))
+            if src in names or dst not in names:
+                break
+        elif os.path.lexists(root / src) or not os.path.lexists(root / dst):
+            break
+        n_done += 1
+    if n_done > n_logged:
+        log(f"紀錄到第 {n_logged} 步，依檔案狀態實際完成 {n_done} 步。")
+    if mode == "rollback":
+        _undo(root, steps, n_done, log)
+        journal_path.unlink()
+        return n_done
+    with open(journal_path, "a", encoding="utf-8") as j:
+        # 補記已確認完成的那一步，讓 journal 與檔案狀態一致
+        j.write("".join(f'{{"done":{i}}}\n' for i in range(n_logged, n_done)))
+        j.flush()
+        _run_steps(root, steps, n_done, j, log)
+    journal_path.unlink()
+    return len(steps) - n_done
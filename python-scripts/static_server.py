@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本機參考靜態伺服器（ETag / 304 / Range / 預壓縮檔）
+========================================
+以 asyncio 提供網站靜態檔，行為接近正式的源站，可用來量測快取、條件式請求
+與音檔的分段載入，也作為壓力測試的目標：
+
+  - 強 ETag：雜湊檔名（publish_assets.py 的輸出）直接用 asset-manifest.json 的雜湊，
+    其他檔案（index.html、清單本身、未發佈的原始碼樹）以 sha256 計算並依 (size, mtime) 快取
+  - If-None-Match / If-Modified-Since → 304；雜湊檔送 immutable，其餘 no-cache
+  - Range: bytes=…（單一區段，含 If-Range）→ 206 / 416，供 <audio> 分段讀取 MP3
+  - 依 Accept-Encoding 挑選 precompress.py 產生的 .br / .zst / .gz（Range 請求一律送原檔）
+  - Linux 上以 loop.sendfile（os.sendfile）零複製送出檔案內容；--no-sendfile 改為讀取後寫出
+  - HTTP/1.1 keep-alive，單一執行緒可撐住數千條並行連線；閒置連線 KEEPALIVE_TIMEOUT 秒後關閉
+  - GET /__stats 回傳請求數、304、206、送出 bytes 等計數（給壓力測試對照）
+
+用法：
+  python static_server.py                       # 服務 ../dist（不存在時改為 repo 根目錄）
+  python static_server.py --root .. --port 8080
+  python static_server.py --no-sendfile --access-log
+"""
+
+import argparse
+import asyncio
+import json
+import mimetypes
+import os
+import sys
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from publish_assets import MANIFEST_NAME, hashed_name
+from ufid_registry import sha256_file
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+DEFAULT_PORT = 8080
+SERVER_NAME = "soundboard-static"
+KEEPALIVE_TIMEOUT = 15.0    # 閒置連線保留秒數
+HEADER_TIMEOUT = 10.0       # 讀完請求標頭的期限
+MAX_HEADER = 16 * 1024
+SMALL_FILE = 32 * 1024      # 不超過此大小的內容直接與標頭一起寫出
+CHUNK = 256 * 1024
+MANIFEST_CHECK = 1.0        # 每隔幾秒檢查清單是否更新
+IMMUTABLE = "public, max-age=31536000, immutable"
+# 偏好順序：壓縮率高的優先
+ENCODINGS = (("br", "br"), ("zstd", "zst"), ("gzip", "gz"))
+COMPRESSIBLE = {"text/html", "text/css", "text/javascript", "application/json",
+                "application/manifest+json", "image/svg+xml", "text/plain", "application/xml"}
+STATUS = {200: "OK", 206: "Partial Content", 304: "Not Modified", 400: "Bad Request",
+          403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+          416: "Range Not Satisfiable", 431: "Request Header Fields Too Large",
+          500: "Internal Server Error"}
+
+mimetypes.add_type("audio/mpeg", ".mp3")
+mimetypes.add_type("text/javascript", ".js")
+mimetypes.add_type("application/json", ".json")
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("image/avif", ".avif")
+
+
+class BadRequest(Exception):
+    def __init__(self, status: int):
+        super().__init__(status)
+        self.status = status
+
+
+# --------------------------------------------------------------------------- #
+#  HTTP 小工具
+# --------------------------------------------------------------------------- #
+_date_cache: Tuple[int, str] = (0, "")
+
+
+def http_date(ts: Optional[float] = None) -> str:
+    """RFC 7231 日期；目前時間每秒只格式化一次。"""
+    global _date_cache
+    if ts is not None:
+        return formatdate(ts, usegmt=True)
+    now = int(time.time())
+    if _date_cache[0] != now:
+        _date_cache = (now, formatdate(now, usegmt=True))
+    return _date_cache[1]
+
+
+def parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """'bytes=a-b' → (start, end) 含端點；格式不支援（多區段等）回 None，無法滿足丟 BadRequest(416)。"""
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first == "":
+            n = int(last)
+            if n <= 0:
+                raise BadRequest(416)
+            return max(0, size - n), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise BadRequest(416)
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def accepted_encodings(value: str) -> Dict[str, float]:
+    """Accept-Encoding → {coding: q}。"""
+    out: Dict[str, float] = {}
+    for part in value.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        out[name] = q
+    return out
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match 的弱比較（W/ 前綴忽略）。"""
+    if header.strip() == "*":
+        return True
+    return any(t.strip().removeprefix("W/") == etag for t in header.split(","))
+
+
+# --------------------------------------------------------------------------- #
+#  檔案與 ETag
+# --------------------------------------------------------------------------- #
+class SiteIndex:
+    """路徑解析、雜湊檔名對照（來自 asset-manifest.json）與 sha256 ETag 快取。"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.hashed: Dict[str, str] = {}      # "sounds/a.3f2a9c1b0d.mp3" → "3f2a9c1b0d"
+        self._manifest_key: Optional[Tuple[int, int]] = None
+        self._manifest_checked = 0.0
+        self._etags: Dict[str, Tuple[int, int, str]] = {}  # path → (size, mtime_ns, etag)
+        self._hashing: Dict[str, asyncio.Future] = {}
+        self.reload_manifest()
+
+    def reload_manifest(self) -> None:
+        self._manifest_checked = time.monotonic()
+        try:
+            st = (self.root / MANIFEST_NAME).stat()
+        except OSError:
+            self.hashed, self._manifest_key = {}, None
+            return
+        key = (st.st_size, st.st_mtime_ns)
+        if key == self._manifest_key:
+            return
+        try:
+            files = json.loads((self.root / MANIFEST_NAME).read_text(encoding="utf-8")).get("files", {})
+        except (OSError, ValueError):
+            return
+        self.hashed = {hashed_name(src, h): h for src, h in files.items()}
+        self._manifest_key = key
+
+    def maybe_reload(self) -> None:
+        if time.monotonic() - self._manifest_checked >= MANIFEST_CHECK:
+            self.reload_manifest()
+
+    def resolve(self, raw_path: str) -> Tuple[str, Path]:
+        """URL 路徑 → (相對路徑, 實體路徑)；不允許 .. 與隱藏檔。"""
+        # 標頭以 latin-1 解碼；未經百分比編碼的 UTF-8 路徑（curl 等）在此還原
+        raw_path = raw_path.encode("latin-1").decode("utf-8", "replace")
+        rel = unquote(raw_path).lstrip("/")
+        if rel == "" or rel.endswith("/"):
+            rel += "index.html"
+        parts = rel.split("/")
+        if any(p in ("", ".", "..") or p.startswith(".") or "\\" in p for p in parts):
+            raise BadRequest(404 if any(p.startswith(".") for p in parts) else 400)
+        path = self.root.joinpath(*parts)
+        if path.is_dir():
+            rel += "/index.html"
+            path = path / "index.html"
+        return rel, path
+
+    async def etag_for(self, rel: str, path: Path, st: os.stat_result) -> Tuple[str, bool]:
+        """回傳 (強 ETag, 是否為雜湊檔名)。"""
+        h = self.hashed.get(rel)
+        if h is not None:
+            return f'"{h}"', True
+        key = str(path)
+        cached = self._etags.get(key)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2], False
+        # 同一檔案的並行請求共用一次雜湊；大檔在執行緒中計算，不卡住事件迴圈
+        fut = self._hashing.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(asyncio.to_thread(sha256_file, path))
+            self._hashing[key] = fut
+            fut.add_done_callback(lambda _f: self._hashing.pop(key, None))
+        digest = await fut
+        etag = f'"{digest[:16]}"'
+        self._etags[key] = (st.st_size, st.st_mtime_ns, etag)
+        return etag, False
+
+
+def content_type(path: Path) -> str:
+    ctype = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if ctype.startswith("text/") or ctype in ("application/json", "application/manifest+json",
+                                              "image/svg+xml", "application/xml"):
+        ctype += "; charset=utf-8"
+    return ctype
+
+
+# --------------------------------------------------------------------------- #
+#  伺服器
+# --------------------------------------------------------------------------- #
+class StaticServer:
+    def __init__(self, root: Path, use_sendfile: bool = True, access_log: bool = False):
+        self.site = SiteIndex(root)
+        self.use_sendfile = use_sendfile
+        self.access_log = access_log
+        self.stats = {"connections": 0, "active": 0, "peak": 0, "requests": 0,
+                      "status": {}, "bytes_body": 0, "bytes_sendfile": 0,
+                      "encoded": {}, "started": time.time()}
+
+    # ---- 連線 ---- #
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        st = self.stats
+        st["connections"] += 1
+        st["active"] += 1
+        st["peak"] = max(st["peak"], st["active"])
+        try:
+            first = True
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"),
+                                                  HEADER_TIMEOUT if first else KEEPALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._send_error(writer, 431, keep_alive=False)
+                    return
+                first = False
+                try:
+                    method, target, version, headers = self._parse_head(head)
+                except BadRequest as e:
+                    await self._send_error(writer, e.status, keep_alive=False)
+                    return
+                # 不支援請求主體：讀掉以免污染下一個請求
+                length = headers.get("content-length")
+                if length:
+                    try:
+                        await reader.readexactly(int(length))
+                    except (ValueError, asyncio.IncompleteReadError):
+                        return
+                conn = headers.get("connection", "").lower()
+                keep_alive = ("close" not in conn) if version == "HTTP/1.1" else ("keep-alive" in conn)
+                t0 = time.perf_counter()
+                status, sent = await self._respond(writer, method, target, headers, keep_alive)
+                st["requests"] += 1
+                st["status"][status] = st["status"].get(status, 0) + 1
+                if self.access_log:
+                    print(f"{method} {target} {status} {sent} {(time.perf_counter() - t0) * 1000:.1f}ms",
+                          file=sys.stderr)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            st["active"] -= 1
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head: bytes) -> Tuple[str, str, str, Dict[str, str]]:
+        try:
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise BadRequest(400)
+        if not version.startswith("HTTP/1."):
+            raise BadRequest(400)
+        headers: Dict[str, str] = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise BadRequest(400)
+            headers[name.strip().lower()] = value.strip()
+        return method, target, version, headers
+
+    # ---- 回應 ---- #
+    def _head_bytes(self, status: int, headers: List[Tuple[str, str]], keep_alive: bool) -> bytes:
+        lines = [f"HTTP/1.1 {status} {STATUS[status]}", f"Date: {http_date()}", f"Server: {SERVER_NAME}"]
+        lines += [f"{k}: {v}" for k, v in headers]
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _send_error(self, writer: asyncio.StreamWriter, status: int, keep_alive: bool,
+                          extra: Optional[List[Tuple[str, str]]] = None, head_only: bool = False) -> int:
+        body = f"{status} {STATUS[status]}\n".encode()
+        hdrs = [("Content-Type", "text/plain; charset=utf-8"), ("Content-Length", str(len(body)))]
+        writer.write(self._head_bytes(status, hdrs + (extra or []), keep_alive) + (b"" if head_only else body))
+        await writer.drain()
+        return 0
+
+    async def _respond(self, writer: asyncio.StreamWriter, method: str, target: str,
+                       headers: Dict[str, str], keep_alive: bool) -> Tuple[int, int]:
+        head_only = method == "HEAD"
+        if method not in ("GET", "HEAD"):
+            await self._send_error(writer, 405, keep_alive, [("Allow", "GET, HEAD")])
+            return 405, 0
+        path_part = urlsplit(target).path
+        if path_part == "/__stats":
+            return await self._send_stats(writer, keep_alive, head_only)
+
+        self.site.maybe_reload()
+        try:
+            rel, path = self.site.resolve(path_part)
+            st = path.stat()
+        except BadRequest as e:
+            await self._send_error(writer, e.status, keep_alive, head_only=head_only)
+            return e.status, 0
+        except OSError:
+            await self._send_error(writer, 404, keep_alive, head_only=head_only)
+            return 404, 0
+
+        etag, immutable = await self.site.etag_for(rel, path, st)
+        ctype = content_type(path)
+        range_header = headers.get("range")
+        if range_header and "if-range" in headers and headers["if-range"] != etag:
+            range_header = None  # 內容已變：送整個檔案
+
+        # 選擇表示法：可壓縮類型 + 非 Range 請求 → 找預壓縮檔
+        send_path, size, encoding = path, st.st_size, None
+        vary = ctype.split(";")[0] in COMPRESSIBLE
+        if vary and not range_header:
+            accepted = accepted_encodings(headers.get("accept-encoding", ""))
+            for coding, ext in ENCODINGS:
+                if accepted.get(coding, 0) <= 0:
+                    continue
+                variant = path.with_name(f"{path.name}.{ext}")
+                try:
+                    vst = variant.stat()
+                except OSError:
+                    continue
+                send_path, size, encoding = variant, vst.st_size, coding
+                etag = f'{etag[:-1]}.{ext}"'
+                break
+
+        common = [("ETag", etag), ("Last-Modified", http_date(st.st_mtime)),
+                  ("Cache-Control", IMMUTABLE if immutable else "no-cache")]
+        if vary:
+            common.append(("Vary", "Accept-Encoding"))
+
+        # 條件式請求
+        inm = headers.get("if-none-match")
+        not_modified = etag_matches(inm, etag) if inm is not None else False
+        if inm is None and "if-modified-since" in headers:
+            try:
+                not_modified = int(st.st_mtime) <= parsedate_to_datetime(headers["if-modified-since"]).timestamp()
+            except (TypeError, ValueError):
+                pass
+        if not_modified:
+            writer.write(self._head_bytes(304, common, keep_alive))
+            await writer.drain()
+            return 304, 0
+
+        status, offset, count = 200, 0, size
+        hdrs = [("Content-Type", ctype), ("Accept-Ranges", "bytes")] + common
+        if encoding:
+            hdrs.append(("Content-Encoding", encoding))
+            self.stats["encoded"][encoding] = self.stats["encoded"].get(encoding, 0) + 1
+        if range_header:
+            try:
+                rng = parse_range(range_header, size)
+            except BadRequest:
+                await self._send_error(writer, 416, keep_alive, [("Content-Range", f"bytes */{size}")],
+                                       head_only=head_only)
+                return 416, 0
+            if rng is not None:
+                status, offset, count = 206, rng[0], rng[1] - rng[0] + 1
+                hdrs.append(("Content-Range", f"bytes {rng[0]}-{rng[1]}/{size}"))
+        hdrs.append(("Content-Length", str(count)))
+        head = self._head_bytes(status, hdrs, keep_alive)
+
+        if head_only or count == 0:
+            writer.write(head)
+            await writer.drain()
+            return status, 0
+        try:
+            f = open(send_path, "rb")
+        except OSError:  # 預壓縮檔剛被刪除等
+            await self._send_error(writer, 404, keep_alive)
+            return 404, 0
+        with f:
+            if count <= SMALL_FILE:
+                f.seek(offset)
+                writer.write(head + f.read(count))
+                await writer.drain()
+            elif self.use_sendfile:
+                writer.write(head)
+                await writer.drain()
+                await asyncio.get_running_loop().sendfile(writer.transport, f, offset, count)
+                self.stats["bytes_sendfile"] += count
+            else:
+                writer.write(head)
+                f.seek(offset)
+                left = count
+                while left > 0:
+                    chunk = f.read(min(CHUNK, left))
+                    if not chunk:
+                        break
+                    writer.write(chunk)
+                    left -= len(chunk)
+                    await writer.drain()
+        self.stats["bytes_body"] += count
+        return status, count
+
+    async def _send_stats(self, writer: asyncio.StreamWriter, keep_alive: bool, head_only: bool) -> Tuple[int, int]:
+        data = dict(self.stats, uptime_s=round(time.time() - self.stats["started"], 1),
+                    sendfile=self.use_sendfile, root=str(self.site.root),
+                    manifest_entries=len(self.site.hashed))
+        body = (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+        hdrs = [("Content-Type", "application/json; charset=utf-8"), ("Cache-Control", "no-store"),
+                ("Content-Length", str(len(body)))]
+        writer.write(self._head_bytes(200, hdrs, keep_alive) + (b"" if head_only else body))
+        await writer.drain()
+        return 200, len(body)
+
+
+def raise_nofile_limit(target: int = 65536) -> Optional[int]:
+    """盡量提高可開啟檔案數上限（數千條連線需要）；Windows 沒有 resource 模組則略過。"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    want = target if hard == resource.RLIM_INFINITY else min(target, hard)
+    if soft < want:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (want, hard))
+            soft = want
+        except (ValueError, OSError):
+            pass
+    return soft
+
+
+async def serve(root: Path, host: str, port: int, use_sendfile: bool, access_log: bool,
+                ready: Optional[asyncio.Future] = None) -> None:
+    app = StaticServer(root, use_sendfile=use_sendfile, access_log=access_log)
+    server = await asyncio.start_server(app.handle, host, port, limit=MAX_HEADER, backlog=4096)
+    bound = server.sockets[0].getsockname()[1]
+    if ready is not None:
+        ready.set_result((bound, app))
+    else:
+        print(f"靜態伺服器：http://{host}:{bound}/（根目錄 {root}，清單 {len(app.site.hashed)} 筆，"
+              f"sendfile {'開' if use_sendfile else '關'}）")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if ready is None:
+            s = app.stats
+            print(f"\n請求 {s['requests']}，連線 {s['connections']}（尖峰 {s['peak']}），"
+                  f"送出 {s['bytes_body'] / (1 << 20):.1f} MB，狀態 {s['status']}", file=sys.stderr)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="本機參考靜態伺服器（ETag / 304 / Range / 預壓縮檔）")
+    ap.add_argument("--root", default=None, help="網站根目錄（預設：dist/，不存在時用 repo 根目錄）")
+    ap.add_argument("--host", default="127.0.0.1", help="綁定位址（預設只限本機）")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"連接埠（預設 {DEFAULT_PORT}）")
+    ap.add_argument("--no-sendfile", action="store_true", help="不用 sendfile，改為讀取後寫出（對照用）")
+    ap.add_argument("--access-log", action="store_true", help="印出每個請求")
+    args = ap.parse_args()
+
+    if args.root:
+        root = Path(args.root).resolve()
+    else:
+        root = REPO_ROOT / "dist" if (REPO_ROOT / "dist").is_dir() else REPO_ROOT
+    if not root.is_dir():
+        print(f"找不到根目錄：{root}", file=sys.stderr)
+        return 2
+    raise_nofile_limit()
+    try:
+        asyncio.run(serve(root, args.host, args.port, not args.no_sendfile, args.access_log))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
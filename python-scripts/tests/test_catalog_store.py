@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""catalog_store.py：歷史檔最後一行寫到一半（當掉）後的行為。"""
+
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from catalog_store import CatalogStore  # noqa: E402
+
+
+class TornHistoryTailTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        self.sounds = self.dir / "sounds.json"
+        self.sounds.write_text("[]\n", encoding="utf-8")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _add(self, store, name):
+        return store.commit([{"op": "add", "path": "/-", "value": {"name": name}}], name)
+
+    def test_append_after_torn_tail_keeps_later_versions(self):
+        store = CatalogStore(self.sounds)
+        self.assertEqual(self._add(store, "a"), 1)
+        self.assertEqual(self._add(store, "b"), 2)
+
+        # 模擬寫第 3 版時當掉：只留下前半行、沒有換行
+        with open(store.history_path, "ab") as f:
+            f.write(b'{"version":3,"time":1,"mess')
+
+        store = CatalogStore(self.sounds)
+        self.assertEqual(store.version, 2)
+        self.assertEqual(self._add(store, "c"), 3)
+        self.assertEqual(self._add(store, "d"), 4)
+
+        lines = store.history_path.read_text(encoding="utf-8").splitlines()
+        self.assertEqual([json.loads(line)["version"] for line in lines], [1, 2, 3, 4])
+
+        reloaded = CatalogStore(self.sounds)
+        self.assertEqual([e["version"] for e in reloaded.history()], [1, 2, 3, 4])
+        self.assertEqual([r["name"] for r in reloaded.records], ["a", "b", "c", "d"])
+
+    def test_torn_first_line(self):
+        store = CatalogStore(self.sounds)
+        store.history_path.write_bytes(b'{"version":1,')
+        store = CatalogStore(self.sounds)
+        self.assertEqual(self._add(store, "a"), 1)
+        self.assertEqual([e["version"] for e in CatalogStore(self.sounds).history()], [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
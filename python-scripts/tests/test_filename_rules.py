@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""檔名清理.py：編譯版 / 分階段版規則與原版 transform_filename 完全一致。"""
+
+import importlib.util
+import random
+import unittest
+from pathlib import Path
+
+_PATH = Path(__file__).resolve().parent.parent / "檔名清理.py"
+_spec = importlib.util.spec_from_file_location("filename_rules", _PATH)
+rules = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(rules)
+
+SEEDS = (0, 1, 2, 20240601)
+SAMPLES = 5000
+
+# 規則交界處的邊界情況：空字串、只有副檔名、多個點、dash 貼副檔名、巢狀 / 不成對括弧、
+# 全形與各種 dash、tab 與全形空白、[sus] 大小寫、角色名後的底線
+ADVERSARIAL = [
+    "", ".", "..", ".mp3", "a.", "-.mp3", "a-.mp3", "a -.mp3", "a--.mp3", "a.b.c-.mp3",
+    "-", "--", " - ", "a - b.mp3", "a-  -b.mp3", "a\t-\tb.mp3", "a　-　b.mp3",
+    "萬_a.mp3", "萬__a.mp3", "_萬.mp3", "a_b.mp3", "狗_-_貓.mp3", "鼠_[笑].mp3",
+    "[a][b].mp3", "[a] [b] [c].mp3", "[ a ][ b ].mp3", "foo [A] bar.mp3", "[A]bar.mp3",
+    "[[a]].mp3", "[a]]b[.mp3", "][.mp3", "[.mp3", "].mp3", "[].mp3", "[ ].mp3", "[][].mp3",
+    "［a］［b］.mp3", "［ a ］ [b].mp3", "a－b.mp3", "a–b—c╴d.mp3", "a — b.mp3",
+    "[sus].mp3", "[ sus ].mp3", "[SUS][sus].mp3", "[sus ][a].mp3", "a[sus]-.mp3",
+    "[a,b][c].mp3", "[a, b] [c].mp3", "  a  .mp3", "a .mp3", " .mp3", "a-[b]-.mp3",
+    "萬-[笑][哭] - 好耶 -.mp3", "貓 ［ 笑 ］ ［ 哭 ］.mp3",
+]
+
+
+class CompiledRulesTest(unittest.TestCase):
+    def _assert_same(self, names):
+        for name in names:
+            want = rules.transform_filename(name)
+            self.assertEqual(rules.transform_filename_compiled(name), want, f"編譯版：{name!r}")
+            self.assertEqual(rules._transform_by_stages(name), want, f"分階段版：{name!r}")
+
+    def test_adversarial_names(self):
+        self._assert_same(ADVERSARIAL)
+
+    def test_seeded_random_names(self):
+        for seed in SEEDS:
+            with self.subTest(seed=seed):
+                rng = random.Random(seed)
+                self._assert_same([rules._random_name(rng) for _ in range(SAMPLES)])
+
+    def test_random_joins_of_adversarial_parts(self):
+        # 把邊界情況拼接起來，覆蓋規則之間的交互（例如 dash 規則後才出現的連續括弧）
+        rng = random.Random(7)
+        parts = [p.removesuffix(".mp3") for p in ADVERSARIAL]
+        names = ["".join(rng.choice(parts) for _ in range(rng.randint(1, 4))) + rng.choice(["", ".mp3"])
+                 for _ in range(SAMPLES)]
+        self._assert_same(names)
+
+    def test_self_check_reports_no_mismatch(self):
+        self.assertEqual(rules.self_check(200, seed=3, extra=ADVERSARIAL), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
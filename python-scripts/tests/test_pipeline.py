@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""pipeline.py：clean_filenames 遇到上次中斷的更名紀錄時的行為；merge_into_catalog 的登記簿連線。"""
+
+import json
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pipeline  # noqa: E402
+
+
+class PendingJournalTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        # 模擬第 1 步（萬-a → 萬-b）完成、第 2 步（萬-c → 萬-d）尚未執行時中斷
+        (self.dir / "萬-b.mp3").write_bytes(b"a")
+        (self.dir / "萬-c.mp3").write_bytes(b"c")
+        self.journal = self.dir / pipeline.mod_rename.JOURNAL_NAME
+        steps = [["萬-a.mp3", "萬-b.mp3"], ["萬-c.mp3", "萬-d.mp3"]]
+        self.journal.write_text(json.dumps({"op": "plan", "steps": steps}, ensure_ascii=False)
+                                + '\n{"done":0}\n', encoding="utf-8")
+        self.logs = []
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _names(self):
+        return sorted(p.name for p in self.dir.iterdir())
+
+    def test_pending_journal(self):
+        self.assertEqual(pipeline.pending_journal(self.dir), (2, 1))
+
+    def test_refuses_without_decision(self):
+        with self.assertRaises(RuntimeError):
+            pipeline.clean_filenames(self.dir, self.logs.append)
+        self.assertEqual(self._names(), sorted(["萬-b.mp3", "萬-c.mp3", self.journal.name]))
+        self.assertTrue(any("中斷" in line for line in self.logs))
+
+    def test_rollback(self):
+        pipeline.clean_filenames(self.dir, self.logs.append, "rollback")
+        self.assertEqual(self._names(), ["萬-a.mp3", "萬-c.mp3"])
+
+    def test_resume(self):
+        pipeline.clean_filenames(self.dir, self.logs.append, "resume")
+        self.assertEqual(self._names(), ["萬-b.mp3", "萬-d.mp3"])
+
+
+class RegistryConnectionTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        self.sounds = self.dir / "sounds.json"
+        self.sounds.write_text(json.dumps([{"id": "dup", "file": "a.mp3"}]), encoding="utf-8")
+        reg_path = pipeline.mod_registry.default_db_for(self.sounds)
+        pipeline.mod_registry.IdRegistry(reg_path).db.close()  # 建立空的登記簿
+        self.opened = []
+        orig = pipeline.mod_registry.IdRegistry
+        opened = self.opened
+
+        class Tracking(orig):
+            def __init__(self, path):
+                super().__init__(path)
+                opened.append(self)
+
+        mod = pipeline.mod_registry._get()
+        mod.IdRegistry = Tracking
+        self.addCleanup(setattr, mod, "IdRegistry", orig)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _assert_closed(self):
+        self.assertEqual(len(self.opened), 1)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            self.opened[0].db.execute("SELECT 1")
+
+    def test_closed_when_ids_clash(self):
+        store = pipeline.mod_store.CatalogStore(self.sounds)
+        with self.assertRaises(RuntimeError):
+            pipeline.merge_into_catalog(store, [{"id": "dup", "file": "b.mp3"}], [], {},
+                                        self.dir, {}, lambda s: None)
+        self._assert_closed()
+        self.assertEqual(len(store.records), 1)
+
+    def test_closed_after_commit(self):
+        store = pipeline.mod_store.CatalogStore(self.sounds)
+        r = pipeline.merge_into_catalog(store, [{"id": "new", "file": "b.mp3"}], [], {},
+                                        self.dir, {}, lambda s: None)
+        self.assertEqual(r["version"], 1)
+        self._assert_closed()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""rename_plan.py：中斷後的 journal 還原 / 續跑。"""
+
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import rename_plan  # noqa: E402
+
+STEPS = [["a.txt", "a_new.txt"], ["b.txt", "b_new.txt"], ["c.txt", "c_new.txt"], ["d.txt", "d_new.txt"]]
+
+
+class _FailingJournal:
+    """第 fail_at 次 write 時拋出 OSError（模擬改名成功後寫 journal 失敗）。"""
+
+    def __init__(self, f, fail_at):
+        self._f, self._left, self.name = f, fail_at, f.name
+
+    def write(self, s):
+        if self._left == 0:
+            raise OSError("磁碟已滿")
+        self._left -= 1
+        return self._f.write(s)
+
+    def flush(self):
+        self._f.flush()
+
+    def fileno(self):
+        return self._f.fileno()
+
+    def close(self):
+        self._f.close()
+
+
+class RecoverTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        self.journal = self.dir / rename_plan.JOURNAL_NAME
+        self.logs = []
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _names(self):
+        return sorted(p.name for p in self.dir.iterdir())
+
+    def _interrupted(self, n_renamed, n_logged):
+        """前 n_renamed 步已改名，journal 只落盤 n_logged 筆 done。"""
+        for i, (src, dst) in enumerate(STEPS):
+            (self.dir / (dst if i < n_renamed else src)).write_text(src, encoding="utf-8")
+        self.journal.write_text(json.dumps({"op": "plan", "steps": STEPS}) + "\n"
+                                + "".join(f'{{"done":{i}}}\n' for i in range(n_logged)),
+                                encoding="utf-8")
+
+    def test_resume_counts_unlogged_steps(self):
+        self._interrupted(4, 1)
+        self.assertEqual(rename_plan.recover(self.dir, "resume", log=self.logs.append), 0)
+        self.assertEqual(self._names(), ["a_new.txt", "b_new.txt", "c_new.txt", "d_new.txt"])
+
+    def test_resume_finishes_remaining_steps(self):
+        self._interrupted(3, 1)
+        self.assertEqual(rename_plan.recover(self.dir, "resume", log=self.logs.append), 1)
+        self.assertEqual(self._names(), ["a_new.txt", "b_new.txt", "c_new.txt", "d_new.txt"])
+
+    def test_rollback_undoes_unlogged_steps(self):
+        self._interrupted(4, 1)
+        self.assertEqual(rename_plan.recover(self.dir, "rollback", log=self.logs.append), 4)
+        self.assertEqual(self._names(), ["a.txt", "b.txt", "c.txt", "d.txt"])
+        for name in self._names():
+            self.assertEqual((self.dir / name).read_text(encoding="utf-8"), name)
+
+    def test_rollback_keeps_journal_when_state_does_not_match(self):
+        self._interrupted(2, 2)
+        (self.dir / "a_new.txt").unlink()  # 別的程式動過資料夾
+        with self.assertRaises(rename_plan.RenameError):
+            rename_plan.recover(self.dir, "rollback", log=self.logs.append)
+        self.assertTrue(self.journal.exists())
+
+    def test_empty_or_torn_plan_line(self):
+        for content in ("", '{"op":"plan","steps":[["a.txt",'):
+            with self.subTest(content=content):
+                (self.dir / "a.txt").write_text("a", encoding="utf-8")
+                self.journal.write_text(content, encoding="utf-8")
+                self.assertEqual(rename_plan.load_journal(self.journal), ([], 0))
+                self.assertFalse(self.journal.exists())
+                self.journal.write_text(content, encoding="utf-8")
+                self.assertEqual(rename_plan.recover(self.dir, "resume", log=self.logs.append), 0)
+                self.assertFalse(self.journal.exists())
+                plan = rename_plan.plan_renames(self.dir, lambda n: n.replace(".txt", "_new.txt"))
+                rename_plan.execute(plan, log=self.logs.append)
+                self.assertEqual(self._names(), ["a_new.txt"])
+                (self.dir / "a_new.txt").unlink()
+
+    def test_journal_write_failure_undoes_current_step(self):
+        steps = [tuple(s) for s in STEPS[:2]]
+        for src, _ in steps:
+            (self.dir / src).write_text(src, encoding="utf-8")
+        with open(self.journal, "a", encoding="utf-8") as f:
+            with self.assertRaises(rename_plan.RenameError):
+                # 第 1 步的 done 寫入成功，第 2 步改名後寫 journal 失敗
+                rename_plan._run_steps(self.dir, steps, 0, _FailingJournal(f, 1), self.logs.append)
+        self.assertEqual(self._names(), ["a.txt", "b.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""檢查音效一致性.py：相似檔名配對（正規化鍵）。"""
+
+import importlib.util
+import unittest
+from pathlib import Path
+
+_PATH = Path(__file__).resolve().parent.parent / "檢查音效一致性.py"
+_spec = importlib.util.spec_from_file_location("check_consistency", _PATH)
+check = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(check)
+
+TRANSFORM = check._load_transform_filename()
+
+SIMILAR = [
+    # 易混淆 dash 要先換成 '-'，dash 前後空白規則才會套用
+    ("萬 ‐ a b.mp3", "萬-a b.mp3"),
+    ("萬 — 好耶.mp3", "萬-好耶.mp3"),
+    # 全形方括弧要先換成 '[' ']'，括弧前空白規則才會套用
+    ("狗-x 【笑】.mp3", "狗-x[笑].mp3"),
+    ("貓－ｘ.mp3", "貓-x.mp3"),
+    ("萬-Сat.mp3", "萬-cat.mp3"),          # 西里爾字母 С
+    ("豹-a\u200bb.mp3", "豹-ab.mp3"),  # 零寬空白
+    ("子資料夾/萬 ‐ a.mp3", "子資料夾/萬-a.mp3"),
+]
+
+DIFFERENT = [
+    ("萬-a b.mp3", "萬-ab.mp3"),
+    ("狗-x[笑].mp3", "狗-y[笑].mp3"),
+]
+
+
+class SimilarPairsTest(unittest.TestCase):
+    def test_similar_names_share_key(self):
+        for json_name, file_name in SIMILAR:
+            with self.subTest(json_name=json_name, file_name=file_name):
+                self.assertEqual(check.confusable_key(json_name, TRANSFORM),
+                                 check.confusable_key(file_name, TRANSFORM))
+                pairs = check.find_similar_pairs([json_name], [file_name], TRANSFORM)
+                self.assertEqual([(j, f) for j, f, _ in pairs], [(json_name, file_name)])
+
+    def test_different_names_not_paired(self):
+        for json_name, file_name in DIFFERENT:
+            with self.subTest(json_name=json_name, file_name=file_name):
+                self.assertEqual(check.find_similar_pairs([json_name], [file_name], TRANSFORM), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
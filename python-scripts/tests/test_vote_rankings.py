@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""vote_rankings.py：misc/ 下各屆 CSV 的排序。"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from vote_rankings import round_number, sort_rounds  # noqa: E402
+
+
+class RoundOrderTest(unittest.TestCase):
+    def test_round_number(self):
+        for name, n in (("第一屆音效板票選結果", 1), ("第二屆音效板票選結果", 2),
+                        ("第十屆票選結果", 10), ("第十二屆票選結果", 12), ("第二十一屆票選結果", 21),
+                        ("第兩百屆票選結果", 200), ("第3屆票選結果", 3), ("第１１屆票選結果", 11),
+                        ("票選結果", None)):
+            with self.subTest(name=name):
+                self.assertEqual(round_number(name), n)
+
+    def test_sort_by_round_not_by_name(self):
+        names = ["第三屆音效板票選結果.csv", "第一屆音效板票選結果.csv",
+                 "第二屆音效板票選結果.csv", "第十屆音效板票選結果.csv"]
+        # 字串排序：第一、第三、第二、第十
+        self.assertEqual([p.name for p in sort_rounds(sorted(Path(n) for n in names))],
+                         ["第一屆音效板票選結果.csv", "第二屆音效板票選結果.csv",
+                          "第三屆音效板票選結果.csv", "第十屆音效板票選結果.csv"])
+
+    def test_ambiguous_names_rejected(self):
+        with self.assertRaises(ValueError):
+            sort_rounds([Path("第一屆票選結果.csv"), Path("補投票選結果.csv")])
+        with self.assertRaises(ValueError):
+            sort_rounds([Path("第二屆票選結果.csv"), Path("第2屆票選結果（修正）.csv")])
+        self.assertEqual(sort_rounds([Path("票選結果.csv")]), [Path("票選結果.csv")])
+
+
+if __name__ == "__main__":
+    unittest.main()
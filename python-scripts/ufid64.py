@@ -10,15 +10,28 @@ UFID v1 (configurable length)
 - 模式：
   * 嚴格（預設）：補缺 id → 檢查碰撞（任何重複即中止）→ 驗證既有 id 與本次參數一致性（預設警告，可選中止）
   * --auto-resolve：穩定順序 + k=0,1,2… 重算直到不碰撞；可加 --force 對全部重算
+- 批次引擎（UfidEngine）：salt 與 BLAKE2b 前綴狀態只算一次，每筆 copy()；可選多行程
+- 規劃（--plan）：精確生日碰撞機率 + 模擬自動解碰 k 深度；--migrate-to 換寬 id 並輸出 舊→新 別名表
+- 串流（--ndjson）：逐行讀寫 NDJSON，只保留精簡的 id 集合偵測碰撞，記憶體不隨記錄內容成長
 """
 
 import argparse
 import base64
+import binascii
 import hashlib
 import json
+import math
+import os
+import shutil
 import sys
+import tempfile
+import time
 import unicodedata
-from typing import Optional, Dict, List, Any
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, List, Any, Iterator, IO, Tuple
 
 # ---------- Transform (configurable) ----------
 
@@ -54,6 +67,78 @@ def ufid(filename: str, namespace: Optional[str], k: int,
     raw = h.digest()  # nbytes
     return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
 
+# ---------- Batch engine ----------
+
+POOL_MIN_RECORDS = 20000   # 少於此數量時多行程的啟動成本不划算
+POOL_CHUNK = 10000
+
+def _b64id(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+class UfidEngine:
+    """
+    批次版 ufid()：參數固定時 salt / person / payload 前綴只處理一次，
+    每筆只正規化一次檔名，並 copy() 預先餵過前綴的 BLAKE2b 狀態。
+    結果與 ufid() 逐字相同。
+    """
+
+    def __init__(self, namespace: Optional[str], norm: str = "nfkc",
+                 do_casefold: bool = True, do_strip: bool = True, nbytes: int = 4):
+        self.params = (namespace, norm, do_casefold, do_strip, nbytes)
+        self.norm, self.do_casefold, self.do_strip = norm, do_casefold, do_strip
+        kwargs = {"digest_size": nbytes, "person": b"UFIDv1"}
+        salt = _salt_from_namespace(namespace)
+        if salt is not None:
+            kwargs["salt"] = salt
+        self._base = hashlib.blake2b(f"ufid:v1:{namespace or ''}:".encode("utf-8"), **kwargs)
+
+    def transform(self, filename: str) -> str:
+        return transform_name(filename, self.norm, self.do_casefold, self.do_strip)
+
+    def from_transformed(self, transformed: str, k: int = 0) -> str:
+        h = self._base.copy()
+        h.update(f"{transformed}:{k}".encode("utf-8"))
+        return _b64id(h.digest())
+
+    def compute(self, filename: str, k: int = 0) -> str:
+        if not isinstance(filename, str) or not filename:
+            raise ValueError("filename must be a non-empty string")
+        return self.from_transformed(self.transform(filename), k)
+
+    def k0_ids(self, transformed: List[str], workers: int = 1) -> List[str]:
+        """對已正規化的名稱批次計算 k=0 id；workers>1 且量大時分塊交給行程池。"""
+        if workers > 1 and len(transformed) >= POOL_MIN_RECORDS:
+            return self._pooled(transformed, True, workers)
+        base, enc = self._base, _b64id
+        out = []
+        for t in transformed:
+            h = base.copy()
+            h.update(f"{t}:0".encode("utf-8"))
+            out.append(enc(h.digest()))
+        return out
+
+    def file_ids(self, filenames: List[str], workers: int = 1) -> List[str]:
+        """同 k0_ids，但輸入為原始檔名（用行程池時正規化也在子行程完成）。"""
+        if workers > 1 and len(filenames) >= POOL_MIN_RECORDS:
+            return self._pooled(filenames, False, workers)
+        return self.k0_ids([self.transform(f) for f in filenames])
+
+    def _pooled(self, names: List[str], transformed: bool, workers: int) -> List[str]:
+        chunks = [names[i:i + POOL_CHUNK] for i in range(0, len(names), POOL_CHUNK)]
+        out: List[str] = []
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            for part in ex.map(_k0_chunk, [(self.params, c, transformed) for c in chunks]):
+                out.extend(part)
+        return out
+
+def _k0_chunk(job: Tuple[tuple, List[str], bool]) -> List[str]:
+    params, names, transformed = job
+    engine = UfidEngine(*params)
+    return engine.k0_ids(names) if transformed else engine.file_ids(names)
+
+def _resolve_workers(workers: int) -> int:
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
 # ---------- Collision & verification helpers ----------
 
 def _collect_ids(records: List[Dict[str, Any]]) -> Dict[str, List[int]]:
@@ -83,42 +168,44 @@ def _report_duplicates(records: List[Dict[str, Any]], dup: Dict[str, List[int]])
     return "\n".join(lines)
 
 def _verify_existing_ids(records: List[Dict[str, Any]], namespace: Optional[str],
-                         norm: str, do_casefold: bool, do_strip: bool, nbytes: int) -> List[str]:
+                         norm: str, do_casefold: bool, do_strip: bool, nbytes: int,
+                         workers: int = 1) -> List[str]:
     """
     對「已有非 null id」的記錄，計算本次參數下的期望 id（k=0），
     若不同則回傳警告訊息。
     """
+    engine = UfidEngine(namespace, norm, do_casefold, do_strip, nbytes)
+    todo = [i for i, obj in enumerate(records)
+            if isinstance(obj, dict) and obj.get("id") is not None
+            and isinstance(obj.get("file"), str) and obj.get("file")]
+    expected = engine.file_ids([records[i]["file"] for i in todo], workers)
     notes: List[str] = []
-    for i, obj in enumerate(records):
-        if not isinstance(obj, dict):
-            continue
-        if obj.get("id") is None:
-            continue
-        fname = obj.get("file")
-        if not isinstance(fname, str) or not fname:
-            continue
-        expected = ufid(fname, namespace, 0, norm, do_casefold, do_strip, nbytes)
-        if str(obj["id"]) != expected:
-            notes.append(f"Index {i} has existing id={obj['id']} but expected={expected} for file={fname!r}")
+    for i, exp in zip(todo, expected):
+        obj = records[i]
+        if str(obj["id"]) != exp:
+            notes.append(f"Index {i} has existing id={obj['id']} but expected={exp} for file={obj['file']!r}")
     return notes
 
 # ---------- Assignment strategies ----------
 
 def assign_ids_strict(records: List[Dict[str, Any]], namespace: Optional[str],
                       force: bool, norm: str, do_casefold: bool, do_strip: bool,
-                      verify_mode: str, nbytes: int) -> int:
+                      verify_mode: str, nbytes: int, workers: int = 1) -> int:
+    engine = UfidEngine(namespace, norm, do_casefold, do_strip, nbytes)
+    # 1) 每筆只算一次 k=0 期望值：缺 id（或 force）就填入，既有 id 則順便驗證
+    todo = [i for i, obj in enumerate(records)
+            if isinstance(obj, dict) and isinstance(obj.get("file"), str) and obj.get("file")
+            and (force or obj.get("id") is None or verify_mode != "off")]
+    expected = engine.file_ids([records[i]["file"] for i in todo], workers)
     changed = 0
-    # 1) 填/重算 id
-    for obj in records:
-        if not isinstance(obj, dict):
-            continue
-        if not force and ("id" in obj and obj["id"] is not None):
-            continue
-        fname = obj.get("file")
-        if not isinstance(fname, str) or not fname:
-            continue
-        obj["id"] = ufid(fname, namespace, 0, norm, do_casefold, do_strip, nbytes)
-        changed += 1
+    notes: List[str] = []
+    for i, exp in zip(todo, expected):
+        obj = records[i]
+        if force or obj.get("id") is None:
+            obj["id"] = exp
+            changed += 1
+        elif str(obj["id"]) != exp:
+            notes.append(f"Index {i} has existing id={obj['id']} but expected={exp} for file={obj['file']!r}")
 
     # 2) 檢查碰撞（含既有與新算）
     dup = _find_duplicates(records)
@@ -127,19 +214,17 @@ def assign_ids_strict(records: List[Dict[str, Any]], namespace: Optional[str],
         raise SystemExit(msg)
 
     # 3) 驗證一致性
-    if verify_mode != "off":
-        notes = _verify_existing_ids(records, namespace, norm, do_casefold, do_strip, nbytes)
-        if notes:
-            text = "Existing ID mismatches detected:\n" + "\n".join("  - " + n for n in notes)
-            if verify_mode == "fail":
-                raise SystemExit(text + "\nHint: use --force (or --auto-resolve --force) to recompute ids.")
-            else:
-                sys.stderr.write(text + "\n")
+    if verify_mode != "off" and notes:
+        text = "Existing ID mismatches detected:\n" + "\n".join("  - " + n for n in notes)
+        if verify_mode == "fail":
+            raise SystemExit(text + "\nHint: use --force (or --auto-resolve --force) to recompute ids.")
+        else:
+            sys.stderr.write(text + "\n")
     return changed
 
 def assign_ids_auto_resolve(records: List[Dict[str, Any]], namespace: Optional[str],
                             force: bool, norm: str, do_casefold: bool, do_strip: bool,
-                            nbytes: int) -> int:
+                            nbytes: int, workers: int = 1) -> int:
     """
     自動解碰：
       - force=False：保留既有非 null id，對缺少的以 k=0,1,2… 找唯一值
@@ -159,14 +244,17 @@ def assign_ids_auto_resolve(records: List[Dict[str, Any]], namespace: Optional[s
             return True
         return (("id" not in o) or (o.get("id") is None))
 
-    pending = [o for o in records if need_assign(o) and isinstance(o.get("file"), str) and o.get("file")]
-    pending.sort(key=lambda o: transform_name(o["file"], norm, do_casefold, do_strip))  # 決定性順序
+    engine = UfidEngine(namespace, norm, do_casefold, do_strip, nbytes)
+    pending = [(engine.transform(o["file"]), o) for o in records
+               if need_assign(o) and isinstance(o.get("file"), str) and o.get("file")]
+    pending.sort(key=lambda t: t[0])  # 決定性順序
+    first = engine.k0_ids([t for t, _ in pending], workers)
 
-    for obj in pending:
-        fname = obj["file"]
+    for (transformed, obj), cand in zip(pending, first):
         k = 0
         while True:
-            cand = ufid(fname, namespace, k, norm, do_casefold, do_strip, nbytes)
+            if k:
+                cand = engine.from_transformed(transformed, k)
             if cand not in used:
                 old = obj.get("id")
                 if old != cand:
@@ -182,6 +270,406 @@ def assign_ids_auto_resolve(records: List[Dict[str, Any]], namespace: Optional[s
         raise SystemExit("Unexpected duplicates after auto-resolve:\n" + msg)
     return changed
 
+# ---------- Width planning & migration ----------
+
+VALID_NBYTES = (4, 8, 16)
+MAX_VERIFY_K = 64  # 驗證遷移結果時容許的最大 k（實務上 k 幾乎不超過 2）
+
+def collision_probability(n: int, nbytes: int) -> float:
+    """
+    n 個均勻隨機 id 落在 2^(8*nbytes) 空間、至少一對碰撞的機率。
+    逐項累加 log(1 - i/N)（fsum + log1p，非 n²/2N 近似），對 16 bytes 的極小值也保有精度。
+    """
+    space = 2 ** (8 * nbytes)
+    if n > space:
+        return 1.0
+    if n < 2:
+        return 0.0
+    log_ok = math.fsum(math.log1p(-i / space) for i in range(1, n))
+    return -math.expm1(log_ok)
+
+def simulate_retry_depth(transformed: List[str], engine: UfidEngine) -> Counter:
+    """依自動解碰（--force）的決定性順序實際指派一遍，回傳 k → 筆數。"""
+    used: set = set()
+    depth: Counter = Counter()
+    names = sorted(transformed)
+    for t, cand in zip(names, engine.k0_ids(names)):
+        k = 0
+        while cand in used:
+            k += 1
+            cand = engine.from_transformed(t, k)
+        used.add(cand)
+        depth[k] += 1
+    return depth
+
+def _infer_nbytes(records: List[Dict[str, Any]]) -> Optional[int]:
+    """由既有 id 的解碼長度推測目前寬度（取最多數）。"""
+    widths: Counter = Counter()
+    for obj in records:
+        if isinstance(obj, dict) and obj.get("id") is not None:
+            raw = _decode_id(str(obj["id"]))
+            if raw is not None:
+                widths[len(raw)] += 1
+    return widths.most_common(1)[0][0] if widths else None
+
+def plan_report(records: List[Dict[str, Any]], namespace: Optional[str], norm: str,
+                do_casefold: bool, do_strip: bool, projections: List[int],
+                max_prob: float) -> str:
+    """目前與預估型錄規模下，各寬度的碰撞機率、期望碰撞對數與模擬 k 深度。"""
+    current = _infer_nbytes(records)
+    names = [obj["file"] for obj in records
+             if isinstance(obj, dict) and isinstance(obj.get("file"), str) and obj.get("file")]
+    sizes = sorted({len(names), *projections})
+    lines = [f"Catalog: {len(records)} records; current id width: "
+             f"{current if current else 'unknown'} bytes; namespace: {namespace or '(none)'}",
+             "",
+             f"{'records':>10} {'bytes':>5} {'P(collision)':>14} {'E[pairs]':>12} "
+             f"{'retries':>8} {'max k':>6}"]
+    recommend: Dict[int, Optional[int]] = {}
+    for n in sizes:
+        # 模擬：真實檔名不足時補上合成檔名，走真正的正規化與雜湊
+        sim = names[:n] + [f"sim-{i:09d}.mp3" for i in range(max(0, n - len(names)))]
+        recommend[n] = None
+        for nbytes in VALID_NBYTES:
+            engine = UfidEngine(namespace, norm, do_casefold, do_strip, nbytes)
+            p = collision_probability(n, nbytes)
+            pairs = n * (n - 1) / 2 / 2 ** (8 * nbytes)
+            depth = simulate_retry_depth([engine.transform(f) for f in sim], engine)
+            retries = sum(k * c for k, c in depth.items())
+            mark = " <- current" if nbytes == current and n == len(names) else ""
+            lines.append(f"{n:>10} {nbytes:>5} {p:>14.3e} {pairs:>12.3e} "
+                         f"{retries:>8} {max(depth) if depth else 0:>6}{mark}")
+            if recommend[n] is None and p <= max_prob:
+                recommend[n] = nbytes
+    lines.append("")
+    for n in sizes:
+        r = recommend[n]
+        lines.append(f"  {n:>10} records: smallest width with P(collision) <= {max_prob:g} -> "
+                     + (f"{r} bytes" if r else "none of 4/8/16"))
+    largest = recommend[sizes[-1]]
+    if current and largest and largest > current:
+        lines.append(f"\nRecommendation: migrate {current} -> {largest} bytes "
+                     f"(--migrate-to {largest} --alias-out aliases.json).")
+    return "\n".join(lines)
+
+def migrate_ids(records: List[Dict[str, Any]], namespace: Optional[str], norm: str,
+                do_casefold: bool, do_strip: bool, nbytes: int, workers: int = 1) -> Dict[str, str]:
+    """
+    以新寬度重新分配所有 id（等同 --auto-resolve --force），回傳 舊 id → 新 id 別名表。
+    舊 id 本身重複時無法建立一對一別名，直接中止。
+    """
+    dup = _find_duplicates(records)
+    if dup:
+        raise SystemExit("Cannot migrate: existing ids are not unique, aliases would be ambiguous.\n"
+                         + _report_duplicates(records, dup))
+    old = {i: str(obj["id"]) for i, obj in enumerate(records)
+           if isinstance(obj, dict) and obj.get("id") is not None}
+    assign_ids_auto_resolve(records, namespace, True, norm, do_casefold, do_strip, nbytes, workers)
+    aliases: Dict[str, str] = {}
+    for i, oid in old.items():
+        nid = records[i].get("id")
+        if nid is not None and str(nid) != oid:
+            aliases[oid] = str(nid)
+    return aliases
+
+def verify_migration(records: List[Dict[str, Any]], aliases: Dict[str, str],
+                     namespace: Optional[str], norm: str, do_casefold: bool,
+                     do_strip: bool, nbytes: int) -> List[str]:
+    """
+    驗證遷移結果，回傳問題列表（空＝通過）：
+      - 所有 id 唯一、寬度正確，且可由 (file, k) 重算出來
+      - 別名的目標都恰好對到一筆記錄；舊 id 不再出現在型錄中；別名不成鏈
+    """
+    problems: List[str] = []
+    dup = _find_duplicates(records)
+    if dup:
+        problems.append(_report_duplicates(records, dup))
+    engine = UfidEngine(namespace, norm, do_casefold, do_strip, nbytes)
+    ids = _collect_ids(records)
+    for i, obj in enumerate(records):
+        if not isinstance(obj, dict) or obj.get("id") is None:
+            continue
+        idv, fname = str(obj["id"]), obj.get("file")
+        raw = _decode_id(idv)
+        if raw is None or len(raw) != nbytes:
+            problems.append(f"Index {i}: id={idv} is not a {nbytes}-byte UFID")
+            continue
+        if isinstance(fname, str) and fname:
+            t = engine.transform(fname)
+            if not any(engine.from_transformed(t, k) == idv for k in range(MAX_VERIFY_K)):
+                problems.append(f"Index {i}: id={idv} cannot be derived from file={fname!r}")
+    for oid, nid in aliases.items():
+        if len(ids.get(nid, [])) != 1:
+            problems.append(f"Alias {oid} -> {nid}: target matches {len(ids.get(nid, []))} records")
+        if oid in ids:
+            problems.append(f"Alias {oid} -> {nid}: old id is still used in the catalog")
+        if nid in aliases:
+            problems.append(f"Alias {oid} -> {nid}: target is itself aliased (chain)")
+    return problems
+
+# ---------- Streaming (NDJSON) ----------
+
+_MASK64 = (1 << 64) - 1
+
+def _decode_id(idv: str) -> Optional[bytes]:
+    """Base64url（無 padding）→ raw bytes；非標準編碼（無法原樣還原）回傳 None。"""
+    try:
+        raw = base64.urlsafe_b64decode(idv + "=" * (-len(idv) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    if base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii") != idv:
+        return None
+    return raw
+
+class CompactIdSet:
+    """
+    串流模式用的精簡 id 集合：
+      - 以 id 前 2 bytes 分成 65536 桶，桶內為排序的定寬整數 array
+      - 每筆只存其餘 (nbytes-2) bytes（4 bytes id → 每筆 2 bytes），遠小於 set[str]
+      - 長度或編碼不符 nbytes 的既有 id（例如手動修改過）退回一般 set
+    """
+
+    def __init__(self, nbytes: int):
+        self.nbytes = nbytes
+        rem = nbytes - 2
+        self._split = rem > 8  # 16 bytes：餘數拆成 hi/lo 兩個 64-bit array
+        self._typecode = "H" if rem <= 2 else ("I" if rem <= 4 else "Q")
+        self._buckets: List[Any] = [None] * 65536
+        self._other: set = set()
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _key(self, idv: str) -> Optional[Tuple[int, int]]:
+        raw = _decode_id(idv)
+        if raw is None or len(raw) != self.nbytes:
+            return None
+        return int.from_bytes(raw[:2], "big"), int.from_bytes(raw[2:], "big")
+
+    def _locate(self, b: int, r: int, create: bool) -> Tuple[Any, int, bool]:
+        """回傳 (桶, 插入位置, 是否已存在)。"""
+        bucket = self._buckets[b]
+        if bucket is None:
+            if not create:
+                return None, 0, False
+            bucket = (array("Q"), array("Q")) if self._split else array(self._typecode)
+            self._buckets[b] = bucket
+        if not self._split:
+            i = bisect_left(bucket, r)
+            return bucket, i, (i < len(bucket) and bucket[i] == r)
+        his, los = bucket
+        hi, lo = r >> 64, r & _MASK64
+        i = bisect_left(his, hi)
+        while i < len(his) and his[i] == hi:
+            if los[i] == lo:
+                return bucket, i, True
+            if los[i] > lo:
+                break
+            i += 1
+        return bucket, i, False
+
+    def __contains__(self, idv: str) -> bool:
+        key = self._key(idv)
+        if key is None:
+            return idv in self._other
+        return self._locate(key[0], key[1], False)[2]
+
+    def add(self, idv: str) -> bool:
+        """加入 id；已存在時回傳 False（即碰撞）。"""
+        key = self._key(idv)
+        if key is None:
+            if idv in self._other:
+                return False
+            self._other.add(idv)
+            self._len += 1
+            return True
+        b, r = key
+        bucket, i, found = self._locate(b, r, True)
+        if found:
+            return False
+        if self._split:
+            bucket[0].insert(i, r >> 64)
+            bucket[1].insert(i, r & _MASK64)
+        else:
+            bucket.insert(i, r)
+        self._len += 1
+        return True
+
+def _iter_ndjson(fp: IO[str]) -> Iterator[Any]:
+    for lineno, line in enumerate(fp, 1):
+        s = line.strip()
+        if not s:
+            continue
+        try:
+            yield json.loads(s)
+        except json.JSONDecodeError as e:
+            raise SystemExit(f"Invalid NDJSON at line {lineno}: {e}")
+
+def _write_ndjson(out: IO[str], obj: Any) -> None:
+    out.write(json.dumps(obj, ensure_ascii=False, separators=(",", ":")))
+    out.write("\n")
+
+def _open_ndjson_source(path: str, need_rewind: bool) -> Tuple[IO[str], bool]:
+    """
+    開啟 NDJSON 來源；回傳 (fp, 可否重讀)。
+    stdin 無法重讀：need_rewind 時先落地到暫存檔（佔磁碟、不佔記憶體）。
+    """
+    if path != "-":
+        return open(path, "r", encoding="utf-8"), True
+    if not need_rewind:
+        return sys.stdin, False
+    spool = tempfile.TemporaryFile("w+", encoding="utf-8")
+    shutil.copyfileobj(sys.stdin, spool)
+    spool.seek(0)
+    return spool, True
+
+def _stream_duplicate_report(fp: IO[str], dup_ids: set) -> str:
+    """第二趟掃描，只收集碰撞 id 的記錄，輸出與批次模式相同的報告。"""
+    fp.seek(0)
+    dup: Dict[str, List[int]] = {}
+    rows: Dict[int, Dict[str, Any]] = {}
+    for i, obj in enumerate(_iter_ndjson(fp)):
+        if isinstance(obj, dict) and obj.get("id") is not None and str(obj["id"]) in dup_ids:
+            dup.setdefault(str(obj["id"]), []).append(i)
+            rows[i] = obj
+    return _report_duplicates(rows, dup)  # type: ignore[arg-type]
+
+def stream_assign_ids(src_path: str, out: IO[str], namespace: Optional[str],
+                      force: bool, auto_resolve: bool, norm: str, do_casefold: bool,
+                      do_strip: bool, verify_mode: str, nbytes: int) -> Tuple[int, int]:
+    """
+    NDJSON 串流版的 assign_ids_strict / assign_ids_auto_resolve，回傳 (records, changed)。
+      - 嚴格：逐筆補 id、驗證既有 id，碰撞即中止（結束前報告全部碰撞）
+      - 自動解碰（非 force）：第一趟只收集既有 id，第二趟依「輸入順序」以 k=0,1,2… 找唯一值
+        （批次模式依正規化檔名排序；串流無法排序，故以輸入順序作為決定性順序）
+    """
+    need_rewind = auto_resolve and not force
+    fp, rewindable = _open_ndjson_source(src_path, need_rewind)
+    engine = UfidEngine(namespace, norm, do_casefold, do_strip, nbytes)
+    ids = CompactIdSet(nbytes)
+    dup_ids: set = set()
+    dup_seen: Dict[str, List[int]] = {}
+    dup_rows: Dict[int, Dict[str, Any]] = {}
+    changed = 0
+    mismatches = 0
+    n = 0
+
+    def note_dup(i: int, obj: Dict[str, Any]) -> None:
+        v = str(obj["id"])
+        dup_ids.add(v)
+        dup_seen.setdefault(v, []).append(i)
+        if len(dup_rows) < 1000:
+            dup_rows[i] = {"file": obj.get("file"), "title": obj.get("title")}
+
+    def fail_on_dups(prefix: str) -> None:
+        if not dup_ids:
+            return
+        if rewindable:
+            msg = _stream_duplicate_report(fp, dup_ids)
+        else:
+            msg = _report_duplicates(dup_rows, dup_seen)  # type: ignore[arg-type]
+            msg += "\n  (stdin input: only repeated occurrences are listed)"
+        raise SystemExit(prefix + msg)
+
+    try:
+        if need_rewind:
+            for i, obj in enumerate(_iter_ndjson(fp)):
+                if isinstance(obj, dict) and obj.get("id") is not None:
+                    if not ids.add(str(obj["id"])):
+                        note_dup(i, obj)
+            fail_on_dups("Unexpected duplicates after auto-resolve:\n")
+            fp.seek(0)
+
+        for i, obj in enumerate(_iter_ndjson(fp)):
+            n += 1
+            if isinstance(obj, dict):
+                fname = obj.get("file")
+                has_file = isinstance(fname, str) and bool(fname)
+                if has_file and (force or obj.get("id") is None):
+                    if auto_resolve:
+                        transformed = engine.transform(fname)
+                        k = 0
+                        while True:
+                            cand = engine.from_transformed(transformed, k)
+                            if ids.add(cand):
+                                break
+                            k += 1
+                        if obj.get("id") != cand:
+                            obj["id"] = cand
+                            changed += 1
+                    else:
+                        obj["id"] = engine.compute(fname)
+                        changed += 1
+                        if not ids.add(obj["id"]):
+                            note_dup(i, obj)
+                elif obj.get("id") is not None:
+                    if not auto_resolve and has_file and verify_mode != "off":
+                        expected = engine.compute(fname)
+                        if str(obj["id"]) != expected:
+                            if not mismatches:
+                                sys.stderr.write("Existing ID mismatches detected:\n")
+                            mismatches += 1
+                            sys.stderr.write(f"  - Index {i} has existing id={obj['id']} "
+                                             f"but expected={expected} for file={fname!r}\n")
+                    if not need_rewind and not ids.add(str(obj["id"])):
+                        note_dup(i, obj)
+            _write_ndjson(out, obj)
+
+        fail_on_dups("Unexpected duplicates after auto-resolve:\n" if auto_resolve else "")
+        if mismatches and verify_mode == "fail":
+            raise SystemExit(f"{mismatches} existing ID mismatch(es) detected."
+                             "\nHint: use --force (or --auto-resolve --force) to recompute ids.")
+    finally:
+        if fp is not sys.stdin:
+            fp.close()
+    return n, changed
+
+def _stage_file(path: str, text: str) -> str:
+    """把 text 寫入 path 同目錄的暫存檔（fsync）並回傳暫存路徑；由呼叫端 os.replace。"""
+    fd, tmp = tempfile.mkstemp(prefix=".ufid-", suffix=".json",
+                               dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return tmp
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_benchmark(n: int, namespace: Optional[str], nbytes: int, workers: int) -> None:
+    """比較逐筆 ufid() 與 UfidEngine（單行程 / 行程池）的吞吐量，並確認結果一致。"""
+    names = [f"狗-測試音效 {i:07d}[笑,迷因].mp3" for i in range(n)]
+
+    def timed(label: str, fn) -> List[str]:
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        sys.stderr.write(f"  {label:<28} {dt:8.3f} s  {n / dt:12,.0f} rec/s\n")
+        return out
+
+    sys.stderr.write(f"Benchmark: {n} records, bytes={nbytes}, namespace={namespace or '(none)'}\n")
+    ref = timed("ufid() per record", lambda: [
+        ufid(f, namespace, 0, "nfkc", True, True, nbytes) for f in names])
+    engine = UfidEngine(namespace, "nfkc", True, True, nbytes)
+    got = timed("UfidEngine.file_ids", lambda: engine.file_ids(names))
+    if got != ref:
+        raise SystemExit("Benchmark mismatch: UfidEngine differs from ufid()")
+    if workers > 1:
+        got = timed(f"UfidEngine.file_ids x{workers}", lambda: engine.file_ids(names, workers))
+        if got != ref:
+            raise SystemExit("Benchmark mismatch: pooled UfidEngine differs from ufid()")
+
 # ---------- I/O & CLI ----------
 
 HELP_EPILOG = r"""
@@ -198,13 +686,29 @@ Examples:
   # 4) 自動解碰 + 全部重算 + 16 bytes（修掉既有重複或不一致）
   ufid.py meta.json --auto-resolve --force --bytes 16 --namespace "my_project"
 
+  # 5) 串流 NDJSON（每行一筆）；'-' 代表 stdin，可與其他工具串接
+  cat meta.ndjson | ufid.py - --ndjson --namespace "my_project" > out.ndjson
+
+  # 6) 效能比較：逐筆 ufid() vs 批次引擎（含 4 行程）
+  ufid.py --bench 200000 --workers 4
+
+  # 7) 寬度規劃：目前與預估規模的碰撞機率、模擬 k 深度（不寫出）
+  ufid.py meta.json --plan --project 10000,50000
+
+  # 8) 換成 8 bytes，輸出 舊→新 別名表（寫出前自動驗證）；之後可單獨重驗
+  ufid.py meta.json --migrate-to 8 --alias-out aliases.json --inplace
+  ufid.py meta.json --bytes 8 --verify-aliases aliases.json
+
 Notes:
   - 產生的 ID 為 nbytes（4/8/16） bytes 的 BLAKE2b 輸出，Base64url（無 '='）。
     對應字串長度約：4B→6、8B→11、16B→22。
   - 32-bit（4 bytes）碰撞風險高：~1 萬筆約 1% 機率；5 萬筆已相當高。
-    在意碰撞請改用 --bytes 8 或 --bytes 16。
+    在意碰撞請改用 --bytes 8 或 --bytes 16；--plan 會算出目前規模的精確機率。
   - 嚴格模式：任何碰撞都會中止（不寫出）。
   - 預設會驗證既有 id 與本次參數是否一致；可用 --fail-on-mismatch 中止，或 --no-verify-existing 關閉。
+  - --ndjson：逐筆讀寫，只保留精簡 id 集合（4 bytes id 約 2 bytes/筆）。
+    自動解碰（非 --force）需讀兩趟：stdin 會先落地成暫存檔；解碰順序為輸入順序。
+    輸出到 -o/--inplace 時先寫暫存檔、成功才取代；輸出到 stdout 時中止前已寫出的內容請捨棄。
 """
 
 def main():
@@ -213,7 +717,7 @@ def main():
         formatter_class=argparse.RawTextHelpFormatter,
         epilog=HELP_EPILOG
     )
-    ap.add_argument("input", help="Input JSON path (array of records)")
+    ap.add_argument("input", nargs="?", help="Input JSON path (array of records); '-' = stdin")
     ap.add_argument("-o", "--output", help="Output path (default: stdout)")
     ap.add_argument("--namespace", help="Optional namespace for domain separation (recommended)")
     ap.add_argument("--inplace", action="store_true", help="Write back to input file in place")
@@ -221,6 +725,9 @@ def main():
     ap.add_argument("--auto-resolve", action="store_true",
                     help="Enable collision auto-resolution (Plan B). Default is strict mode (Plan A).")
 
+    ap.add_argument("--ndjson", action="store_true",
+                    help="Stream NDJSON (one record per line) in and out with constant memory")
+
     # ID 長度（bytes）
     ap.add_argument("--bytes", dest="nbytes", type=int, choices=[4,8,16], default=4,
                     help="ID length in bytes (default: 4). Use 8 or 16 to reduce collisions.")
@@ -246,32 +753,140 @@ def main():
                     help="Do not verify existing ids against current parameters")
     ap.set_defaults(verify_mode="warn")  # 預設：警告但不中止
 
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Processes for batch hashing (0=auto; pool only used for large inputs)")
+    ap.add_argument("--bench", type=int, metavar="N",
+                    help="Benchmark ufid() vs UfidEngine on N synthetic names and exit")
+
+    # 寬度規劃 / 遷移
+    ap.add_argument("--plan", action="store_true",
+                    help="Report exact collision probability and simulated auto-resolve depth; no output")
+    ap.add_argument("--project", default="10000,50000,100000",
+                    help="Comma-separated projected catalog sizes for --plan (default: 10000,50000,100000)")
+    ap.add_argument("--max-prob", type=float, default=1e-6,
+                    help="Acceptable collision probability for --plan recommendations (default: 1e-6)")
+    ap.add_argument("--migrate-to", type=int, choices=[8, 16],
+                    help="Reassign every id at this width and write an old->new alias map (--alias-out)")
+    ap.add_argument("--alias-out", help="Alias map output path for --migrate-to")
+    ap.add_argument("--verify-aliases", metavar="ALIASES_JSON",
+                    help="Verify a migrated catalog (at --bytes) against its alias map and exit")
+
     ap.add_argument("--version", "-V", action="version", version="UFID v1")
 
     args = ap.parse_args()
+    workers = _resolve_workers(args.workers)
 
-    with open(args.input, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    if not isinstance(data, list):
-        raise SystemExit("Top-level JSON must be an array of objects.")
-
-    if args.auto_resolve:
-        changed = assign_ids_auto_resolve(
-            data, args.namespace, args.force, args.normalize, args.casefold, args.strip, args.nbytes
-        )
-    else:
-        changed = assign_ids_strict(
-            data, args.namespace, args.force, args.normalize, args.casefold, args.strip, args.verify_mode, args.nbytes
-        )
+    if args.bench:
+        run_benchmark(args.bench, args.namespace, args.nbytes, workers)
+        return
+    if not args.input:
+        ap.error("the following arguments are required: input")
 
     out_path = args.input if (args.inplace and not args.output) else args.output
-    out_json = json.dumps(data, ensure_ascii=False, indent=2)
-
-    if out_path:
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write(out_json + "\n")
+    if out_path == "-":
+        raise SystemExit("Cannot write in place to stdin.")
+    if args.ndjson and (args.plan or args.migrate_to or args.verify_aliases):
+        ap.error("--plan / --migrate-to / --verify-aliases work on JSON arrays, not --ndjson")
+    if args.migrate_to and not args.alias_out:
+        ap.error("--migrate-to requires --alias-out")
+
+    if args.ndjson:
+        if out_path:
+            # 先寫同目錄暫存檔，成功才取代，確保中止時不留下半成品
+            fd, tmp = tempfile.mkstemp(prefix=".ufid-", suffix=".ndjson",
+                                       dir=os.path.dirname(os.path.abspath(out_path)))
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as out:
+                    total, changed = stream_assign_ids(
+                        args.input, out, args.namespace, args.force, args.auto_resolve,
+                        args.normalize, args.casefold, args.strip, args.verify_mode, args.nbytes)
+                os.replace(tmp, out_path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        else:
+            total, changed = stream_assign_ids(
+                args.input, sys.stdout, args.namespace, args.force, args.auto_resolve,
+                args.normalize, args.casefold, args.strip, args.verify_mode, args.nbytes)
+        rss = _peak_rss_mb()
+        sys.stderr.write(f"Records streamed: {total}"
+                         + (f"; peak RSS: {rss:.1f} MiB" if rss is not None else "") + "\n")
     else:
-        sys.stdout.write(out_json + "\n")
+        if args.input == "-":
+            data = json.load(sys.stdin)
+        else:
+            with open(args.input, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        if not isinstance(data, list):
+            raise SystemExit("Top-level JSON must be an array of objects.")
+
+        if args.plan:
+            try:
+                projections = [int(x) for x in args.project.split(",") if x.strip()]
+            except ValueError:
+                ap.error("--project must be comma-separated integers")
+            print(plan_report(data, args.namespace, args.normalize, args.casefold, args.strip,
+                              projections, args.max_prob))
+            return
+
+        if args.verify_aliases:
+            with open(args.verify_aliases, "r", encoding="utf-8") as f:
+                aliases = json.load(f)
+            problems = verify_migration(data, aliases, args.namespace, args.normalize,
+                                        args.casefold, args.strip, args.nbytes)
+            if problems:
+                raise SystemExit("Migration verification failed:\n" + "\n".join("  - " + p for p in problems))
+            sys.stderr.write(f"Migration verified: {len(data)} records, {len(aliases)} aliases, "
+                             f"{args.nbytes}-byte ids.\n")
+            return
+
+        if args.migrate_to:
+            from_bytes = _infer_nbytes(data)
+            aliases = migrate_ids(data, args.namespace, args.normalize, args.casefold, args.strip,
+                                  args.migrate_to, workers)
+            problems = verify_migration(data, aliases, args.namespace, args.normalize,
+                                        args.casefold, args.strip, args.migrate_to)
+            if problems:
+                raise SystemExit("Migration verification failed (nothing written):\n"
+                                 + "\n".join("  - " + p for p in problems))
+            alias_json = json.dumps(aliases, ensure_ascii=False, indent=2, sort_keys=True) + "\n"
+            changed = len(aliases)
+            args.nbytes, args.auto_resolve, args.force = args.migrate_to, True, True
+        elif args.auto_resolve:
+            changed = assign_ids_auto_resolve(
+                data, args.namespace, args.force, args.normalize, args.casefold, args.strip, args.nbytes,
+                workers
+            )
+        else:
+            changed = assign_ids_strict(
+                data, args.namespace, args.force, args.normalize, args.casefold, args.strip, args.verify_mode,
+                args.nbytes, workers
+            )
+
+        out_json = json.dumps(data, ensure_ascii=False, indent=2) + "\n"
+
+        # 型錄與別名表都先寫成同目錄暫存檔，全部成功才依序取代（型錄在前）：
+        # 任何一步失敗都不會留下指向未出貨 id 的別名表
+        staged = []
+        try:
+            if out_path:
+                staged.append((_stage_file(out_path, out_json), out_path))
+            if args.migrate_to:
+                staged.append((_stage_file(args.alias_out, alias_json), args.alias_out))
+            if not out_path:
+                sys.stdout.write(out_json)
+                sys.stdout.flush()
+            while staged:
+                tmp, final = staged[0]
+                os.replace(tmp, final)
+                staged.pop(0)
+        except BaseException:
+            for tmp, _ in staged:
+                os.unlink(tmp)
+            raise
+        if args.migrate_to:
+            sys.stderr.write(f"Migrated {from_bytes or '?'} -> {args.migrate_to} bytes; "
+                             f"{len(aliases)} aliases written to {args.alias_out}; verified.\n")
 
     sys.stderr.write(
         f"IDs added/updated: {changed}\n"
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UFID 登記簿（SQLite）：讓音效改名 / 搬移後仍沿用原本的 id
+========================================
+ufid64 的 id 由檔名決定，檔名一改（suggest_rename、衝突對話框的「重新命名」、手動改名）
+id 就跟著變，使用者存的最愛與分享連結就失效。本工具把
+
+    內容雜湊（SHA-256）→ id → 歷史檔名
+
+記在 SQLite 裡（皆有索引，查詢 O(1)）：
+  - 同內容的檔案不論改名或搬移，都對回登記過的 id
+  - 同檔名但內容更新（重新轉檔 / 覆寫）也沿用該檔名登記的 id
+  - 被取代的 id 記入別名表，可匯出給前端把舊 id 導向新 id
+  - (size, mtime_ns) 未變的檔案直接用快取雜湊，不重新讀檔
+
+用法：
+  python ufid_registry.py sync                 # 登記 config/sounds.json 目前的內容
+  python ufid_registry.py sync --apply         # 並把改名後被重算的 id 改回登記的 id（經 catalog_store 寫回 sounds.json）
+  python ufid_registry.py aliases              # 匯出別名表 config/id-aliases.json
+  python ufid_registry.py lookup <檔名或 id>
+  python ufid_registry.py import-aliases aliases.json   # 匯入 ufid64 --migrate-to 產生的 舊→新 對照
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from catalog_store import CatalogStore
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_SOUNDS = SCRIPT_DIR.parent / "config" / "sounds.json"
+DEFAULT_SOUNDS_DIR = SCRIPT_DIR.parent / "sounds"
+DEFAULT_DB = SCRIPT_DIR.parent / "config" / "ufid-registry.sqlite"
+DEFAULT_ALIASES = SCRIPT_DIR.parent / "config" / "id-aliases.json"
+HASH_BUFSIZE = 1 << 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contents (
+    sha256     TEXT PRIMARY KEY,
+    id         TEXT NOT NULL,
+    first_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS contents_id ON contents(id);
+CREATE TABLE IF NOT EXISTS names (
+    file       TEXT PRIMARY KEY,
+    id         TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS names_id ON names(id);
+CREATE TABLE IF NOT EXISTS aliases (
+    old_id  TEXT PRIMARY KEY,
+    id      TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stat_cache (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256   TEXT NOT NULL
+);
+"""
+
+
+def sha256_file(path: Path) -> str:
+    """以大區塊讀檔計算 SHA-256（hex）。"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_BUFSIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class IdRegistry:
+    """內容雜湊 / 檔名 → id 的持久登記簿。以 with 使用時離開會自動 commit。"""
+
+    def __init__(self, db_path: Path):
+        self.path = Path(db_path)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.executescript(SCHEMA)
+        self._stat: Optional[Dict[str, Tuple[int, int, str]]] = None
+        self.hashed = 0   # 本次實際讀檔計算雜湊的數量
+        self.cached = 0   # 本次直接使用快取雜湊的數量
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.db.commit()
+        self.db.close()
+
+    def commit(self) -> None:
+        self.db.commit()
+
+    # ---- 雜湊（含 stat 快取） ---- #
+    def content_hash(self, path: Path) -> str:
+        """(size, mtime_ns) 與快取相同就直接回傳快取雜湊，否則重新計算並更新快取。"""
+        if self._stat is None:
+            self._stat = {p: (s, m, h) for p, s, m, h in
+                          self.db.execute("SELECT path, size, mtime_ns, sha256 FROM stat_cache")}
+        key = str(Path(path).resolve())
+        st = Path(path).stat()
+        hit = self._stat.get(key)
+        if hit is not None and hit[0] == st.st_size and hit[1] == st.st_mtime_ns:
+            self.cached += 1
+            return hit[2]
+        sha = sha256_file(path)
+        self._stat[key] = (st.st_size, st.st_mtime_ns, sha)
+        self.db.execute("INSERT OR REPLACE INTO stat_cache VALUES (?, ?, ?, ?)",
+                        (key, st.st_size, st.st_mtime_ns, sha))
+        self.hashed += 1
+        return sha
+
+    # ---- 查詢 ---- #
+    def id_for_content(self, sha: str) -> Optional[str]:
+        row = self.db.execute("SELECT id FROM contents WHERE sha256 = ?", (sha,)).fetchone()
+        return row[0] if row else None
+
+    def id_for_name(self, file: str) -> Optional[str]:
+        row = self.db.execute("SELECT id FROM names WHERE file = ?", (file,)).fetchone()
+        return row[0] if row else None
+
+    def names_for_id(self, idv: str) -> List[str]:
+        return [r[0] for r in self.db.execute(
+            "SELECT file FROM names WHERE id = ? ORDER BY first_seen", (idv,))]
+
+    def resolve_alias(self, idv: str) -> str:
+        """沿別名鏈找到目前的 id（別名在寫入時已攤平，通常一步到位）。"""
+        seen = {idv}
+        while True:
+            row = self.db.execute("SELECT id FROM aliases WHERE old_id = ?", (idv,)).fetchone()
+            if not row or row[0] in seen:
+                return idv
+            idv = row[0]
+            seen.add(idv)
+
+    def aliases(self) -> Dict[str, str]:
+        return {old: self.resolve_alias(new) for old, new in
+                self.db.execute("SELECT old_id, id FROM aliases ORDER BY old_id")}
+
+    # ---- 寫入 ---- #
+    def record(self, sha: Optional[str], idv: str, file: str) -> None:
+        """登記 內容→id（已登記者不覆蓋）與 檔名→id（更新為最新）。"""
+        now = time.time()
+        if sha:
+            self.db.execute("INSERT OR IGNORE INTO contents VALUES (?, ?, ?)", (sha, idv, now))
+        self.db.execute(
+            "INSERT INTO names VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(file) DO UPDATE SET id = excluded.id, last_seen = excluded.last_seen",
+            (file, idv, now, now))
+
+    def add_alias(self, old_id: str, new_id: str) -> None:
+        """old_id → new_id；同時把原本指向 old_id 的別名改指 new_id，保持一步解析。"""
+        if not old_id or old_id == new_id:
+            return
+        self.db.execute("DELETE FROM aliases WHERE old_id = ?", (new_id,))
+        self.db.execute("UPDATE aliases SET id = ? WHERE id = ?", (new_id, old_id))
+        self.db.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?, ?)",
+                        (old_id, new_id, time.time()))
+
+    def rename_ids(self, mapping: Dict[str, str]) -> int:
+        """整批換 id（例如 ufid64 --migrate-to 換寬度）：更新內容 / 檔名對應並記錄別名。"""
+        for old_id, new_id in mapping.items():
+            self.db.execute("UPDATE contents SET id = ? WHERE id = ?", (new_id, old_id))
+            self.db.execute("UPDATE names SET id = ? WHERE id = ?", (new_id, old_id))
+            self.add_alias(old_id, new_id)
+        return len(mapping)
+
+    def stable_id(self, path: Path, file: str, proposed: str, taken: set) -> str:
+        """
+        新音效併入前決定 id：內容已登記 → 沿用；否則檔名已登記 → 沿用；
+        但若該 id 目前已被型錄中其他音效使用（同內容重複收錄），則保留 proposed。
+        """
+        sha = self.content_hash(path) if Path(path).is_file() else None
+        for known in (self.id_for_content(sha) if sha else None, self.id_for_name(file)):
+            if known and known != proposed and known not in taken:
+                return known
+        return proposed
+
+
+# --------------------------------------------------------------------------- #
+#  sounds.json 同步
+# --------------------------------------------------------------------------- #
+def sync_catalog(reg: IdRegistry, records: list, sounds_dir: Path, apply: bool, log=print) -> dict:
+    """
+    逐筆登記型錄；同內容已登記為其他 id（＝改名後 id 被重算）時：
+      apply=True  → 記錄改回登記的 id，並把新 id 記為別名
+      apply=False → 只回報
+    """
+    stats = {"registered": 0, "unchanged": 0, "relinked": 0, "missing": 0, "no_id": 0}
+    taken = Counter(str(r["id"]) for r in records
+                    if isinstance(r, dict) and r.get("id") is not None)
+    for rec in records:
+        if not isinstance(rec, dict):
+            continue
+        f, idv = rec.get("file"), rec.get("id")
+        if not isinstance(f, str) or not f or idv is None:
+            stats["no_id"] += 1
+            continue
+        idv = str(idv)
+        path = sounds_dir / f
+        if not path.is_file():
+            stats["missing"] += 1
+            reg.record(None, idv, f)
+            continue
+        sha = reg.content_hash(path)
+        known = reg.id_for_content(sha)
+        if known is None:
+            reg.record(sha, idv, f)
+            stats["registered"] += 1
+        elif known == idv:
+            reg.record(sha, idv, f)
+            stats["unchanged"] += 1
+        elif taken[known]:
+            log(f"[重複內容] {f}（id={idv}）與已登記 id={known} 內容相同，且該 id 仍在型錄中；未變更。")
+            reg.record(None, idv, f)
+        else:
+            stats["relinked"] += 1
+            if apply:
+                log(f"[沿用] {f}：{idv} → {known}")
+                reg.add_alias(idv, known)
+                rec["id"] = known
+                taken[idv] -= 1
+                taken[known] += 1
+                reg.record(sha, known, f)
+            else:
+                log(f"[可沿用] {f}：目前 id={idv}，登記 id={known}（加 --apply 改回）")
+    return stats
+
+
+def default_db_for(sounds_path: Path) -> Path:
+    """登記簿預設放在 sounds.json 旁。"""
+    return Path(sounds_path).with_name(DEFAULT_DB.name)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="UFID 登記簿：內容雜湊 → id → 歷史檔名，讓改名後 id 不變。")
+    ap.add_argument("--db", default=None, help=f"SQLite 路徑（預設：sounds.json 旁的 {DEFAULT_DB.name}）")
+    ap.add_argument("--sounds", default=str(DEFAULT_SOUNDS), help="sounds.json 路徑")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sp = sub.add_parser("sync", help="登記 sounds.json 中每筆音效的內容與檔名")
+    sp.add_argument("--sounds-dir", default=str(DEFAULT_SOUNDS_DIR), help="音檔資料夾")
+    sp.add_argument("--apply", action="store_true", help="把改名後被重算的 id 改回登記的 id 並寫回 sounds.json")
+
+    sp = sub.add_parser("aliases", help="匯出 舊 id → 目前 id 的別名表（JSON）")
+    sp.add_argument("-o", "--output", default=str(DEFAULT_ALIASES), help='輸出路徑（"-" 為 stdout）')
+
+    sp = sub.add_parser("import-aliases", help="匯入 ufid64 --migrate-to 的別名表並換掉登記的 id")
+    sp.add_argument("path", help="別名表 JSON（舊 id → 新 id）")
+
+    sp = sub.add_parser("lookup", help="查詢檔名或 id")
+    sp.add_argument("key", help="檔名或 id")
+
+    args = ap.parse_args()
+    sounds_path = Path(args.sounds)
+    db_path = Path(args.db) if args.db else default_db_for(sounds_path)
+
+    with IdRegistry(db_path) as reg:
+        if args.cmd == "sync":
+            store = CatalogStore(sounds_path)
+            # sync_catalog 會就地改 id：在複本上執行，改到的記錄再以 replace 提交（原子寫入 + 歷史）
+            current = store.records
+            records = [dict(r) if isinstance(r, dict) else r for r in current]
+            t0 = time.perf_counter()
+            stats = sync_catalog(reg, records, Path(args.sounds_dir), args.apply)
+            ops = [{"op": "replace", "path": f"/{i}", "value": new}
+                   for i, (old, new) in enumerate(zip(current, records)) if new != old]
+            if args.apply and ops:
+                version = store.commit(ops, f"ufid_registry sync：{len(ops)} 筆改回登記的 id")
+                print(f"[寫回] {sounds_path}（版本 v{version}）")
+            print(f"新登記 {stats['registered']}、未變 {stats['unchanged']}、"
+                  f"{'已沿用' if args.apply else '可沿用'} {stats['relinked']}、"
+                  f"找不到音檔 {stats['missing']}、缺 id {stats['no_id']}；"
+                  f"雜湊：重算 {reg.hashed}、快取 {reg.cached}（{time.perf_counter() - t0:.2f}s）")
+        elif args.cmd == "aliases":
+            text = json.dumps(reg.aliases(), ensure_ascii=False, indent=2, sort_keys=True)
+            if args.output == "-":
+                print(text)
+            else:
+                Path(args.output).write_text(text + "\n", encoding="utf-8")
+                print(f"[完成] 已輸出 {args.output}")
+        elif args.cmd == "import-aliases":
+            mapping = json.loads(Path(args.path).read_text(encoding="utf-8"))
+            print(f"[完成] 已換掉 {reg.rename_ids(mapping)} 個 id 並記錄別名。")
+        elif args.cmd == "lookup":
+            idv = reg.id_for_name(args.key) or args.key
+            current = reg.resolve_alias(idv)
+            names = reg.names_for_id(current)
+            if not names and current == args.key:
+                print(f"查無資料：{args.key}")
+                return 1
+            print(json.dumps({"id": current, "alias_of": idv if idv != current else None,
+                              "names": names}, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
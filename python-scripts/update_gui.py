@@ -10,64 +10,88 @@
   2. 轉檔        ── 用 ffmpeg loudnorm 把音檔批次轉成標準化 MP3 到輸出資料夾
   3. 生成 JSON   ── 解析輸出資料夾的 MP3 檔名為 title / tags
   4. 產生 UUID   ── 用 ufid64 為每筆資料計算決定性 id
-  5. 更新 JSON   ── 把 config/sounds.json 備份成 sounds-old.json，
-                    再把新音效資料併入 sounds.json
+  5. 更新 JSON   ── 把新音效資料併入 config/sounds.json（原子寫入；每次合併記成一版
+                    JSON Patch 到 sounds.history.jsonl，可用 catalog_store.py 復原）
 
 特色：
   - 可即時檢視「檔名變更（原→新）」、「解析結果（file / title / tags / id）」
   - 更新前可預覽哪些是「新增」、哪些是「重複」
-  - 直接重用既有腳本的核心函式（檔名清理 / JSON生成 / ufid64），轉檔則以子行程呼叫 轉檔v3.py
+  - 清單表格為虛擬化（只放可見範圍），數萬筆也能即時捲動；點欄位標題排序、依 tag 篩選
+  - 直接重用既有腳本的核心函式（檔名清理 / JSON生成 / ufid64），轉檔則以子行程呼叫 轉檔v3.py；
+    1~5 步驟的實作在 pipeline.py（不含介面，ingest_server.py 共用）
+  - 轉檔以 --progress-json 事件顯示逐檔進度、吞吐量與剩餘時間；中斷經 stdin 通知，不必等下一行輸出
+  - 執行紀錄每個 tick 批次更新、畫面只保留最近 log_max_lines 行（預設 5000，進度行會合併），
+    完整紀錄寫入 logs/update_gui.log（輪替 5 MB × 3）
+  - 啟動時只建立介面：處理模組在第一次使用時才載入，sounds.json 在第一次預覽 / 更新時才解析，
+    之後依 (size, mtime) 快取；啟動各階段耗時寫在 log 第一行，
+    `python update_gui.py --startup-report` 可印出 JSON（超過 500 ms 結束碼為 1）
 
 依賴：標準函式庫 + tkinter；轉檔步驟需要系統的 ffmpeg/ffprobe 與 轉檔v3.py 所需的 tqdm。
 """
 
+import argparse
 import os
+import re
 import sys
-import copy
 import json
-import queue
+import logging
+import logging.handlers
 import shutil
 import threading
-import importlib.util
+import time
 import subprocess
+from collections import deque
 from pathlib import Path
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
+# 1~5 步驟的核心（不含 Tk；ingest_server.py 也用同一份）
+from pipeline import (
+    LazyModule, mod_store, pending_journal, clean_filenames, run_convert, generate_index,
+    assign_uuids, split_merge, merge_into_catalog,
+)
+
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 CONFIG_FILE = SCRIPT_DIR / "update_gui.json"
 DEFAULT_SOUNDS = (SCRIPT_DIR.parent / "config" / "sounds.json")
 DEFAULT_SOUNDS_DIR = (SCRIPT_DIR.parent / "sounds")  # 既有音檔實體所在
 SOUNDS_INDENT = 4  # 與現有 config/sounds.json 一致
+_T_IMPORT = time.perf_counter()  # 啟動計時的起點（標準函式庫、tkinter 與 pipeline 已匯入）
 
 
 # --------------------------------------------------------------------------- #
-#  動態載入既有腳本（檔名含中文，用 importlib 依路徑載入）
+#  啟動計時
 # --------------------------------------------------------------------------- #
-def _load_module(filename: str, alias: str):
-    path = SCRIPT_DIR / filename
-    if not path.exists():
-        raise FileNotFoundError(path)
-    spec = importlib.util.spec_from_file_location(alias, path)
-    mod = importlib.util.module_from_spec(spec)
-    sys.modules[alias] = mod
-    spec.loader.exec_module(mod)
-    return mod
-
-
-def _try_load(filename: str, alias: str):
-    try:
-        return _load_module(filename, alias)
-    except Exception as e:  # noqa: BLE001
-        print(f"[警告] 無法載入 {filename}：{e}")
-        return None
+STARTUP_BUDGET_MS = 500  # 可互動時間超過此值時在 log 提醒
+
 
+class StartupTimer:
+    """依序記錄啟動各階段的時間點；最後一個階段是第一次 idle（視窗可互動）。"""
+
+    def __init__(self, t0: float):
+        self.t0 = t0
+        self.marks: list = []  # [(階段, perf_counter)]
+
+    def mark(self, name: str) -> None:
+        self.marks.append((name, time.perf_counter()))
+
+    def report(self) -> dict:
+        phases, prev = {}, self.t0
+        for name, t in self.marks:
+            phases[name] = round((t - prev) * 1000, 1)
+            prev = t
+        return {
+            "phases_ms": phases,
+            "interactive_ms": round((prev - self.t0) * 1000, 1),
+            "modules_loaded": [f for f, _ in LazyModule.loaded],
+        }
 
-mod_clean = _try_load("檔名清理.py", "mod_clean")     # transform_filename()
-mod_json = _try_load("JSON生成v3.py", "mod_json")      # build_index()
-mod_uuid = _try_load("ufid64.py", "mod_uuid")          # ufid(), assign_ids_strict()
+    def describe(self) -> str:
+        r = self.report()
+        parts = " · ".join(f"{k} {v:.0f}" for k, v in r["phases_ms"].items())
+        return f"[啟動] 可互動 {r['interactive_ms']:.0f} ms（{parts}）"
 
 
 # --------------------------------------------------------------------------- #
@@ -92,106 +116,81 @@ def save_settings(data: dict) -> None:
 
 
 # --------------------------------------------------------------------------- #
-#  核心邏輯（與 GUI 解耦，皆接受 log 回呼）
+#  log 匯流（批次顯示、行數上限、完整紀錄寫檔）
 # --------------------------------------------------------------------------- #
-def clean_filenames(input_dir: Path, log) -> list:
-    """就地清理 input_dir 第一層的檔名。回傳 [(old, new), ...]。"""
-    if mod_clean is None:
-        raise RuntimeError("檔名清理.py 未載入，無法執行清理。")
-    changes = []
-    for p in sorted(input_dir.iterdir()):
-        if not p.is_file() or p.name.startswith("."):
-            continue
-        new_name = mod_clean.transform_filename(p.name)
-        if new_name == p.name:
-            continue
-        dst = p.with_name(new_name)
-        if dst.exists() and dst.resolve() != p.resolve():
-            log(f"[跳過] 目標已存在：{dst.name}")
-            continue
-        try:
-            p.rename(dst)
-            log(f"[更名] {p.name}  →  {dst.name}")
-            changes.append((p.name, dst.name))
-        except Exception as e:  # noqa: BLE001
-            log(f"[失敗] {p.name} → {dst.name}：{e}")
-    if not changes:
-        log("沒有需要更名的檔案。")
-    return changes
-
-
-def build_convert_cmd(input_dir: Path, output_dir: Path, opts: dict) -> list:
-    cmd = [sys.executable, str(SCRIPT_DIR / "轉檔v3.py"),
-           "-i", str(input_dir), "-o", str(output_dir)]
-    if opts.get("recursive"):
-        cmd.append("--recursive")
-    if opts.get("keep_channels"):
-        cmd.append("--stereo")
-    if opts.get("force"):
-        cmd.append("--force")
-    cmd += ["--sample-rate", str(opts.get("sample_rate", 32000))]
-    if opts.get("workers", 0):
-        cmd += ["--workers", str(opts["workers"])]
-    cmd += ["--I", str(opts.get("I", -14.0)),
-            "--TP", str(opts.get("TP", -1.5)),
-            "--LRA", str(opts.get("LRA", 11.0))]
-    return cmd
-
-
-def run_convert(input_dir: Path, output_dir: Path, opts: dict, log,
-                cancel_event: threading.Event) -> int:
-    """以子行程呼叫 轉檔v3.py，串流輸出到 log。回傳結束碼。"""
-    script = SCRIPT_DIR / "轉檔v3.py"
-    if not script.exists():
-        raise RuntimeError(f"找不到 轉檔v3.py：{script}")
-    cmd = build_convert_cmd(input_dir, output_dir, opts)
-    log("執行：" + " ".join(f'"{c}"' if " " in c else c for c in cmd))
-
-    env = os.environ.copy()
-    env["PYTHONUTF8"] = "1"
-    env["PYTHONIOENCODING"] = "UTF-8"
-
-    proc = subprocess.Popen(
-        cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-        env=env, text=True, encoding="utf-8", errors="replace", bufsize=1,
-    )
-    try:
-        for line in proc.stdout:
-            if cancel_event.is_set():
-                proc.terminate()
-                log("[中斷] 已要求停止轉檔。")
-                break
-            log(line.rstrip("\n"))
-    finally:
-        proc.stdout.close()
-        proc.wait()
-    return proc.returncode
-
-
-def generate_index(output_dir: Path, log) -> list:
-    """解析輸出資料夾的 MP3 檔名 → [{file, title, tags}]。"""
-    if mod_json is None:
-        raise RuntimeError("JSON生成v3.py 未載入，無法生成索引。")
-    data = mod_json.build_index(str(output_dir))
-    log(f"解析完成：共 {len(data)} 筆 MP3。")
-    return data
-
-
-def assign_uuids(entries: list, opts: dict, log) -> list:
-    """為 entries 計算 id（k=0，與 ufid64 預設一致）。回傳新 list。"""
-    if mod_uuid is None:
-        raise RuntimeError("ufid64.py 未載入，無法產生 UUID。")
-    nbytes = int(opts.get("nbytes", 4))
-    namespace = opts.get("namespace") or None
-    out = []
-    for e in entries:
-        e = dict(e)
-        f = e.get("file")
-        if isinstance(f, str) and f:
-            e["id"] = mod_uuid.ufid(f, namespace, 0, "nfkc", True, True, nbytes)
-        out.append(e)
-    log(f"已產生 {len(out)} 筆 id（bytes={nbytes}, namespace={namespace or '(無)'}）。")
-    return out
+LOG_MAX_LINES = 5000                     # 畫面保留行數（update_gui.json 的 log_max_lines 可調）
+LOG_FILE = SCRIPT_DIR / "logs" / "update_gui.log"
+LOG_FILE_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+# tqdm / ffmpeg 的進度行：同一個前綴的連續進度行只保留最後一行
+_RE_PROGRESS = re.compile(r"^(?P<key>.*?)\s*(?:\d{1,3}%\||\d+%\s*$|frame=\s*\d+|size=\s*\d+)")
+
+
+def _progress_key(line: str):
+    m = _RE_PROGRESS.match(line)
+    return m.group("key") if m else None
+
+
+class LogSink:
+    """
+    執行緒安全的 log 匯流。工作執行緒呼叫 write()，GUI 每個 tick 呼叫 take() 取出一批：
+      - 待顯示的行放在有上限的 deque，畫面卡住時最舊的行直接丟掉，記憶體不會無限成長
+      - 同一前綴的連續進度行（tqdm 的 \\r 更新經管線後會變成一行一行）合併為最後一行
+      - 每一行都完整寫入輪替檔（logs/update_gui.log），畫面只保留最近 max_lines 行
+    """
+
+    def __init__(self, max_lines: int = LOG_MAX_LINES, log_file: Path | None = LOG_FILE):
+        self.max_lines = max(100, int(max_lines))
+        self._lock = threading.Lock()
+        self._pending: deque = deque(maxlen=self.max_lines)
+        self._pending_progress = None   # _pending 最後一行的進度前綴
+        self._shown_progress = None     # 畫面最後一行的進度前綴
+        self._dropped = 0
+        self._file = None
+        if log_file is not None:
+            try:
+                log_file.parent.mkdir(parents=True, exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    log_file, maxBytes=LOG_FILE_BYTES, backupCount=LOG_FILE_BACKUPS,
+                    encoding="utf-8", delay=True)
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                self._file = logging.getLogger("update_gui.log_sink")
+                self._file.propagate = False
+                self._file.setLevel(logging.INFO)
+                self._file.handlers[:] = [handler]
+            except OSError as e:
+                print(f"[警告] 無法建立 log 檔：{e}")
+
+    def write(self, msg: str) -> None:
+        lines = str(msg).split("\n")
+        if self._file is not None:
+            for line in lines:
+                self._file.info(line)
+        with self._lock:
+            for line in lines:
+                key = _progress_key(line)
+                if key is not None and key == self._pending_progress and self._pending:
+                    self._pending[-1] = line
+                    continue
+                if len(self._pending) == self._pending.maxlen:
+                    self._dropped += 1
+                self._pending.append(line)
+                self._pending_progress = key
+
+    def take(self):
+        """取出目前累積的行。回傳 (是否先刪掉畫面最後一行, 行列表, 因上限丟棄的行數)。"""
+        with self._lock:
+            if not self._pending:
+                return False, [], 0
+            lines = list(self._pending)
+            self._pending.clear()
+            dropped, self._dropped = self._dropped, 0
+            first_key = _progress_key(lines[0])
+            replace_last = (not dropped and first_key is not None
+                            and first_key == self._shown_progress)
+            self._shown_progress = self._pending_progress
+            self._pending_progress = None
+        return replace_last, lines, dropped
 
 
 # --------------------------------------------------------------------------- #
@@ -446,20 +445,174 @@ class ConflictDialog(tk.Toplevel):
         self.destroy()
 
 
+# --------------------------------------------------------------------------- #
+#  虛擬化表格（大量資料時只把可見範圍放進 Treeview）
+# --------------------------------------------------------------------------- #
+VIRTUAL_WINDOW = 200   # 實際放進 Treeview 的列數（可見列 + 上下緩衝）
+VIRTUAL_MARGIN = 50    # 捲到離窗口邊緣這麼近時就換窗
+ALL_TAGS = "（全部）"
+
+
+def _entry_values(e: dict) -> tuple:
+    """解析結果 / 合併預覽共用的欄位：(id, file, title, tags)。"""
+    return (e.get("id", ""), e.get("file", ""), e.get("title", ""), ", ".join(e.get("tags", [])))
+
+
+class VirtualTable:
+    """
+    ttk.Treeview 的虛擬化包裝。資料以 key 清單表示（key 即 Treeview 的 iid），
+    每列內容由 row_values(key) / row_tags(key) 即時產生；Treeview 裡永遠只有約
+    VIRTUAL_WINDOW 列。窗口內照常原生捲動（滾輪、方向鍵、選取、bbox 都能用），
+    接近邊緣時才增量換窗：只刪掉移出窗口的列、補上新進的列。
+    捲軸對應整份資料；排序 / 篩選只重排 key 清單。
+    """
+
+    def __init__(self, parent, columns, row_values, row_tags=None):
+        self.row_values = row_values
+        self.row_tags = row_tags or (lambda key: ())
+        self.columns = [c[0] for c in columns]
+        self.tv = ttk.Treeview(parent, columns=self.columns, show="headings")
+        self._headings = {}
+        for name, text, width in columns:
+            self._headings[name] = text
+            self.tv.heading(name, text=text, command=lambda n=name: self.sort_by(n))
+            self.tv.column(name, width=width)
+        self.sb = ttk.Scrollbar(parent, orient="vertical", command=self._on_scrollbar)
+        self.tv.configure(yscrollcommand=self._on_tv_scroll)
+        self._keys: list = []
+        self._view: list = []
+        self._start = self._end = 0
+        self._filter = None
+        self._sort = None  # (欄位, 是否遞減)
+        self._recenter_pending = False
+        self._moving = False
+
+    # ---- 資料 ---- #
+    def __len__(self):
+        return len(self._view)
+
+    @property
+    def total(self) -> int:
+        return len(self._keys)
+
+    def set_keys(self, keys) -> None:
+        self._keys = list(keys)
+        self._rebuild()
+
+    def set_filter(self, pred) -> None:
+        """pred(key) -> bool；None 表示不篩選。"""
+        self._filter = pred
+        self._rebuild()
+
+    def sort_by(self, col: str) -> None:
+        reverse = bool(self._sort and self._sort[0] == col and not self._sort[1])
+        self._sort = (col, reverse)
+        for name, text in self._headings.items():
+            mark = (" ▼" if reverse else " ▲") if name == col else ""
+            self.tv.heading(name, text=text + mark)
+        self._rebuild()
+
+    def refresh_row(self, key) -> None:
+        """資料變更後更新該列（不在窗口內就不必動，換窗時會重新取值）。"""
+        if self.tv.exists(key):
+            self.tv.item(key, values=self.row_values(key), tags=self.row_tags(key))
+
+    def _rebuild(self) -> None:
+        view = self._keys if self._filter is None else [k for k in self._keys if self._filter(k)]
+        if self._sort is not None:
+            idx = self.columns.index(self._sort[0])
+            view = sorted(view, key=lambda k: str(self.row_values(k)[idx]).casefold(),
+                          reverse=self._sort[1])
+        self._view = list(view)
+        self.tv.delete(*self.tv.get_children())
+        self._start = self._end = 0
+        self._materialize(0)
+
+    # ---- 換窗 ---- #
+    def _materialize(self, top: int) -> None:
+        """讓 view[top] 位於畫面頂端；只增刪與目前窗口不重疊的列。"""
+        view, tv = self._view, self.tv
+        total = len(view)
+        top = max(0, min(top, total - 1)) if total else 0
+        ns = max(0, min(top - VIRTUAL_WINDOW // 4, total - VIRTUAL_WINDOW))
+        ne = min(total, ns + VIRTUAL_WINDOW)
+        s, e = self._start, self._end
+        sel = tv.selection()
+        if ne <= s or ns >= e:
+            tv.delete(*tv.get_children())
+            for i in range(ns, ne):
+                self._insert("end", view[i])
+        else:
+            drop = view[s:ns] + view[ne:e]
+            if drop:
+                tv.delete(*drop)
+            for i in range(s - 1, ns - 1, -1):
+                self._insert(0, view[i])
+            for i in range(max(e, ns), ne):
+                self._insert("end", view[i])
+        self._start, self._end = ns, ne
+        keep = [k for k in sel if tv.exists(k)]
+        if keep:
+            tv.selection_set(keep)
+        if ne > ns:
+            self._moving = True
+            try:
+                tv.yview_moveto((top - ns) / (ne - ns))
+            finally:
+                self._moving = False
+            first, last = tv.yview()
+            self._on_tv_scroll(first, last)
+        else:
+            self.sb.set(0.0, 1.0)
+
+    def _insert(self, index, key) -> None:
+        self.tv.insert("", index, iid=key, values=self.row_values(key), tags=self.row_tags(key))
+
+    def _on_tv_scroll(self, first, last) -> None:
+        total, w = len(self._view), self._end - self._start
+        if not total or not w:
+            self.sb.set(0.0, 1.0)
+            return
+        top = self._start + float(first) * w
+        bottom = self._start + float(last) * w
+        self.sb.set(top / total, bottom / total)
+        if self._moving or self._recenter_pending:
+            return
+        if ((top < self._start + VIRTUAL_MARGIN and self._start > 0)
+                or (bottom > self._end - VIRTUAL_MARGIN and self._end < total)):
+            self._recenter_pending = True
+            self.tv.after_idle(self._recenter)
+
+    def _recenter(self) -> None:
+        self._recenter_pending = False
+        first = self.tv.yview()[0]
+        self._materialize(int(round(self._start + first * (self._end - self._start))))
+
+    def _on_scrollbar(self, *args) -> None:
+        if args and args[0] == "moveto":
+            self._materialize(int(float(args[1]) * len(self._view)))
+        else:
+            self.tv.yview(*args)  # 上下箭頭 / 翻頁：窗口內原生捲動，接近邊緣自動換窗
+
+
 # --------------------------------------------------------------------------- #
 #  GUI
 # --------------------------------------------------------------------------- #
 class App:
-    def __init__(self, root: tk.Tk):
+    def __init__(self, root: tk.Tk, startup: StartupTimer | None = None):
         self.root = root
+        self.startup = startup or StartupTimer(_T_IMPORT)
         self.settings = load_settings()
-        self.log_queue: "queue.Queue[str]" = queue.Queue()
+        self.log_sink = LogSink(self.settings.get("log_max_lines", LOG_MAX_LINES))
+        self._log_lines = 0  # 畫面目前行數
         self.cancel_event = threading.Event()
         self.worker: threading.Thread | None = None
 
         self.entries: list = []        # 解析 + uuid 後的資料
         self.rename_changes: list = []  # (old, new)
         self.player = AudioPlayer()
+        self._store = None  # CatalogStore，依 sounds.json 路徑重用；解析結果依 mtime 快取
+        self.startup.mark("設定")
 
         root.title("音效處理工具 — 清理 ▸ 轉檔 ▸ JSON ▸ UUID ▸ 更新")
         root.geometry("980x720")
@@ -467,11 +620,22 @@ class App:
 
         self._build_vars()
         self._build_paths()
+        self.startup.mark("路徑")
         self._build_notebook()
+        self.startup.mark("分頁")
         self._build_statusbar()
 
         self.root.after(120, self._drain_log)
         self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.root.after_idle(self._on_ready)
+
+    def _on_ready(self):
+        """第一次 idle：視窗已可互動。處理模組與 sounds.json 都留到第一次使用才載入。"""
+        self.startup.mark("首次繪製")
+        self.log(self.startup.describe())
+        if self.startup.report()["interactive_ms"] > STARTUP_BUDGET_MS:
+            self.log(f"[警告] 啟動超過 {STARTUP_BUDGET_MS} ms")
+        LazyModule.on_load = lambda f, ms: self.log(f"[載入] {f}（{ms:.0f} ms）")
 
     # ---- 變數 -------------------------------------------------------------- #
     def _build_vars(self):
@@ -606,17 +770,12 @@ class App:
     def _tab_renames(self, nb):
         tab = ttk.Frame(nb)
         nb.add(tab, text="檔名變更")
-        cols = ("old", "new")
-        tv = ttk.Treeview(tab, columns=cols, show="headings")
-        tv.heading("old", text="原檔名")
-        tv.heading("new", text="新檔名")
-        tv.column("old", width=420)
-        tv.column("new", width=420)
-        ys = ttk.Scrollbar(tab, orient="vertical", command=tv.yview)
-        tv.configure(yscrollcommand=ys.set)
-        tv.pack(side="left", fill="both", expand=True, padx=(6, 0), pady=6)
-        ys.pack(side="right", fill="y", pady=6)
-        self.tv_renames = tv
+        self.tbl_renames = VirtualTable(
+            tab, [("old", "原檔名", 420), ("new", "新檔名", 420)],
+            row_values=lambda k: self.rename_changes[int(k)])
+        self.tbl_renames.tv.pack(side="left", fill="both", expand=True, padx=(6, 0), pady=6)
+        self.tbl_renames.sb.pack(side="right", fill="y", pady=6)
+        self.tv_renames = self.tbl_renames.tv
 
     # --- Tab 3：解析結果 --- #
     def _tab_results(self, nb):
@@ -627,6 +786,11 @@ class App:
         ttk.Button(bar, text="▶ 試聽選取", command=self._play_selected_result).pack(side="left")
         ttk.Button(bar, text="■ 停止", command=self.player.stop).pack(side="left", padx=(4, 12))
         ttk.Button(bar, text="匯出此結果為 JSON…", command=self._export_results).pack(side="left")
+        ttk.Label(bar, text="tag：").pack(side="left", padx=(12, 0))
+        self.cb_results_tag = ttk.Combobox(bar, state="readonly", width=12, values=[ALL_TAGS])
+        self.cb_results_tag.set(ALL_TAGS)
+        self.cb_results_tag.bind("<<ComboboxSelected>>", lambda _e: self._filter_results())
+        self.cb_results_tag.pack(side="left")
         self.lbl_results = ttk.Label(bar, text="尚無資料")
         self.lbl_results.pack(side="left", padx=12)
         ttk.Label(bar, text="（雙擊 title / tags 編輯；tags 以逗號分隔）",
@@ -634,16 +798,13 @@ class App:
 
         body = ttk.Frame(tab)
         body.pack(fill="both", expand=True, padx=6, pady=6)
-        cols = ("id", "file", "title", "tags")
-        tv = ttk.Treeview(body, columns=cols, show="headings")
-        for c, t, w in [("id", "id", 90), ("file", "file", 320),
-                        ("title", "title", 260), ("tags", "tags", 200)]:
-            tv.heading(c, text=t)
-            tv.column(c, width=w)
-        ys = ttk.Scrollbar(body, orient="vertical", command=tv.yview)
-        tv.configure(yscrollcommand=ys.set)
+        self.tbl_results = VirtualTable(
+            body, [("id", "id", 90), ("file", "file", 320),
+                   ("title", "title", 260), ("tags", "tags", 200)],
+            row_values=lambda k: _entry_values(self.entries[int(k)]))
+        tv = self.tbl_results.tv
         tv.pack(side="left", fill="both", expand=True)
-        ys.pack(side="right", fill="y")
+        self.tbl_results.sb.pack(side="right", fill="y")
         self.tv_results = tv
         self._results_editor = None
         tv.bind("<Double-1>", self._edit_results_cell)
@@ -704,10 +865,7 @@ class App:
         elif col_name == "tags":
             entry["tags"] = [t.strip() for t in new_val.split(",") if t.strip()]
         # 更新顯示（tags 以正規化後的逗號分隔重新呈現）
-        tv = self.tv_results
-        row = str(entry_idx)
-        tv.set(row, "title", entry.get("title", ""))
-        tv.set(row, "tags", ", ".join(entry.get("tags", [])))
+        self.tbl_results.refresh_row(str(entry_idx))
         self.log(f"[編輯] {entry.get('file', '')} 的 {col_name} → "
                  f"{entry.get(col_name) if col_name == 'title' else ', '.join(entry.get('tags', []))}")
 
@@ -723,22 +881,26 @@ class App:
                         variable=self.var_overwrite_dup).pack(side="left", padx=12)
         ttk.Button(top, text="✔ 更新 JSON（備份後寫入）",
                    command=self.do_update_json).pack(side="left", padx=4)
+        ttk.Label(top, text="tag：").pack(side="left", padx=(12, 0))
+        self.cb_merge_tag = ttk.Combobox(top, state="readonly", width=12, values=[ALL_TAGS])
+        self.cb_merge_tag.set(ALL_TAGS)
+        self.cb_merge_tag.bind("<<ComboboxSelected>>", lambda _e: self._filter_merge())
+        self.cb_merge_tag.pack(side="left")
         self.lbl_merge = ttk.Label(tab, text="按「預覽差異」檢視將新增 / 重複的項目。")
         self.lbl_merge.pack(fill="x", padx=8)
 
         body = ttk.Frame(tab)
         body.pack(fill="both", expand=True, padx=6, pady=6)
-        cols = ("status", "id", "file", "title", "tags")
-        tv = ttk.Treeview(body, columns=cols, show="headings")
-        for c, t, w in [("status", "狀態", 70), ("id", "id", 90),
-                        ("file", "file", 300), ("title", "title", 240),
-                        ("tags", "tags", 160)]:
-            tv.heading(c, text=t)
-            tv.column(c, width=w)
-        ys = ttk.Scrollbar(body, orient="vertical", command=tv.yview)
-        tv.configure(yscrollcommand=ys.set)
+        self._merge_rows: list = []  # [(狀態, tag, entry)]
+        self.tbl_merge = VirtualTable(
+            body, [("status", "狀態", 70), ("id", "id", 90),
+                   ("file", "file", 300), ("title", "title", 240),
+                   ("tags", "tags", 160)],
+            row_values=lambda k: (self._merge_rows[int(k)][0],) + _entry_values(self._merge_rows[int(k)][2]),
+            row_tags=lambda k: (self._merge_rows[int(k)][1],))
+        tv = self.tbl_merge.tv
         tv.pack(side="left", fill="both", expand=True)
-        ys.pack(side="right", fill="y")
+        self.tbl_merge.sb.pack(side="right", fill="y")
         tv.tag_configure("new", background="#e6ffe6")
         tv.tag_configure("dup", background="#fff2e6")
         self.tv_merge = tv
@@ -755,18 +917,29 @@ class App:
     #  log / 執行緒工具
     # ------------------------------------------------------------------ #
     def log(self, msg: str):
-        self.log_queue.put(str(msg))
+        self.log_sink.write(msg)
 
     def _drain_log(self):
-        try:
-            while True:
-                msg = self.log_queue.get_nowait()
-                self.log_text.configure(state="normal")
-                self.log_text.insert("end", msg + "\n")
-                self.log_text.see("end")
-                self.log_text.configure(state="disabled")
-        except queue.Empty:
-            pass
+        """每個 tick 把累積的行一次插入，並把畫面維持在 max_lines 行以內。"""
+        replace_last, lines, dropped = self.log_sink.take()
+        if lines:
+            t = self.log_text
+            at_bottom = t.yview()[1] >= 0.999
+            t.configure(state="normal")
+            if replace_last and self._log_lines:
+                t.delete("end-2l", "end-1l")
+                self._log_lines -= 1
+            if dropped:
+                lines.insert(0, f"…（略過 {dropped} 行，完整內容見 {LOG_FILE}）")
+            t.insert("end", "\n".join(lines) + "\n")
+            self._log_lines += len(lines)
+            excess = self._log_lines - self.log_sink.max_lines
+            if excess > 0:
+                t.delete("1.0", f"{excess + 1}.0")
+                self._log_lines -= excess
+            t.configure(state="disabled")
+            if at_bottom:
+                t.see("end")
         self.root.after(120, self._drain_log)
 
     def _set_busy(self, busy: bool):
@@ -799,6 +972,9 @@ class App:
         self.cancel_event.set()
         self.log("[中斷] 已要求停止…")
 
+    def _convert_progress(self, text: str):
+        self.root.after(0, lambda: self.status.set(text))
+
     # ------------------------------------------------------------------ #
     #  驗證 / 設定
     # ------------------------------------------------------------------ #
@@ -851,13 +1027,41 @@ class App:
     # ------------------------------------------------------------------ #
     #  動作
     # ------------------------------------------------------------------ #
+    def _ask_journal(self):
+        """
+        輸入資料夾有上次中斷的更名紀錄時，詢問續跑或還原。
+        回傳 "resume" / "rollback"；沒有紀錄回傳 None；使用者取消回傳 False。
+        """
+        p = self.var_in.get().strip()
+        if not p or not Path(p).is_dir():
+            return None  # 交給 _need_dir 報錯
+        try:
+            pending = pending_journal(Path(p))
+        except (OSError, ValueError) as e:
+            messagebox.showerror("錯誤", f"無法讀取中斷的更名紀錄：{e}")
+            return False
+        if not pending:
+            return None
+        total, done = pending
+        ans = messagebox.askyesnocancel(
+            "上次更名未完成",
+            f"輸入資料夾有上次中斷的更名紀錄：共 {total} 步，已完成 {done} 步。\n\n"
+            "是：續跑，完成上次的更名\n否：還原到上次更名前\n取消：不執行")
+        if ans is None:
+            self.log("[取消] 輸入資料夾有未完成的更名紀錄，未執行。")
+            return False
+        return "resume" if ans else "rollback"
+
     def do_clean(self):
         self._persist()
+        journal = self._ask_journal()
+        if journal is False:
+            return
 
         def task():
             in_dir = self._need_dir(self.var_in, "輸入資料夾")
             self.log("\n=== 1. 檔名清理 ===")
-            changes = clean_filenames(in_dir, self.log)
+            changes = clean_filenames(in_dir, self.log, journal)
             self.rename_changes = changes
             self.root.after(0, self._refresh_renames)
 
@@ -874,7 +1078,11 @@ class App:
             out_dir = Path(out)
             out_dir.mkdir(parents=True, exist_ok=True)
             self.log("\n=== 2. 轉檔 ===")
-            rc = run_convert(in_dir, out_dir, self._collect_opts(), self.log, self.cancel_event)
+            rc = run_convert(in_dir, out_dir, self._collect_opts(), self.log, self.cancel_event,
+                             self._convert_progress)
+            if self.cancel_event.is_set():
+                self.log("[中斷] 轉檔已停止。")
+                return
             if rc != 0:
                 raise RuntimeError(f"轉檔結束碼非 0：{rc}")
             self.log("[完成] 轉檔。")
@@ -909,6 +1117,9 @@ class App:
 
     def do_all(self):
         self._persist()
+        journal = self._ask_journal()
+        if journal is False:
+            return
 
         def task():
             in_dir = self._need_dir(self.var_in, "輸入資料夾")
@@ -920,17 +1131,19 @@ class App:
             opts = self._collect_opts()
 
             self.log("\n=== 1. 檔名清理 ===")
-            self.rename_changes = clean_filenames(in_dir, self.log)
+            self.rename_changes = clean_filenames(in_dir, self.log, journal)
             self.root.after(0, self._refresh_renames)
             if self.cancel_event.is_set():
                 return
 
             self.log("\n=== 2. 轉檔 ===")
-            rc = run_convert(in_dir, out_dir, opts, self.log, self.cancel_event)
-            if rc != 0:
-                raise RuntimeError(f"轉檔結束碼非 0：{rc}")
+            rc = run_convert(in_dir, out_dir, opts, self.log, self.cancel_event,
+                             self._convert_progress)
             if self.cancel_event.is_set():
+                self.log("[中斷] 轉檔已停止。")
                 return
+            if rc != 0:
+                raise RuntimeError(f"轉檔結束碼非 0：{rc}")
 
             self.log("\n=== 3. 生成 JSON ===")
             data = generate_index(out_dir, self.log)
@@ -945,27 +1158,31 @@ class App:
     # ------------------------------------------------------------------ #
     #  更新 sounds.json
     # ------------------------------------------------------------------ #
-    def _load_sounds(self) -> tuple[Path, list]:
+    def _catalog(self):
+        """目前 sounds.json 的 CatalogStore；路徑不變就重用，檔案沒變就不重新解析。"""
         p = Path(self.var_sounds.get().strip())
         if not p.exists():
             raise RuntimeError(f"找不到 sounds.json：{p}")
-        data = json.loads(p.read_text(encoding="utf-8"))
-        if not isinstance(data, list):
-            raise RuntimeError("sounds.json 最外層必須是陣列。")
-        return p, data
+        if not mod_store:
+            raise RuntimeError("catalog_store.py 未載入，無法讀取 sounds.json。")
+        if self._store is None or self._store.path != p:
+            self._store = mod_store.CatalogStore(p)
+        return self._store
+
+    def _load_sounds(self) -> tuple[Path, list]:
+        """回傳 (路徑, 記錄)。記錄為快取中的物件，僅供讀取。"""
+        store = self._catalog()
+        try:
+            return store.path, store.records
+        except mod_store.CatalogError as e:
+            raise RuntimeError(str(e)) from e
 
     def _compute_merge(self):
         """回傳 (existing, new_entries, dup_entries)。"""
         if not self.entries:
             raise RuntimeError("尚無解析結果，請先執行步驟 1~4。")
         _, existing = self._load_sounds()
-        existing_files = {e.get("file") for e in existing if isinstance(e, dict)}
-        new_entries, dup_entries = [], []
-        for e in self.entries:
-            if e.get("file") in existing_files:
-                dup_entries.append(e)
-            else:
-                new_entries.append(e)
+        new_entries, dup_entries = split_merge(existing, self.entries)
         return existing, new_entries, dup_entries
 
     def preview_merge(self):
@@ -974,16 +1191,11 @@ class App:
         except Exception as e:  # noqa: BLE001
             messagebox.showerror("錯誤", str(e))
             return
-        tv = self.tv_merge
-        tv.delete(*tv.get_children())
-        for e in new_entries:
-            tv.insert("", "end", tags=("new",), values=(
-                "新增", e.get("id", ""), e.get("file", ""),
-                e.get("title", ""), ", ".join(e.get("tags", []))))
-        for e in dup_entries:
-            tv.insert("", "end", tags=("dup",), values=(
-                "重複", e.get("id", ""), e.get("file", ""),
-                e.get("title", ""), ", ".join(e.get("tags", []))))
+        self._merge_rows = ([("新增", "new", e) for e in new_entries]
+                            + [("重複", "dup", e) for e in dup_entries])
+        self._set_tag_choices(self.cb_merge_tag, (r[2] for r in self._merge_rows))
+        self.tbl_merge.set_filter(None)
+        self.tbl_merge.set_keys(str(i) for i in range(len(self._merge_rows)))
         self.lbl_merge.configure(
             text=(f"現有 {len(existing)} 筆；本次解析 {len(self.entries)} 筆 → "
                   f"新增 {len(new_entries)} 筆、重複 {len(dup_entries)} 筆。"))
@@ -1022,7 +1234,7 @@ class App:
                f"  新增：{len(new_entries)} 筆\n"
                f"  重複：{len(dup_entries)} 筆"
                + (f"（略過 {n_skip}、覆寫 {n_over}、重新命名 {n_ren}）" if dup_entries else "")
-               + f"\n\n舊檔會先備份為 sounds-old.json。確定要寫入嗎？")
+               + f"\n\n本次變更會記錄在 sounds.history.jsonl，可再復原。確定要寫入嗎？")
         if not messagebox.askyesno("確認更新", msg):
             return
 
@@ -1030,79 +1242,17 @@ class App:
 
         def task():
             self.log("\n=== 5. 更新 sounds.json ===")
-            sounds_path = Path(self.var_sounds.get().strip())
-            old_path = sounds_path.with_name("sounds-old.json")
-            output_dir = Path(self.var_out.get().strip() or ".")
-            opts = self._collect_opts()
-            nbytes = int(opts.get("nbytes", 4))
-            namespace = opts.get("namespace") or None
-
-            shutil.copy2(sounds_path, old_path)
-            self.log(f"[備份] {sounds_path.name} → {old_path.name}")
-
-            merged = copy.deepcopy(existing)
-            by_file = {e.get("file"): i for i, e in enumerate(merged)
-                       if isinstance(e, dict)}
-            dup_by_file = {e.get("file"): e for e in dup_entries}
-
-            n_skip = n_over = n_ren = 0
-            extra_new = []  # 重新命名後當作新增
-            for f, res in resolutions.items():
-                src = dup_by_file.get(f)
-                if src is None:
-                    continue
-                action = res["action"]
-                if action == "skip":
-                    n_skip += 1
-                elif action == "overwrite":
-                    idx = by_file.get(f)
-                    if idx is not None:
-                        merged[idx] = dict(src)
-                    n_over += 1
-                elif action == "rename":
-                    new_file = res["new_file"]
-                    old_fp = output_dir / f
-                    new_fp = output_dir / new_file
-                    if old_fp.exists():
-                        if new_fp.exists():
-                            raise RuntimeError(f"重新命名目標已存在：{new_fp}")
-                        old_fp.rename(new_fp)
-                        self.log(f"[更名] {f} → {new_file}")
-                    else:
-                        self.log(f"[警告] 找不到輸出檔，僅更新資料：{old_fp}")
-                    # 更新原解析資料（self.entries 共用同一物件）
-                    src["file"] = new_file
-                    if mod_uuid is not None:
-                        src["id"] = mod_uuid.ufid(new_file, namespace, 0,
-                                                  "nfkc", True, True, nbytes)
-                    extra_new.append(dict(src))
-                    n_ren += 1
-
-            new_all = [dict(e) for e in new_entries] + extra_new
-            merged.extend(new_all)
-            self.log(f"[新增] 加入 {len(new_all)} 筆"
-                     + (f"（含 {n_ren} 筆重新命名）" if n_ren else "") + "。")
-            if dup_entries:
-                self.log(f"[重複] 略過 {n_skip}、覆寫 {n_over}、重新命名 {n_ren}。")
-
-            # 以 ufid 補/驗證 id（保留既有、補缺、偵測碰撞）
-            if mod_uuid is not None:
-                opts = self._collect_opts()
-                try:
-                    changed = mod_uuid.assign_ids_strict(
-                        merged, opts.get("namespace") or None, False,
-                        "nfkc", True, True, "warn", int(opts.get("nbytes", 4)))
-                    self.log(f"[UUID] 補/更新 {changed} 筆 id。")
-                except SystemExit as se:
-                    raise RuntimeError(f"id 碰撞或驗證失敗：{se}")
-
-            text = json.dumps(merged, ensure_ascii=False, indent=SOUNDS_INDENT)
-            sounds_path.write_text(text + "\n", encoding="utf-8")
-            self.log(f"[完成] 已寫入 {sounds_path}（共 {len(merged)} 筆）。")
-            if n_ren:
+            r = merge_into_catalog(self._catalog(), new_entries, dup_entries, resolutions,
+                                   Path(self.var_out.get().strip() or "."),
+                                   self._collect_opts(), self.log)
+            if r["version"] is None:
+                return
+            if r["renamed"]:
                 self.root.after(0, self._refresh_results)  # 反映重新命名後的 file/id
+            version = r["version"]
             self.root.after(0, lambda: messagebox.showinfo(
-                "完成", f"已更新 sounds.json，共 {len(merged)} 筆。\n備份：{old_path.name}"))
+                "完成", f"已更新 sounds.json，共 {r['total']} 筆（版本 v{version}）。\n"
+                        f"復原：python catalog_store.py undo --to {version - 1}"))
 
         self._run_async(task)
 
@@ -1132,21 +1282,40 @@ class App:
         self._play(Path(out) / self.entries[idx].get("file", ""))
 
     def _refresh_renames(self):
-        tv = self.tv_renames
-        tv.delete(*tv.get_children())
-        for old, new in self.rename_changes:
-            tv.insert("", "end", values=(old, new))
+        self.tbl_renames.set_keys(str(i) for i in range(len(self.rename_changes)))
 
     def _refresh_results(self):
-        tv = self.tv_results
         self._destroy_results_editor()
-        tv.delete(*tv.get_children())
-        for i, e in enumerate(self.entries):
-            tv.insert("", "end", iid=str(i), values=(
-                e.get("id", ""), e.get("file", ""),
-                e.get("title", ""), ", ".join(e.get("tags", []))))
+        self._set_tag_choices(self.cb_results_tag, self.entries)
+        self.tbl_results.set_filter(None)
+        self.tbl_results.set_keys(str(i) for i in range(len(self.entries)))
         self.lbl_results.configure(text=f"共 {len(self.entries)} 筆")
 
+    @staticmethod
+    def _set_tag_choices(cb, entries):
+        tags = sorted({t for e in entries for t in e.get("tags", [])})
+        cb.configure(values=[ALL_TAGS] + tags)
+        cb.set(ALL_TAGS)
+
+    @staticmethod
+    def _tag_filter(cb, entry_of):
+        tag = cb.get()
+        if tag == ALL_TAGS:
+            return None
+        return lambda k: tag in entry_of(k).get("tags", [])
+
+    def _filter_results(self):
+        self._destroy_results_editor()
+        self.tbl_results.set_filter(
+            self._tag_filter(self.cb_results_tag, lambda k: self.entries[int(k)]))
+        shown = len(self.tbl_results)
+        self.lbl_results.configure(
+            text=f"共 {len(self.entries)} 筆" + (f"（顯示 {shown} 筆）" if shown != len(self.entries) else ""))
+
+    def _filter_merge(self):
+        self.tbl_merge.set_filter(
+            self._tag_filter(self.cb_merge_tag, lambda k: self._merge_rows[int(k)][2]))
+
     def _export_results(self):
         if not self.entries:
             messagebox.showinfo("無資料", "尚無解析結果可匯出。")
@@ -1171,13 +1340,30 @@ class App:
 
 
 def main():
+    ap = argparse.ArgumentParser(description="音效處理一條龍 GUI")
+    ap.add_argument("--startup-report", action="store_true",
+                    help=f"視窗可互動後印出啟動耗時 JSON 並結束（超過 {STARTUP_BUDGET_MS} ms 結束碼為 1）")
+    args = ap.parse_args()
+
+    startup = StartupTimer(_T_IMPORT)
     root = tk.Tk()
     try:
         ttk.Style().theme_use("vista")  # Windows 預設較美觀
     except tk.TclError:
         pass
-    App(root)
+    startup.mark("Tk")
+    App(root, startup)
+    rc = 0
+    if args.startup_report:
+        def report():
+            nonlocal rc
+            r = startup.report()
+            print(json.dumps(r, ensure_ascii=False, indent=2))
+            rc = 1 if r["interactive_ms"] > STARTUP_BUDGET_MS else 0
+            root.destroy()  # 不經 _on_close，避免改寫 update_gui.json
+        root.after_idle(lambda: root.after_idle(report))
     root.mainloop()
+    sys.exit(rc)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+型錄完整驗證（一次平行跑完，輸出結構化 JSON 報告）
+========================================
+檢查項目：
+  ids    ── id 唯一、與 ufid 參數一致（重用 ufid64._verify_existing_ids）
+  files  ── sounds.json 的檔案存在；sounds/ 內沒有未登錄的 MP3
+  tags   ── 每個 tag 都定義在 config/tags.json
+  votes  ── config/vote-results.json 的 id 都存在於 sounds.json
+  audio  ── 每個 MP3 可完整解碼（ffmpeg），時長 / 位元率在合理範圍（ffprobe）
+
+音訊檢查以執行緒池平行呼叫 ffmpeg/ffprobe，結果依 (size, mtime_ns) 快取；
+未變更的檔案直接沿用上次結果，整庫夜間重跑只需數秒。
+有 error（或 --strict 下有 warning）時以結束碼 1 結束，方便 CI 使用。
+
+用法：
+  python validate_catalog.py                       # 報告輸出到 stdout
+  python validate_catalog.py -o report.json --workers 8
+  python validate_catalog.py --no-audio            # 只檢查資料（不需 ffmpeg）
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import ufid64
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+DEFAULT_SOUNDS = PROJECT_ROOT / "config" / "sounds.json"
+DEFAULT_TAGS = PROJECT_ROOT / "config" / "tags.json"
+DEFAULT_VOTES = PROJECT_ROOT / "config" / "vote-results.json"
+DEFAULT_SOUNDS_DIR = PROJECT_ROOT / "sounds"
+DEFAULT_CACHE = SCRIPT_DIR / "validate_cache.json"
+CACHE_VERSION = 1
+
+
+def issue(level: str, message: str, **extra) -> dict:
+    d = {"level": level, "message": message}
+    d.update(extra)
+    return d
+
+
+def _load_json(path: Path):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+# --------------------------------------------------------------------------- #
+#  資料檢查
+# --------------------------------------------------------------------------- #
+def check_ids(records: list, namespace: Optional[str], nbytes: Optional[int]) -> List[dict]:
+    issues = []
+    dup = ufid64._find_duplicates(records)
+    for idv, idxs in dup.items():
+        issues.append(issue("error", f"id 重複：{len(idxs)} 筆", id=idv,
+                            files=[records[i].get("file") for i in idxs]))
+    for i, obj in enumerate(records):
+        if isinstance(obj, dict) and obj.get("id") is None:
+            issues.append(issue("error", "缺少 id", index=i, file=obj.get("file")))
+    nbytes = nbytes or ufid64._infer_nbytes(records) or 4
+    for note in ufid64._verify_existing_ids(records, namespace, "nfkc", True, True, nbytes):
+        issues.append(issue("warning", note))
+    return issues
+
+
+def check_files(records: list, sounds_dir: Path) -> List[dict]:
+    issues = []
+    listed = set()
+    for obj in records:
+        f = obj.get("file") if isinstance(obj, dict) else None
+        if not isinstance(f, str) or not f:
+            issues.append(issue("error", "缺少 file 欄位", id=obj.get("id") if isinstance(obj, dict) else None))
+            continue
+        listed.add(f)
+        if not (sounds_dir / f).is_file():
+            issues.append(issue("error", "音檔不存在", file=f))
+    for root, _, files in os.walk(sounds_dir):
+        for fn in files:
+            if fn.lower().endswith(".mp3"):
+                rel = os.path.relpath(os.path.join(root, fn), sounds_dir).replace("\\", "/")
+                if rel not in listed:
+                    issues.append(issue("warning", "音檔未登錄於 sounds.json", file=rel))
+    return issues
+
+
+def check_tags(records: list, tags: list) -> List[dict]:
+    known = {t.get("key") for t in tags if isinstance(t, dict)}
+    issues = []
+    for obj in records:
+        if not isinstance(obj, dict):
+            continue
+        for t in obj.get("tags", []) or []:
+            if t not in known:
+                issues.append(issue("error", f"未定義的 tag：{t}", file=obj.get("file"), tag=t))
+    return issues
+
+
+def check_votes(records: list, votes: list) -> List[dict]:
+    ids = {str(obj.get("id")) for obj in records if isinstance(obj, dict)}
+    issues = []
+    for i, v in enumerate(votes):
+        vid = v.get("id") if isinstance(v, dict) else None
+        if not vid:
+            issues.append(issue("error", "票選項目缺少 id", index=i, title=(v or {}).get("title")))
+        elif str(vid) not in ids:
+            issues.append(issue("error", "票選 id 不在 sounds.json", index=i, id=vid, title=v.get("title")))
+    return issues
+
+
+# --------------------------------------------------------------------------- #
+#  音訊檢查（ffprobe + ffmpeg 解碼，平行 + 快取）
+# --------------------------------------------------------------------------- #
+def probe_audio(path: Path) -> dict:
+    """回傳 {duration, bit_rate, codec, sample_rate, decode_error}。"""
+    res = {"duration": None, "bit_rate": None, "codec": None, "sample_rate": None, "decode_error": None}
+    p = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries",
+         "format=duration,bit_rate:stream=codec_name,sample_rate", "-select_streams", "a:0",
+         "-of", "json", str(path)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if p.returncode == 0:
+        data = json.loads(p.stdout.decode("utf-8", "replace") or "{}")
+        fmt = data.get("format", {})
+        stream = (data.get("streams") or [{}])[0]
+        res["duration"] = float(fmt["duration"]) if fmt.get("duration") else None
+        res["bit_rate"] = int(fmt["bit_rate"]) if fmt.get("bit_rate") else None
+        res["codec"] = stream.get("codec_name")
+        res["sample_rate"] = int(stream["sample_rate"]) if stream.get("sample_rate") else None
+    # -xerror：遇到第一個解碼錯誤就失敗
+    d = subprocess.run(["ffmpeg", "-v", "error", "-xerror", "-i", str(path), "-f", "null", "-"],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    err = d.stderr.decode("utf-8", "replace").strip()
+    if d.returncode != 0 or err:
+        res["decode_error"] = err or f"ffmpeg 結束碼 {d.returncode}"
+    return res
+
+
+def audio_issues(file: str, res: dict, limits: dict) -> List[dict]:
+    issues = []
+    if res.get("decode_error"):
+        issues.append(issue("error", f"解碼失敗：{res['decode_error'][:300]}", file=file))
+    dur = res.get("duration")
+    if not dur:
+        issues.append(issue("error", "無法取得時長", file=file))
+    elif dur > limits["max_duration"]:
+        issues.append(issue("warning", f"時長過長：{dur:.1f}s", file=file))
+    if res.get("codec") not in (None, "mp3"):
+        issues.append(issue("warning", f"編碼不是 mp3：{res['codec']}", file=file))
+    br = res.get("bit_rate")
+    if br and not (limits["min_bitrate"] <= br <= limits["max_bitrate"]):
+        issues.append(issue("warning", f"位元率異常：{br // 1000} kbps", file=file))
+    return issues
+
+
+def load_cache(path: Optional[Path]) -> Dict[str, dict]:
+    if path is None or not path.exists():
+        return {}
+    try:
+        data = _load_json(path)
+    except Exception:  # noqa: BLE001
+        return {}
+    return data.get("files", {}) if data.get("version") == CACHE_VERSION else {}
+
+
+def save_cache(path: Optional[Path], files: Dict[str, dict]) -> None:
+    if path is None:
+        return
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"version": CACHE_VERSION, "files": files}, ensure_ascii=False),
+                   encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def check_audio(records: list, sounds_dir: Path, workers: int, cache_path: Optional[Path],
+                limits: dict) -> tuple:
+    """回傳 (issues, stats)。只有 (size, mtime_ns) 改變的檔案才重新檢查。"""
+    cache = load_cache(cache_path)
+    fresh: Dict[str, dict] = {}
+    todo = []
+    for obj in records:
+        f = obj.get("file") if isinstance(obj, dict) else None
+        if not isinstance(f, str) or not f.lower().endswith(".mp3"):
+            continue
+        p = sounds_dir / f
+        try:
+            st = p.stat()
+        except OSError:
+            continue  # 不存在的檔案由 files 檢查回報
+        hit = cache.get(f)
+        if hit and hit["size"] == st.st_size and hit["mtime_ns"] == st.st_mtime_ns:
+            fresh[f] = hit
+        else:
+            todo.append((f, p, st))
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        for (f, _, st), res in zip(todo, ex.map(lambda t: probe_audio(t[1]), todo)):
+            fresh[f] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "result": res}
+    save_cache(cache_path, fresh)
+
+    issues = []
+    for f in sorted(fresh):
+        issues += audio_issues(f, fresh[f]["result"], limits)
+    return issues, {"checked": len(todo), "cached": len(fresh) - len(todo)}
+
+
+# --------------------------------------------------------------------------- #
+#  主流程
+# --------------------------------------------------------------------------- #
+def validate(sounds_path: Path, sounds_dir: Path, tags_path: Path, votes_path: Path,
+             namespace: Optional[str] = None, nbytes: Optional[int] = None,
+             audio: bool = True, workers: int = 0, cache_path: Optional[Path] = DEFAULT_CACHE,
+             limits: Optional[dict] = None) -> dict:
+    t0 = time.perf_counter()
+    limits = limits or {"max_duration": 600.0, "min_bitrate": 32000, "max_bitrate": 330000}
+    workers = workers if workers > 0 else min(32, (os.cpu_count() or 1) * 2)
+    records = _load_json(sounds_path)
+    if not isinstance(records, list):
+        raise SystemExit("sounds.json 最外層必須是陣列。")
+
+    checks: Dict[str, dict] = {}
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        # 音訊檢查（I/O 與子行程為主）與資料檢查同時進行
+        audio_future = None
+        if audio:
+            if shutil.which("ffmpeg") and shutil.which("ffprobe"):
+                audio_future = ex.submit(check_audio, records, sounds_dir, workers, cache_path, limits)
+            else:
+                checks["audio"] = {"status": "skipped", "reason": "找不到 ffmpeg/ffprobe", "issues": []}
+        checks["ids"] = {"issues": check_ids(records, namespace, nbytes)}
+        checks["files"] = {"issues": check_files(records, sounds_dir)}
+        checks["tags"] = {"issues": check_tags(records, _load_json(tags_path))}
+        checks["votes"] = {"issues": check_votes(records, _load_json(votes_path))}
+        if audio_future is not None:
+            issues, stats = audio_future.result()
+            checks["audio"] = {"issues": issues, **stats}
+
+    n_err = n_warn = 0
+    for c in checks.values():
+        levels = Counter(i["level"] for i in c["issues"])
+        n_err += levels["error"]
+        n_warn += levels["warning"]
+        c.setdefault("status", "error" if levels["error"] else ("warning" if levels["warning"] else "ok"))
+    return {
+        "generated": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "summary": {"records": len(records), "errors": n_err, "warnings": n_warn,
+                    "elapsed_s": round(time.perf_counter() - t0, 3)},
+        "checks": checks,
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="平行驗證整個音效型錄並輸出 JSON 報告。")
+    ap.add_argument("--sounds", default=str(DEFAULT_SOUNDS), help="sounds.json 路徑")
+    ap.add_argument("--sounds-dir", default=str(DEFAULT_SOUNDS_DIR), help="音檔資料夾")
+    ap.add_argument("--tags", default=str(DEFAULT_TAGS), help="tags.json 路徑")
+    ap.add_argument("--votes", default=str(DEFAULT_VOTES), help="vote-results.json 路徑")
+    ap.add_argument("-o", "--output", default="-", help='報告輸出路徑（預設 "-" 為 stdout）')
+    ap.add_argument("--namespace", default=None, help="ufid namespace（驗證 id 一致性用）")
+    ap.add_argument("--bytes", dest="nbytes", type=int, choices=[4, 8, 16], default=None,
+                    help="ufid 長度（預設由既有 id 推測）")
+    ap.add_argument("--no-audio", action="store_true", help="略過音訊解碼 / 時長 / 位元率檢查")
+    ap.add_argument("--workers", type=int, default=0, help="音訊檢查並行數（0=自動）")
+    ap.add_argument("--cache", default=str(DEFAULT_CACHE), help="音訊檢查快取檔")
+    ap.add_argument("--no-cache", action="store_true", help="不讀寫快取（全部重新檢查）")
+    ap.add_argument("--max-duration", type=float, default=600.0, help="時長上限（秒），預設 600")
+    ap.add_argument("--min-bitrate", type=int, default=32, help="位元率下限（kbps），預設 32")
+    ap.add_argument("--max-bitrate", type=int, default=330, help="位元率上限（kbps），預設 330")
+    ap.add_argument("--strict", action="store_true", help="有 warning 也以結束碼 1 結束")
+    args = ap.parse_args()
+
+    report = validate(
+        Path(args.sounds), Path(args.sounds_dir), Path(args.tags), Path(args.votes),
+        namespace=args.namespace, nbytes=args.nbytes, audio=not args.no_audio,
+        workers=args.workers, cache_path=None if args.no_cache else Path(args.cache),
+        limits={"max_duration": args.max_duration, "min_bitrate": args.min_bitrate * 1000,
+                "max_bitrate": args.max_bitrate * 1000})
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    s = report["summary"]
+    print(f"驗證完成：{s['records']} 筆，error {s['errors']}、warning {s['warnings']}"
+          f"（{s['elapsed_s']}s）", file=sys.stderr)
+    failed = s["errors"] or (args.strict and s["warnings"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+票選結果匯入與排名表
+========================================
+config/vote-results.json 原本由 misc/ 的票選 CSV 手動整理，頁面再於執行時排序、切片。
+此腳本讀取一或多屆票選的 CSV，依 id 對應 sounds.json，預先算好排名表：
+
+  config/vote-rankings.json   每屆（以及多屆合計）的總排名、各標籤排名、前 N 名切片
+  config/vote-results.json    最新一屆的結果（格式不變：title / votes / tags / id，依票數排序）
+
+  - CSV 可帶 BOM；欄位依表頭辨識（標題 / 得票數 / 標籤 / 網址，或 title / votes / tags / id），
+    標籤以 | 分隔；.csv.gz 直接讀取
+  - 逐列串流累加：同一 id 出現多次時票數相加，沒有得票數欄的匯出（一列一票）每列算 1 票；
+    記憶體只與音效數有關，與列數無關
+  - 網址欄不是 id 時嘗試還原：分享網址的 sound= / list=（多個候選時以標題比對）、
+    重複貼上兩次的 id；仍對不上 sounds.json 的列計入「未對應」並列出前幾筆
+  - 排名為「同票同名次」（1、2、2、4）；同票依 CSV 中第一次出現的順序
+  - 標題、標籤以 sounds.json 為準（CSV 內是投票當時的快照）
+  - 輸出只取決於輸入內容，沒變就不改寫
+
+頁面仍只讀 vote-results.json（已依票數排好，頁面只切前 topRankCount 筆；build_page.py
+再把這段內嵌進頁面），不讀 vote-rankings.json：整份排名表（各標籤、多屆）比頁面需要的
+大得多，因此不發佈（publish_assets.PUBLIC_FILES 不含），供維護者查詢與之後的頁面功能使用。
+
+用法：
+  python vote_rankings.py                                  # misc/ 下所有 *票選結果*.csv，依檔名中的「第N屆」排序
+  python vote_rankings.py 第一屆=../misc/第一屆音效板票選結果.csv 第二屆=export.csv.gz
+  python vote_rankings.py --top 10 30 --dry-run
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from publish_assets import write_if_changed
+from ufid_registry import sha256_file
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+DEFAULT_SOUNDS = REPO_ROOT / "config" / "sounds.json"
+DEFAULT_RANKINGS = REPO_ROOT / "config" / "vote-rankings.json"
+DEFAULT_RESULTS = REPO_ROOT / "config" / "vote-results.json"
+DEFAULT_GLOB = "*票選結果*.csv"
+# 檔名中的屆數：第3屆、第三屆、第十二屆
+_ROUND_RE = re.compile(r"第\s*([0-9０-９]+|[〇零一二兩三四五六七八九十百]+)\s*屆")
+_CN_DIGITS = {ch: i for i, ch in enumerate("零一二三四五六七八九")}
+_CN_DIGITS.update({"〇": 0, "兩": 2})
+RANKINGS_VERSION = 1
+DEFAULT_TOP = (10, 30)  # 同頁面 CONFIG.awards.top10Count / topRankCount
+UNRESOLVED_SAMPLES = 10
+# 表頭別名 → 欄位
+COLUMNS = {
+    "id": ("網址", "id", "ID", "url"),
+    "votes": ("得票數", "票數", "votes"),
+    "title": ("標題", "title"),
+    "tags": ("標籤", "tags"),
+}
+
+
+# --------------------------------------------------------------------------- #
+#  讀取與對應                                                                  #
+# --------------------------------------------------------------------------- #
+
+def _open_text(path: Path) -> io.TextIOBase:
+    # utf-8-sig：有 BOM 時去掉，沒有也照常讀
+    if path.suffix == ".gz":
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8-sig", newline="")
+    return open(path, "r", encoding="utf-8-sig", newline="")
+
+
+def _columns(header: List[str]) -> Dict[str, int]:
+    idx = {h.strip(): i for i, h in enumerate(header)}
+    cols = {}
+    for key, names in COLUMNS.items():
+        for n in names:
+            if n in idx:
+                cols[key] = idx[n]
+                break
+    if "id" not in cols:
+        raise ValueError(f"找不到 id 欄（表頭：{', '.join(header)}）")
+    return cols
+
+
+def iter_rows(path: Path) -> Iterator[Tuple[str, int, str, List[str]]]:
+    """逐列產生 (ref, 票數, 標題, 標籤)；沒有得票數欄時每列 1 票。"""
+    with _open_text(path) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        cols = _columns(header)
+
+        def cell(row: List[str], key: str) -> str:
+            i = cols.get(key)
+            return row[i].strip() if i is not None and i < len(row) else ""
+
+        for lineno, row in enumerate(reader, start=2):
+            if not any(c.strip() for c in row):
+                continue
+            raw = cell(row, "votes")
+            try:
+                votes = int(raw) if "votes" in cols else 1
+            except ValueError:
+                raise ValueError(f"{path.name} 第 {lineno} 列得票數不是整數：{raw!r}") from None
+            tags = [t.strip() for t in cell(row, "tags").split("|") if t.strip()]
+            yield cell(row, "id"), votes, cell(row, "title"), tags
+
+
+class Resolver:
+    """CSV 的網址欄 → sounds.json 的 id。"""
+
+    def __init__(self, sounds: list):
+        self.title: Dict[str, str] = {}
+        for s in sounds:
+            if isinstance(s, dict) and s.get("id"):
+                self.title[s["id"]] = s.get("title", "")
+
+    def __call__(self, ref: str, title: str) -> Tuple[Optional[str], bool]:
+        """回傳 (id 或 None, 是否經過還原)。"""
+        if ref in self.title:
+            return ref, False
+        if "://" in ref or ref.startswith("?"):
+            q = parse_qs(urlsplit(ref).query)
+            cands = q.get("sound", []) + [i for v in q.get("list", []) for i in v.split(",")]
+            cands = list(dict.fromkeys(c for c in cands if c in self.title))
+            if len(cands) > 1:
+                cands = [c for c in cands if title and self.title[c] == title]
+            return (cands[0], True) if len(cands) == 1 else (None, False)
+        half = len(ref) // 2
+        if ref and len(ref) % 2 == 0 and ref[:half] == ref[half:] and ref[:half] in self.title:
+            return ref[:half], True
+        return None, False
+
+
+class Tally:
+    """單屆（或合計）的累加：id → [票數, 第一次出現的順序]。"""
+
+    def __init__(self):
+        self.votes: Dict[str, List[int]] = {}
+        self.rows = 0
+        self.recovered = 0
+        self.unresolved = 0
+        self.unresolved_votes = 0
+        self.samples: List[str] = []
+
+    def add(self, sid: str, votes: int) -> None:
+        e = self.votes.get(sid)
+        if e is None:
+            self.votes[sid] = [votes, len(self.votes)]
+        else:
+            e[0] += votes
+
+    def merge(self, other: "Tally") -> None:
+        for sid, (votes, _) in sorted(other.votes.items(), key=lambda kv: kv[1][1]):
+            self.add(sid, votes)
+        for k in ("rows", "recovered", "unresolved", "unresolved_votes"):
+            setattr(self, k, getattr(self, k) + getattr(other, k))
+
+    def ordered(self) -> List[Tuple[str, int]]:
+        """[(id, 票數)]，票數由高到低，同票依第一次出現的順序；不含 0 票以下。"""
+        items = [(sid, v, seen) for sid, (v, seen) in self.votes.items() if v > 0]
+        items.sort(key=lambda x: (-x[1], x[2]))
+        return [(sid, v) for sid, v, _ in items]
+
+
+def tally_csv(path: Path, resolve: Resolver) -> Tally:
+    t = Tally()
+    for ref, votes, title, _ in iter_rows(path):
+        t.rows += 1
+        sid, recovered = resolve(ref, title)
+        if sid is None:
+            t.unresolved += 1
+            t.unresolved_votes += votes
+            if len(t.samples) < UNRESOLVED_SAMPLES:
+                t.samples.append(f"{title or '（無標題）'}：{ref or '（空白）'}")
+            continue
+        t.recovered += recovered
+        t.add(sid, votes)
+    return t
+
+
+# --------------------------------------------------------------------------- #
+#  排名表                                                                      #
+# --------------------------------------------------------------------------- #
+
+def ranked(items: List[Tuple[str, int]]) -> List[dict]:
+    """同票同名次（1、2、2、4）。"""
+    out, rank, prev = [], 0, None
+    for pos, (sid, v) in enumerate(items, start=1):
+        if v != prev:
+            rank, prev = pos, v
+        out.append({"id": sid, "votes": v, "rank": rank})
+    return out
+
+
+def tables(t: Tally, sounds_by_id: Dict[str, dict], top: List[int]) -> dict:
+    items = t.ordered()
+    by_tag: Dict[str, List[Tuple[str, int]]] = {}
+    for sid, v in items:
+        for tag in sounds_by_id.get(sid, {}).get("tags", []):
+            by_tag.setdefault(tag, []).append((sid, v))
+    return {
+        "rows": t.rows,
+        "votes": sum(v for _, v in items),
+        "sounds": len(items),
+        "recovered": t.recovered,
+        "unresolved": t.unresolved,
+        "unresolved_votes": t.unresolved_votes,
+        "overall": ranked(items),
+        "top": {str(n): [sid for sid, _ in items[:n]] for n in top},
+        "by_tag": {tag: ranked(lst) for tag, lst in sorted(by_tag.items(), key=lambda kv: (-len(kv[1]), kv[0]))},
+    }
+
+
+def vote_results(t: Tally, sounds_by_id: Dict[str, dict]) -> list:
+    """vote-results.json 的格式（頁面、precache_manifest.py、load_test.py 讀取）。"""
+    return [{"title": sounds_by_id[sid].get("title", ""), "votes": v,
+             "tags": list(sounds_by_id[sid].get("tags", [])), "id": sid}
+            for sid, v in t.ordered()]
+
+
+def round_number(name: str) -> Optional[int]:
+    """檔名中「第N屆」的 N（阿拉伯或中文數字）；沒有時回傳 None。"""
+    m = _ROUND_RE.search(name)
+    if not m:
+        return None
+    s = m.group(1)
+    if s[0] not in _CN_DIGITS and s[0] not in "十百":
+        return int(s)  # int() 也接受全形數字
+    total, cur = 0, 0
+    for ch in s:
+        if ch in _CN_DIGITS:
+            cur = _CN_DIGITS[ch]
+        else:  # 十、百
+            total += (cur or 1) * (10 if ch == "十" else 100)
+            cur = 0
+    return total + cur
+
+
+def sort_rounds(paths: List[Path]) -> List[Path]:
+    """
+    依檔名中的屆數排序（字串排序會把「第三屆」排在「第二屆」前面）。
+    兩個以上的檔案時，判斷不出屆數或屆數重複就報錯，要求以「名稱=CSV」依時間順序指定。
+    """
+    if len(paths) < 2:
+        return list(paths)
+    numbered = [(round_number(p.stem), p) for p in paths]
+    unknown = [p.name for n, p in numbered if n is None]
+    if unknown:
+        raise ValueError(f"無法從檔名判斷屆數：{', '.join(unknown)}；請以「名稱=CSV」依時間順序指定各屆")
+    nums = [n for n, _ in numbered]
+    if len(set(nums)) != len(nums):
+        raise ValueError(f"檔名中的屆數重複：{', '.join(p.name for p in paths)}；請以「名稱=CSV」依時間順序指定各屆")
+    return [p for _, p in sorted(numbered, key=lambda t: t[0])]
+
+
+def parse_rounds(items: List[str]) -> List[Tuple[str, Path]]:
+    """「名稱=路徑」或只給路徑（名稱取檔名）；沒給就找 misc/ 下的票選 CSV（依屆數排序）。"""
+    if not items:
+        found = sort_rounds(sorted((REPO_ROOT / "misc").glob(DEFAULT_GLOB)))
+        return [(p.stem, p) for p in found]
+    rounds = []
+    for item in items:
+        name, sep, path = item.partition("=")
+        if not sep:
+            name, path = "", item
+        p = Path(path)
+        rounds.append((name or re.sub(r"\.csv$", "", p.name.removesuffix(".gz")), p))
+    names = [n for n, _ in rounds]
+    if len(set(names)) != len(names):
+        raise ValueError(f"各屆名稱不可重複：{', '.join(names)}")
+    return rounds
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="匯入票選 CSV，產生排名表與 vote-results.json")
+    ap.add_argument("rounds", nargs="*", metavar="[名稱=]CSV",
+                    help=f"各屆票選 CSV，依時間順序（預設：misc/{DEFAULT_GLOB}，依檔名中的「第N屆」排序）")
+    ap.add_argument("--sounds", default=str(DEFAULT_SOUNDS), help="音效清單（預設：config/sounds.json）")
+    ap.add_argument("--out", default=str(DEFAULT_RANKINGS), help="排名表（預設：config/vote-rankings.json）")
+    ap.add_argument("--results", default=str(DEFAULT_RESULTS),
+                    help="最新一屆的 vote-results.json（空字串 = 不輸出）")
+    ap.add_argument("--top", type=int, nargs="+", default=list(DEFAULT_TOP), help="前 N 名切片")
+    ap.add_argument("--dry-run", action="store_true", help="只顯示報告，不寫檔")
+    ap.add_argument("--json", action="store_true", help="以 JSON 輸出報告")
+    args = ap.parse_args()
+
+    try:
+        rounds = parse_rounds(args.rounds)
+        if not rounds:
+            raise ValueError(f"misc/ 下沒有符合 {DEFAULT_GLOB} 的檔案，請指定 CSV")
+        sounds = json.loads(Path(args.sounds).read_text(encoding="utf-8"))
+        resolve = Resolver(sounds)
+        sounds_by_id = {s["id"]: s for s in sounds if isinstance(s, dict) and s.get("id")}
+        top = sorted(set(n for n in args.top if n > 0))
+        tallies = [(name, path, tally_csv(path, resolve)) for name, path in rounds]
+    except (OSError, ValueError) as e:
+        print(f"匯入失敗：{e}", file=sys.stderr)
+        return 2
+
+    out_rounds = []
+    for name, path, t in tallies:
+        try:
+            source = path.resolve().relative_to(REPO_ROOT).as_posix()
+        except ValueError:
+            source = path.name
+        out_rounds.append({"name": name, "source": source, "sha256": sha256_file(path),
+                           **tables(t, sounds_by_id, top)})
+    result = {"version": RANKINGS_VERSION, "rounds": out_rounds}
+    if len(tallies) > 1:
+        total = Tally()
+        for _, _, t in tallies:
+            total.merge(t)
+        result["combined"] = tables(total, sounds_by_id, top)
+
+    dump = lambda obj: (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")  # noqa: E731
+    rankings_written = write_if_changed(Path(args.out), dump(result), args.dry_run)
+    results_written = None
+    latest = tallies[-1][2]
+    if args.results:
+        data = (json.dumps(vote_results(latest, sounds_by_id), ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+        results_written = write_if_changed(Path(args.results), data, args.dry_run)
+
+    summary = [{k: r[k] for k in ("name", "rows", "votes", "sounds", "recovered", "unresolved", "unresolved_votes")}
+               | {"tags": len(r["by_tag"])} for r in out_rounds]
+    if args.json:
+        print(json.dumps({"rounds": summary, "rankings_written": rankings_written,
+                          "results_written": results_written, "dry_run": args.dry_run}, ensure_ascii=False, indent=2))
+        return 0
+    verb = "會" if args.dry_run else "已"
+    for r, (_, _, t) in zip(summary, tallies):
+        print(f"[{r['name']}] {r['rows']} 列 → {r['sounds']} 個音效、{r['votes']} 票、{r['tags']} 個標籤"
+              + (f"；還原網址 {r['recovered']} 列" if r["recovered"] else "")
+              + (f"；未對應 {r['unresolved']} 列（{r['unresolved_votes']} 票）" if r["unresolved"] else ""))
+        for s in t.samples:
+            print(f"    未對應：{s}")
+    if "combined" in result:
+        c = result["combined"]
+        print(f"[合計] {len(tallies)} 屆 → {c['sounds']} 個音效、{c['votes']} 票")
+    head = (result.get("combined") or out_rounds[-1])["overall"][:min(top or [10])]
+    for e in head:
+        print(f"  {e['rank']:>3}. {e['votes']:>4} 票  {sounds_by_id[e['id']].get('title', '')}")
+    print(f"{args.out}：{verb + '更新' if rankings_written else '未變'}"
+          + (f"；{args.results}：{verb + '更新' if results_written else '未變'}（{tallies[-1][0]}）"
+             if results_written is not None else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,11 +10,21 @@
 4) 將連續方括弧片段 [A][B][C] → [A,B,C]，也解析全形［］
 5) 清理方括弧內外空白（例如 " [ A ] " → "[A]"、"foo [A]" → "foo[A]"、"[A] bar" → "[A]bar"）
 
+更名先整批規劃（rename_plan.py）：鏈狀 / 循環更名會排好順序或經暫存名完成，
+執行過程寫入 journal，失敗或中斷時可還原。
+
 可選：
   --include-hidden  # 若也想處理以 . 開頭的隱藏檔
+  --dry-run         # 只列出更名計畫，不實際更名
+  --resume / --rollback  # 處理上次中斷留下的 journal
+  --recursive       # 遞迴處理所有子資料夾（各資料夾平行，--workers 控制）
+  --self-check N    # 以 N 個隨機檔名驗證編譯版規則與 transform_filename 一致
+  --bench N         # 以 N 個合成檔名量測規則耗時（含各階段）
 """
 
+import os
 import re
+import sys
 import argparse
 from pathlib import Path
 
@@ -98,7 +108,191 @@ def transform_filename(original_name: str) -> str:
 
     return new_name
 
+# ---- 編譯版規則 ---- #
+# 與 transform_filename 結果完全相同（--self-check 驗證），但把單字元替換併成一張
+# translate 表、多個 replace / re.sub 併成少數預先編譯的 regex，且只在檔名含有
+# 觸發字元時才執行該步驟（大部分檔名只會跑其中兩三步）。
+# 全形括弧與各種 dash 不會影響方括弧 / 空白的比對，因此可以最先一次轉換。
+# 新增規則時：同時加進 transform_filename_compiled 與 _STAGES，
+# 再跑 --self-check（三者須一致）與 --bench（看該階段成本）。
+_TRANSLATE = str.maketrans({"［": "[", "］": "]", "－": "-", "╴": "-", "–": "-", "—": "-"})
+_RE_TRANSLATE_CHARS = re.compile("[［］－╴–—]")
+_RE_BRACKET_INNER = re.compile(r"\[\s*([^][]*?)\s*\]")
+_RE_BRACKET_OUTER = re.compile(r"\s+(?=\[)|(?<=\])\s+")
+_RE_NAME_UNDERSCORE = re.compile(r"(?<=[萬狗豹貓瓦鼠雞])_")
+_RE_DASH_SPACE = re.compile(r"\s*-\s*")
+_RE_BRACKET_RUN = re.compile(r"(?:\[\s*[^][]*?\s*\]\s*){2,}")
+_RE_BRACKET_TOKEN = re.compile(r"\[\s*([^][]*?)\s*\]")
+_RE_DASH_BEFORE_EXT = re.compile(r"-\.(?=[^.]+$)")
+
+
+def _strip_inner(m: re.Match) -> str:
+    return f"[{m.group(1).strip()}]"
+
+
+def _combine_run(m: re.Match) -> str:
+    tokens = [t.strip() for t in _RE_BRACKET_TOKEN.findall(m.group(0))]
+    return "[" + ",".join(t for t in tokens if t) + "]"
+
+
+def transform_filename_compiled(original_name: str) -> str:
+    """transform_filename 的編譯版（結果相同；實際檔名約快 2～3 倍）。"""
+    dot_idx = original_name.rfind(".")
+    if dot_idx > 0:
+        base, ext = original_name[:dot_idx], original_name[dot_idx:]
+    else:
+        base, ext = original_name, ""
+    if _RE_TRANSLATE_CHARS.search(base):
+        base = base.translate(_TRANSLATE)
+    if "[" in base or "]" in base:
+        base = _RE_BRACKET_INNER.sub(_strip_inner, base)
+        base = _RE_BRACKET_OUTER.sub("", base)
+        if "[sus]" in base:
+            base = base.replace("[sus]", "[SUS]")
+    if "_" in base:
+        base = _RE_NAME_UNDERSCORE.sub("-", base)
+    if "-" in base:
+        base = _RE_DASH_SPACE.sub("-", base)
+    if base.count("[") > 1:
+        base = _RE_BRACKET_RUN.sub(_combine_run, base)
+    new_name = base.rstrip("-") + ext
+    if "-." in new_name:
+        new_name = _RE_DASH_BEFORE_EXT.sub(".", new_name)
+    return new_name.strip()
+
+
+# 與 transform_filename_compiled 相同的步驟（不含觸發判斷），供 --bench 分項計時
+_STAGES = [
+    ("translate", lambda s: s.translate(_TRANSLATE)),
+    ("bracket-inner", lambda s: _RE_BRACKET_INNER.sub(_strip_inner, s)),
+    ("bracket-outer", lambda s: _RE_BRACKET_OUTER.sub("", s)),
+    ("sus", lambda s: s.replace("[sus]", "[SUS]")),
+    ("name-underscore", lambda s: _RE_NAME_UNDERSCORE.sub("-", s)),
+    ("dash-space", lambda s: _RE_DASH_SPACE.sub("-", s)),
+    ("bracket-run", lambda s: _RE_BRACKET_RUN.sub(_combine_run, s)),
+    ("rstrip-dash", lambda s: s.rstrip("-")),
+]
+
+
+def _transform_by_stages(original_name: str) -> str:
+    dot_idx = original_name.rfind(".")
+    if dot_idx > 0:
+        base, ext = original_name[:dot_idx], original_name[dot_idx:]
+    else:
+        base, ext = original_name, ""
+    for _, stage in _STAGES:
+        base = stage(base)
+    return _RE_DASH_BEFORE_EXT.sub(".", base + ext).strip()
+
+# ---- 自我檢查 / 效能量測 ---- #
+_FUZZ_ALPHABET = (list("ab萬狗豹貓瓦鼠雞_-.[]［］－╴–— \t　,")
+                  + ["[sus]", "[ sus ]", "萬_", " - ", "][", ".mp3", "x"])
+
+
+def _random_name(rng) -> str:
+    return "".join(rng.choice(_FUZZ_ALPHABET) for _ in range(rng.randint(0, 24)))
+
+
+def self_check(samples: int, seed: int = 0, extra=()) -> int:
+    """隨機產生檔名比對原版、編譯版與分階段版；回傳不一致的數量（並印出前幾筆）。"""
+    import random
+    rng = random.Random(seed)
+    bad = 0
+    names = list(extra) + [_random_name(rng) for _ in range(samples)]
+    for name in names:
+        want = transform_filename(name)
+        got = transform_filename_compiled(name)
+        staged = _transform_by_stages(name)
+        if want != got or want != staged:
+            bad += 1
+            if bad <= 10:
+                print(f"[不一致] {name!r}: 原版 {want!r} / 編譯版 {got!r} / 分階段 {staged!r}")
+    print(f"自我檢查：{len(names)} 個檔名，{bad} 個不一致。")
+    return bad
+
+
+def bench(n: int, seed: int = 0) -> None:
+    """以 n 個合成檔名量測：原版、編譯版，以及編譯版每個階段的耗時。"""
+    import random
+    import time
+    rng = random.Random(seed)
+    words = ["阿萬", "下去", "最棒的", "音效", "開燈啊", "SUS", "笑", "迷因", "良心", "何在"]
+    prefixes = ["萬_", "狗 - ", "豹－", "貓_", "瓦 — ", "鼠", "雞_", "多人-"]
+    tags = ["", " [笑]", " [ sus ]", "［迷因］[笑]", " [A] [B] [C] ", "[阿邁]"]
+    corpus = [
+        rng.choice(prefixes) + "".join(rng.choices(words, k=rng.randint(1, 3)))
+        + rng.choice(tags) + rng.choice(["", "-", " - "]) + ".mp3"
+        for _ in range(n)
+    ]
+    for label, fn in (("原版", transform_filename), ("編譯版", transform_filename_compiled)):
+        t0 = time.perf_counter()
+        for name in corpus:
+            fn(name)
+        dt = time.perf_counter() - t0
+        print(f"{label:6} {dt:7.2f}s  {dt / n * 1e6:6.2f} µs/檔名")
+    bases = [c[:c.rfind(".")] for c in corpus]
+    print("各階段（不含觸發判斷，即最壞情況）：")
+    for label, stage in _STAGES:
+        t0 = time.perf_counter()
+        bases = [stage(b) for b in bases]
+        print(f"  {label:16} {(time.perf_counter() - t0) / n * 1e6:6.2f} µs/檔名")
+
+# ---- 遞迴 / 平行 ---- #
+def _clean_dir(args) -> tuple:
+    """處理單一資料夾（每個資料夾各自一份 journal）。回傳 (訊息, 更名數, 跳過數, 失敗)。"""
+    import rename_plan
+    directory, include_hidden, dry_run = args
+    lines = []
+    plan = rename_plan.plan_renames(directory, transform_filename_compiled, include_hidden=include_hidden)
+    if dry_run:
+        if plan.renames or plan.skipped:
+            lines.append(f"== {directory}")
+            plan.describe(lines.append)
+        return lines, len(plan.renames), len(plan.skipped), False
+    for src, dst, why in plan.skipped:
+        lines.append(f"[跳過] {Path(directory, src)} -> {dst}：{why}")
+    try:
+        rename_plan.execute(plan, log=lambda s: lines.append(f"{s}  ({directory})"))
+    except rename_plan.RenameError as e:
+        lines.append(f"[失敗] {directory}：{e}")
+        return lines, 0, len(plan.skipped), True
+    return lines, len(plan.renames), len(plan.skipped), False
+
+
+def _iter_dirs(root: Path, include_hidden: bool):
+    for dirpath, dirnames, _ in os.walk(root):
+        if not include_hidden:
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        dirnames.sort()
+        yield dirpath
+
+
+def clean_tree(root: Path, include_hidden: bool, dry_run: bool, workers: int) -> bool:
+    """遞迴處理 root 下所有資料夾（只更名檔案，資料夾名稱不變，因此可平行）。"""
+    dirs = list(_iter_dirs(root, include_hidden))
+    jobs = [(d, include_hidden, dry_run) for d in dirs]
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    if workers > 1 and len(dirs) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(dirs))) as ex:
+            results = list(ex.map(_clean_dir, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        results = [_clean_dir(j) for j in jobs]
+    total = skipped = 0
+    failed = False
+    for lines, n, s, f in results:
+        for line in lines:
+            print(line)
+        total += n
+        skipped += s
+        failed = failed or f
+    verb = "預計更名" if dry_run else "已更名"
+    print(f"{len(dirs)} 個資料夾，{verb} {total} 個、跳過 {skipped} 個。")
+    return not failed
+
 def main() -> None:
+    # 延後載入：其他工具（update_gui、檢查音效一致性）只借用 transform_filename
+    import rename_plan
     parser = argparse.ArgumentParser(description="整理腳本目錄中的檔名（直接更名）。")
     parser.add_argument("input_dir_pos", nargs="?", default=None, help="輸入資料夾（無旗標位置參數）")
     parser.add_argument("-i", "--input", dest="input_dir_cli", default=None, help="輸入資料夾（與位置參數擇一提供）")
@@ -107,33 +301,54 @@ def main() -> None:
         "--include-hidden", action="store_true",
         help="包含隱藏檔（以 . 開頭）"
     )
+    parser.add_argument("--dry-run", action="store_true", help="只列出更名計畫，不實際更名")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--resume", action="store_true", help="依上次中斷留下的 journal 繼續更名")
+    group.add_argument("--rollback", action="store_true", help="依上次中斷留下的 journal 還原")
+    parser.add_argument("-r", "--recursive", action="store_true", help="遞迴處理所有子資料夾的檔案")
+    parser.add_argument("--workers", type=int, default=0, help="遞迴模式的並行行程數（0=CPU 數，1=不平行）")
+    parser.add_argument("--self-check", type=int, metavar="N", default=None,
+                        help="以 N 個隨機檔名（加上輸入資料夾內的檔名）驗證編譯版規則後結束")
+    parser.add_argument("--bench", type=int, metavar="N", default=None,
+                        help="以 N 個合成檔名量測規則耗時後結束（例如 1000000）")
     args = parser.parse_args()
 
     root = Path(args.input_dir_cli or args.input_dir_pos or Path(__file__).resolve().parent).resolve()
-    items = sorted(root.iterdir())
-
-    changed = False
-    for p in items:
-        if not p.is_file():
-            continue
-        if not args.include_hidden and p.name.startswith("."):
-            continue
-
-        new_name = transform_filename(p.name)
-        if new_name != p.name:
-            dst = p.with_name(new_name)
-            if dst.exists() and dst.resolve() != p.resolve():
-                print(f"[跳過] 目標已存在：{dst.name}")
-                continue
-            try:
-                p.rename(dst)
-                print(f"[完成] {p.name} -> {dst.name}")
-                changed = True
-            except Exception as e:
-                print(f"[失敗] {p.name} -> {dst.name}：{e}")
-
-    if not changed:
+
+    if args.self_check is not None:
+        existing = [n for _, _, files in os.walk(root) for n in files]
+        sys.exit(1 if self_check(args.self_check, extra=existing) else 0)
+    if args.bench is not None:
+        bench(args.bench)
+        return
+
+    if args.resume or args.rollback:
+        mode = "resume" if args.resume else "rollback"
+        dirs = _iter_dirs(root, args.include_hidden) if args.recursive else [root]
+        for d in dirs:
+            if (Path(d) / rename_plan.JOURNAL_NAME).exists():
+                rename_plan.recover(Path(d), mode)
+        return
+
+    if args.recursive:
+        if not clean_tree(root, args.include_hidden, args.dry_run, args.workers):
+            sys.exit(1)
+        return
+
+    plan = rename_plan.plan_renames(root, transform_filename_compiled, include_hidden=args.include_hidden)
+    if args.dry_run:
+        plan.describe()
+        return
+    for src, dst, why in plan.skipped:
+        print(f"[跳過] {src} -> {dst}：{why}")
+    if not plan.renames:
         print("沒有需要更名的檔案。")
+        return
+    try:
+        rename_plan.execute(plan)
+    except rename_plan.RenameError as e:
+        print(f"[失敗] {e}")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -5,6 +5,9 @@
 
 比對 sounds 資料夾中的實際檔案與 sounds.json 中的條目，
 找出不一致的地方（缺少 JSON 條目或檔案不存在）。
+對兩邊多出來的檔名，以「正規化鍵」做雜湊比對（O(n)），找出相似但不完全相同的配對：
+    NFKC → 易混淆字元表 → 檔名清理.transform_filename 的 dash / 方括弧規則 → casefold
+（易混淆字元要先換成 '-'、'[' 等，檔名清理的 dash 與方括弧空白規則才認得）
 
 使用方式：
     python 檢查音效一致性.py
@@ -13,9 +16,93 @@
     python python-scripts/檢查音效一致性.py
 """
 
+import difflib
+import importlib.util
 import json
 import os
 import sys
+import unicodedata
+from collections import defaultdict
+
+# 外觀相近、NFKC 不會合併的字元 → 正規化後的代表字元（None＝刪除）
+CONFUSABLES = str.maketrans({
+    # dash / 長音
+    '\u2010': '-', '\u2011': '-', '\u2012': '-', '\u2013': '-', '\u2014': '-',
+    '\u2015': '-', '\u2212': '-', '\u2500': '-', '\u2574': '-', '\u30fc': '-', '\uff70': '-',
+    # 波浪號
+    '\u301c': '~', '\u223c': '~', '\u02dc': '~',
+    # 引號 / 撇號
+    '\u2018': "'", '\u2019': "'", '\u02bc': "'", '\u2032': "'", '`': "'", '\u00b4': "'",
+    '\u201c': '"', '\u201d': '"', '\u2033': '"',
+    # 括弧
+    '\u3010': '[', '\u3011': ']', '\u3014': '[', '\u3015': ']', '\u3016': '[', '\u3017': ']',
+    # 中點 / 頓號類
+    '\u30fb': '.', '\u00b7': '.', '\u2027': '.', '\u2219': '.',
+    # 西里爾 / 希臘字母中長得像拉丁字母者
+    '\u0430': 'a', '\u0435': 'e', '\u043e': 'o', '\u0440': 'p', '\u0441': 'c',
+    '\u0445': 'x', '\u0443': 'y', '\u0456': 'i', '\u0458': 'j', '\u0455': 's',
+    '\u0410': 'A', '\u0412': 'B', '\u0415': 'E', '\u041a': 'K', '\u041c': 'M',
+    '\u041d': 'H', '\u041e': 'O', '\u0420': 'P', '\u0421': 'C', '\u0422': 'T', '\u0425': 'X',
+    '\u0391': 'A', '\u0392': 'B', '\u0395': 'E', '\u0396': 'Z', '\u0397': 'H', '\u0399': 'I',
+    '\u039a': 'K', '\u039c': 'M', '\u039d': 'N', '\u039f': 'O', '\u03a1': 'P', '\u03a4': 'T',
+    '\u03a5': 'Y', '\u03a7': 'X', '\u03bf': 'o',
+    # 零寬字元
+    '\u200b': None, '\u200c': None, '\u200d': None, '\u2060': None, '\ufeff': None,
+})
+
+
+def _load_transform_filename():
+    """載入 檔名清理.transform_filename（檔名含中文，用 importlib 依路徑載入）；失敗時退回不轉換。"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '檔名清理.py')
+    try:
+        spec = importlib.util.spec_from_file_location('mod_clean', path)
+        mod = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mod)
+        return mod.transform_filename
+    except Exception as e:  # noqa: BLE001
+        print(f'[警告] 無法載入 檔名清理.py（{e}），正規化鍵不含 dash/方括弧規則')
+        return lambda name: name
+
+
+def confusable_key(name, transform_filename):
+    """相似檔名的比對鍵：NFKC → 易混淆字元表 → 檔名清理規則（逐層路徑）→ casefold。"""
+    s = unicodedata.normalize('NFKC', name).translate(CONFUSABLES)
+    s = '/'.join(transform_filename(part) for part in s.replace('\\', '/').split('/'))
+    return s.casefold()
+
+
+def code_point_diffs(a, b):
+    """列出兩字串不同的片段：[(位置, a 片段, b 片段), ...]。"""
+    diffs = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag != 'equal':
+            diffs.append((i1, a[i1:i2], b[j1:j2]))
+    return diffs
+
+
+def _fmt_chars(s):
+    if not s:
+        return '（無）'
+    return ' '.join(f'"{c}" (U+{ord(c):04X})' for c in s)
+
+
+def find_similar_pairs(in_json_not_folder, in_folder_not_json, transform_filename=None):
+    """
+    以正規化鍵做雜湊比對（O(n)），回傳所有鍵相同的 (JSON 檔名, 資料夾檔名, 差異) 配對。
+    同一鍵下兩邊各有多筆時，列出全部組合。
+    """
+    if transform_filename is None:
+        transform_filename = _load_transform_filename()
+    by_key = defaultdict(list)
+    for f in in_json_not_folder:
+        by_key[confusable_key(f, transform_filename)].append(f)
+    pairs = []
+    for actual_file in sorted(in_folder_not_json):
+        for json_file in by_key.get(confusable_key(actual_file, transform_filename), ()):
+            pairs.append((json_file, actual_file, code_point_diffs(json_file, actual_file)))
+    pairs.sort()
+    return pairs
+
 
 def get_project_root():
     """取得專案根目錄（此腳本的上層目錄）"""
@@ -82,32 +169,29 @@ def check_sound_consistency():
         print('🔍 可能的檔名字元差異（相似但不完全相同）:')
         print('=' * 60)
         
-        found_similar = False
-        for json_file in sorted(in_json_not_folder):
-            # 正規化比對：將全形字元轉半形
-            json_normalized = json_file.replace('～', '~').replace('！', '!').replace('？', '?')
-            
-            for actual_file in in_folder_not_json:
-                actual_normalized = actual_file.replace('～', '~').replace('！', '!').replace('？', '?')
-                
-                if json_normalized == actual_normalized:
-                    found_similar = True
-                    print(f'\n   JSON:     {json_file}')
-                    print(f'   資料夾:   {actual_file}')
-                    # 找出差異字元
-                    for i, (c1, c2) in enumerate(zip(json_file, actual_file)):
-                        if c1 != c2:
-                            print(f'   差異位置 {i}: "{c1}" (U+{ord(c1):04X}) vs "{c2}" (U+{ord(c2):04X})')
-        
-        if not found_similar:
+        similar_pairs = find_similar_pairs(in_json_not_folder, in_folder_not_json)
+        for json_file, actual_file, diffs in similar_pairs:
+            print(f'\n   JSON:     {json_file}')
+            print(f'   資料夾:   {actual_file}')
+            for pos, a, b in diffs:
+                print(f'   差異位置 {pos}: {_fmt_chars(a)} vs {_fmt_chars(b)}')
+
+        if not similar_pairs:
             print('   （未發現明顯的字元差異配對）')
-    
+    else:
+        similar_pairs = []
+
     # 回傳結果供程式化使用
     return {
         'actual_count': len(actual_files),
         'json_count': len(json_files),
         'in_folder_not_json': sorted(in_folder_not_json),
         'in_json_not_folder': sorted(in_json_not_folder),
+        'similar_pairs': [
+            {'json': j, 'folder': a,
+             'diffs': [{'pos': pos, 'json': x, 'folder': y} for pos, x, y in diffs]}
+            for j, a, diffs in similar_pairs
+        ],
         'is_consistent': len(in_folder_not_json) == 0 and len(in_json_not_folder) == 0
     }
 
@@ -10,6 +10,21 @@
 
 支援副檔名：.mp4 .mp3 .m4a .wav .flac
 需要：系統可執行 ffmpeg/ffprobe。
+
+--progress-json：stdout 只輸出 JSON Lines 事件（供 update_gui 等呼叫端使用），每行一個：
+  {"event": "start", "total", "todo", "skipped", "workers", "bytes_total"}
+  {"event": "file_start", "index", "src", "out", "bytes_in"}
+  {"event": "stage", "index", "stage": "probe" | "measure" | "apply" | "fallback"}
+  {"event": "file_done", "index", "src", "out", "ok", "fallback", "bytes_in", "bytes_out",
+   "elapsed", "stages": {階段: 秒}, "error"}
+  {"event": "done", "succeeded", "failed", "skipped", "cancelled", "elapsed", "bytes_in", "bytes_out"}
+每個事件都帶 "t"（距開始的秒數）。stdin 為控制通道：寫入一行 "cancel" 即停止——
+尚未開始的檔案取消，執行中的 ffmpeg 會在約 0.2 秒內被終止並刪除不完整的輸出。
+
+--optimize：逐檔搜尋「仍達品質門檻的最小編碼設定」（VBR V9→V4，二分搜尋），取代一律 -q:a 4。
+  標準化後的音先存成暫存 WAV 當參考，候選編碼解碼回來與它比對（audio_quality.py：lsd 或 snr），
+  都不達標就用原本的設定；結果以來源 SHA-256 快取在輸出資料夾的 .bitrate-cache.json。
+  需要 numpy。
 """
 
 import argparse
@@ -19,15 +34,24 @@ import os
 import shutil
 import subprocess
 import sys
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import tempfile
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Optional, Tuple
 
 from tqdm import tqdm
 
+import audio_quality as aq
+from ufid_registry import sha256_file
+
 SUPPORTED_EXTS = {".mp4", ".mp3", ".m4a", ".wav", ".flac"}
 DEFAULT_OUT_DIR_NAME = "已轉換"
+CANCEL_POLL = 0.2  # 取消旗標的檢查間隔（秒）
+VBR_LADDER = (9, 8, 7, 6, 5, 4)  # --optimize 的候選 VBR 等級，由小到大；4 即原本的預設
+BITRATE_CACHE_NAME = ".bitrate-cache.json"
 
 @dataclass
 class LoudnormTarget:
@@ -44,8 +68,31 @@ def have_ffprobe() -> bool:
     return shutil.which("ffprobe") is not None
 
 
-def run_cmd(cmd: list) -> Tuple[int, str, str]:
-    """Run a command and return (returncode, stdout, stderr) as text."""
+class Cancelled(Exception):
+    pass
+
+
+def run_cmd(cmd: list, cancel=None) -> Tuple[int, str, str]:
+    """Run a command and return (returncode, stdout, stderr) as text.
+    有 cancel（Event）時每 CANCEL_POLL 秒檢查一次，被設定就終止子行程並拋出 Cancelled。"""
+    if cancel is not None:
+        try:
+            p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError as e:
+            return 127, "", f"找不到可執行檔：{e}"
+        while True:
+            try:
+                out, err = p.communicate(timeout=CANCEL_POLL)
+                break
+            except subprocess.TimeoutExpired:
+                if cancel.is_set():
+                    # 不再 communicate：子行程若又開了孫行程，管線會一直被佔住
+                    p.kill()
+                    p.wait()
+                    p.stdout.close()
+                    p.stderr.close()
+                    raise Cancelled()
+        return p.returncode, out.decode(errors="replace"), err.decode(errors="replace")
     try:
         p = subprocess.run(
             cmd,
@@ -62,7 +109,7 @@ def run_cmd(cmd: list) -> Tuple[int, str, str]:
         return 1, "", f"執行指令時發生未預期錯誤：{e}"
 
 
-def ffprobe_audio_info(path: Path) -> Dict:
+def ffprobe_audio_info(path: Path, cancel=None) -> Dict:
     """用 ffprobe 取得音訊資訊（取樣率、平均位元率、聲道數、編碼器）。"""
     cmd = [
         "ffprobe",
@@ -72,7 +119,7 @@ def ffprobe_audio_info(path: Path) -> Dict:
         "-of", "json",
         str(path),
     ]
-    rc, out, err = run_cmd(cmd)
+    rc, out, err = run_cmd(cmd, cancel)
     if rc != 0:
         raise RuntimeError(f"ffprobe 失敗：{err.strip()}")
     data = json.loads(out or "{}")
@@ -125,23 +172,31 @@ def parse_measurement(stderr_text: str) -> Dict[str, float]:
     return needed
 
 
-def _encode_args_for(src_info: Dict, keep_channels: bool, target_sr: int) -> list:
-    """依來源資訊決定 mp3 編碼參數與取樣率/聲道設定。"""
-    audio_args = ["-c:a", "libmp3lame"]
-
-    # 取樣率策略（與原版相同）：
-    # - 若輸入是 mp3 且取樣率 == target_sr -> 不更改取樣率（維持原值）
-    # - 否則 -> 設定為 target_sr
-    set_ar = None
+def _target_rate(src_info: Dict, target_sr: int) -> Optional[int]:
+    """取樣率策略（與原版相同）：
+    - 若輸入是 mp3 且取樣率 == target_sr -> 不更改取樣率（回傳 None，維持原值）
+    - 否則 -> 設定為 target_sr
+    """
     if src_info.get("codec_name") == "mp3" and src_info.get("sample_rate") == target_sr:
-        set_ar = None
-    else:
-        set_ar = target_sr
+        return None
+    return target_sr
+
+
+def _encode_args_for(src_info: Dict, keep_channels: bool, target_sr: int,
+                     vbr_quality: Optional[int] = None) -> list:
+    """依來源資訊決定 mp3 編碼參數與取樣率/聲道設定；vbr_quality 指定時改用該 VBR 等級。"""
+    audio_args = ["-c:a", "libmp3lame"]
+    set_ar = _target_rate(src_info, target_sr)
 
     # 位元率策略：
+    # - 有指定 vbr_quality（--optimize 搜尋結果）-> -q:a vbr_quality
     # - 若是 mp3 並且未更改取樣率 -> 儘量維持原平均位元率（-b:a 指定 kbps）
     # - 其他情況 -> 採用 VBR V4（-q:a 4）
-    if set_ar is None:
+    if vbr_quality is not None:
+        audio_args += ["-q:a", str(vbr_quality)]
+        if set_ar is not None:
+            audio_args += ["-ar", str(set_ar)]
+    elif set_ar is None:
         if src_info.get("codec_name") == "mp3" and src_info.get("bit_rate", 0) > 0:
             kbps = max(32, int(math.floor(src_info["bit_rate"] / 1000)))
             audio_args += ["-b:a", f"{kbps}k"]
@@ -212,6 +267,7 @@ def _try_fallback_singlepass(
     target_sr: int,
     src_info: Dict,
     target: LoudnormTarget,
+    cancel=None,
 ) -> Tuple[bool, str]:
     """執行單段式 loudnorm 後備方案；回傳 (ok, detail_message)。"""
     fallback_cmd = build_singlepass_cmd(
@@ -223,7 +279,7 @@ def _try_fallback_singlepass(
         target=target,
         force_overwrite=True,  # 後備重試時強制覆寫，避免殘留不完整輸出擋住
     )
-    rc, fo, fe = run_cmd(fallback_cmd)
+    rc, fo, fe = run_cmd(fallback_cmd, cancel)
     if rc == 0:
         return True, f"(已使用單段式 loudnorm 後備方案)\n指令：{' '.join(fallback_cmd)}"
     else:
@@ -237,24 +293,98 @@ def process_one(
     target_sr: int,
     force_overwrite: bool,
     target: LoudnormTarget,
+    index: Optional[int] = None,
+    events=None,
+    cancel=None,
 ) -> Tuple[str, bool, str]:
-    """處理單一檔案。回傳 (相對輸出路徑/檔名, success, message)。"""
+    """
+    處理單一檔案。回傳 (相對輸出路徑/檔名, success, message)。
+    events（Queue）不為 None 時送出 file_start / stage / file_done 事件；
+    cancel（Event）被設定時終止執行中的 ffmpeg 並刪除不完整的輸出。
+    """
+    if events is None:
+        return _process_one(in_path, out_path, keep_channels, target_sr, force_overwrite, target)
+    if cancel is not None and cancel.is_set():
+        # 已預先送進行程池、來不及 Future.cancel() 的項目
+        return (str(out_path), False, "已取消")
+
+    stages: Dict[str, float] = {}
+    state = {"stage": None, "t": time.perf_counter(), "fallback": False}
+    t0 = state["t"]
+
+    def stage(name: Optional[str]) -> None:
+        now = time.perf_counter()
+        if state["stage"] is not None:
+            stages[state["stage"]] = round(stages.get(state["stage"], 0.0) + now - state["t"], 3)
+        state["stage"], state["t"] = name, now
+        if name == "fallback":
+            state["fallback"] = True
+        if name is not None:
+            events.put({"event": "stage", "index": index, "stage": name})
+
+    bytes_in = in_path.stat().st_size
+    events.put({"event": "file_start", "index": index, "src": str(in_path),
+                "out": str(out_path), "bytes_in": bytes_in})
+    done = {"event": "file_done", "index": index, "src": str(in_path), "out": str(out_path),
+            "bytes_in": bytes_in, "bytes_out": 0}
     try:
-        src = ffprobe_audio_info(in_path)
+        out_rel, ok, msg = _process_one(in_path, out_path, keep_channels, target_sr,
+                                        force_overwrite, target, stage, cancel)
+    except Cancelled:
+        stage(None)
+        # 被終止的 ffmpeg 可能留下寫一半的輸出
+        if state["fallback"] or stages.get("apply") is not None:
+            try:
+                out_path.unlink()
+            except OSError:
+                pass
+        done.update(ok=False, cancelled=True, error="已取消", fallback=state["fallback"],
+                    elapsed=round(time.perf_counter() - t0, 3), stages=stages)
+        events.put(done)
+        return (str(out_path), False, "已取消")
+    stage(None)
+    done.update(ok=ok, fallback=state["fallback"], elapsed=round(time.perf_counter() - t0, 3),
+                stages=stages, error=None if ok else msg)
+    if ok and out_path.exists():
+        done["bytes_out"] = out_path.stat().st_size
+    events.put(done)
+    return (out_rel, ok, msg)
+
+
+def _process_one(
+    in_path: Path,
+    out_path: Path,
+    keep_channels: bool,
+    target_sr: int,
+    force_overwrite: bool,
+    target: LoudnormTarget,
+    stage=lambda name: None,
+    cancel=None,
+) -> Tuple[str, bool, str]:
+    stage("probe")
+    try:
+        src = ffprobe_audio_info(in_path, cancel)
+    except Cancelled:
+        raise
     except Exception as e:
         return (str(out_path), False, f"ffprobe 失敗：{e}")
 
+    def fallback():
+        stage("fallback")
+        return _try_fallback_singlepass(in_path, out_path, keep_channels, target_sr, src, target, cancel)
+
     # Pass 1: 測量 loudnorm
-    rc1, m_out, m_err = run_cmd(build_measure_cmd(in_path, target))
+    stage("measure")
+    rc1, m_out, m_err = run_cmd(build_measure_cmd(in_path, target), cancel)
     if rc1 != 0:
         # 直接嘗試後備方案
-        ok, detail = _try_fallback_singlepass(in_path, out_path, keep_channels, target_sr, src, target)
+        ok, detail = fallback()
         return (str(out_path), ok, f"兩段式 loudnorm 量測失敗\n{m_err.strip()}\n{detail}")
 
     try:
         m = parse_measurement(m_err)
     except Exception as e:
-        ok, detail = _try_fallback_singlepass(in_path, out_path, keep_channels, target_sr, src, target)
+        ok, detail = fallback()
         return (str(out_path), ok, f"解析 loudnorm 量測輸出失敗：{e}\n原始輸出：\n{m_err.strip()}\n{detail}")
 
     # Pass 2: 套用 loudnorm（帶入量測值）
@@ -275,9 +405,10 @@ def process_one(
             )
             break
 
-    rc2, a_out, a_err = run_cmd(apply_cmd)
+    stage("apply")
+    rc2, a_out, a_err = run_cmd(apply_cmd, cancel)
     if rc2 != 0:
-        ok, detail = _try_fallback_singlepass(in_path, out_path, keep_channels, target_sr, src, target)
+        ok, detail = fallback()
         return (str(out_path), ok, f"兩段式 loudnorm 套用/轉檔失敗\n指令：{' '.join(apply_cmd)}\n錯誤：\n{a_err.strip()}\n{detail}")
 
     return (str(out_path), True, "OK")
@@ -310,6 +441,305 @@ def collect_inputs(input_dir: Path, output_dir: Path, recursive: bool = False) -
     return pairs, len(pairs)
 
 
+# --------------------------------------------------------------------------- #
+#  --progress-json：JSON Lines 事件 + stdin 控制通道
+# --------------------------------------------------------------------------- #
+class EventWriter:
+    """把事件寫成一行 JSON；主程序與轉發執行緒共用，以鎖確保一行不會被拆開。"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.t0 = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def emit(self, ev: Dict) -> None:
+        ev["t"] = round(time.perf_counter() - self.t0, 3)
+        line = json.dumps(ev, ensure_ascii=False)
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+def _forward_events(queue, writer: EventWriter) -> None:
+    """把子行程放進 queue 的事件轉寫到 stdout，收到 None 結束。"""
+    while True:
+        ev = queue.get()
+        if ev is None:
+            return
+        writer.emit(ev)
+
+
+def _watch_control(on_cancel) -> None:
+    """讀取 stdin 的控制指令；目前只有 cancel。stdin 關閉（EOF）不視為取消。"""
+    for line in sys.stdin:
+        if line.strip().lower() == "cancel":
+            on_cancel()
+            return
+
+
+def run_progress_json(pairs: list, args, target: LoudnormTarget) -> int:
+    """--progress-json 模式的主流程；回傳結束碼（有失敗 1、被取消 130）。"""
+    import multiprocessing
+
+    writer = EventWriter()
+    todo = [(i, o) for i, o in pairs if args.force or not o.exists()]
+    skipped = len(pairs) - len(todo)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    writer.emit({
+        "event": "start", "total": len(pairs), "todo": len(todo), "skipped": skipped,
+        "workers": workers, "bytes_total": sum(i.stat().st_size for i, _ in todo),
+    })
+
+    stats = {"succeeded": 0, "failed": 0, "cancelled": 0, "bytes_in": 0, "bytes_out": 0}
+    with multiprocessing.Manager() as mgr:
+        queue, cancel = mgr.Queue(), mgr.Event()
+        fwd = threading.Thread(target=_forward_events, args=(queue, writer), daemon=True)
+        fwd.start()
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            futures = {
+                ex.submit(process_one, in_path, out_path, args.keep_channels, args.sample_rate,
+                          args.force, target, n, queue, cancel): (n, in_path, out_path)
+                for n, (in_path, out_path) in enumerate(todo)
+            }
+
+            def on_cancel() -> None:
+                cancel.set()
+                for f in futures:
+                    f.cancel()  # 尚未開始的直接取消；執行中的由 cancel 旗標終止 ffmpeg
+
+            threading.Thread(target=_watch_control, args=(on_cancel,), daemon=True).start()
+            for fut in as_completed(futures):
+                n, in_path, out_path = futures[fut]
+                try:
+                    _, ok, msg = fut.result()
+                except CancelledError:
+                    stats["cancelled"] += 1
+                    continue
+                except Exception as e:
+                    # 子行程本身出錯（例如被系統終止），process_one 來不及送 file_done
+                    stats["failed"] += 1
+                    queue.put({"event": "file_done", "index": n, "src": str(in_path), "out": str(out_path),
+                               "ok": False, "error": f"{type(e).__name__}: {e}", "bytes_in": 0, "bytes_out": 0})
+                    continue
+                if ok:
+                    stats["succeeded"] += 1
+                    stats["bytes_in"] += in_path.stat().st_size
+                    stats["bytes_out"] += out_path.stat().st_size if out_path.exists() else 0
+                elif cancel.is_set() and msg == "已取消":
+                    stats["cancelled"] += 1
+                else:
+                    stats["failed"] += 1
+        queue.put(None)
+        fwd.join()
+        was_cancelled = cancel.is_set()
+
+    writer.emit({"event": "done", "skipped": skipped,
+                 "elapsed": round(time.perf_counter() - writer.t0, 3), **stats})
+    if was_cancelled:
+        return 130
+    return 1 if stats["failed"] else 0
+
+
+# --------------------------------------------------------------------------- #
+#  --optimize：逐檔搜尋達品質門檻的最小編碼設定
+# --------------------------------------------------------------------------- #
+def _loudnorm_filter(target: LoudnormTarget, m: Optional[Dict[str, float]] = None) -> str:
+    """有量測值時為兩段式套用濾鏡，否則為單段式（後備）。"""
+    filt = f"loudnorm=I={target.I}:TP={target.TP}:LRA={target.LRA}"
+    if m is None:
+        return filt
+    return (
+        f"{filt}:measured_I={m['input_i']}:measured_TP={m['input_tp']}:"
+        f"measured_LRA={m['input_lra']}:measured_thresh={m['input_thresh']}:"
+        f"offset={m['target_offset']}:linear=true"
+    )
+
+
+def build_reference_cmd(in_path: Path, ref_path: Path, keep_channels: bool, target_sr: int,
+                        src_info: Dict, loudnorm: str) -> list:
+    """標準化後存成 32-bit float WAV（取樣率/聲道同正式輸出），作為候選編碼的參考與來源。"""
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"]
+    cmd += ["-i", str(in_path), "-vn", "-af", loudnorm, "-c:a", "pcm_f32le"]
+    set_ar = _target_rate(src_info, target_sr)
+    if set_ar is not None:
+        cmd += ["-ar", str(set_ar)]
+    if not keep_channels:
+        cmd += ["-ac", "1"]
+    cmd += [str(ref_path)]
+    return cmd
+
+
+def build_encode_cmd(ref_path: Path, in_path: Path, out_path: Path, audio_args: list) -> list:
+    """把參考 WAV 編碼成 mp3；標籤（metadata）仍取自原始來源檔。"""
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"]
+    cmd += ["-i", str(ref_path), "-i", str(in_path), "-map", "0:a", "-map_metadata", "1"]
+    cmd += audio_args
+    cmd += [str(out_path)]
+    return cmd
+
+
+def optimize_one(
+    in_path: Path,
+    out_path: Path,
+    keep_channels: bool,
+    target_sr: int,
+    target: LoudnormTarget,
+    metric: str,
+    threshold: float,
+    cached: Optional[Dict] = None,
+) -> Dict:
+    """
+    處理單一檔案（--optimize）。回傳 dict：ok、msg、quality（None=基準設定）、value、
+    bytes、baseline_bytes、fallback、cached、tried（{等級: 指標值}）。
+    cached 為快取項目時直接用其 quality 編碼，不再搜尋。
+    """
+    res = {"out": str(out_path), "ok": False, "msg": "", "quality": None, "value": None,
+           "bytes": 0, "baseline_bytes": 0, "fallback": False, "cached": cached is not None,
+           "tried": {}}
+    try:
+        src = ffprobe_audio_info(in_path)
+    except Exception as e:
+        res["msg"] = f"ffprobe 失敗：{e}"
+        return res
+
+    # 量測 loudnorm；失敗時與一般模式一樣改用單段式
+    rc, _, m_err = run_cmd(build_measure_cmd(in_path, target))
+    try:
+        if rc != 0:
+            raise ValueError(m_err.strip())
+        loudnorm = _loudnorm_filter(target, parse_measurement(m_err))
+    except Exception:
+        loudnorm = _loudnorm_filter(target)
+        res["fallback"] = True
+
+    with tempfile.TemporaryDirectory(prefix="optimize-") as tmp:
+        tmp = Path(tmp)
+        ref = tmp / "ref.wav"
+        ref_cmd = build_reference_cmd(in_path, ref, keep_channels, target_sr, src, loudnorm)
+        rc, _, err = run_cmd(ref_cmd)
+        if rc != 0 and not res["fallback"]:
+            # 量測值無法套用（例如整段靜音時 measured_I=-inf）
+            res["fallback"] = True
+            ref_cmd = build_reference_cmd(in_path, ref, keep_channels, target_sr, src,
+                                          _loudnorm_filter(target))
+            rc, _, err = run_cmd(ref_cmd)
+        if rc != 0:
+            res["msg"] = f"標準化失敗\n指令：{' '.join(ref_cmd)}\n錯誤：\n{err.strip()}"
+            return res
+
+        def encode(quality: Optional[int]) -> Path:
+            path = tmp / ("baseline.mp3" if quality is None else f"v{quality}.mp3")
+            cmd = build_encode_cmd(ref, in_path, path,
+                                   _encode_args_for(src, keep_channels, target_sr, quality))
+            rc, _, err = run_cmd(cmd)
+            if rc != 0:
+                raise RuntimeError(f"指令：{' '.join(cmd)}\n錯誤：\n{err.strip()}")
+            return path
+
+        try:
+            if cached is not None:
+                chosen = encode(cached.get("quality"))
+                res.update(quality=cached.get("quality"), value=cached.get("value"),
+                           baseline_bytes=cached.get("baseline_bytes", 0))
+            else:
+                baseline = encode(None)
+                res["baseline_bytes"] = baseline.stat().st_size
+                candidates = {}
+
+                def ok_at(i: int) -> bool:
+                    q = VBR_LADDER[i]
+                    candidates[q] = encode(q)
+                    value = aq.measure(ref, candidates[q], target_sr, metric)
+                    res["tried"][q] = round(value, 3)
+                    return aq.passes(value, metric, threshold)
+
+                # 等級由小到大，品質大致單調：二分搜尋第一個達標的等級
+                lo, hi = 0, len(VBR_LADDER)
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if ok_at(mid):
+                        hi = mid
+                    else:
+                        lo = mid + 1
+                chosen = baseline
+                if lo < len(VBR_LADDER):
+                    q = VBR_LADDER[lo]
+                    if candidates[q].stat().st_size < res["baseline_bytes"]:
+                        chosen = candidates[q]
+                        res.update(quality=q, value=res["tried"][q])
+        except Exception as e:
+            res["msg"] = f"編碼或比對失敗：{e}"
+            return res
+
+        shutil.move(str(chosen), str(out_path))
+    res["bytes"] = out_path.stat().st_size
+    res.update(ok=True, msg="OK")
+    return res
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1048576:.2f} MB"
+
+
+def run_optimize(todo: list, args, target: LoudnormTarget, output_dir: Path) -> Dict:
+    """--optimize 的主流程：並行搜尋、寫回快取；回傳統計。"""
+    cache = aq.BitrateCache(output_dir / BITRATE_CACHE_NAME)
+    # 參數不同（目標響度、取樣率、聲道、門檻）就是不同的結果，一起放進快取鍵
+    op = "<=" if args.metric == "lsd" else ">="
+    params = (f"I={target.I},TP={target.TP},LRA={target.LRA},sr={args.sample_rate},"
+              f"{'stereo' if args.keep_channels else 'mono'},{args.metric}{op}{args.threshold}")
+    stats = {"succeeded": 0, "failed": 0, "cache_hits": 0, "bytes_in": 0, "baseline_bytes": 0,
+             "bytes_out": 0, "settings": {}, "errors": []}
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            futures = {}
+            for in_path, out_path in todo:
+                key = cache.key(sha256_file(in_path), params)
+                fut = ex.submit(optimize_one, in_path, out_path, args.keep_channels,
+                                args.sample_rate, target, args.metric, args.threshold,
+                                cache.get(key))
+                futures[fut] = (in_path, out_path, key)
+            for fut in tqdm(as_completed(futures), total=len(futures), desc="最佳化中", unit="檔"):
+                in_path, out_path, key = futures[fut]
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    stats["errors"].append(f"[EXC] {in_path} -> {out_path}\n{e}\n")
+                    continue
+                if not res["ok"]:
+                    stats["failed"] += 1
+                    stats["errors"].append(f"[FAIL] {res['out']}\n{res['msg']}\n")
+                    continue
+                stats["succeeded"] += 1
+                stats["cache_hits"] += res["cached"]
+                stats["bytes_in"] += in_path.stat().st_size
+                stats["baseline_bytes"] += res["baseline_bytes"]
+                stats["bytes_out"] += res["bytes"]
+                label = "基準" if res["quality"] is None else f"V{res['quality']}"
+                stats["settings"][label] = stats["settings"].get(label, 0) + 1
+                cache.put(key, {"quality": res["quality"], "value": res["value"],
+                                "bytes": res["bytes"], "baseline_bytes": res["baseline_bytes"]})
+    finally:
+        cache.save()
+    return stats
+
+
+def print_optimize_report(stats: Dict, metric: str, threshold: float) -> None:
+    print("\n=== 位元率最佳化 ===")
+    print(f"品質門檻：{metric} {'≤' if metric == 'lsd' else '≥'} {threshold}")
+    print(f"快取命中：{stats['cache_hits']} / {stats['succeeded']}")
+    order = [f"V{q}" for q in VBR_LADDER] + ["基準"]
+    dist = "  ".join(f"{k}×{stats['settings'][k]}" for k in order if k in stats["settings"])
+    print(f"選用設定：{dist or '—'}")
+    print(f"來源總計：{_mb(stats['bytes_in'])}")
+    print(f"原設定（-q:a 4／原位元率）：{_mb(stats['baseline_bytes'])}")
+    saved = stats["baseline_bytes"] - stats["bytes_out"]
+    pct = 100.0 * saved / stats["baseline_bytes"] if stats["baseline_bytes"] else 0.0
+    print(f"最佳化後：{_mb(stats['bytes_out'])}（節省 {_mb(saved)}，{pct:.1f}%）")
+
+
 def main():
     if not have_ffmpeg() or not have_ffprobe():
         if not have_ffmpeg():
@@ -344,8 +774,23 @@ def main():
     parser.add_argument("--I", type=float, default=-14.0, help="loudnorm 目標整體響度 (LUFS)；預設 -14")
     parser.add_argument("--TP", type=float, default=-1.5, help="loudnorm 目標真峰值 (dBTP)；預設 -1.5")
     parser.add_argument("--LRA", type=float, default=11.0, help="loudnorm 目標動態範圍 (LRA)；預設 11")
+    parser.add_argument("--progress-json", action="store_true",
+                        help="stdout 改為逐行 JSON 事件（不顯示進度條），stdin 讀取 cancel 指令")
+    parser.add_argument("--optimize", action="store_true",
+                        help="逐檔搜尋仍達品質門檻的最小編碼設定（VBR V9→V4），取代一律 -q:a 4；需要 numpy")
+    parser.add_argument("--metric", choices=aq.METRICS, default="lsd",
+                        help="--optimize 的品質指標：lsd＝頻譜距離 dB（愈小愈好）、snr＝訊雜比 dB（愈大愈好）")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="--optimize 的品質門檻；預設 lsd 4.0、snr 20.0")
 
     args = parser.parse_args()
+    if args.optimize and args.progress_json:
+        parser.error("--optimize 不支援 --progress-json")
+    if args.threshold is None:
+        args.threshold = aq.DEFAULT_THRESHOLDS[args.metric]
+    if args.optimize and aq.np is None:
+        print("錯誤：--optimize 需要 numpy（pip install numpy）。", file=sys.stderr)
+        sys.exit(1)
 
     input_dir = Path(getattr(args, "input_dir_cli", None) or getattr(args, "input_dir_pos", None) or os.getcwd()).resolve()
     if not input_dir.exists() or not input_dir.is_dir():
@@ -358,6 +803,8 @@ def main():
     target = LoudnormTarget(I=args.I, TP=args.TP, LRA=args.LRA)
 
     pairs, total = collect_inputs(input_dir, output_dir, args.recursive)
+    if args.progress_json and not args.dry_run:
+        sys.exit(run_progress_json(pairs, args, target))
     if total == 0:
         print("沒有可處理的檔案。支援：.mp4 .mp3 .m4a .wav .flac")
         return
@@ -370,6 +817,9 @@ def main():
     print(f"目標取樣率：{args.sample_rate} Hz（僅在需要時更改 MP3 的取樣率）")
     print(f"覆寫策略：{'強制覆寫' if args.force else '已存在則略過'}")
     print(f"並行工作數：{args.workers if args.workers>0 else os.cpu_count() or 1}")
+    if args.optimize:
+        print(f"位元率最佳化：{args.metric} {'≤' if args.metric == 'lsd' else '≥'} {args.threshold}，"
+              f"候選 {' '.join(f'V{q}' for q in VBR_LADDER)}（快取：{output_dir / BITRATE_CACHE_NAME}）")
     print(f"模式：{'乾跑' if args.dry_run else '實際轉檔'}\n")
 
     if args.dry_run:
@@ -385,6 +835,14 @@ def main():
         print("[DRY-RUN] 兩段式套用指令（值將以量測結果替換）：", " ".join(dummy_apply))
         dummy_fallback = build_singlepass_cmd(sample[0], sample[1], args.keep_channels, args.sample_rate, info, target, True)
         print("[DRY-RUN] 後備（單段式 loudnorm）指令：", " ".join(dummy_fallback))
+        if args.optimize:
+            ref = Path("ref.wav")
+            print("[DRY-RUN] 最佳化參考音指令：", " ".join(build_reference_cmd(
+                sample[0], ref, args.keep_channels, args.sample_rate, info, _loudnorm_filter(target))))
+            for q in VBR_LADDER:
+                print(f"[DRY-RUN] 候選 V{q}：", " ".join(build_encode_cmd(
+                    ref, sample[0], sample[1],
+                    _encode_args_for(info, args.keep_channels, args.sample_rate, q))))
         return
 
     # 去除已存在且不覆寫的項目
@@ -396,6 +854,20 @@ def main():
             continue
         todo.append((in_path, out_path))
 
+    if args.optimize:
+        stats = run_optimize(todo, args, target, output_dir)
+        print("\n=== 結果 ===")
+        print(f"總計檔案：{total}")
+        print(f"待處理：{len(todo)} ；略過（已存在且未 --force）：{skipped}")
+        print(f"成功轉檔：{stats['succeeded']}")
+        print(f"失敗檔案：{stats['failed']}")
+        print_optimize_report(stats, args.metric, args.threshold)
+        if stats["errors"]:
+            print("\n=== 失敗/錯誤詳細 ===")
+            for log in stats["errors"]:
+                print(log)
+        return
+
     succeeded = 0
     failed = 0
     error_logs = []
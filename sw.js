@@ -0,0 +1,119 @@
+/*
+ * 音效板 Service Worker
+ * ========================================
+ * 依 precache-manifest.json（python-scripts/precache_manifest.py 產生）分層預快取：
+ * 先型錄（JSON、腳本、頭像），再依票數排序的熱門音效，讓第一次點播不必等網路。
+ *
+ * - 清單中的網址都是內容雜湊檔名：已快取的網址不重新下載，不在清單中的（舊雜湊）刪除
+ * - 清單 revision 沒變就不做事；有下載失敗時不記錄 revision，下次再補
+ * - 開啟「節省數據」時只快取第一層（型錄）
+ * - 已快取的音效也能回應 <audio> 的 Range 請求（由快取內容切出 206）
+ */
+'use strict';
+
+const PRECACHE = 'soundboard-precache-v1';
+const MANIFEST_URL = 'precache-manifest.json';
+const REVISION_KEY = '__precache-revision';
+const CONCURRENCY = 4;
+
+self.addEventListener('install', event => {
+  event.waitUntil(self.skipWaiting());
+});
+
+self.addEventListener('activate', event => {
+  event.waitUntil(self.clients.claim().then(() => sync()));
+});
+
+self.addEventListener('message', event => {
+  if (event.data === 'precache') event.waitUntil(sync());
+});
+
+let syncing = null;
+
+/** 同一時間只跑一次同步 */
+function sync() {
+  if (!syncing) syncing = doSync().catch(err => console.warn('[sw] precache failed', err)).finally(() => { syncing = null; });
+  return syncing;
+}
+
+const absolute = url => new URL(url, self.registration.scope).href;
+
+async function doSync() {
+  const resp = await fetch(MANIFEST_URL, { cache: 'no-cache' });
+  if (!resp.ok) return;
+  const manifest = await resp.json();
+  const cache = await caches.open(PRECACHE);
+  const saved = await cache.match(REVISION_KEY);
+  if (saved && (await saved.text()) === manifest.revision) return;
+
+  const saveData = Boolean(self.navigator.connection && self.navigator.connection.saveData);
+  const tiers = saveData ? manifest.tiers.slice(0, 1) : manifest.tiers;
+  const wanted = new Set(tiers.flatMap(t => t.entries.map(e => absolute(e.url))));
+  const revisionUrl = absolute(REVISION_KEY);
+
+  for (const req of await cache.keys()) {
+    if (req.url !== revisionUrl && !wanted.has(req.url)) await cache.delete(req);
+  }
+
+  let failed = 0;
+  for (const tier of tiers) {
+    const missing = [];
+    for (const e of tier.entries) {
+      const url = absolute(e.url);
+      if (!(await cache.match(url))) missing.push(url);
+    }
+    await runPool(missing, CONCURRENCY, async url => {
+      try {
+        const r = await fetch(url);
+        if (r.status === 200) await cache.put(url, r);
+        else failed++;
+      } catch (_) {
+        failed++;
+      }
+    });
+  }
+  if (!failed && !saveData) await cache.put(REVISION_KEY, new Response(manifest.revision));
+}
+
+async function runPool(items, size, worker) {
+  let next = 0;
+  const lanes = Array.from({ length: Math.min(size, items.length) }, async () => {
+    while (next < items.length) await worker(items[next++]);
+  });
+  await Promise.all(lanes);
+}
+
+self.addEventListener('fetch', event => {
+  const req = event.request;
+  if (req.method !== 'GET' || new URL(req.url).origin !== self.location.origin) return;
+  event.respondWith((async () => {
+    const cache = await caches.open(PRECACHE);
+    const hit = await cache.match(req.url);
+    if (!hit) return fetch(req);
+    const range = req.headers.get('range');
+    return range ? rangeResponse(hit, range) : hit;
+  })());
+});
+
+/** 由完整的快取回應切出 Range 請求要的部分（單一區段） */
+async function rangeResponse(resp, range) {
+  const buf = await resp.arrayBuffer();
+  const size = buf.byteLength;
+  const m = /^bytes=(\d*)-(\d*)$/.exec(range.trim());
+  if (!m || (m[1] === '' && m[2] === '')) return new Response(buf, { status: 200, headers: resp.headers });
+  let start, end;
+  if (m[1] === '') {
+    start = Math.max(0, size - Number(m[2]));
+    end = size - 1;
+  } else {
+    start = Number(m[1]);
+    end = m[2] === '' ? size - 1 : Math.min(Number(m[2]), size - 1);
+  }
+  if (start >= size || start > end) {
+    return new Response(null, { status: 416, headers: { 'Content-Range': `bytes */${size}` } });
+  }
+  const headers = new Headers(resp.headers);
+  headers.set('Content-Range', `bytes ${start}-${end}/${size}`);
+  headers.set('Content-Length', String(end - start + 1));
+  return new Response(buf.slice(start, end + 1), { status: 206, statusText: 'Partial Content', headers });
+}